@@ -0,0 +1,459 @@
+"""
+Shared client for the USDA Soil Data Access (SDA) REST service.
+
+All SDA traffic (tabular horizon queries from GAEZ_SSURGO_data and spatial
+mukey lookups from GAEZ_SDA_query) goes through one SDAClient so that the
+payload format, latency history, and failure state are shared:
+
+- Adaptive timeouts: the per-request timeout is derived from the recent p99
+  latency of the same kind of query instead of a fixed value.
+- Hedged requests: if the first request has not answered by the recent p95
+  latency, a duplicate is sent and whichever answers first is used.
+- Circuit breaker: after repeated failures the client stops calling SDA for a
+  cool-down period and either serves the last good answer for the same query
+  (stale cache) or fails fast with SDAUnavailableError.
+
+Retries never sleep; a failed attempt is retried immediately while the time
+budget for the call allows it.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, Optional
+
+import numpy as np
+import requests
+
+import gaez_config
+
+logger = logging.getLogger(__name__)
+
+
+class SDAClientError(requests.RequestException):
+    """Base error raised by the SDA client."""
+    pass
+
+
+class SDAUnavailableError(SDAClientError):
+    """Raised when the circuit breaker is open and no stale answer is cached."""
+    pass
+
+
+class LatencyTracker:
+    """Rolling window of successful request latencies (seconds)."""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if not self._samples:
+                return None
+            return float(np.percentile(np.fromiter(self._samples, dtype=float), q))
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker.
+
+    closed    -> requests flow; `failure_threshold` consecutive failures open it
+    open      -> requests are refused until `reset_seconds` have passed
+    half_open -> a single probe request is allowed; success closes the
+                 breaker, failure re-opens it
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                return self.HALF_OPEN
+            return self._state
+
+    PROBE = 'probe'
+    REQUEST = 'request'
+
+    def acquire(self) -> Optional[str]:
+        """
+        PROBE for the single half-open probe, REQUEST while closed, None if the
+        request is refused. A probe that records neither success nor failure
+        must be handed back with release_probe().
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return self.REQUEST
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_seconds:
+                    return None
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            # half-open: let exactly one probe through
+            if self._probe_in_flight:
+                return None
+            self._probe_in_flight = True
+            return self.PROBE
+
+    def allow_request(self) -> bool:
+        return self.acquire() is not None
+
+    def release_probe(self) -> None:
+        """End a probe without an outcome (e.g. a 4xx answer); the next request probes again."""
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(f"SDA circuit breaker opened after {self._failures} consecutive failures")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probe_in_flight = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+
+class SDAClient:
+    """
+    Thread-safe SDA client with adaptive timeouts, hedging, a circuit breaker
+    and a bounded stale-answer cache.
+
+    Queries are posted as JSON+COLUMNNAME, so a successful payload looks like
+    {"Table": [[column names], [row], ...]}. SDA returns {} when the query
+    matches no rows.
+    """
+
+    def __init__(self,
+                 url: str = gaez_config.sda_url,
+                 default_timeouts: Optional[Dict[str, float]] = None,
+                 min_timeout: float = gaez_config.sda_min_timeout,
+                 max_timeout: float = gaez_config.sda_max_timeout,
+                 timeout_multiplier: float = gaez_config.sda_timeout_multiplier,
+                 min_samples: int = gaez_config.sda_min_latency_samples,
+                 hedge: bool = gaez_config.sda_hedge_requests,
+                 retries: int = gaez_config.sda_retries,
+                 failure_threshold: int = gaez_config.sda_breaker_failure_threshold,
+                 reset_seconds: float = gaez_config.sda_breaker_reset_seconds,
+                 stale_cache_size: int = gaez_config.sda_stale_cache_size,
+                 max_workers: int = gaez_config.sda_max_workers):
+        self.url = url
+        self.default_timeouts = dict(default_timeouts or gaez_config.sda_default_timeouts)
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_multiplier = timeout_multiplier
+        self.min_samples = min_samples
+        self.hedge = hedge
+        self.retries = retries
+        self.stale_cache_size = stale_cache_size
+        self.breaker = CircuitBreaker(failure_threshold, reset_seconds)
+
+        self._latency = {}
+        self._stale = OrderedDict()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='sda')
+        self._counters = {'requests': 0, 'hedged': 0, 'hedge_wins': 0, 'failures': 0,
+                          'stale_served': 0, 'short_circuited': 0}
+
+    # -- latency bookkeeping -------------------------------------------------
+
+    def _tracker(self, kind: str) -> LatencyTracker:
+        with self._lock:
+            if kind not in self._latency:
+                self._latency[kind] = LatencyTracker()
+            return self._latency[kind]
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self._counters[name] += 1
+
+    def timeout_for(self, kind: str = 'tabular') -> float:
+        """Adaptive timeout: p99 latency x multiplier, clamped to [min, max]."""
+        tracker = self._tracker(kind)
+        if len(tracker) < self.min_samples:
+            return self.default_timeouts.get(kind, self.max_timeout)
+        p99 = tracker.percentile(99)
+        return float(min(max(p99 * self.timeout_multiplier, self.min_timeout), self.max_timeout))
+
+    def hedge_delay_for(self, kind: str = 'tabular') -> Optional[float]:
+        """Delay before a duplicate request is sent (recent p95), or None if unknown."""
+        tracker = self._tracker(kind)
+        if len(tracker) < self.min_samples:
+            return None
+        return tracker.percentile(95)
+
+    # -- stale cache ---------------------------------------------------------
+
+    def _remember(self, sql: str, payload: Dict[str, Any]) -> None:
+        if self.stale_cache_size <= 0:
+            return
+        with self._lock:
+            self._stale[sql] = payload
+            self._stale.move_to_end(sql)
+            while len(self._stale) > self.stale_cache_size:
+                self._stale.popitem(last=False)
+
+    def _stale_answer(self, sql: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            payload = self._stale.get(sql)
+        if payload is not None:
+            self._count('stale_served')
+        return payload
+
+    # -- requests ------------------------------------------------------------
+
+    def _post(self, sql: str, timeout: float, kind: str) -> Dict[str, Any]:
+        """Single HTTP round trip; records latency on success."""
+        start = time.perf_counter()
+        response = requests.post(self.url, json={"format": "JSON+COLUMNNAME", "query": sql}, timeout=timeout)
+        response.raise_for_status()
+        payload = response.json()
+        elapsed = time.perf_counter() - start
+        self._tracker(kind).add(elapsed)
+        logger.info(f"{round(elapsed, 2)}: {self.url}")
+        return payload
+
+    def _hedged_post(self, sql: str, timeout: float, kind: str) -> Dict[str, Any]:
+        """Send one request and, if it is slower than the p95, a duplicate."""
+        delay = self.hedge_delay_for(kind) if self.hedge else None
+        if delay is None or delay >= timeout:
+            return self._post(sql, timeout, kind)
+
+        deadline = time.monotonic() + timeout
+        primary = self._executor.submit(self._post, sql, timeout, kind)
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        self._count('hedged')
+        remaining = max(deadline - time.monotonic(), self.min_timeout)
+        backup = self._executor.submit(self._post, sql, remaining, kind)
+        pending = {primary, backup}
+        error = None
+        while pending:
+            done, pending = wait(pending, timeout=max(deadline - time.monotonic(), 0), return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if future is backup:
+                        self._count('hedge_wins')
+                    return future.result()
+                error = future.exception()
+        raise error or requests.Timeout(f"SDA request exceeded {timeout:.1f}s")
+
+    @staticmethod
+    def _is_upstream_failure(err: Exception) -> bool:
+        """Network errors and 5xx responses count against the breaker; 4xx do not."""
+        if isinstance(err, requests.HTTPError):
+            status = getattr(err.response, 'status_code', None)
+            return not isinstance(status, int) or status >= 500
+        return isinstance(err, requests.RequestException)
+
+    def query(self, sql: str, kind: str = 'tabular', timeout: Optional[float] = None,
+              allow_stale: bool = True, retries: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Run a SQL query against SDA.
+
+        Args:
+            sql: SQL query string
+            kind: Latency class of the query ('tabular' or 'spatial'); each
+                  kind keeps its own latency percentiles
+            timeout: Optional upper bound (seconds) on the adaptive timeout
+            allow_stale: Serve the last good answer for this query when SDA
+                         is unavailable
+            retries: Immediate retries for this query (default: the client's)
+
+        Returns:
+            Parsed JSON+COLUMNNAME payload
+
+        Raises:
+            SDAUnavailableError: Breaker open and no stale answer cached
+            requests.RequestException: Request failed and no stale answer cached
+        """
+        ticket = self.breaker.acquire()
+        if ticket is None:
+            self._count('short_circuited')
+            stale = self._stale_answer(sql) if allow_stale else None
+            if stale is not None:
+                logger.warning("SDA circuit open: serving cached answer")
+                return stale
+            raise SDAUnavailableError("SDA circuit breaker is open; not calling Soil Data Access")
+
+        try:
+            return self._query(sql, kind, timeout, allow_stale, self.retries if retries is None else retries)
+        finally:
+            # a probe answered by a 4xx (or any other non-upstream error) has no outcome
+            if ticket == CircuitBreaker.PROBE:
+                self.breaker.release_probe()
+
+    def _query(self, sql: str, kind: str, timeout: Optional[float], allow_stale: bool,
+               retries: int) -> Dict[str, Any]:
+        """Retried request of query() once the breaker has let it through."""
+        budget = self.timeout_for(kind)
+        if timeout is not None:
+            budget = min(budget, timeout)
+        deadline = time.monotonic() + budget
+
+        last_error = None
+        for attempt in range(retries + 1):
+            remaining = deadline - time.monotonic()
+            if attempt > 0 and remaining < self.min_timeout:
+                break
+            self._count('requests')
+            try:
+                payload = self._hedged_post(sql, max(remaining, self.min_timeout), kind)
+            except (requests.ConnectionError, requests.Timeout) as err:
+                last_error = err
+                logger.warning(f"SDA request failed (attempt {attempt + 1}/{retries + 1}): {err}")
+                continue
+            except requests.RequestException as err:
+                last_error = err
+                break
+            self.breaker.record_success()
+            self._remember(sql, payload)
+            return payload
+
+        self._count('failures')
+        if self._is_upstream_failure(last_error):
+            self.breaker.record_failure()
+            stale = self._stale_answer(sql) if allow_stale else None
+            if stale is not None:
+                logger.warning(f"SDA request failed ({last_error}); serving cached answer")
+                return stale
+        raise last_error
+
+    def stream(self, sql: str, kind: str = 'stream', timeout: Optional[float] = None,
+               chunk_size: int = 1 << 16) -> Iterator[bytes]:
+        """
+        Run a SQL query against SDA and yield the response body in chunks.
+
+        For large answers that are parsed incrementally (GAEZ_SDA_stream). The
+        request is retried on connection errors and timeouts before the body
+        starts; there is no hedging and no stale cache (answers are not kept).
+        The timeout applies to connecting and to each read. Streamed queries
+        keep their own latency class ('stream') so that large answers do not
+        stretch the timeouts of ordinary tabular queries.
+
+        Yields:
+            Raw body chunks (UTF-8 JSON+COLUMNNAME)
+
+        Raises:
+            SDAUnavailableError: Breaker open
+            requests.RequestException: Request failed
+        """
+        ticket = self.breaker.acquire()
+        if ticket is None:
+            self._count('short_circuited')
+            raise SDAUnavailableError("SDA circuit breaker is open; not calling Soil Data Access")
+
+        try:
+            budget = self.timeout_for(kind)
+            if timeout is not None:
+                budget = min(budget, timeout)
+
+            response = None
+            last_error = None
+            start = time.perf_counter()
+            for attempt in range(self.retries + 1):
+                self._count('requests')
+                try:
+                    response = requests.post(self.url, json={"format": "JSON+COLUMNNAME", "query": sql},
+                                             timeout=budget, stream=True)
+                    response.raise_for_status()
+                    break
+                except (requests.ConnectionError, requests.Timeout) as err:
+                    last_error, response = err, None
+                    logger.warning(f"SDA request failed (attempt {attempt + 1}/{self.retries + 1}): {err}")
+                except requests.RequestException as err:
+                    last_error, response = err, None
+                    break
+
+            if response is None:
+                self._count('failures')
+                if self._is_upstream_failure(last_error):
+                    self.breaker.record_failure()
+                raise last_error
+
+            try:
+                with response:
+                    yield from response.iter_content(chunk_size)
+            except GeneratorExit:
+                # consumer stopped reading; SDA was answering
+                self.breaker.record_success()
+                raise
+            except requests.RequestException:
+                self._count('failures')
+                self.breaker.record_failure()
+                raise
+            elapsed = time.perf_counter() - start
+            self._tracker(kind).add(elapsed)
+            self.breaker.record_success()
+            logger.info(f"{round(elapsed, 2)}: {self.url} (streamed)")
+        finally:
+            # a probe answered by a 4xx (or any other non-upstream error) has no outcome
+            if ticket == CircuitBreaker.PROBE:
+                self.breaker.release_probe()
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters, breaker state and current adaptive timeouts per query kind."""
+        with self._lock:
+            counters = dict(self._counters)
+            kinds = list(self._latency)
+        counters['breaker_state'] = self.breaker.state
+        counters['timeouts'] = {kind: self.timeout_for(kind) for kind in kinds}
+        return counters
+
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+
+def get_sda_client() -> SDAClient:
+    """Process-wide SDA client built from gaez_config settings."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            _default_client = SDAClient()
+        return _default_client
+
+
+def reset_sda_client() -> None:
+    """Discard the shared client (latency history, breaker state and cache)."""
+    global _default_client
+    with _default_client_lock:
+        _default_client = None
@@ -9,63 +9,50 @@ import requests
 import json
 from typing import List, Tuple, Optional, Dict, Any
 import logging
-import time
+
+import GAEZ_SDA_client
+import GAEZ_coverage
+import gaez_config
 
 logger = logging.getLogger(__name__)
 
 # SDA REST endpoint
-SDA_URL = "https://sdmdataaccess.sc.egov.usda.gov/tabular/post.rest"
+SDA_URL = gaez_config.sda_url
 
 
-def query_sda(sql: str, format: str = "json", timeout: int = 60, retries: int = 2) -> Dict[str, Any]:
+def query_sda(sql: str, format: str = "json", timeout: Optional[float] = None,
+              retries: Optional[int] = None) -> Dict[str, Any]:
     """
-    Execute a SQL query against the SDA service with retry logic.
-    
+    Execute a SQL query against the SDA service.
+
+    Requests go through the shared GAEZ_SDA_client.SDAClient, which handles
+    adaptive timeouts, hedged duplicates, immediate retries and the circuit
+    breaker. The payload is always requested as JSON+COLUMNNAME; the header
+    row is stripped so "Table" holds data rows only.
+
     Args:
         sql: SQL query string
-        format: Response format ('json' or 'xml')
-        timeout: Timeout in seconds
-        retries: Number of retry attempts
+        format: Response format ('json' returns the Table dict, anything else
+                returns {"response": <raw JSON text>})
+        timeout: Optional upper bound in seconds on the adaptive timeout
+        retries: Optional number of immediate retries (default: the client's
+                 gaez_config.sda_retries); 0 fails fast
     
     Returns:
         Dict containing the query results
         
     Raises:
-        requests.RequestException: If the query fails after all retries
+        requests.RequestException: If the query fails (including
+            GAEZ_SDA_client.SDAUnavailableError when the breaker is open)
     """
-    payload = {
-        "query": sql,
-        "format": format
-    }
-    
-    last_error = None
-    for attempt in range(retries + 1):
-        try:
-            if attempt > 0:
-                wait_time = 2 ** attempt  # Exponential backoff: 2, 4 seconds
-                logger.info(f"Retrying after {wait_time} seconds (attempt {attempt + 1}/{retries + 1})...")
-                time.sleep(wait_time)
-            
-            response = requests.post(SDA_URL, data=payload, timeout=timeout)
-            response.raise_for_status()
-            
-            if format == "json":
-                return response.json()
-            else:
-                return {"response": response.text}
-                
-        except requests.Timeout as e:
-            last_error = e
-            logger.warning(f"SDA query timeout (attempt {attempt + 1}/{retries + 1})")
-            continue
-        except requests.RequestException as e:
-            last_error = e
-            logger.error(f"SDA query failed: {str(e)}")
-            raise
-    
-    # All retries failed
-    logger.error(f"SDA query failed after {retries + 1} attempts")
-    raise last_error
+    result = GAEZ_SDA_client.get_sda_client().query(sql, kind='spatial', timeout=timeout, retries=retries)
+
+    if format != "json":
+        return {"response": json.dumps(result)}
+
+    if "Table" in result:
+        return {"Table": result["Table"][1:]}
+    return {}
 
 
 def get_mukeys_by_bbox(min_lon: float, min_lat: float, max_lon: float, max_lat: float) -> List[int]:
@@ -163,6 +150,9 @@ def get_dominant_mukey_at_point(latitude: float, longitude: float) -> Optional[i
     """
     Get the most likely/dominant map unit key at a specific point.
     Uses a tiny bounding box around the point - same fast query as bbox method.
+
+    Points outside the SSURGO coverage mask, or with an earlier empty SDA
+    answer (GAEZ_coverage), return None without a query.
     
     Args:
         latitude: Latitude in decimal degrees
@@ -171,6 +161,10 @@ def get_dominant_mukey_at_point(latitude: float, longitude: float) -> Optional[i
     Returns:
         Single mukey integer or None if not found
     """
+    if GAEZ_coverage.known_uncovered(latitude, longitude):
+        logger.info(f"({latitude}, {longitude}) is outside SSURGO coverage")
+        return None
+
     # Use a very small bounding box around the point (~10m x 10m)
     # This uses the same fast query pattern as get_mukeys_by_bbox
     buffer = 0.0001  # ~10 meters
@@ -187,6 +181,7 @@ def get_dominant_mukey_at_point(latitude: float, longitude: float) -> Optional[i
         return mukey
     else:
         logger.warning(f"No map unit found at ({latitude}, {longitude})")
+        GAEZ_coverage.remember_uncovered(latitude, longitude)
         return None
 
 
@@ -0,0 +1,132 @@
+"""
+Incremental parsing of large SDA JSON+COLUMNNAME responses.
+
+SDA answers tabular queries with {"Table": [[column names], [row], ...]},
+every value a string or null. Parsing the whole body with response.json()
+and building a DataFrame from the nested lists holds several copies of the
+payload at once. Here the body is read in chunks, complete rows are cut out
+of the text as they arrive and every batch of rows is converted straight
+into typed column arrays (float64 for the numeric columns of a known schema,
+object for the rest), so only the current chunk and the typed batches are
+kept in memory.
+
+    frames = iter_table_frames(response.iter_content(65536), numeric_columns)
+    raw = pd.concat(frames, ignore_index=True)
+"""
+
+import codecs
+import json
+import logging
+import re
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Rows converted per batch
+DEFAULT_BATCH_ROWS = 5000
+
+# Start of the table array and the separators between rows
+_TABLE_START = re.compile(r'"Table"\s*:\s*\[')
+_SEPARATOR = re.compile(r'[\s,]*')
+_DECODER = json.JSONDecoder()
+
+
+class SDAStreamError(ValueError):
+    """Raised when a streamed SDA response is not a JSON+COLUMNNAME table."""
+    pass
+
+
+def iter_table_rows(chunks: Iterable[Union[bytes, str]],
+                    batch_rows: int = DEFAULT_BATCH_ROWS) -> Iterator[Tuple[List[str], List[list]]]:
+    """
+    Cut rows out of a streamed JSON+COLUMNNAME body.
+
+    Args:
+        chunks: Body chunks (bytes in UTF-8 or str), e.g. response.iter_content()
+        batch_rows: Rows per yielded batch
+
+    Yields:
+        (header, rows) with up to batch_rows parsed rows per batch; nothing for
+        an empty answer ({} or an empty table)
+
+    Raises:
+        SDAStreamError: The body ends inside the table or is not a table
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    pos = 0
+    header = None
+    started = finished = False
+    pending = []
+
+    for chunk in chunks:
+        buffer = buffer[pos:] + (decoder.decode(chunk) if isinstance(chunk, bytes) else chunk)
+        pos = 0
+        if not started:
+            match = _TABLE_START.search(buffer)
+            if match is None:
+                continue
+            started, pos = True, match.end()
+        while True:
+            pos = _SEPARATOR.match(buffer, pos).end()
+            if pos == len(buffer):
+                break
+            if buffer[pos] == ']':
+                finished = True
+                break
+            try:
+                row, pos = _DECODER.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Row continues in the next chunk
+                break
+            if not isinstance(row, list):
+                raise SDAStreamError("SDA response table holds a value that is not a row")
+            if header is None:
+                header = row
+            else:
+                pending.append(row)
+                if len(pending) >= batch_rows:
+                    yield header, pending
+                    pending = []
+        if finished:
+            break
+
+    if pending:
+        yield header, pending
+    if started and not finished:
+        raise SDAStreamError("SDA response ended inside the table")
+    if not started and buffer.strip() not in ('', '{}'):
+        raise SDAStreamError("SDA response is not a JSON+COLUMNNAME table")
+
+
+def _to_float(values: tuple) -> np.ndarray:
+    """Float array from strings/numbers/None; unparseable values become NaN."""
+    try:
+        return np.array(['nan' if v is None else v for v in values], dtype=float)
+    except (ValueError, TypeError):
+        return pd.to_numeric(np.array(values, dtype=object), errors='coerce').astype(float)
+
+
+def rows_to_frame(header: Sequence[str], rows: List[list],
+                  numeric_columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """
+    Typed DataFrame from parsed rows: numeric_columns as float64 (unparseable -> NaN),
+    all other columns as object arrays of the original strings.
+    """
+    numeric = set(numeric_columns or ())
+    columns = list(zip(*rows)) if rows else [()] * len(header)
+    data = {}
+    for name, values in zip(header, columns):
+        data[name] = _to_float(values) if name in numeric else np.array(values, dtype=object)
+    return pd.DataFrame(data, columns=list(header))
+
+
+def iter_table_frames(chunks: Iterable[Union[bytes, str]], numeric_columns: Optional[Iterable[str]] = None,
+                      batch_rows: int = DEFAULT_BATCH_ROWS) -> Iterator[pd.DataFrame]:
+    """Typed DataFrame per batch of rows of a streamed JSON+COLUMNNAME body."""
+    numeric_columns = list(numeric_columns or ())
+    for header, rows in iter_table_rows(chunks, batch_rows):
+        yield rows_to_frame(header, rows, numeric_columns)
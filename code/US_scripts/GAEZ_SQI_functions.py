@@ -6,6 +6,7 @@ import numpy as np
 import pandas as pd
 import math
 import sys
+from functools import lru_cache
 
 # Use lightweight NumPy-only interpolation (no scipy - saves 110MB!)
 try:
@@ -124,6 +125,22 @@ def get_depth_weight_type(CROP_ID):
         raise KeyError(f"CROP_ID '{CROP_ID}' not found in GAEZ_DEPTH_WEIGHT_LOOKUP.")
 
 
+# Exponential decay constant k for each rooting depth class (depthWt_type)
+DEPTH_WEIGHT_K = {
+    1: 0.10,   # shallow
+    2: 0.05,   # moderate
+    3: 0.03,   # deep
+    4: 0.015   # very deep
+}
+MAX_WEIGHT_DEPTH = 200  # cm
+
+
+def _decay_constant(depthWt_type):
+    if depthWt_type not in DEPTH_WEIGHT_K:
+        raise ValueError("depthWt_type must be 1 (shallow), 2 (moderate), 3 (deep), or 4 (very deep)")
+    return DEPTH_WEIGHT_K[depthWt_type]
+
+
 def cumulative_weight(d, depthWt_type):
     """
     Returns the cumulative weight fraction at depth d (in cm) using a normalized exponential decay curve.
@@ -146,33 +163,65 @@ def cumulative_weight(d, depthWt_type):
     float
         The cumulative fraction of weight at depth d.
     """
-    max_depth = 200  # cm
-
-    # Define decay constant k for each type
-    k_values = {
-        1: 0.10,   # shallow
-        2: 0.05,   # moderate
-        3: 0.03,   # deep
-        4: 0.015   # very deep
-    }
-
-    if depthWt_type not in k_values:
-        raise ValueError("depthWt_type must be 1 (shallow), 2 (moderate), 3 (deep), or 4 (very deep)")
-
-    k = k_values[depthWt_type]
+    k = _decay_constant(depthWt_type)
 
     # Handle bounds
     if d <= 0:
         return 0.0
-    elif d >= max_depth:
+    elif d >= MAX_WEIGHT_DEPTH:
         return 1.0
 
     # Normalized exponential cumulative weight
     numerator = 1 - math.exp(-k * d)
-    denominator = 1 - math.exp(-k * max_depth)
+    denominator = 1 - math.exp(-k * MAX_WEIGHT_DEPTH)
     return numerator / denominator
 
 
+def cumulative_weights(depths, depthWt_type):
+    """
+    Array form of cumulative_weight: cumulative weight fraction at each depth (cm).
+    Depths are clipped to 0-200 cm; NaN depths give NaN.
+    """
+    k = _decay_constant(depthWt_type)
+    depths = np.clip(np.asarray(depths, dtype=float), 0, MAX_WEIGHT_DEPTH)
+    return -np.expm1(-k * depths) / -np.expm1(-k * MAX_WEIGHT_DEPTH)
+
+
+def _raw_depth_weights(tops, bottoms, depthWt_type):
+    """Un-normalized horizon weights f(bottom) - f(top); 0 where bottom <= top or depths are missing."""
+    tops = np.asarray(tops, dtype=float)
+    bottoms = np.asarray(bottoms, dtype=float)
+    raw = cumulative_weights(bottoms, depthWt_type) - cumulative_weights(tops, depthWt_type)
+    return np.where(bottoms > tops, raw, 0.0)
+
+
+@lru_cache(maxsize=gaez_config.depth_weight_cache_size)
+def _cached_depth_weights(boundaries, depthWt_type):
+    """Normalized weights for a tuple of (top, bottom) pairs; SSURGO profiles share few patterns."""
+    tops = [top for top, _ in boundaries]
+    bottoms = [bottom for _, bottom in boundaries]
+    raw = _raw_depth_weights(tops, bottoms, depthWt_type)
+    total = raw.sum()
+    weights = raw / total if total > 0 else raw
+    weights.setflags(write=False)
+    return weights
+
+
+def depth_weights(tops, bottoms, depthWt_type=2):
+    """
+    Normalized depth weights for one profile from arrays of horizon tops and bottoms (cm).
+
+    Results are memoized by (horizon boundaries, depthWt_type).
+
+    Returns
+    -------
+    np.ndarray
+        Weights summing to 1 (all zero if no horizon has thickness).
+    """
+    boundaries = tuple(zip(np.asarray(tops, dtype=float).tolist(), np.asarray(bottoms, dtype=float).tolist()))
+    return _cached_depth_weights(boundaries, depthWt_type).copy()
+
+
 def calculate_depth_weights(data, top_col=hz_names.top_col_name, bottom_col=hz_names.bottom_col_name, depthWt_type=2):
     """
     Compute normalized depth weights for a soil profile using cumulative weighting based on rooting depth class.
@@ -206,20 +255,98 @@ def calculate_depth_weights(data, top_col=hz_names.top_col_name, bottom_col=hz_n
     pandas.Series
         A Series of normalized weights (summing to 1) for each horizon.
     """
-    # Compute raw weight for each horizon by applying the cumulative_weight function
-    raw_weights = data.apply(
-        lambda row: (cumulative_weight(row[bottom_col], depthWt_type) - cumulative_weight(row[top_col], depthWt_type))
-                    if row[bottom_col] > row[top_col] else 0,
-        axis=1
-    )
-
-    # Normalize the weights
-    total = raw_weights.sum()
-    if total > 0:
-        norm_weights = raw_weights / total
-    else:
-        norm_weights = raw_weights
-    return norm_weights
+    tops = pd.to_numeric(data[top_col], errors='coerce').to_numpy(dtype=float)
+    bottoms = pd.to_numeric(data[bottom_col], errors='coerce').to_numpy(dtype=float)
+    return pd.Series(depth_weights(tops, bottoms, depthWt_type), index=data.index)
+
+
+def pad_profile_depths(data, group_col='cokey', top_col=hz_names.top_col_name, bottom_col=hz_names.bottom_col_name):
+    """
+    Ragged horizon table -> padded (profiles x horizons) depth matrices.
+
+    Horizons keep their row order within each profile; padding is NaN.
+
+    Returns
+    -------
+    tuple
+        (profile keys, tops (N, H), bottoms (N, H), mask (N, H) True for real horizons)
+    """
+    keys, padded, mask = pad_profile_columns(data, [top_col, bottom_col], group_col)
+    return keys, padded[top_col], padded[bottom_col], mask
+
+
+def pad_profile_columns(data, columns, group_col='cokey'):
+    """
+    Ragged horizon table -> padded (profiles x horizons) matrices of numeric columns.
+
+    Profiles are ordered by first appearance and horizons keep their row order
+    within each profile; padding (and non-numeric values) is NaN.
+
+    Returns
+    -------
+    tuple
+        (profile keys, {column: values (N, H)}, mask (N, H) True for real horizons)
+    """
+    groups = pd.Series(data[group_col].to_numpy())
+    keys = pd.unique(groups)
+    row = pd.Categorical(groups, categories=keys).codes
+    col = groups.groupby(groups).cumcount().to_numpy()
+    n_layers = int(col.max()) + 1 if len(col) else 0
+
+    padded = {}
+    for column in columns:
+        values = np.full((len(keys), n_layers), np.nan)
+        values[row, col] = pd.to_numeric(data[column], errors='coerce').to_numpy(dtype=float)
+        padded[column] = values
+    mask = np.zeros((len(keys), n_layers), dtype=bool)
+    mask[row, col] = True
+    return keys, padded, mask
+
+
+def depth_weights_batch(tops, bottoms, depthWt_type=2, mask=None):
+    """
+    Normalized depth weights for many profiles at once.
+
+    Parameters
+    ----------
+    tops, bottoms : array-like
+        (N, H) horizon depths in cm, padded with NaN (see pad_profile_depths).
+    depthWt_type : int
+        Rooting depth class (1-4).
+    mask : array-like of bool, optional
+        (N, H) True for real horizons; padded cells get weight 0.
+
+    Returns
+    -------
+    np.ndarray
+        (N, H) weights, each row summing to 1 (or all zero if the profile has no thickness).
+    """
+    raw = _raw_depth_weights(tops, bottoms, depthWt_type)
+    if mask is not None:
+        raw = np.where(mask, raw, 0.0)
+    total = raw.sum(axis=1, keepdims=True)
+    return np.divide(raw, total, out=np.zeros_like(raw), where=total > 0)
+
+
+def _phase_score(data, phase_req, sqi_code):
+    """Most limiting general-phase score of a profile for one SQI (100 if no phases)."""
+    phase_ids_list = data.explode("phase_ids_list")["phase_ids_list"].astype(int)
+    if phase_ids_list.nunique() == 1 and phase_ids_list.iloc[0] == 0:
+        return 100
+    phase_req_filtered = phase_req.query(f'SQI_code == {sqi_code} & property == "phase" & phase_id in @phase_ids_list')
+    return phase_req_filtered["score"].min() if not phase_req_filtered.empty else 100
+
+
+def _phase_class_score(phase_req, sqi_code, prop, phase_id):
+    """Score of a phase-coded property (roots, il, SWR) for one SQI (100 if not listed)."""
+    req = phase_req.query(f'SQI_code == {sqi_code} & property == "{prop}" & phase_id == {phase_id}').reset_index(drop=True)
+    return req['score'].iloc[0] if not req.empty else 100
+
+
+def _flag_score(profile_req, sqi_code, prop, flag):
+    """Score of a yes/no profile property (vertic, gelic) for one SQI."""
+    req = profile_req.query(f'SQI_code == {sqi_code} & property == "{prop}"').sort_values(by='property_value', ascending=False).reset_index(drop=True)
+    return req['score'].iloc[0] if flag == 1 else 100
 
 
 def calculate_SQ1(data, profile_req, texture_req, inputLevel, wts):
@@ -229,8 +356,9 @@ def calculate_SQ1(data, profile_req, texture_req, inputLevel, wts):
     SQ1_scores = []
     sq1_oc_req = profile_req.query('SQI_code == 1 & property == "oc"').sort_values(by='property_value', ascending=False).reset_index(drop=True)
     sq1_ph_req = profile_req.query('SQI_code == 1 & property == "ph"').sort_values(by='property_value', ascending=False).reset_index(drop=True)
+    sq1_txt_scores = GAEZ_crop_req.texture_scores(texture_req, 1, data['texture_class_id'].to_numpy())
 
-    for s, layer in data.iterrows():
+    for pos, (s, layer) in enumerate(data.iterrows()):
         # oc score
         oc = layer.soc
         oc_score = constraint_curve(oc, sq1_oc_req[['score', 'property_value']])
@@ -240,13 +368,7 @@ def calculate_SQ1(data, profile_req, texture_req, inputLevel, wts):
         ph_score = constraint_curve(ph, sq1_ph_req[['score', 'property_value']])
         
         # texture score
-        text_class_id_raw = layer['texture_class_id']
-        if pd.isna(text_class_id_raw):
-            txt_score = 100
-        else:
-            text_class_id = str(text_class_id_raw)
-            txt_req = texture_req.query(f'SQI_code == 1 & text_class_id == {text_class_id}').reset_index(drop=True)
-            txt_score = txt_req['score'].iloc[0] if not txt_req.empty else 100
+        txt_score = sq1_txt_scores[pos]
 
         # For topsoil only
         if s == 0:
@@ -276,7 +398,7 @@ def calculate_SQ2(data, profile_req, texture_req, inputLevel, wts):
     Parameters:
         data (DataFrame): Soil horizon data with properties like 'b', 'cecs', 'cecc', 'ph', and 'texture_class_id'.
         profile_req (DataFrame): Table of constraint curve definitions for SQI_code 2.
-        texture_req (DataFrame): Table of texture class scores for SQI_code 2.
+        texture_req (DataFrame or np.ndarray): Texture class scores for SQI_code 2 (or the compiled table).
         inputLevel (str): Indicates input data type ('H' = high input; includes texture scoring).
         wts (list or float): Weight(s) for each soil layer. Can be a list (one per layer) or scalar (same for all).
 
@@ -287,6 +409,7 @@ def calculate_SQ2(data, profile_req, texture_req, inputLevel, wts):
 
     # Ensure iloc-based access and reset index for safety
     data = data.reset_index(drop=True)
+    sq2_txt_scores = GAEZ_crop_req.texture_scores(texture_req, 2, data['texture_class_id'].to_numpy())
 
     for i in range(len(data)):
         layer = data.iloc[i]
@@ -297,13 +420,7 @@ def calculate_SQ2(data, profile_req, texture_req, inputLevel, wts):
 
         # Texture score only for high input level
         if inputLevel == 'H':
-            text_class_id_raw = layer['texture_class_id']
-            if pd.isna(text_class_id_raw):
-                txt_score = 100
-            else:
-                text_class_id = str(text_class_id_raw)
-                txt_req = texture_req.query(f'SQI_code == 2 & text_class_id == {text_class_id}').reset_index(drop=True)
-                txt_score = txt_req['score'].iloc[0] if not txt_req.empty else 100
+            txt_score = sq2_txt_scores[i]
         else:
             txt_score = None
 
@@ -354,7 +471,7 @@ def calculate_SQ3(data, profile_req, texture_req, phase_req, wts):
         data (DataFrame): Soil profile data with attributes like 'rd', 'vertic', 'gelic', 'roots', 'il',
                           'DB_DC', 'CFRAG', 'texture_class_id', and 'phase_ids_list'.
         profile_req (DataFrame): Constraint curve table for profile and horizon properties (SQI_code 3).
-        texture_req (DataFrame): Texture score table (SQI_code 3).
+        texture_req (DataFrame or np.ndarray): Texture score table (SQI_code 3) or the compiled table.
         phase_req (DataFrame): Phase and root condition scores (SQI_code 3).
         wts (list or float): Weight(s) for each soil layer. Can be a list or scalar.
 
@@ -375,50 +492,22 @@ def calculate_SQ3(data, profile_req, texture_req, phase_req, wts):
     sq3_rd_req = profile_req.query('SQI_code == 3 & property == "rd"').sort_values(by='property_value', ascending=False).reset_index(drop=True)
     sq3_rd_score = constraint_curve(rd, sq3_rd_req[['score', 'property_value']])
 
-    # Vertic
-    vertic = data['vertic'].iloc[0]
-    sq3_ver_req = profile_req.query('SQI_code == 3 & property == "ver"').sort_values(by='property_value', ascending=False).reset_index(drop=True)
-    sq3_ver_score = sq3_ver_req['score'].iloc[0] if vertic == 1 else 100
-
-    # Gelic
-    gelic = data['gelic'].iloc[0]
-    sq3_gel_req = profile_req.query('SQI_code == 3 & property == "gel"').sort_values(by='property_value', ascending=False).reset_index(drop=True)
-    sq3_gel_score = sq3_gel_req['score'].iloc[0] if gelic == 1 else 100
+    # Vertic and gelic
+    sq3_ver_score = _flag_score(profile_req, 3, "ver", data['vertic'].iloc[0])
+    sq3_gel_score = _flag_score(profile_req, 3, "gel", data['gelic'].iloc[0])
 
     # --- Phase-based properties ---
-    data_exploded = data.explode("phase_ids_list")
-    phase_ids_list = data_exploded["phase_ids_list"].astype(int)
-
-    if phase_ids_list.nunique() == 1 and phase_ids_list.iloc[0] == 0:
-        sq3_phase_score = 100
-    else:
-        sq3_phase_req = phase_req.query(
-            'SQI_code == 3 & property == "phase" & phase_id in @phase_ids_list'
-        )
-        sq3_phase_score = sq3_phase_req["score"].min() if not sq3_phase_req.empty else 100
-
-    # Roots
-    roots = data['roots'].iloc[0]
-    sq3_roots_req = phase_req.query(f'SQI_code == 3 & property == "roots" & phase_id == {roots}').reset_index(drop=True)
-    sq3_roots_score = sq3_roots_req['score'].iloc[0] if not sq3_roots_req.empty else 100
-
-    # Impermeable layer
-    il = data['il'].iloc[0]
-    sq3_il_req = phase_req.query(f'SQI_code == 3 & property == "il" & phase_id == {il}').reset_index(drop=True)
-    sq3_il_score = sq3_il_req['score'].iloc[0] if not sq3_il_req.empty else 100
+    sq3_phase_score = _phase_score(data, phase_req, 3)
+    sq3_roots_score = _phase_class_score(phase_req, 3, "roots", data['roots'].iloc[0])
+    sq3_il_score = _phase_class_score(phase_req, 3, "il", data['il'].iloc[0])
 
     # --- Layer-based properties ---
+    sq3_txt_scores = GAEZ_crop_req.texture_scores(texture_req, 3, data['texture_class_id'].to_numpy())
     for s in range(len(data)):
         layer = data.iloc[s]
 
         # Texture
-        text_class_id_raw = layer['texture_class_id']
-        if pd.isna(text_class_id_raw):
-            sq3_txt_score = 100
-        else:
-            text_class_id = str(text_class_id_raw)
-            sq3_text_req = texture_req.query(f'SQI_code == 3 & text_class_id == {text_class_id}').reset_index(drop=True)
-            sq3_txt_score = sq3_text_req['score'].iloc[0] if not sq3_text_req.empty else 100
+        sq3_txt_score = sq3_txt_scores[s]
 
         # Compactness (bulk density)
         db_dc = layer['db']
@@ -474,36 +563,22 @@ def calculate_SQ4(data, phase_req, drainage_req):
             - 'pscl_id': particle size class code
             - 'phase_ids_list': list of general phase IDs
         phase_req (DataFrame): Phase-based score reference table (SQI_code == 4).
-        drainage_req (DataFrame): Drainage score table by drain_id and PSCL_ID.
+        drainage_req (DataFrame or np.ndarray): Drainage score table by drain_id and PSCL_ID
+            (or the compiled table from GAEZ_crop_req.compile_drainage_scores).
 
     Returns:
         float: SQ4 score (0-100).
     """
     data = data.reset_index(drop=True)
 
-    # SWR
-    swr = data['swr'].iloc[0]
-    swr_req = phase_req.query(f'SQI_code == 4 & property == "SWR" & phase_id == {swr}').reset_index(drop=True)
-    swr_score = swr_req['score'].iloc[0] if not swr_req.empty else 100
-
-    # Impermeable layer
-    il = data['il'].iloc[0]
-    il_req = phase_req.query(f'SQI_code == 4 & property == "il" & phase_id == {il}').reset_index(drop=True)
-    il_score = il_req['score'].iloc[0] if not il_req.empty else 100
+    swr_score = _phase_class_score(phase_req, 4, "SWR", data['swr'].iloc[0])
+    il_score = _phase_class_score(phase_req, 4, "il", data['il'].iloc[0])
 
     # Drainage
-    drain_id = data['drain_id'].iloc[0]
-    pscl_id = data['pscl_id'].iloc[0]
-    drain_req = drainage_req.query(f'SQI_code == 4 & PSCL_ID == "{pscl_id}" & DrainNum == {drain_id}').reset_index(drop=True)
-    drain_score = drain_req['score'].iloc[0] if not drain_req.empty else 100
+    drain_score = GAEZ_crop_req.drainage_scores(drainage_req, data['pscl_id'].iloc[0], data['drain_id'].iloc[0])
 
-    # General phase from exploded list
-    phase_ids_list = data.explode("phase_ids_list")["phase_ids_list"].astype(int)
-    if phase_ids_list.nunique() == 1 and phase_ids_list.iloc[0] == 0:
-        phase_score = 100
-    else:
-        phase_req_filtered = phase_req.query('SQI_code == 4 & property == "phase" & phase_id in @phase_ids_list')
-        phase_score = phase_req_filtered["score"].min() if not phase_req_filtered.empty else 100
+    # General phase
+    phase_score = _phase_score(data, phase_req, 4)
 
     # Combine and find the most limiting factor
     scores = pd.DataFrame({
@@ -541,14 +616,7 @@ def calculate_SQ5(data, phase_req, profile_req, wts):
     data = data.reset_index(drop=True)
 
     # --- Phase Score (Profile-level) ---
-    data_exploded = data.explode("phase_ids_list")
-    phase_ids_list = data_exploded["phase_ids_list"].astype(int)
-
-    if phase_ids_list.nunique() == 1 and phase_ids_list.iloc[0] == 0:
-        phase_score = 100
-    else:
-        phase_req_filtered = phase_req.query('SQI_code == 5 & property == "phase" & phase_id in @phase_ids_list')
-        phase_score = phase_req_filtered["score"].min() if not phase_req_filtered.empty else 100
+    phase_score = _phase_score(data, phase_req, 5)
 
     # --- Layer-level Scoring ---
     for i in range(len(data)):
@@ -605,14 +673,7 @@ def calculate_SQ6(data, phase_req, profile_req, wts):
     data = data.reset_index(drop=True)
 
     # --- Phase Score (Profile-level) ---
-    data_exploded = data.explode("phase_ids_list")
-    phase_ids_list = data_exploded["phase_ids_list"].astype(int)
-
-    if phase_ids_list.nunique() == 1 and phase_ids_list.iloc[0] == 0:
-        phase_score = 100
-    else:
-        phase_req_filtered = phase_req.query('SQI_code == 6 & property == "phase" & phase_id in @phase_ids_list')
-        phase_score = phase_req_filtered["score"].min() if not phase_req_filtered.empty else 100
+    phase_score = _phase_score(data, phase_req, 6)
 
     # --- Layer-level Scoring ---
     for i in range(len(data)):
@@ -659,7 +720,7 @@ def calculate_SQ7(data, phase_req, profile_req, texture_req, wts):
               and 'phase_ids_list'.
         phase_req (DataFrame): Phase-based scores for SQI_code == 7.
         profile_req (DataFrame): Constraint curves for RD, DB, CF, etc. (SQI_code == 7).
-        texture_req (DataFrame): Texture class scores for SQI_code == 7.
+        texture_req (DataFrame or np.ndarray): Texture class scores for SQI_code == 7 (or the compiled table).
         wts (list or float): Layer weights.
 
     Returns:
@@ -676,40 +737,18 @@ def calculate_SQ7(data, phase_req, profile_req, texture_req, wts):
     rd_req = profile_req.query('SQI_code == 7 & property == "rd"').sort_values(by='property_value', ascending=False).reset_index(drop=True)
     rd_score = constraint_curve(rd, rd_req[['score', 'property_value']])
 
-    vertic = data['vertic'].iloc[0]
-    ver_req = profile_req.query('SQI_code == 7 & property == "ver"').sort_values(by='property_value', ascending=False).reset_index(drop=True)
-    ver_score = ver_req['score'].iloc[0] if vertic == 1 else 100
-
-    gelic = data['gelic'].iloc[0]
-    gel_req = profile_req.query('SQI_code == 7 & property == "gel"').sort_values(by='property_value', ascending=False).reset_index(drop=True)
-    gel_score = gel_req['score'].iloc[0] if gelic == 1 else 100
-
-    roots = data['roots'].iloc[0]
-    roots_req = phase_req.query(f'SQI_code == 7 & property == "roots" & phase_id == {roots}').reset_index(drop=True)
-    roots_score = roots_req['score'].iloc[0] if not roots_req.empty else 100
-
-    il = data['il'].iloc[0]
-    il_req = phase_req.query(f'SQI_code == 7 & property == "il" & phase_id == {il}').reset_index(drop=True)
-    il_score = il_req['score'].iloc[0] if not il_req.empty else 100
-
-    phase_ids_list = data.explode("phase_ids_list")["phase_ids_list"].astype(int)
-    if phase_ids_list.nunique() == 1 and phase_ids_list.iloc[0] == 0:
-        phase_score = 100
-    else:
-        phase_req_filtered = phase_req.query('SQI_code == 7 & property == "phase" & phase_id in @phase_ids_list')
-        phase_score = phase_req_filtered["score"].min() if not phase_req_filtered.empty else 100
+    ver_score = _flag_score(profile_req, 7, "ver", data['vertic'].iloc[0])
+    gel_score = _flag_score(profile_req, 7, "gel", data['gelic'].iloc[0])
+    roots_score = _phase_class_score(phase_req, 7, "roots", data['roots'].iloc[0])
+    il_score = _phase_class_score(phase_req, 7, "il", data['il'].iloc[0])
+    phase_score = _phase_score(data, phase_req, 7)
 
     # --- Layer-level scoring ---
+    txt_scores = GAEZ_crop_req.texture_scores(texture_req, 7, data['texture_class_id'].to_numpy())
     for i in range(len(data)):
         layer = data.iloc[i]
 
-        text_class_id_raw = layer['texture_class_id']
-        if pd.isna(text_class_id_raw):
-            txt_score = 100
-        else:
-            text_class_id = str(text_class_id_raw)
-            txt_req = texture_req.query(f'SQI_code == 7 & text_class_id == {text_class_id}').reset_index(drop=True)
-            txt_score = txt_req['score'].iloc[0] if not txt_req.empty else 100
+        txt_score = txt_scores[i]
 
         db_dc = data['db'].iloc[0]
         db_req = profile_req.query('SQI_code == 7 & property == "db"').sort_values(by='property_value', ascending=True).reset_index(drop=True)
@@ -804,6 +843,22 @@ def gaez_sqi_ratings(map_data, CROP_ID, inputLevel, depthWt_type=1, plot_data=No
     # S4 Very severe constraint (30%)
     # N  Not suitable (<10%)
     """
+    map_data = prepare_sqi_data(map_data, plot_data, site_data, lab_data)
+    requirements = load_sqi_requirements(CROP_ID, inputLevel)
+    scores = score_sqis(map_data, requirements, inputLevel, depthWt_type)
+
+    # Final soil rating using most limiting scores and logic by inputLevel
+    cokey_val = map_data['cokey'].iloc[0] if 'cokey' in map_data.columns else 'unknown'
+    gaez_sqi_scores = calculate_soil_rating(*[scores[name] for name in SQI_NAMES], inputLevel, cokey=cokey_val)
+
+    return gaez_sqi_scores
+
+
+def prepare_sqi_data(map_data, plot_data=None, site_data=None, lab_data=None):
+    """
+    Copy of map_data with the optional user data applied and the NaN defaults
+    the SQI functions expect (rd 200 cm, fragvol 0 %).
+    """
     # CRITICAL: Work on a copy to prevent mutating the input DataFrame
     # This prevents data corruption across API requests
     map_data = map_data.copy()
@@ -821,28 +876,496 @@ def gaez_sqi_ratings(map_data, CROP_ID, inputLevel, depthWt_type=1, plot_data=No
     if 'fragvol' in map_data.columns:
         map_data['fragvol'] = map_data['fragvol'].fillna(0)
 
-    # Load crop requirement tables (based on input level and crop ID)
+    return map_data
+
+
+def load_sqi_requirements(CROP_ID, inputLevel):
+    """
+    Crop requirement tables used by the SQI functions: the profile and phase
+    tables and the compiled drainage and texture score tables.
+    """
     crop_reqs = GAEZ_crop_req.getGAEZ_requirements_source(CROP_ID=CROP_ID, inputLevel=inputLevel, source='csv', requirement_type='all')
-    profile_req = crop_reqs.get("profile")
-    phase_req = crop_reqs.get("phase")
-    drainage_req = crop_reqs.get("drainage")
-    texture_req = crop_reqs.get("texture")
-    terrain_req = crop_reqs.get("terrain")  # Not yet used
+    return {
+        'profile': crop_reqs.get("profile"),
+        'phase': crop_reqs.get("phase"),
+        'drainage': GAEZ_crop_req.compile_drainage_scores(crop_reqs.get("drainage")),
+        'texture': GAEZ_crop_req.compile_texture_scores(crop_reqs.get("texture")),
+        # terrain requirements are not yet used
+    }
+
+
+def score_sqis(map_data, requirements, inputLevel, depthWt_type, sqis=None):
+    """
+    Score the requested SQIs (default SQ1-SQ7) of a prepared profile.
+
+    Parameters:
+        map_data (DataFrame): Profile from prepare_sqi_data.
+        requirements (dict): Tables from load_sqi_requirements.
+        inputLevel (str): 'L', 'I' or 'H'.
+        depthWt_type (int): Rooting depth type for the horizon weights.
+        sqis (iterable, optional): Names of the SQIs to score.
+
+    Returns:
+        dict: Score per requested SQI name ('NA' for SQ1 at input level 'H').
+    """
+    profile_req = requirements['profile']
+    phase_req = requirements['phase']
+    drainage_req = requirements['drainage']
+    texture_req = requirements['texture']
 
     # Calculate horizon depth weights
     wts = calculate_depth_weights(map_data, top_col=hz_names.top_col_name, bottom_col=hz_names.bottom_col_name, depthWt_type=depthWt_type)
 
-    # Compute each Soil Quality Index (SQ1–SQ7)
-    sqi1 = calculate_SQ1(map_data, profile_req, texture_req, inputLevel, wts)
-    sqi2 = calculate_SQ2(map_data, profile_req, texture_req, inputLevel, wts)
-    sqi3 = calculate_SQ3(map_data, profile_req, texture_req, phase_req, wts)
-    sqi4 = calculate_SQ4(map_data, phase_req, drainage_req)
-    sqi5 = calculate_SQ5(map_data, phase_req, profile_req, wts)
-    sqi6 = calculate_SQ6(map_data, phase_req, profile_req, wts)
-    sqi7 = calculate_SQ7(map_data, phase_req, profile_req, texture_req, wts)
+    calculators = {
+        'SQ1': lambda: calculate_SQ1(map_data, profile_req, texture_req, inputLevel, wts),
+        'SQ2': lambda: calculate_SQ2(map_data, profile_req, texture_req, inputLevel, wts),
+        'SQ3': lambda: calculate_SQ3(map_data, profile_req, texture_req, phase_req, wts),
+        'SQ4': lambda: calculate_SQ4(map_data, phase_req, drainage_req),
+        'SQ5': lambda: calculate_SQ5(map_data, phase_req, profile_req, wts),
+        'SQ6': lambda: calculate_SQ6(map_data, phase_req, profile_req, wts),
+        'SQ7': lambda: calculate_SQ7(map_data, phase_req, profile_req, texture_req, wts),
+    }
+    return {name: calculators[name]() for name in (SQI_NAMES if sqis is None else sqis)}
 
-    # Final soil rating using most limiting scores and logic by inputLevel
+
+#----------------------------------------------------------------------------------------------------
+#                          Incremental (what-if) SQI scoring
+#----------------------------------------------------------------------------------------------------
+
+SQI_NAMES = ['SQ1', 'SQ2', 'SQ3', 'SQ4', 'SQ5', 'SQ6', 'SQ7']
+
+# SQIs reading each profile column. Columns not listed are not read by any SQI;
+# horizon depths set the layer weights of every SQI except SQ4.
+PROPERTY_SQI_DEPENDENCIES = {
+    'soc': {'SQ1'},
+    'teb': {'SQ1'},
+    'ph': {'SQ1', 'SQ2'},
+    'bs': {'SQ2'},
+    'cecs': {'SQ2'},
+    'cecc': {'SQ2'},
+    'texture_class_id': {'SQ1', 'SQ2', 'SQ3', 'SQ7'},
+    'db': {'SQ3', 'SQ7'},
+    'fragvol': {'SQ3', 'SQ7'},
+    'rd': {'SQ3', 'SQ7'},
+    'vertic': {'SQ3', 'SQ7'},
+    'gelic': {'SQ3', 'SQ7'},
+    'roots': {'SQ3', 'SQ7'},
+    'il': {'SQ3', 'SQ4', 'SQ7'},
+    'swr': {'SQ4'},
+    'drain_id': {'SQ4'},
+    'pscl_id': {'SQ4'},
+    'phase_ids_list': {'SQ3', 'SQ4', 'SQ5', 'SQ6', 'SQ7'},
+    'esp': {'SQ5'},
+    'ec': {'SQ5'},
+    'caco3': {'SQ6'},
+    'gypsum': {'SQ6'},
+    hz_names.top_col_name: {'SQ1', 'SQ2', 'SQ3', 'SQ5', 'SQ6', 'SQ7'},
+    hz_names.bottom_col_name: {'SQ1', 'SQ2', 'SQ3', 'SQ5', 'SQ6', 'SQ7'},
+}
+
+
+def _same_value(a, b):
+    """Equality of two profile cells (NaN equals NaN, lists compare element-wise)."""
+    if isinstance(a, (list, tuple, np.ndarray)) or isinstance(b, (list, tuple, np.ndarray)):
+        return list(np.atleast_1d(a)) == list(np.atleast_1d(b))
+    if pd.isna(a) and pd.isna(b):
+        return True
+    return a == b
+
+
+def changed_properties(before, after):
+    """
+    Columns whose values differ between two versions of a profile.
+
+    A change in the number of horizons marks every column as changed.
+    """
+    if len(before) != len(after):
+        return set(before.columns) | set(after.columns)
+    changed = set(before.columns) ^ set(after.columns)
+    for col in set(before.columns) & set(after.columns):
+        if not all(_same_value(a, b) for a, b in zip(before[col].tolist(), after[col].tolist())):
+            changed.add(col)
+    return changed
+
+
+def affected_sqis(properties):
+    """SQIs (in SQ1-SQ7 order) that read any of the given profile columns."""
+    affected = set()
+    for prop in properties:
+        affected |= PROPERTY_SQI_DEPENDENCIES.get(prop, set())
+    return [name for name in SQI_NAMES if name in affected]
+
+
+def rescore_sqis(map_data, previous_scores, sqis, requirements, inputLevel, depthWt_type):
+    """
+    Recompute only the given SQIs of a prepared profile and re-rate SR.
+
+    The other SQIs are taken from previous_scores (a mapping with SQ1-SQ7), so
+    the result matches gaez_sqi_ratings when sqis covers every SQI whose
+    inputs changed (see affected_sqis).
+
+    Returns:
+        DataFrame: Same single-row layout as gaez_sqi_ratings.
+    """
+    scores = {name: previous_scores[name] for name in SQI_NAMES}
+    scores.update(score_sqis(map_data, requirements, inputLevel, depthWt_type, sqis))
     cokey_val = map_data['cokey'].iloc[0] if 'cokey' in map_data.columns else 'unknown'
-    gaez_sqi_scores = calculate_soil_rating(sqi1, sqi2, sqi3, sqi4, sqi5, sqi6, sqi7, inputLevel, cokey=cokey_val)
+    return calculate_soil_rating(*[scores[name] for name in SQI_NAMES], inputLevel, cokey=cokey_val)
 
-    return gaez_sqi_scores
+
+#----------------------------------------------------------------------------------------------------
+#                          Batch (vectorized) SQI scoring
+#----------------------------------------------------------------------------------------------------
+
+# Horizon properties used by calculate_sqi_batch, each an (N profiles, H horizons) array
+BATCH_LAYER_PROPERTIES = ['soc', 'ph', 'teb', 'bs', 'cecs', 'cecc', 'texture_class_id', 'db',
+                          'fragvol', 'esp', 'ec', 'caco3', 'gypsum']
+
+
+def _curve_scores(values, profile_req, sqi_code, prop):
+    """constraint_curve over an array of any shape; NaN values give NaN scores."""
+    req = profile_req.query(f'SQI_code == {sqi_code} & property == "{prop}"')[['score', 'property_value']]
+    values = np.asarray(values, dtype=float)
+    scores = np.full(values.shape, np.nan)
+    valid = ~np.isnan(values)
+    if valid.any():
+        scores[valid] = constraint_curve(values[valid], req)
+    return scores
+
+
+def _limiting_mean(*scores):
+    """
+    Mean of the most limiting score and the mean of the remaining scores,
+    element-wise over broadcast arrays. NaN scores are left out; 100 if all are NaN.
+    """
+    stacked = np.stack(np.broadcast_arrays(*[np.asarray(s, dtype=float) for s in scores]), axis=-1)
+    count = np.sum(~np.isnan(stacked), axis=-1)
+    low = np.fmin.reduce(stacked, axis=-1)
+    total = np.nansum(stacked, axis=-1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        high_mean = np.where(count > 1, (total - low) / (count - 1), low)
+    return np.where(count > 0, 0.5 * (low + high_mean), 100.0)
+
+
+def _neutral(scores):
+    """Treat NaN (unscored) values as no constraint in multiplicative terms."""
+    return np.where(np.isnan(scores), 100.0, scores)
+
+
+def calculate_sqi_batch(layers, rd, profile, profile_req, phase_req, drainage_req, texture_req, inputLevel, wts):
+    """
+    Score N variants of one soil profile at once (SQ1-SQ7 and SR as arrays).
+
+    This is the array form of calculate_SQ1..calculate_SQ7 and calculate_soil_rating
+    for profiles that share horizon depths and profile-level classes but differ in
+    horizon property values (e.g. Monte Carlo draws, see GAEZ_SQI_uncertainty).
+    Each constraint curve is evaluated once over the whole (N, H) array instead of
+    once per horizon per profile.
+
+    Parameters:
+        layers (dict): (N, H) arrays keyed by BATCH_LAYER_PROPERTIES.
+        rd (array-like): (N,) depth to restriction in cm (NaN = no restriction, 200).
+        profile (DataFrame): Representative profile; vertic, gelic, roots, il, swr,
+            drain_id, pscl_id and phase_ids_list are taken from it, so SQ4 and the
+            phase/flag scores are the same for all N profiles.
+        profile_req, phase_req (DataFrame): Crop requirements.
+        drainage_req, texture_req (DataFrame or np.ndarray): Requirement tables or their
+            compiled arrays (GAEZ_crop_req.compile_drainage_scores / compile_texture_scores).
+        inputLevel (str): 'L', 'I' or 'H'.
+        wts (array-like): Horizon depth weights, (H,) or (N, H).
+
+    Returns:
+        dict: (N,) arrays for 'SQ1'..'SQ7' and 'SR' (SQ1 is NaN for inputLevel 'H').
+
+    Note:
+        Unlike the scalar functions, NaN property values are scored explicitly: they
+        are left out of the limiting-factor means and count as 100 in the
+        multiplicative terms (rd x layer, ec x esp, ca x gy). On complete data both
+        give the same result.
+    """
+    if inputLevel not in ('L', 'I', 'H'):
+        raise ValueError("Invalid input level. Choose from 'L', 'I', or 'H'.")
+
+    profile = profile.reset_index(drop=True)
+    classes = {
+        'vertic': profile['vertic'].iloc[:1], 'gelic': profile['gelic'].iloc[:1],
+        'roots': profile['roots'].iloc[:1], 'il': profile['il'].iloc[:1], 'swr': profile['swr'].iloc[:1],
+        'drain_id': profile['drain_id'].iloc[:1], 'pscl_id': profile['pscl_id'].iloc[:1],
+    }
+    class_scores = _profile_class_scores(classes, _phase_scores(profile, np.zeros(len(profile), dtype=int), 1, phase_req),
+                                         profile_req, phase_req, drainage_req)
+    return _score_sqi_arrays(layers, rd, class_scores, profile_req, texture_req, inputLevel, wts)
+
+
+def _phase_scores(data, profile_index, n_profiles, phase_req):
+    """
+    Most limiting general-phase score per profile and SQI (the array form of _phase_score).
+
+    Parameters:
+        data (DataFrame): Horizon rows with phase_ids_list.
+        profile_index (np.ndarray): Profile number (0..n_profiles-1) of every row.
+
+    Returns:
+        dict: SQI code (3-7) -> (n_profiles,) scores; 100 where a profile has only
+        phase 0 or none of its phases is listed.
+    """
+    ids = pd.DataFrame({'profile': profile_index, 'phase_id': data['phase_ids_list'].to_numpy()}).explode('phase_id')
+    ids['phase_id'] = pd.to_numeric(ids['phase_id'], errors='coerce')
+    only_zero = ids['phase_id'].eq(0).groupby(ids['profile']).all().reindex(range(n_profiles), fill_value=True)
+
+    phase_rows = phase_req[phase_req['property'] == 'phase']
+    scores = {}
+    for sqi_code in (3, 4, 5, 6, 7):
+        req = phase_rows[phase_rows['SQI_code'] == sqi_code]
+        table = pd.to_numeric(req['score'], errors='coerce').groupby(
+            pd.to_numeric(req['phase_id'], errors='coerce')).min()
+        limiting = ids['phase_id'].map(table).groupby(ids['profile']).min().reindex(range(n_profiles))
+        scores[sqi_code] = np.where(only_zero.to_numpy(), 100.0, limiting.fillna(100).to_numpy(dtype=float))
+    return scores
+
+
+def _phase_class_scores(phase_req, sqi_code, prop, phase_ids):
+    """Array form of _phase_class_score: first listed score per phase id, 100 if not listed."""
+    req = phase_req[(phase_req['SQI_code'] == sqi_code) & (phase_req['property'] == prop)]
+    table = pd.Series(pd.to_numeric(req['score'], errors='coerce').to_numpy(),
+                      index=pd.to_numeric(req['phase_id'], errors='coerce').to_numpy())
+    table = table[~table.index.duplicated(keep='first')]
+    ids = pd.Series(pd.to_numeric(pd.Series(phase_ids), errors='coerce').to_numpy(dtype=float))
+    return ids.map(table).fillna(100).to_numpy(dtype=float)
+
+
+def _flag_scores(profile_req, sqi_code, prop, flags):
+    """Array form of _flag_score (yes/no profile properties)."""
+    flagged = pd.to_numeric(pd.Series(flags), errors='coerce').to_numpy(dtype=float) == 1
+    if not flagged.any():
+        return np.full(len(flagged), 100.0)
+    return np.where(flagged, float(_flag_score(profile_req, sqi_code, prop, 1)), 100.0)
+
+
+def _profile_class_scores(classes, phase_scores, profile_req, phase_req, drainage_req):
+    """
+    Profile-level scores of N profiles: vertic/gelic flags, roots and
+    impermeable-layer phases, general phases and SQ4, each an (N,) array.
+
+    Parameters:
+        classes (dict): vertic, gelic, roots, il, swr, drain_id and pscl_id of each profile.
+        phase_scores (dict): General-phase scores per SQI code (see _phase_scores).
+    """
+    scores = {}
+    for sqi_code in (3, 7):
+        scores[sqi_code] = {
+            'ver': _flag_scores(profile_req, sqi_code, "ver", classes['vertic']),
+            'gel': _flag_scores(profile_req, sqi_code, "gel", classes['gelic']),
+            'phase': phase_scores[sqi_code],
+            'roots': _phase_class_scores(phase_req, sqi_code, "roots", classes['roots']),
+            'il': _phase_class_scores(phase_req, sqi_code, "il", classes['il']),
+        }
+    drain = GAEZ_crop_req.drainage_scores(GAEZ_crop_req.drainage_score_table(drainage_req),
+                                          np.asarray(classes['pscl_id']), np.asarray(classes['drain_id']))
+    scores[4] = np.fmin.reduce([_phase_class_scores(phase_req, 4, "SWR", classes['swr']),
+                                _phase_class_scores(phase_req, 4, "il", classes['il']),
+                                np.asarray(drain, dtype=float), phase_scores[4]])
+    scores[5] = phase_scores[5]
+    scores[6] = phase_scores[6]
+    return scores
+
+
+def _score_sqi_arrays(layers, rd, class_scores, profile_req, texture_req, inputLevel, wts, mask=None):
+    """
+    SQ1-SQ7 and SR of N profiles from padded (N, H) layer arrays.
+
+    class_scores holds the profile-level scores from _profile_class_scores,
+    either one value for all profiles or one per profile. mask marks the real
+    horizons of padded profiles; padding contributes nothing, and the SQ1
+    layer mean is taken over each profile's own horizons.
+    """
+    layers = {name: np.atleast_2d(np.asarray(values, dtype=float)) for name, values in layers.items()}
+    n_profiles, n_layers = layers['ph'].shape
+    wts = np.broadcast_to(np.asarray(wts, dtype=float), (n_profiles, n_layers))
+    mask = np.ones((n_profiles, n_layers), dtype=bool) if mask is None else np.asarray(mask, dtype=bool)
+    rd = np.broadcast_to(np.asarray(rd, dtype=float), (n_profiles,))
+    rd = np.where(np.isnan(rd), 200, rd)
+    fragvol = np.nan_to_num(layers['fragvol'], nan=0)
+    topsoil = np.arange(n_layers) == 0
+    texture_req = GAEZ_crop_req.texture_score_table(texture_req)
+
+    def per_profile(values):
+        # (N, 1) column of profile-level scores, broadcast over horizons
+        return np.broadcast_to(np.asarray(values, dtype=float), (n_profiles,))[:, None]
+
+    def weighted_sum(layer_scores):
+        return np.sum(np.where(mask, layer_scores * wts, 0.0), axis=1)
+
+    # --- SQ1: nutrient availability ---
+    if inputLevel == 'H':
+        sq1 = np.full(n_profiles, np.nan)
+    else:
+        oc = _curve_scores(layers['soc'], profile_req, 1, "oc")
+        ph = _curve_scores(layers['ph'], profile_req, 1, "ph")
+        txt = GAEZ_crop_req.texture_scores(texture_req, 1, layers['texture_class_id'])
+        # teb only scores the topsoil; NaN leaves it out of the subsoil means
+        teb = np.where(topsoil, _curve_scores(layers['teb'], profile_req, 1, "teb"), np.nan)
+        layer_scores = _limiting_mean(oc, ph, teb, txt)
+        # mean over each profile's horizons, as in calculate_SQ1
+        sq1 = weighted_sum(layer_scores) / np.maximum(mask.sum(axis=1), 1)
+
+    # --- SQ2: nutrient retention ---
+    bs = _curve_scores(layers['bs'], profile_req, 2, "bs")
+    cecs = _curve_scores(layers['cecs'][:, :1], profile_req, 2, "cecs")
+    if inputLevel == 'H':
+        txt = GAEZ_crop_req.texture_scores(texture_req, 2, layers['texture_class_id'])
+        top = _limiting_mean(bs[:, :1], cecs, txt[:, :1])
+    else:
+        top = _limiting_mean(bs[:, :1], cecs)
+    if n_layers > 1:
+        ph = _curve_scores(layers['ph'][:, 1:], profile_req, 2, "ph")
+        cecc = _curve_scores(layers['cecc'][:, 1:], profile_req, 2, "cecc")
+        sub_scores = [bs[:, 1:], cecc, ph] + ([txt[:, 1:]] if inputLevel == 'H' else [])
+        layer_scores = np.concatenate([top, _limiting_mean(*sub_scores)], axis=1)
+    else:
+        layer_scores = top
+    sq2 = weighted_sum(layer_scores)
+
+    # --- SQ3: rooting conditions ---
+    classes = class_scores[3]
+    rd_score = _neutral(_curve_scores(rd, profile_req, 3, "rd"))
+    layer_scores = _limiting_mean(GAEZ_crop_req.texture_scores(texture_req, 3, layers['texture_class_id']),
+                                  _curve_scores(fragvol, profile_req, 3, "cf"),
+                                  _curve_scores(layers['db'], profile_req, 3, "db"),
+                                  *[per_profile(classes[name]) for name in ('ver', 'gel', 'phase', 'roots', 'il')])
+    sq3 = weighted_sum(rd_score[:, None] * (layer_scores / 100))
+
+    # --- SQ4: oxygen availability (profile-level only) ---
+    sq4 = per_profile(class_scores[4])[:, 0].copy()
+
+    # --- SQ5: excess salts ---
+    esp = _neutral(_curve_scores(layers['esp'], profile_req, 5, "esp"))
+    ec = _neutral(_curve_scores(layers['ec'], profile_req, 5, "ec"))
+    sq5 = weighted_sum(np.minimum(ec * (esp / 100), per_profile(class_scores[5])))
+
+    # --- SQ6: toxicity ---
+    ca = _neutral(_curve_scores(layers['caco3'], profile_req, 6, "ca"))
+    gy = _neutral(_curve_scores(layers['gypsum'], profile_req, 6, "gy"))
+    sq6 = weighted_sum(np.minimum(gy * (ca / 100), per_profile(class_scores[6])))
+
+    # --- SQ7: workability ---
+    classes = class_scores[7]
+    layer_scores = _limiting_mean(_curve_scores(rd, profile_req, 7, "rd")[:, None],
+                                  GAEZ_crop_req.texture_scores(texture_req, 7, layers['texture_class_id']),
+                                  _curve_scores(fragvol, profile_req, 7, "cf"),
+                                  # topsoil bulk density is applied to every layer, as in calculate_SQ7
+                                  _curve_scores(layers['db'][:, :1], profile_req, 7, "db"),
+                                  *[per_profile(classes[name]) for name in ('ver', 'gel', 'phase', 'roots', 'il')])
+    sq7 = weighted_sum(layer_scores)
+
+    # --- Soil rating ---
+    if inputLevel == 'L':
+        sr = sq1 * (sq3 / 100) * (np.fmin.reduce([sq4, sq5, sq6, sq7]) / 100)
+    elif inputLevel == 'I':
+        sr = 0.5 * (sq1 + sq2) * (sq3 / 100) * (np.fmin.reduce([sq4, sq5, sq6, sq7]) / 100)
+    else:
+        sr = sq2 * (sq3 / 100) * (np.fmin(sq4, sq7) / 100)
+
+    return {'SQ1': sq1, 'SQ2': sq2, 'SQ3': sq3, 'SQ4': sq4, 'SQ5': sq5, 'SQ6': sq6, 'SQ7': sq7, 'SR': sr}
+
+
+#----------------------------------------------------------------------------------------------------
+#                          Map unit (all-component) ratings
+#----------------------------------------------------------------------------------------------------
+
+# Profile-level columns read from the first horizon of each component
+COMPONENT_CLASS_COLUMNS = ['vertic', 'gelic', 'roots', 'il', 'swr', 'drain_id', 'pscl_id']
+
+
+def score_components(map_data, requirements, inputLevel, depthWt_type):
+    """
+    Score every component (cokey) of a prepared horizon table in one padded batch.
+
+    All components of all map units are padded to a common (N components,
+    H horizons) layout and scored together by the array SQI functions; the
+    profile-level classes (phases, flags, drainage) are looked up per
+    component from the requirement tables without a per-component loop.
+
+    Parameters:
+        map_data (DataFrame): Horizons of all components, e.g. ssurgo_gaez_data
+            output after phase classification and prepare_sqi_data.
+        requirements (dict): Tables from load_sqi_requirements.
+        inputLevel (str): 'L', 'I' or 'H'.
+        depthWt_type (int): Rooting depth type for the horizon weights.
+
+    Returns:
+        DataFrame: One row per component (in input order) with mukey, cokey,
+        compname and comppct_r where available, SQ1-SQ7 and SR.
+    """
+    if inputLevel not in ('L', 'I', 'H'):
+        raise ValueError("Invalid input level. Choose from 'L', 'I', or 'H'.")
+    map_data = map_data.reset_index(drop=True)
+
+    columns = BATCH_LAYER_PROPERTIES + [hz_names.top_col_name, hz_names.bottom_col_name]
+    keys, padded, mask = pad_profile_columns(map_data, columns)
+    wts = depth_weights_batch(padded[hz_names.top_col_name], padded[hz_names.bottom_col_name], depthWt_type, mask)
+
+    cokeys = pd.Series(map_data['cokey'].to_numpy())
+    profile_index = pd.Categorical(cokeys, categories=keys).codes
+    first = map_data.loc[~cokeys.duplicated().to_numpy()].reset_index(drop=True)
+    classes = {name: first[name].to_numpy() for name in COMPONENT_CLASS_COLUMNS}
+    class_scores = _profile_class_scores(classes, _phase_scores(map_data, profile_index, len(keys), requirements['phase']),
+                                         requirements['profile'], requirements['phase'], requirements['drainage'])
+
+    scores = _score_sqi_arrays({name: padded[name] for name in BATCH_LAYER_PROPERTIES}, first['rd'].to_numpy(),
+                               class_scores, requirements['profile'], requirements['texture'], inputLevel, wts, mask)
+
+    components = first[[col for col in ('mukey', 'cokey', 'compname', 'comppct_r') if col in first.columns]].copy()
+    for name, values in scores.items():
+        components[name] = values
+    return components
+
+
+def map_unit_ratings(component_scores):
+    """
+    Area-weighted SQI and SR ratings per map unit from score_components output.
+
+    Every component is weighted by its comppct_r share of the scored components
+    of its map unit (components without comppct_r weigh 0; equal weights if no
+    component of the map unit has one).
+
+    Returns:
+        DataFrame: One row per mukey with SQ1-SQ7, SR, components (count) and
+        comppct_total (percent of the map unit covered by the scored components).
+    """
+    scores = component_scores.copy()
+    if 'mukey' not in scores.columns:
+        scores['mukey'] = 'unknown'
+    pct = pd.to_numeric(scores['comppct_r'], errors='coerce') if 'comppct_r' in scores.columns \
+        else pd.Series(np.nan, index=scores.index)
+    scores['_weight'] = pct.fillna(0)
+    no_pct = scores.groupby('mukey', sort=False)['_weight'].transform('sum') <= 0
+    scores.loc[no_pct, '_weight'] = 1.0
+
+    rows = []
+    for mukey, group in scores.groupby('mukey', sort=False):
+        weights = group['_weight'].to_numpy(dtype=float)
+        row = {'mukey': mukey}
+        for name in SQI_NAMES + ['SR']:
+            values = group[name].to_numpy(dtype=float)
+            valid = ~np.isnan(values)
+            total = weights[valid].sum()
+            row[name] = float(np.dot(values[valid], weights[valid]) / total) if total > 0 else np.nan
+        row['components'] = len(group)
+        row['comppct_total'] = float(pct.loc[group.index].sum(min_count=1))
+        rows.append(row)
+    return pd.DataFrame(rows)
+
+
+def gaez_map_unit_ratings(map_data, CROP_ID, inputLevel, depthWt_type=1):
+    """
+    Per-component and area-weighted map unit SQIs and SR for all components in map_data.
+
+    Returns:
+        tuple: (components DataFrame from score_components, map units DataFrame
+        from map_unit_ratings)
+    """
+    map_data = prepare_sqi_data(map_data)
+    requirements = load_sqi_requirements(CROP_ID, inputLevel)
+    components = score_components(map_data, requirements, inputLevel, depthWt_type)
+    return components, map_unit_ratings(components)
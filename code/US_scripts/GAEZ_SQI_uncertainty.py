@@ -0,0 +1,208 @@
+"""
+Monte Carlo uncertainty bands for GAEZ soil quality indices.
+
+SSURGO reports a low (_l), representative (_r) and high (_h) value for most of
+the horizon properties the SQIs score. gaez_sqi_uncertainty() draws N profiles
+from triangular(low, r, high) distributions, derives the scored properties
+(texture class, relative bulk density, SOC, BS, CECc, ESP) for every draw and
+scores all N profiles in one array pass with
+GAEZ_SQI_functions.calculate_sqi_batch, returning percentiles of SQ1-SQ7 and SR.
+
+The range columns come from ssurgo_gaez_data(..., include_ranges=True).
+Properties without a range (missing _l/_h, including user-measured values,
+whose ranges the overlay drops) are held at their representative value. Profile-level classes (phases, drainage, particle
+size class, vertic/gelic, roots, impermeable layer) are not sampled and are
+taken from the representative profile.
+"""
+
+import logging
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from gaez_config import hz_names
+import GAEZ_crop_req
+import GAEZ_SQI_functions
+from GAEZ_SSURGO_data import BULK_DENSITY_REF, SSURGO_RANGE_COLUMNS, TEXTURE_CLASS_IDS
+from GAEZ_texture_lut import texture_lookup
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DRAWS = 1000
+DEFAULT_PERCENTILES = (5, 50, 95)
+
+# Reference bulk density by texture class id (index 0 = no class)
+_DB_REF_BY_ID = np.full(len(TEXTURE_CLASS_IDS) + 1, np.nan)
+for _name, _db_ref in BULK_DENSITY_REF.items():
+    _DB_REF_BY_ID[TEXTURE_CLASS_IDS[_name.lower()]] = _db_ref
+
+
+def triangular_draws(low, mode, high, n_draws: int, rng: np.random.Generator,
+                     correlated: bool = True) -> np.ndarray:
+    """
+    Inverse-CDF draws from triangular(low, mode, high) for an array of horizons.
+
+    Missing low/high fall back to the mode (no spread); a mode outside
+    [low, high] widens the range to include it. NaN modes stay NaN.
+
+    Args:
+        low, mode, high: Arrays of the same shape (one value per horizon)
+        n_draws: Number of draws
+        rng: numpy random Generator
+        correlated: Use one uniform per draw for all horizons (a wetter/sandier/...
+            profile is wetter/sandier in every horizon) instead of independent
+            horizons, which would understate profile-level spread
+
+    Returns:
+        (n_draws, *mode.shape) array
+    """
+    mode = np.asarray(mode, dtype=float)
+    low = np.asarray(low, dtype=float)
+    high = np.asarray(high, dtype=float)
+    low = np.fmin(np.where(np.isnan(low), mode, low), mode)
+    high = np.fmax(np.where(np.isnan(high), mode, high), mode)
+
+    u = rng.random((n_draws,) + ((1,) * mode.ndim if correlated else mode.shape))
+    width = high - low
+    with np.errstate(invalid='ignore', divide='ignore'):
+        split = np.where(width > 0, (mode - low) / width, 0.5)
+        draws = np.where(u < split,
+                         low + np.sqrt(u * width * (mode - low)),
+                         high - np.sqrt((1 - u) * width * (high - mode)))
+    return np.where(np.isnan(mode), np.nan, draws)
+
+
+def _column(data: pd.DataFrame, name: str) -> np.ndarray:
+    """Numeric column as float array (all NaN if absent)."""
+    if name not in data.columns:
+        return np.full(len(data), np.nan)
+    return pd.to_numeric(data[name], errors='coerce').to_numpy(dtype=float)
+
+
+def _no_range(data: pd.DataFrame, prop: str) -> np.ndarray:
+    """Horizons without a SSURGO low or high value for a processed property."""
+    low_col, high_col = SSURGO_RANGE_COLUMNS[prop]
+    return np.isnan(_column(data, low_col)) & np.isnan(_column(data, high_col))
+
+
+def _draw_property(data: pd.DataFrame, prop: str, n_draws: int, rng: np.random.Generator,
+                   correlated: bool) -> np.ndarray:
+    """(n_draws, H) draws of one processed property around its representative value."""
+    low_col, high_col = SSURGO_RANGE_COLUMNS[prop]
+    return triangular_draws(_column(data, low_col), _column(data, prop), _column(data, high_col),
+                            n_draws, rng, correlated)
+
+
+def sample_profiles(map_data: pd.DataFrame, n_draws: int = DEFAULT_DRAWS, seed: Optional[int] = None,
+                    correlated: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Draw n_draws variants of a profile and derive the properties scored by the SQIs.
+
+    Sand and clay are drawn and silt is the remainder (sand and clay are rescaled
+    when they exceed 100 together), so every draw is a valid texture.
+
+    Returns:
+        Dict of (n_draws, H) arrays keyed by GAEZ_SQI_functions.BATCH_LAYER_PROPERTIES,
+        plus 'rd' as an (n_draws,) array
+    """
+    data = map_data.reset_index(drop=True)
+    rng = np.random.default_rng(seed)
+    draw = {prop: _draw_property(data, prop, n_draws, rng, correlated)
+            for prop in SSURGO_RANGE_COLUMNS if prop not in ('silt', 'rd')}
+
+    # Texture: silt is the remainder of the sampled sand and clay
+    sand = np.clip(draw['sand'], 0, 100)
+    clay = np.clip(draw['clay'], 0, 100)
+    excess = np.fmax(sand + clay, 100) / 100
+    sand, clay = sand / excess, clay / excess
+    silt = 100 - sand - clay
+    texture_id = texture_lookup(sand, silt, clay)[0]
+
+    sar = draw['sar']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        layers = {
+            'soc': draw['om'] * 0.58,
+            'ph': draw['ph'],
+            'teb': draw['teb'],
+            'bs': draw['teb'] / draw['cecs'] * 100,
+            'cecs': draw['cecs'],
+            'cecc': draw['cecs'] / clay * 100,
+            'texture_class_id': texture_id.astype(float),
+            'db': draw['db_measured'] / _DB_REF_BY_ID[texture_id],
+            'fragvol': np.nan_to_num(draw['fragvol'], nan=0),
+            'esp': (100 * (-0.0126 + 0.01475 * sar)) / (1 + (-0.0126 + 0.01475 * sar)),
+            'ec': draw['ec'],
+            'caco3': draw['caco3'],
+            'gypsum': draw['gypsum'],
+        }
+
+    # Horizons without SSURGO source columns, or whose sources have no range (user-measured
+    # layers, see overlay_user_horizons.clear_measured_ranges), keep their processed values
+    sources = {'soc': ('om',), 'bs': ('teb', 'cecs'), 'cecc': ('cecs', 'clay'),
+               'texture_class_id': ('sand', 'clay'), 'db': ('db_measured', 'sand', 'clay'), 'esp': ('sar',)}
+    for prop, props in sources.items():
+        if prop in data.columns:
+            held = np.isnan(_column(data, props[0])) | np.logical_and.reduce([_no_range(data, src) for src in props])
+            if held.any():
+                layers[prop][:, held] = _column(data, prop)[held]
+
+    # Depth to restriction is a profile property: one draw per profile
+    rd_low, rd_high = SSURGO_RANGE_COLUMNS['rd']
+    layers['rd'] = triangular_draws(_column(data, rd_low)[:1], _column(data, 'rd')[:1],
+                                    _column(data, rd_high)[:1], n_draws, rng)[:, 0]
+    return layers
+
+
+def gaez_sqi_uncertainty(map_data: pd.DataFrame, CROP_ID, inputLevel: str, depthWt_type: int = 1,
+                         n_draws: int = DEFAULT_DRAWS, percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+                         seed: Optional[int] = None, correlated: bool = True) -> pd.DataFrame:
+    """
+    Percentile bands of SQ1-SQ7 and SR from Monte Carlo draws of SSURGO low/high ranges.
+
+    Parameters:
+        map_data (DataFrame): One component's horizons with phases classified, as
+            passed to gaez_sqi_ratings, including the range columns from
+            ssurgo_gaez_data(..., include_ranges=True).
+        CROP_ID (str or int): GAEZ crop identifier.
+        inputLevel (str): 'L', 'I' or 'H'.
+        depthWt_type (int): Rooting depth class for the horizon weights.
+        n_draws (int): Number of sampled profiles.
+        percentiles (sequence): Percentiles to report (0-100).
+        seed (int, optional): Random seed for reproducible bands.
+        correlated (bool): Sample all horizons of a draw with the same quantile.
+
+    Returns:
+        DataFrame indexed by percentile with columns SQ1-SQ7 and SR
+        (SQ1 is NaN for inputLevel 'H').
+    """
+    if n_draws < 1:
+        raise ValueError("n_draws must be at least 1")
+
+    map_data = map_data.reset_index(drop=True)
+    crop_reqs = GAEZ_crop_req.getGAEZ_requirements_source(CROP_ID=CROP_ID, inputLevel=inputLevel, source='csv', requirement_type='all')
+
+    wts = GAEZ_SQI_functions.calculate_depth_weights(map_data, top_col=hz_names.top_col_name,
+                                                     bottom_col=hz_names.bottom_col_name, depthWt_type=depthWt_type)
+    layers = sample_profiles(map_data, n_draws=n_draws, seed=seed, correlated=correlated)
+    rd = layers.pop('rd')
+
+    scores = GAEZ_SQI_functions.calculate_sqi_batch(
+        layers, rd, map_data,
+        profile_req=crop_reqs.get("profile"),
+        phase_req=crop_reqs.get("phase"),
+        drainage_req=crop_reqs.get("drainage"),
+        texture_req=crop_reqs.get("texture"),
+        inputLevel=inputLevel,
+        wts=wts.to_numpy(dtype=float),
+    )
+
+    bands = {}
+    for name, values in scores.items():
+        if np.isnan(values).all():
+            bands[name] = np.full(len(percentiles), np.nan)
+        else:
+            bands[name] = np.nanpercentile(values, percentiles)
+    result = pd.DataFrame(bands, index=pd.Index(list(percentiles), name='percentile'))
+    logger.info(f"SQI uncertainty: {n_draws} draws for crop {CROP_ID} ({inputLevel})")
+    return result
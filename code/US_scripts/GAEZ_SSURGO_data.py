@@ -6,6 +6,19 @@ import requests
 import pandas as pd
 import numpy as np
 import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import GAEZ_SDA_client
+import GAEZ_SDA_stream
+import GAEZ_SSURGO_mirror
+import gaez_config
+from GAEZ_ssurgo_categories import encode_ssurgo_categoricals, category_code_map
+from GAEZ_texture_lut import pscl_class_ids, texture_class_ids, texture_lookup
 
 def getTextGroup(field):
     if field is None:
@@ -78,13 +91,15 @@ def get_property_by_texture(texture, property_map):
         return np.nan
     return property_map.get(texture.lower(), np.nan)
 
+TEXTURE_CLASS_IDS = {
+    "sand": 12, "loamy sand": 11, "sandy loam": 10, "sandy clay loam": 9,
+    "loam": 8, "silt": 5, "silt loam": 6, "silty clay loam": 3,
+    "clay loam": 4, "sandy clay": 7, "silty clay": 2, "clay": 1
+}
+
+
 def getTXT_id(texture):
-    texture_id_map = {
-        "sand": 12, "loamy sand": 11, "sandy loam": 10, "sandy clay loam": 9,
-        "loam": 8, "silt": 5, "silt loam": 6, "silty clay loam": 3,
-        "clay loam": 4, "sandy clay": 7, "silty clay": 2, "clay": 1
-    }
-    return get_property_by_texture(texture, texture_id_map) 
+    return get_property_by_texture(texture, TEXTURE_CLASS_IDS) 
 
 
 def classify_pscl(texture_or_row, clay=None, sand=None):
@@ -169,22 +184,156 @@ def classify_pscl(texture_or_row, clay=None, sand=None):
     return 'unknown'
 
 
-def ssurgo_gaez_data(mukey_list):
+
+# Texture class names as returned by gettt, keyed by texture class id
+TEXTURE_CLASS_NAMES = {class_id: name[0].upper() + name[1:] for name, class_id in TEXTURE_CLASS_IDS.items()}
+
+# Particle size class ids; classify_pscl returns the digit strings and
+# getTextGroup the letter codes
+PSCL_IDS = {'c': 1, 'm': 2, 'f': 3, '1': 1, '2': 2, '3': 3, 'unknown': 0}
+
+# Derived horizon columns and the processed columns they are computed from
+DERIVED_COLUMN_SOURCES = {
+    'esp': ('sar',),
+    'soc': ('om',),
+    'bs': ('teb', 'cecs'),
+    'cecc': ('cecs', 'clay'),
+    'texture': ('sand', 'silt', 'clay'),
+    'db': ('db_measured', 'sand', 'silt', 'clay'),
+}
+
+
+def derive_horizon_properties(df, rows=None, changed=None):
     """
-    Extracts combined component-horizon data for the given list of mukey values
-    using the sda_return() function.
-    
+    Compute the derived GAEZ columns of processed horizon data in place.
+
+    Derives esp, soc, bs, cecc, the texture columns (texture, texture_class_id,
+    db_ref, pscl, pscl_id) and the relative bulk density db in array passes.
+
+    Args:
+        df (DataFrame): Processed horizons (sand, silt, clay, om, ... columns).
+        rows (array-like of bool, optional): Rows to recompute; all rows by default.
+        changed (iterable of str, optional): Source columns that changed; only
+            derived columns depending on them are recomputed. All by default.
+
+    Returns:
+        DataFrame: df, updated in place.
+    """
+    rows = np.ones(len(df), dtype=bool) if rows is None else np.asarray(rows, dtype=bool)
+    if not rows.any():
+        return df
+    changed = None if changed is None else set(changed)
+    index = df.index[rows]
+
+    def needed(col):
+        sources = DERIVED_COLUMN_SOURCES[col]
+        return (all(src in df.columns for src in sources)
+                and (changed is None or not changed.isdisjoint(sources)))
+
+    def values(col):
+        return pd.to_numeric(df.loc[index, col], errors='coerce').to_numpy(dtype=float)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        if needed('esp'):
+            sar = values('sar')
+            df.loc[index, 'esp'] = (100 * (-0.0126 + 0.01475 * sar)) / (1 + (-0.0126 + 0.01475 * sar))
+        if needed('soc'):
+            df.loc[index, 'soc'] = values('om') * 0.58
+        if needed('bs'):
+            df.loc[index, 'bs'] = values('teb') / values('cecs') * 100
+        if needed('cecc'):
+            df.loc[index, 'cecc'] = values('cecs') / values('clay') * 100
+        if needed('texture'):
+            ids, _, pscl = texture_lookup(values('sand'), values('silt'), values('clay'))
+            if 'texture' not in df.columns:
+                df['texture'] = None
+            df.loc[index, 'texture'] = pd.Series(ids, index=index).map(TEXTURE_CLASS_NAMES)
+            df.loc[index, 'texture_class_id'] = np.where(ids > 0, ids, np.nan)
+            df.loc[index, 'db_ref'] = df.loc[index, 'texture'].map(BULK_DENSITY_REF)
+            if 'pscl' not in df.columns:
+                df['pscl'] = None
+            df.loc[index, 'pscl'] = np.where(pscl > 0, pscl.astype(str), 'unknown')
+            df.loc[index, 'pscl_id'] = pscl
+        if needed('db'):
+            df.loc[index, 'db'] = values('db_measured') / pd.to_numeric(df.loc[index, 'db_ref'],
+                                                                         errors='coerce').to_numpy(dtype=float)
+    return df
+
+# SSURGO low/high companions of the representative (_r) properties, keyed by the
+# processed column name they bracket (see _ssurgo_rows_to_frame)
+SSURGO_RANGE_COLUMNS = {
+    'sand': ('sandtotal_l', 'sandtotal_h'),
+    'silt': ('silttotal_l', 'silttotal_h'),
+    'clay': ('claytotal_l', 'claytotal_h'),
+    'om': ('om_l', 'om_h'),
+    'db_measured': ('dbovendry_l', 'dbovendry_h'),
+    'ec': ('ec_l', 'ec_h'),
+    'caco3': ('caco3_l', 'caco3_h'),
+    'gypsum': ('gypsum_l', 'gypsum_h'),
+    'sar': ('sar_l', 'sar_h'),
+    'cecs': ('cec7_l', 'cec7_h'),
+    'teb': ('sumbases_l', 'sumbases_h'),
+    'ph': ('ph1to1h2o_l', 'ph1to1h2o_h'),
+    'fragvol': ('total_fragvol_l', 'total_fragvol_h'),
+    'rd': ('resdept_l', 'resdept_h'),
+}
+
+# range columns that come straight from CHORIZON
+SSURGO_RANGE_HORIZON_COLUMNS = [col for prop, pair in SSURGO_RANGE_COLUMNS.items()
+                                if prop not in ('fragvol', 'rd') for col in pair]
+
+# Bulk density lookup table (g/cm³) based on Saxton and Rawls (2006) pedotransfer equations using soil texture and 1% OM
+BULK_DENSITY_REF = {
+    "Sand": 1.51,
+    "Loamy sand": 1.53,
+    "Sandy loam": 1.56,
+    "Loam": 1.55,
+    "Silt loam": 1.50,
+    "Silt": 1.55,
+    "Sandy clay loam": 1.57,
+    "Clay loam": 1.47,
+    "Silty clay loam": 1.38,
+    "Sandy clay": 1.51,
+    "Silty clay": 1.28,
+    "Clay": 1.37
+}
+
+
+def build_ssurgo_gaez_query(mukey_list, include_ranges=False, survey_version=False):
+    """
+    Build the component-horizon SQL used by ssurgo_gaez_data.
+
+    The query only uses SQL understood by both SDA (SQL Server) and the local
+    SQLite mirror (GAEZ_SSURGO_mirror), so either source can answer it.
+
     Args:
         mukey_list (list): List of mukey values (integers or strings) to filter by.
-    
-    External Functions:
-        sda_return (function): A function that executes the SQL query against the Soil Data Access API.
-    
+        include_ranges (bool): Also select the low/high (_l/_h) columns listed in
+            SSURGO_RANGE_COLUMNS (used by GAEZ_SQI_uncertainty).
+        survey_version (bool): Also select the survey area (legend.areasymbol) and its
+            version date (sacatalog.saverest) of each map unit. SDA only: the mirror
+            has no mapunit/legend/sacatalog tables.
+
     Returns:
-        pd.DataFrame: Combined data as a DataFrame, or a string error message if no data are returned.
+        str: Single-line SQL query string.
     """
     # Convert each mukey value to an ASCII string and join them with commas
     mukey_str = ",".join([str(val).encode("ascii", "ignore").decode("utf-8") for val in mukey_list])
+
+    range_select = ""
+    frag_range_select = ""
+    if include_ranges:
+        range_select = "".join(f", ch.{col}" for col in SSURGO_RANGE_HORIZON_COLUMNS) + \
+            ", frag.total_fragvol_l, frag.total_fragvol_h, corestr.resdept_l, corestr.resdept_h"
+        frag_range_select = ", SUM(f.fragvol_l) AS total_fragvol_l, SUM(f.fragvol_h) AS total_fragvol_h"
+    survey_select = ", lg.areasymbol, sac.saverest" if survey_version else ""
+    survey_join = """
+    LEFT JOIN MAPUNIT mu
+         ON comp.mukey = mu.mukey
+    LEFT JOIN LEGEND lg
+         ON mu.lkey = lg.lkey
+    LEFT JOIN SACATALOG sac
+         ON lg.areasymbol = sac.areasymbol""" if survey_version else ""
     
     # Build the SQL query string (as a multi-line string)
     query = f"""
@@ -220,6 +369,7 @@ def ssurgo_gaez_data(mukey_list):
         comp.hydricrating,
         comp.taxtempcl,
         comp.frostact,
+        comp.slope_r,
         corestr.reskind,
         corestr.resdept_r,
         corestr.reshard,
@@ -228,12 +378,12 @@ def ssurgo_gaez_data(mukey_list):
         cm.ponddurcl,
         cm.flodfreqcl,
         cm.floddurcl,
-        muagg.wtdepannmin
+        muagg.wtdepannmin{range_select}{survey_select}
     FROM CHORIZON ch
     LEFT JOIN COMPONENT comp
          ON ch.cokey = comp.cokey
     LEFT JOIN (
-         SELECT chkey, SUM(f.fragvol_r) AS total_fragvol_r, f.fragkind
+         SELECT chkey, SUM(f.fragvol_r) AS total_fragvol_r{frag_range_select}, f.fragkind
          FROM CHFRAGS f
          GROUP BY chkey, f.fragkind
     ) AS frag
@@ -257,120 +407,437 @@ def ssurgo_gaez_data(mukey_list):
     ) AS cm
          ON comp.cokey = cm.cokey
     LEFT JOIN MUAGGATT muagg
-         ON comp.mukey = muagg.mukey
+         ON comp.mukey = muagg.mukey{survey_join}
     WHERE comp.mukey IN ({mukey_str})
     ORDER BY comp.mukey, comp.comppct_r DESC, comp.cokey, ch.hzdept_r;
     """
     
     # Clean the query by removing extra whitespace/newlines
-    query_clean = " ".join(query.split())
+    return " ".join(query.split())
+
+
+# Numeric columns of the ssurgo_gaez_data query (SSURGO names); streamed SDA
+# answers are parsed straight to float64 for these
+SSURGO_NUMERIC_QUERY_COLUMNS = [
+    "comppct_r", "hzdept_r", "hzdepb_r", "sandtotal_r", "silttotal_r", "claytotal_r", "pi_r", "lep_r",
+    "ec_r", "caco3_r", "om_r", "dbovendry_r", "gypsum_r", "sar_r", "cec7_r", "ecec_r", "sumbases_r",
+    "ph1to1h2o_r", "total_fragvol_r", "resdept_r", "wtdepannmin", "slope_r",
+] + SSURGO_RANGE_HORIZON_COLUMNS + ["total_fragvol_l", "total_fragvol_h", "resdept_l", "resdept_h"]
+
+
+def _ssurgo_rows_to_frame(header, data):
+    """
+    Turn the raw rows of the ssurgo_gaez_data query into the processed horizon
+    DataFrame (renamed columns, numeric types and derived GAEZ properties).
+    """
+    return _ssurgo_raw_to_frame(pd.DataFrame(data, columns=header))
+
+
+def _ssurgo_raw_to_frame(df_out):
+    """
+    Process the raw ssurgo_gaez_data query result (one column per query field,
+    values as strings or already typed) into the horizon DataFrame.
+    """
+    df_out["fragvol"] = pd.to_numeric(df_out["total_fragvol_r"], errors="coerce")
+    # Group by chkey and concatenate all fragkind values (separated by a space)
+    frag_agg = df_out.groupby('chkey')['fragkind'].apply(lambda x: " ".join(x.dropna())).reset_index()
+    # Merge the aggregated fragkind back into the main DataFrame (dropping the original fragkind column)
+    df_out = df_out.drop(columns=['fragkind', 'total_fragvol_r']).drop_duplicates(subset=['chkey'])
+    df_out = df_out.merge(frag_agg, on='chkey', how='left')
+    df_out.rename(columns={"sandtotal_r": "sand", "silttotal_r": "silt", "claytotal_r": "clay",
+    "pi_r": "pi", "lep_r": "lep", "ec_r": "ec", "caco3_r": "caco3", "om_r": "om",
+    "dbovendry_r": "db_measured", "sandtotal_r": "sand", "gypsum_r": "gypsum", "sar_r": "sar",
+    "cec7_r": "cecs", "ecec_r": "ecec", "sumbases_r": "teb", "ph1to1h2o_r": "ph", "resdept_r": "rd"},
+    inplace=True)
+    cols_to_convert = [
+        "hzdept_r", "hzdepb_r", "sand", "silt", "clay", "pi", "lep",
+        "ec", "caco3", "om", "db_measured", "gypsum", "sar", "cecs",
+        "ecec", "teb", "ph", "wtdepannmin", "rd", "comppct_r"
+    ]
+
+    # Drainage class number lookup table (lowercase keys, reverse scale)
+    ssurgo_drainage_to_numeric = {
+        'very poorly drained': 1,
+        'poorly drained': 2,
+        'somewhat poorly drained': 3,
+        'moderately well drained': 4,
+        'well drained': 5,
+        'somewhat excessively drained': 6,
+        'excessively drained': 7
+    }
+
+    cols_to_convert += [col for pair in SSURGO_RANGE_COLUMNS.values() for col in pair if col in df_out.columns]
+    # Component slope (%), when the row set has it
+    if 'slope_r' in df_out.columns:
+        cols_to_convert.append('slope_r')
+
+    for col in cols_to_convert:
+        df_out[col] = pd.to_numeric(df_out[col], errors='coerce')
+    derive_horizon_properties(df_out)
+    # String attributes become Categoricals with fixed vocabularies (lowercase, stripped)
+    encode_ssurgo_categoricals(df_out)
+    df_out['drain_id'] = category_code_map('drainagecl', ssurgo_drainage_to_numeric, df_out['drainagecl'])
+    return df_out
+
+
+class RawHorizonCache:
+    """
+    Thread-safe LRU cache of raw ssurgo_gaez_data query rows per mukey.
+
+    Holds the unprocessed query result (one DataFrame per mukey and
+    include_ranges flag) of mukeys fetched from SDA, so repeated and
+    overlapping requests only query the mukeys not seen before.
+
+    Each entry remembers the survey area (areasymbol) and survey version
+    (saverest) its rows came from. invalidate_changed_areas drops the entries
+    whose survey area has since been republished, so entries can live for
+    max_age seconds (months) without serving superseded soils.
+    """
+
+    def __init__(self, max_mukeys: int, max_age: Optional[float] = None):
+        self.max_mukeys = max_mukeys
+        self.max_age = max_age
+        self._frames = OrderedDict()  # key -> (rows, stored_at, areasymbol, saverest)
+        self._lock = threading.Lock()
+
+    def get_many(self, mukeys, include_ranges=False):
+        """Cached raw frames of the given mukeys (mukey -> DataFrame)."""
+        found = {}
+        cutoff = time.monotonic() - self.max_age if self.max_age else None
+        with self._lock:
+            for mukey in mukeys:
+                key = (mukey, include_ranges)
+                entry = self._frames.get(key)
+                if entry is None:
+                    continue
+                if cutoff is not None and entry[1] < cutoff:
+                    del self._frames[key]
+                    continue
+                self._frames.move_to_end(key)
+                found[mukey] = entry[0]
+        return found
+
+    def put(self, raw, include_ranges=False):
+        """Store a raw query result, split by mukey."""
+        if self.max_mukeys <= 0 or raw is None or not len(raw):
+            return
+        stored_at = time.monotonic()
+        with self._lock:
+            for mukey, rows in raw.groupby('mukey', sort=False):
+                key = (_mukey_key(mukey), include_ranges)
+                self._frames[key] = (rows.reset_index(drop=True), stored_at,
+                                     first_value(rows, 'areasymbol'), first_value(rows, 'saverest'))
+                self._frames.move_to_end(key)
+            while len(self._frames) > self.max_mukeys:
+                self._frames.popitem(last=False)
+
+    def survey_versions(self):
+        """Survey version of each cached survey area (areasymbol -> saverest)."""
+        with self._lock:
+            return {area: version for _, _, area, version in self._frames.values() if area is not None}
+
+    def invalidate_changed_areas(self, versions):
+        """
+        Drop entries whose survey area has a different version in versions
+        (areasymbol -> saverest, e.g. from GAEZ_survey_versions). Entries of areas
+        not in versions, or without a recorded area, are kept.
+
+        Returns:
+            Number of entries dropped
+        """
+        with self._lock:
+            stale = [key for key, (_, _, area, version) in self._frames.items()
+                     if area in versions and versions[area] != version]
+            for key in stale:
+                del self._frames[key]
+        return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._frames.clear()
+
+    def __len__(self):
+        return len(self._frames)
+
+
+def first_value(rows, columns, numeric=False):
+    """
+    First non-null value of the first of columns present in rows, or None.
+
+    columns is a column name or a sequence of fallbacks. Values are returned
+    as text; with numeric=True values that do not parse are skipped and the
+    result is a float.
+    """
+    if isinstance(columns, str):
+        columns = (columns,)
+    for column in columns:
+        if column in rows.columns:
+            values = pd.to_numeric(rows[column], errors='coerce') if numeric else rows[column]
+            values = values.dropna()
+            if len(values):
+                return float(values.iloc[0]) if numeric else str(values.iloc[0])
+    return None
+
+
+_horizon_cache = RawHorizonCache(gaez_config.ssurgo_horizon_cache_size, gaez_config.ssurgo_horizon_cache_max_age)
+
+
+def clear_ssurgo_cache():
+    """Drop all cached SDA horizon rows."""
+    _horizon_cache.clear()
+
+
+def invalidate_survey_areas(versions):
+    """Drop cached SDA horizon rows of survey areas republished since they were fetched."""
+    return _horizon_cache.invalidate_changed_areas(versions)
+
+
+def _mukey_key(mukey):
+    """Canonical string form of a mukey ('123456' for 123456, '123456.0', ...)."""
+    try:
+        return str(int(float(mukey)))
+    except (TypeError, ValueError):
+        return str(mukey).strip()
+
+
+# Running estimate of query rows per mukey, used to size SDA batches
+_rows_per_mukey = {'rows': 0, 'mukeys': 0}
+_rows_per_mukey_lock = threading.Lock()
+
+
+def _record_batch_size(n_mukeys, n_rows):
+    with _rows_per_mukey_lock:
+        _rows_per_mukey['rows'] += n_rows
+        _rows_per_mukey['mukeys'] += n_mukeys
+
+
+def sda_batch_size():
+    """
+    Mukeys per SDA request: gaez_config.sda_target_rows_per_request divided by
+    the observed rows per mukey, clamped to [1, gaez_config.sda_max_mukeys_per_request].
+    """
+    with _rows_per_mukey_lock:
+        rows, mukeys = _rows_per_mukey['rows'], _rows_per_mukey['mukeys']
+    if not mukeys or not rows:
+        return gaez_config.sda_max_mukeys_per_request
+    size = int(gaez_config.sda_target_rows_per_request / (rows / mukeys))
+    return max(1, min(size, gaez_config.sda_max_mukeys_per_request))
+
+
+def _fetch_sda_batch(mukeys, include_ranges):
+    """Raw query result of one batch of mukeys from SDA, None if empty; failures raise."""
+    query = build_ssurgo_gaez_query(mukeys, include_ranges, survey_version=True)
+    if len(mukeys) >= gaez_config.sda_stream_min_mukeys:
+        # Large requests: parse the answer incrementally into typed columns
+        raw = sda_return_stream(query, SSURGO_NUMERIC_QUERY_COLUMNS, raise_errors=True)
+    else:
+        # Execute the query using sda_return
+        result = sda_return(query, raise_errors=True)
+        raw = None
+        if result is not None:
+            # Result is returned in a column named "Table" containing a nested list,
+            # where the first sub-list is the header row.
+            table = result["Table"].iloc[0]
+            raw = pd.DataFrame(table[1:], columns=table[0])
+    if raw is not None:
+        _record_batch_size(len(mukeys), len(raw))
+    return raw
+
+
+class SDAFetchError(requests.RequestException):
+    """
+    Some SDA batches of fetch_sda_horizons failed. mukeys lists the mukeys of
+    the failed batches, frames the raw results of the batches that succeeded.
+    """
+
+    def __init__(self, mukeys, frames, error):
+        super().__init__(f"SDA horizon query failed for {len(mukeys)} mukey(s): {error}")
+        self.mukeys = mukeys
+        self.frames = frames
+
+
+def fetch_sda_horizons(mukeys, include_ranges=False):
+    """
+    Raw ssurgo_gaez_data query results for mukeys from SDA, fetched in batches of
+    sda_batch_size() mukeys with up to gaez_config.sda_fetch_workers concurrent
+    requests through the shared SDA client.
+
+    Returns:
+        List of raw DataFrames in mukey batch order (empty batches are left out)
+
+    Raises:
+        SDAFetchError: One or more batches failed (raised after all batches finished)
+    """
+    size = sda_batch_size()
+    batches = [mukeys[i:i + size] for i in range(0, len(mukeys), size)]
+
+    def fetch(batch):
+        try:
+            return _fetch_sda_batch(batch, include_ranges)
+        except (requests.RequestException, GAEZ_SDA_stream.SDAStreamError) as err:
+            return err
+
+    if len(batches) == 1:
+        results = [fetch(batches[0])]
+    else:
+        workers = max(1, min(gaez_config.sda_fetch_workers, len(batches)))
+        logging.info(f"SSURGO: fetching {len(mukeys)} mukeys from SDA in {len(batches)} batches")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ssurgo') as executor:
+            results = list(executor.map(fetch, batches))
+
+    frames, failed, error = [], [], None
+    for batch, raw in zip(batches, results):
+        if isinstance(raw, Exception):
+            failed += batch
+            error = error or raw
+        elif raw is None or not len(raw):
+            logging.warning(f"SSURGO: no SDA data for {len(batch)} mukey(s) ({batch[0]}...)")
+        else:
+            frames.append(raw)
+    if failed:
+        raise SDAFetchError(failed, frames, error)
+    return frames
+
+
+def ssurgo_gaez_data(mukey_list, source=None, include_ranges=False):
+    """
+    Extracts combined component-horizon data for the given list of mukey values.
+
+    The data source is gaez_config.ssurgo_source unless given: 'sda' queries
+    Soil Data Access (fetch_sda_horizons: concurrent batches through sda_return(),
+    or sda_return_stream() for batches of at least gaez_config.sda_stream_min_mukeys
+    mukeys); 'mirror' runs the same query against the local SQLite mirror
+    (GAEZ_SSURGO_mirror) and falls back to SDA for any mukey the mirror does not
+    contain (or for all of them if no mirror is built). Mukeys fetched from SDA
+    before are served from an in-memory cache (clear_ssurgo_cache); their rows are
+    stamped with the survey area and version (areasymbol, saverest) used by
+    GAEZ_survey_versions to invalidate republished survey areas.
     
-    # Execute the query using sda_return (assumed to be defined elsewhere)
-    result = sda_return(query_clean)
+    Args:
+        mukey_list (list): List of mukey values (integers or strings) to filter by.
+        source (str): Optional override of gaez_config.ssurgo_source.
+        include_ranges (bool): Also return the SSURGO low/high columns in
+            SSURGO_RANGE_COLUMNS (kept under their SSURGO names, e.g. 'om_l').
     
-    if result is None:
+    External Functions:
+        sda_return (function): A function that executes the SQL query against the Soil Data Access API.
+    
+    Returns:
+        pd.DataFrame: Combined data as a DataFrame, or a string error message if no data are returned.
+
+    Raises:
+        SDAFetchError: An SDA request failed; the error lists the mukeys not fetched.
+    """
+    source = source or gaez_config.ssurgo_source
+    mukeys = list(dict.fromkeys(_mukey_key(m) for m in mukey_list))
+
+    cached = _horizon_cache.get_many(mukeys, include_ranges)
+    raw_frames = list(cached.values())
+    sda_mukeys = [m for m in mukeys if m not in cached]
+
+    if sda_mukeys and source == 'mirror' and GAEZ_SSURGO_mirror.mirror_available():
+        try:
+            local = GAEZ_SSURGO_mirror.mirror_mukeys(sda_mukeys)
+            if local:
+                header, data = GAEZ_SSURGO_mirror.query_mirror(build_ssurgo_gaez_query(sorted(local), include_ranges))
+                if data:
+                    raw_frames.append(pd.DataFrame(data, columns=header))
+            sda_mukeys = [m for m in sda_mukeys if m not in local]
+        except (sqlite3.Error, ValueError) as err:
+            logging.error(f"SSURGO mirror: query failed, falling back to SDA: {err}")
+            raw_frames = list(cached.values())
+            sda_mukeys = [m for m in mukeys if m not in cached]
+        if sda_mukeys:
+            logging.info(f"SSURGO mirror: {len(sda_mukeys)} mukey(s) not mirrored, querying SDA")
+
+    if sda_mukeys:
+        try:
+            fetched = fetch_sda_horizons(sda_mukeys, include_ranges)
+        except SDAFetchError as err:
+            # keep the batches that arrived; a retry only fetches the failed ones
+            for raw in err.frames:
+                _horizon_cache.put(raw, include_ranges)
+            raise
+        for raw in fetched:
+            _horizon_cache.put(raw, include_ranges)
+        raw_frames += fetched
+
+    if not raw_frames:
         return "SSURGO not available in this area"
-    else:
-        # Assume result is returned in a column named "Table" containing a nested list,
-        # where the first sub-list is the header row.
-        raw = result["Table"].iloc[0]
-        header = raw[0]
-        data = raw[1:]
-        df_out = pd.DataFrame(data, columns=header)
-        df_out["fragvol"] = pd.to_numeric(df_out["total_fragvol_r"], errors="coerce")
-        # Group by chkey and concatenate all fragkind values (separated by a space)
-        frag_agg = df_out.groupby('chkey')['fragkind'].apply(lambda x: " ".join(x.dropna())).reset_index()
-        # Merge the aggregated fragkind back into the main DataFrame (dropping the original fragkind column)
-        df_out = df_out.drop(columns=['fragkind', 'total_fragvol_r']).drop_duplicates(subset=['chkey'])
-        df_out = df_out.merge(frag_agg, on='chkey', how='left')
-        df_out.rename(columns={"sandtotal_r": "sand", "silttotal_r": "silt", "claytotal_r": "clay",
-        "pi_r": "pi", "lep_r": "lep", "ec_r": "ec", "caco3_r": "caco3", "om_r": "om",
-        "dbovendry_r": "db_measured", "sandtotal_r": "sand", "gypsum_r": "gypsum", "sar_r": "sar",
-        "cec7_r": "cecs", "ecec_r": "ecec", "sumbases_r": "teb", "ph1to1h2o_r": "ph", "resdept_r": "rd"},
-        inplace=True)
-        cols_to_convert = [
-            "hzdept_r", "hzdepb_r", "sand", "silt", "clay", "pi", "lep",
-            "ec", "caco3", "om", "db_measured", "gypsum", "sar", "cecs",
-            "ecec", "teb", "ph", "wtdepannmin", "rd", "comppct_r"
-        ]
-
-        # Bulk density lookup table (g/cm³) based on Saxton and Rawls (2006) pedotransfer equations using soil texture and 1% OM
-        bulk_density_lookup = {
-            "Sand": 1.51,
-            "Loamy sand": 1.53,
-            "Sandy loam": 1.56,
-            "Loam": 1.55,
-            "Silt loam": 1.50,
-            "Silt": 1.55,
-            "Sandy clay loam": 1.57,
-            "Clay loam": 1.47,
-            "Silty clay loam": 1.38,
-            "Sandy clay": 1.51,
-            "Silty clay": 1.28,
-            "Clay": 1.37
-        }
-
-        # Drainage class number lookup table (lowercase keys, reverse scale)
-        ssurgo_drainage_to_numeric = {
-            'very poorly drained': 1,
-            'poorly drained': 2,
-            'somewhat poorly drained': 3,
-            'moderately well drained': 4,
-            'well drained': 5,
-            'somewhat excessively drained': 6,
-            'excessively drained': 7
-        }
-
-        # PSCL numver lookup table
-        pscl_to_numeric = {
-            'c': 1,        # coarse
-            'm': 2,        # medium
-            'f': 3,        # fine
-            'unknown': 0   # fallback
-        }
-
-        for col in cols_to_convert:
-            df_out[col] = pd.to_numeric(df_out[col], errors='coerce')
-        df_out['esp'] = (100 * (-0.0126 + 0.01475 * df_out['sar'])) / (1 + (-0.0126 + 0.01475 * df_out['sar']))
-        df_out['soc'] = df_out['om'] * 0.58
-        df_out['bs'] = df_out['teb'] / df_out['cecs'] * 100
-        df_out['cecc'] = df_out['cecs'] / df_out['clay'] * 100
-        df_out['texture'] = df_out.apply(gettt, axis=1)
-        df_out['texture_class_id'] = df_out['texture'].apply(getTXT_id)
-        df_out['db_ref'] = df_out['texture'].map(bulk_density_lookup)
-        df_out['db'] = df_out['db_measured'] / df_out['db_ref']
-        df_out['drainagecl'] = df_out['drainagecl'].str.lower().str.strip()
-        df_out['drain_id'] = df_out['drainagecl'].map(ssurgo_drainage_to_numeric)
-        df_out['pscl'] = df_out.apply(classify_pscl, axis=1) 
-        df_out['pscl_id'] = df_out['pscl'].map(pscl_to_numeric)
-        return df_out
+    df_out = _ssurgo_raw_to_frame(raw_frames[0].copy() if len(raw_frames) == 1
+                                  else pd.concat(raw_frames, ignore_index=True))
+    if len(raw_frames) > 1:
+        # Restore the query's ORDER BY across cached, mirrored and SDA row sets
+        order = df_out[['mukey', 'cokey']].apply(pd.to_numeric, errors='coerce')
+        df_out = df_out.assign(_mukey=order['mukey'], _cokey=order['cokey']).sort_values(
+            ['_mukey', 'comppct_r', '_cokey', 'hzdept_r'], ascending=[True, False, True, True]
+        ).drop(columns=['_mukey', '_cokey']).reset_index(drop=True)
+    return df_out
 
 
 # SDA = Soil Data Access
-def sda_return(propQry):
+def sda_return(propQry, *, raise_errors=False):
     """
     Queries data from the USDA's Soil Data Mart (SDM) Tabular Service and returns
     it as a pandas DataFrame.
+
+    Requests go through the shared GAEZ_SDA_client.SDAClient (adaptive timeout,
+    hedging, circuit breaker and stale cache). Failures are logged and give
+    None, or are re-raised with raise_errors.
     """
-    base_url = "https://sdmdataaccess.sc.egov.usda.gov/tabular/post.rest"
-    request_data = {"format": "JSON+COLUMNNAME", "query": propQry}
     result = None
 
     try:
-        response = requests.post(base_url, json=request_data, timeout=6)
-        logging.info(f"{round(response.elapsed.total_seconds(), 2)}: {base_url}")
-        response.raise_for_status()
-        result = response.json()
+        result = GAEZ_SDA_client.get_sda_client().query(propQry, kind='tabular')
 
         # If dictionary key "Table" is found, normalize the data and return as DataFrame
         result = pd.json_normalize(result) if "Table" in result else None
 
-    except requests.ConnectionError as err:
+    except requests.RequestException as err:
+        _log_sda_error(err)
+        if raise_errors:
+            raise
+
+    return result
+
+
+def _log_sda_error(err):
+    if isinstance(err, GAEZ_SDA_client.SDAUnavailableError):
+        logging.error(f"USDA service: unavailable: {err}")
+    elif isinstance(err, GAEZ_SDA_stream.SDAStreamError):
+        logging.error(f"USDA service: malformed response: {err}")
+    elif isinstance(err, requests.ConnectionError):
         logging.error(f"USDA service: failed to connect: {err}")
-    except requests.Timeout:
+    elif isinstance(err, requests.Timeout):
         logging.error("USDA service: timed out")
-    except requests.RequestException as err:
+    else:
         logging.error(f"USDA service: error: {err}")
 
-    return result
+
+def sda_return_stream(propQry, numeric_columns=None, *, raise_errors=False):
+    """
+    Queries SDA like sda_return, but reads the answer incrementally
+    (GAEZ_SDA_stream) and converts it batch by batch into typed columns.
+
+    Args:
+        propQry (str): SQL query.
+        numeric_columns (list): Columns parsed to float64; others stay strings.
+        raise_errors (bool): Re-raise failures instead of returning None.
+
+    Returns:
+        pd.DataFrame of the raw query result (one column per field), or None on
+        error or when no rows are returned.
+    """
+    try:
+        frames = list(GAEZ_SDA_stream.iter_table_frames(
+            GAEZ_SDA_client.get_sda_client().stream(propQry), numeric_columns, gaez_config.sda_stream_batch_rows))
+    except (requests.RequestException, GAEZ_SDA_stream.SDAStreamError) as err:
+        _log_sda_error(err)
+        if raise_errors:
+            raise
+        return None
+
+    if not frames:
+        return None
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
 
@@ -0,0 +1,186 @@
+"""
+Local SQLite mirror of the gSSURGO tables joined by ssurgo_gaez_data.
+
+build_ssurgo_mirror() ingests chorizon, component, chfrags, chconsistence,
+corestrictions, cotaxfmmin, comonth and muaggatt from a gSSURGO file
+geodatabase (through surgo_data.load_attributes_from_table) into one indexed
+SQLite file. query_mirror() runs the same SQL that GAEZ_SSURGO_data sends to
+Soil Data Access, so horizon data can be served locally without an SDA round
+trip.
+
+Build once (needs geopandas and the gSSURGO .gdb):
+
+    python GAEZ_SSURGO_mirror.py data/gSSURGO_CONUS.gdb
+
+and set gaez_config.ssurgo_source = 'mirror' (or GAEZ_SSURGO_SOURCE=mirror).
+"""
+
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+import gaez_config
+
+logger = logging.getLogger(__name__)
+
+# gSSURGO tables and the columns ssurgo_gaez_data needs from each
+MIRROR_TABLES: Dict[str, List[str]] = {
+    'muaggatt': ['mukey', 'wtdepannmin'],
+    'component': ['mukey', 'cokey', 'compname', 'comppct_r', 'drainagecl', 'hydricrating',
+                  'taxtempcl', 'frostact', 'slope_r'],
+    'corestrictions': ['cokey', 'reskind', 'resdept_r', 'resdept_l', 'resdept_h', 'reshard'],
+    'cotaxfmmin': ['cokey', 'taxminalogy'],
+    'comonth': ['cokey', 'monthseq', 'pondfreqcl', 'ponddurcl', 'flodfreqcl', 'floddurcl'],
+    'chorizon': ['cokey', 'chkey', 'hzname', 'hzdept_r', 'hzdepb_r', 'sandtotal_r', 'silttotal_r',
+                 'claytotal_r', 'pi_r', 'lep_r', 'ec_r', 'caco3_r', 'om_r', 'dbovendry_r', 'gypsum_r',
+                 'sar_r', 'cec7_r', 'ecec_r', 'sumbases_r', 'ph1to1h2o_r',
+                 # low/high ranges (GAEZ_SSURGO_data.SSURGO_RANGE_HORIZON_COLUMNS)
+                 'sandtotal_l', 'sandtotal_h', 'silttotal_l', 'silttotal_h', 'claytotal_l', 'claytotal_h',
+                 'om_l', 'om_h', 'dbovendry_l', 'dbovendry_h', 'ec_l', 'ec_h', 'caco3_l', 'caco3_h',
+                 'gypsum_l', 'gypsum_h', 'sar_l', 'sar_h', 'cec7_l', 'cec7_h', 'sumbases_l', 'sumbases_h',
+                 'ph1to1h2o_l', 'ph1to1h2o_h'],
+    'chfrags': ['chkey', 'fragvol_r', 'fragvol_l', 'fragvol_h', 'fragkind'],
+    'chconsistence': ['chkey', 'plasticity', 'stickiness'],
+}
+
+# (table, column) pairs used by the ssurgo_gaez_data joins
+MIRROR_INDEXES: List[Tuple[str, str]] = [
+    ('muaggatt', 'mukey'),
+    ('component', 'mukey'),
+    ('component', 'cokey'),
+    ('corestrictions', 'cokey'),
+    ('cotaxfmmin', 'cokey'),
+    ('comonth', 'cokey'),
+    ('chorizon', 'cokey'),
+    ('chorizon', 'chkey'),
+    ('chfrags', 'chkey'),
+    ('chconsistence', 'chkey'),
+]
+
+KEY_COLUMNS = ['mukey', 'cokey', 'chkey']
+
+
+def mirror_available(mirror_path: Optional[str] = None) -> bool:
+    """True if a mirror file exists at mirror_path (default: gaez_config.ssurgo_mirror_path)."""
+    return os.path.isfile(mirror_path or gaez_config.ssurgo_mirror_path)
+
+
+def _connect(mirror_path: str) -> sqlite3.Connection:
+    """Read-only connection to the mirror."""
+    return sqlite3.connect(f"file:{mirror_path}?mode=ro", uri=True)
+
+
+def _filter_by_keys(table: pd.DataFrame, keys: Dict[str, set]) -> pd.DataFrame:
+    """Keep rows whose most specific key column is in the selected key set."""
+    for key in ('chkey', 'cokey', 'mukey'):
+        if key in table.columns and key in keys:
+            return table[table[key].isin(keys[key])]
+    return table
+
+
+def build_ssurgo_mirror(gdb_file: Optional[str] = None,
+                        mirror_path: Optional[str] = None,
+                        mukeys: Optional[Iterable] = None) -> str:
+    """
+    Build the SQLite mirror from a gSSURGO file geodatabase.
+
+    Args:
+        gdb_file: Path to gSSURGO geodatabase (default: surgo_data.DEFAULT_GDB_FILE)
+        mirror_path: Output SQLite file (default: gaez_config.ssurgo_mirror_path)
+        mukeys: Optional subset of map unit keys to mirror (e.g. one state);
+                all map units are mirrored when None
+
+    Returns:
+        Path of the mirror file
+    """
+    from surgo_data import load_attributes_from_table
+
+    mirror_path = mirror_path or gaez_config.ssurgo_mirror_path
+    os.makedirs(os.path.dirname(os.path.abspath(mirror_path)), exist_ok=True)
+    tmp_path = f"{mirror_path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    keys = {}
+    if mukeys is not None:
+        keys['mukey'] = {int(m) for m in mukeys}
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        # Tables are loaded parent-first so the mukey subset can be pushed down to cokey and chkey
+        for table_name, columns in MIRROR_TABLES.items():
+            start = time.perf_counter()
+            table = load_attributes_from_table(table_name, gdb_file, columns=columns)
+            for key in KEY_COLUMNS:
+                if key in table.columns:
+                    table[key] = pd.to_numeric(table[key], errors='coerce').astype('Int64')
+            table = _filter_by_keys(table, keys)
+            if mukeys is not None and table_name == 'component':
+                keys['cokey'] = set(table['cokey'].dropna())
+            if mukeys is not None and table_name == 'chorizon':
+                keys['chkey'] = set(table['chkey'].dropna())
+
+            table.to_sql(table_name, conn, if_exists='replace', index=False, chunksize=50000)
+            logger.info(f"Mirrored {table_name}: {len(table)} rows in {time.perf_counter() - start:.1f}s")
+
+        for table_name, column in MIRROR_INDEXES:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table_name}_{column} ON {table_name} ({column})")
+
+        conn.execute("CREATE TABLE mirror_info (key TEXT PRIMARY KEY, value TEXT)")
+        conn.executemany("INSERT INTO mirror_info VALUES (?, ?)", [
+            ('source', str(gdb_file)),
+            ('built_at', time.strftime('%Y-%m-%dT%H:%M:%S')),
+        ])
+        conn.execute("ANALYZE")
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, mirror_path)
+    return mirror_path
+
+
+def mirror_mukeys(mukey_list: Iterable, mirror_path: Optional[str] = None) -> set:
+    """Subset of mukey_list (as strings) that has components in the mirror."""
+    mukey_str = ",".join(str(int(m)) for m in mukey_list)
+    if not mukey_str:
+        return set()
+    conn = _connect(mirror_path or gaez_config.ssurgo_mirror_path)
+    try:
+        rows = conn.execute(f"SELECT DISTINCT mukey FROM component WHERE mukey IN ({mukey_str})").fetchall()
+    finally:
+        conn.close()
+    return {str(row[0]) for row in rows}
+
+
+def query_mirror(sql: str, mirror_path: Optional[str] = None) -> Tuple[List[str], List[list]]:
+    """
+    Run a SDA-dialect SELECT against the mirror.
+
+    Values are returned as text (None for NULL), matching the JSON+COLUMNNAME
+    payload from SDA, so results from both sources are processed identically.
+
+    Returns:
+        (header, rows)
+    """
+    conn = _connect(mirror_path or gaez_config.ssurgo_mirror_path)
+    try:
+        cursor = conn.execute(sql.rstrip().rstrip(';'))
+        header = [col[0] for col in cursor.description]
+        rows = [[None if value is None else str(value) for value in row] for row in cursor]
+    finally:
+        conn.close()
+    return header, rows
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    gdb = sys.argv[1] if len(sys.argv) > 1 else None
+    out = sys.argv[2] if len(sys.argv) > 2 else None
+    print(f"Mirror written to {build_ssurgo_mirror(gdb, out)}")
@@ -6,6 +6,8 @@ import pandas as pd
 import numpy as np
 import re
 
+from GAEZ_ssurgo_categories import category_contains, category_isin
+
 
 """
 ==================================================================================================
@@ -185,6 +187,243 @@ This module defines classification criteria for various FAO soil phases based on
 
 """
 
+# HWSD phase ids
+PHASE_IDS = {
+    'stony': 1,
+    'lithic': 2,
+    'petric': 3,
+    'gravelly': 25,
+    'petrocalcic': 4,
+    'petrogypsic': 5,
+    'petroferric': 6,
+    'fragipan': 8,
+    'duripan': 9,
+    'placic': 17,
+    'rudic': 18,
+    'skeletic': 20,
+    'concretionary': 26,
+    'phreatic': 7,
+    'anthraquic': 13,
+    'inundic': 16,
+    'saline': 10,
+    'salic': 19,
+    'sodic': 11,
+    'excessively_drained': 29
+}
+
+_WEAK_RESTRICTIONS = ("noncemented", "extremely weakly cemented", "weakly cemented", "noncoherent",
+                      "extremely weakly coherent", "very weakly coherent", "weakly coherent")
+_POORLY_DRAINED = ("poorly drained", "very poorly drained")
+_LONG_DURATIONS = ("long (7 to 30 days)", "very long (more than 30 days)")
+_VERY_LONG = ("very long (more than 30 days)",)
+
+# Phase rules: (phase, groups). A phase applies when all clauses of any group hold.
+# Clauses are (field, operator, value) with operators:
+#   '>=', '<=', '>', '<'  numeric comparison (missing values never match)
+#   'in', 'notin'         normalized string equal to one of the values (missing: 'in' False, 'notin' True)
+#   'contains'            normalized string contains one of the values (missing: False)
+# The order of the table is the order of phase_ids_list.
+PHASE_RULE_TABLE = [
+    ('stony', [[('fragvol', '>=', 35)]]),
+    ('lithic', [[('reskind', 'contains', ("lithic bedrock", "paralithic bedrock", "densic bedrock")),
+                 ('rd', '<=', 50)]]),
+    ('petric', [[('fragvol', '>=', 40), ('rd', '<=', 100)]]),
+    ('gravelly', [[('fragvol', '>=', 40), ('rd', '<=', 100)]]),
+    ('petrocalcic', [[('reskind', 'contains', ("petrocalcic",)), ('rd', '<=', 100)]]),
+    ('petrogypsic', [[('reskind', 'contains', ("petrogypsic",)), ('rd', '<=', 100)]]),
+    ('petroferric', [[('reskind', 'contains', ("petroferric",)), ('rd', '<=', 100)]]),
+    ('fragipan', [[('reskind', 'contains', ("fragipan", "plinthite", "ortstein")),
+                   ('reshard', 'notin', _WEAK_RESTRICTIONS)]]),
+    ('duripan', [[('reskind', 'contains', ("duripan",)), ('reshard', 'notin', _WEAK_RESTRICTIONS)]]),
+    ('placic', [[('reskind', 'contains', ("placic",))]]),
+    ('rudic', [[('fragvol', '>=', 35)],
+               [('fragkind', 'contains', ("boulders", "cobbles", "stones"))]]),
+    ('skeletic', [[('fragvol', '>=', 40), ('rd', '<=', 50)]]),
+    ('concretionary', [[('fragvol', '>=', 40), ('fragkind', 'contains', ("concretions",))]]),
+    ('phreatic', [[('wtdepannmin', '<=', 50), ('drainagecl', 'in', _POORLY_DRAINED)],
+                  [('wtdepannmin', '<=', 50), ('hydricrating', 'in', ("yes",))]]),
+    ('anthraquic', [[(freq, 'in', ("frequent", "occasional")), (dur, 'in', _LONG_DURATIONS), wet]
+                    for freq, dur in (('pondfreqcl', 'ponddurcl'), ('flodfreqcl', 'floddurcl'))
+                    for wet in (('drainagecl', 'in', _POORLY_DRAINED), ('hydricrating', 'in', ("yes",)))]),
+    ('inundic', [[('flodfreqcl', 'in', ("frequent", "very frequent")), ('floddurcl', 'in', _LONG_DURATIONS)],
+                 [('flodfreqcl', 'in', ("occasional",)), ('floddurcl', 'in', _VERY_LONG)],
+                 [('pondfreqcl', 'in', ("frequent", "common")), ('ponddurcl', 'in', _LONG_DURATIONS)],
+                 [('pondfreqcl', 'in', ("occasional",)), ('ponddurcl', 'in', _VERY_LONG)]]),
+    ('saline', [[('reskind', 'contains', ("salic",))], [('ec', '>=', 4)]]),
+    ('salic', [[('reskind', 'contains', ("salic",))], [('ec', '>=', 15)], [('ec', '>=', 4), ('ph', '>=', 8.3)]]),
+    ('sodic', [[('reskind', 'contains', ("natric",))], [('esp', '>=', 6)], [('sar', '>=', 13)]]),
+    ('excessively_drained', [[('drainagecl', 'contains', ("excessively drained",))]]),
+]
+
+# Binary vertic/gelic properties in the same form (see classify_gaez_vertic / classify_gaez_gelic)
+PROPERTY_RULE_TABLE = [
+    ('vertic', [[('taxminalogy', 'contains', ("smectitic", "montmorillonitic"))],
+                [('clay', '>=', 40), ('pi', '>=', 20), ('lep', '>=', 15)],
+                [('plasticity', 'contains', ("high",)), ('stickiness', 'contains', ("high",))]]),
+    ('gelic', [[('taxtempcl', 'in', ("subgelic", "pergelic"))],
+               [('reskind', 'in', ("permafrost",))],
+               [('frostact', 'in', ("high",))]]),
+]
+
+# Fields looked up under alternative names (first column present is used), e.g. raw
+# SSURGO names or other horizon sources; a field with no column counts as missing
+PHASE_FIELD_ALIASES = {
+    'ec': ('ec', 'ec_r'),
+    'ph': ('ph', 'ph1to1h2o_r'),
+    'esp': ('esp', 'esp_r'),
+    'sar': ('sar', 'sar_r'),
+    'clay': ('clay', 'claytotal_r'),
+    'pi': ('pi', 'pi_r'),
+    'lep': ('lep', 'lep_r'),
+    'rd': ('rd', 'resdept_r'),
+}
+
+# Component attributes that ssurgo_gaez_data joins onto every horizon of a
+# component (restriction, drainage, flooding/ponding, water table, taxonomy)
+COMPONENT_LEVEL_FIELDS = frozenset({
+    'reskind', 'rd', 'reshard', 'drainagecl', 'hydricrating', 'pondfreqcl', 'ponddurcl',
+    'flodfreqcl', 'floddurcl', 'wtdepannmin', 'taxtempcl', 'frostact', 'taxminalogy',
+})
+
+_NUMERIC_OPERATORS = {
+    '>=': np.greater_equal,
+    '<=': np.less_equal,
+    '>': np.greater,
+    '<': np.less,
+}
+_STRING_OPERATORS = ('in', 'notin', 'contains')
+
+
+def compile_phase_rules(rule_table=None, phase_ids=None, aliases=None):
+    """
+    Compile a rule table into a plan of vectorized clauses.
+
+    Args:
+        rule_table: List of (name, groups) rules (default PHASE_RULE_TABLE)
+        phase_ids: Dict of rule name -> output id (default PHASE_IDS; names are
+            used when the rule has no id)
+        aliases: Dict of field -> candidate column names (default PHASE_FIELD_ALIASES)
+
+    Returns:
+        dict with 'ids' (output id per rule), 'clauses' (unique (field, op, value)
+        clauses), 'groups' (per rule, tuples of clause indices) and 'aliases'
+    """
+    rule_table = PHASE_RULE_TABLE if rule_table is None else rule_table
+    phase_ids = PHASE_IDS if phase_ids is None else phase_ids
+    aliases = PHASE_FIELD_ALIASES if aliases is None else aliases
+
+    clauses, clause_index, ids, groups = [], {}, [], []
+    for name, rule_groups in rule_table:
+        ids.append(phase_ids.get(name, name))
+        compiled = []
+        for group in rule_groups:
+            indices = []
+            for field, op, value in group:
+                if op not in _NUMERIC_OPERATORS and op not in _STRING_OPERATORS:
+                    raise ValueError(f"Phase rule '{name}': unknown operator '{op}'")
+                if op in _STRING_OPERATORS:
+                    value = tuple(str(v).strip().lower() for v in value)
+                clause = (field, op, value)
+                if clause not in clause_index:
+                    clause_index[clause] = len(clauses)
+                    clauses.append(clause)
+                indices.append(clause_index[clause])
+            compiled.append(tuple(indices))
+        groups.append(tuple(compiled))
+    return {'ids': ids, 'clauses': clauses, 'groups': groups, 'aliases': dict(aliases)}
+
+
+def _field_column(df, field, aliases):
+    """Column of df holding field (directly or under an alias), or None."""
+    for col in aliases.get(field, (field,)):
+        if col in df.columns:
+            return df[col]
+    return None
+
+
+def _clause_mask(column, op, value, n):
+    """Boolean array of rows satisfying one clause."""
+    if op in _NUMERIC_OPERATORS:
+        if column is None:
+            return np.zeros(n, dtype=bool)
+        values = pd.to_numeric(column, errors='coerce').to_numpy(dtype=float)
+        with np.errstate(invalid='ignore'):
+            return _NUMERIC_OPERATORS[op](values, value)
+    if column is None:
+        return np.full(n, op == 'notin')
+    if op == 'contains':
+        return category_contains(column, value, column.name)
+    mask = category_isin(column, value, column.name)
+    return ~mask if op == 'notin' else mask
+
+
+def _component_rows(df, component_key):
+    """
+    First row position of each component and the component index of every row,
+    or None when df has no usable component key (missing column or keys, or one
+    row per component).
+    """
+    if component_key is None or component_key not in df.columns or len(df) == 0:
+        return None
+    codes, uniques = pd.factorize(df[component_key])
+    if (codes < 0).any() or len(uniques) == len(codes):
+        return None
+    # factorize numbers components in order of first appearance
+    _, first = np.unique(codes, return_index=True)
+    return first, codes
+
+
+def evaluate_phase_rules(df, plan=None, component_key='cokey'):
+    """
+    Evaluate a compiled plan over a horizon table.
+
+    Clauses on COMPONENT_LEVEL_FIELDS are evaluated once per component (on the
+    first horizon of each component_key value) and broadcast back to its
+    horizons; the other clauses are evaluated per horizon.
+
+    Args:
+        df: Horizon DataFrame (SSURGO processed data or any table with the fields
+            used by the plan; string fields may be plain or Categorical)
+        plan: Result of compile_phase_rules (default: the compiled PHASE_RULE_TABLE)
+        component_key: Column identifying components (None = evaluate every clause per row)
+
+    Returns:
+        (n_rows, n_rules) boolean array, one column per rule in table order
+    """
+    plan = _PHASE_PLAN if plan is None else plan
+    n = len(df)
+    components = _component_rows(df, component_key)
+
+    clause_masks = []
+    for field, op, value in plan['clauses']:
+        column = _field_column(df, field, plan['aliases'])
+        if components is not None and field in COMPONENT_LEVEL_FIELDS:
+            first, codes = components
+            column = None if column is None else column.iloc[first]
+            clause_masks.append(_clause_mask(column, op, value, len(first))[codes])
+        else:
+            clause_masks.append(_clause_mask(column, op, value, n))
+
+    result = np.zeros((n, len(plan['groups'])), dtype=bool)
+    for j, groups in enumerate(plan['groups']):
+        for group in groups:
+            group_mask = np.ones(n, dtype=bool)
+            for index in group:
+                group_mask &= clause_masks[index]
+            result[:, j] |= group_mask
+    return result
+
+
+def phase_id_lists(matches, ids):
+    """Per row, the list of matching ids in rule order ([0] when none match)."""
+    ids = np.asarray(ids)
+    return [ids[row].tolist() or [0] for row in matches]
+
+
+_PHASE_PLAN = compile_phase_rules()
+_PROPERTY_PLAN = compile_phase_rules(PROPERTY_RULE_TABLE)
+
+
 def classify_gaez_v4_phases(df):
     """
     Classifies soils into GAEZ v4 phases using SSURGO attributes.  Assigns HWSD phase
@@ -202,6 +441,11 @@ def classify_gaez_v4_phases(df):
     - Vertic
     - Gelic
 
+    The phase rules are PHASE_RULE_TABLE and PROPERTY_RULE_TABLE, compiled once
+    into vectorized clauses (compile_phase_rules), so any horizon table with the
+    same fields can be classified. Component attributes (COMPONENT_LEVEL_FIELDS)
+    are evaluated once per cokey and broadcast to the component's horizons.
+
     Inputs:
         'df' - dataframe created using GAEZ_SSURGO_data script from the following source tables:
             - df_component: SSURGO component table.
@@ -217,88 +461,8 @@ def classify_gaez_v4_phases(df):
     # This prevents data corruption across API requests
     df = df.copy()
 
-    # Define HWSD Phase IDs
-    PHASE_IDS = {
-        'stony': 1,
-        'lithic': 2,
-        'petric': 3,
-        'gravelly': 25,
-        'petrocalcic': 4,
-        'petrogypsic': 5,
-        'petroferric': 6,
-        'fragipan': 8,
-        'duripan': 9,
-        'placic': 17,
-        'rudic': 18,
-        'skeletic': 20,
-        'concretionary': 26,
-        'phreatic': 7,
-        'anthraquic': 13,
-        'inundic': 16,
-        'saline': 10,
-        'salic': 19,
-        'sodic': 11,
-        'excessively_drained': 29
-    }
-    
-    # List of conditions as (function, phase_id) tuples
-    conditions = [
-        (lambda row: row["fragvol"] >= 35, PHASE_IDS['stony']),
-        (lambda row: (any(x in str(row["reskind"]).lower() for x in ["lithic bedrock", "paralithic bedrock", "densic bedrock"]) 
-                      and row["rd"] <= 50), PHASE_IDS['lithic']),
-        (lambda row: (row["fragvol"] >= 40) and (row["rd"] <= 100), PHASE_IDS['petric']),
-        (lambda row: (row["fragvol"] >= 40) and (row["rd"] <= 100), PHASE_IDS['gravelly']),
-        (lambda row: ("petrocalcic" in str(row["reskind"]).lower()) and (row["rd"] <= 100), PHASE_IDS['petrocalcic']),
-        (lambda row: ("petrogypsic" in str(row["reskind"]).lower()) and (row["rd"] <= 100), PHASE_IDS['petrogypsic']),
-        (lambda row: ("petroferric" in str(row["reskind"]).lower()) and (row["rd"] <= 100), PHASE_IDS['petroferric']),
-        (lambda row: (any(x in str(row["reskind"]).lower() for x in ["fragipan", "plinthite", "ortstein"]) and 
-                      str(row["reshard"]).lower() not in {
-                          "noncemented", "extremely weakly cemented", "weakly cemented", "noncoherent",
-                          "extremely weakly coherent", "very weakly coherent", "weakly coherent"
-                      }), PHASE_IDS['fragipan']),
-        (lambda row: ("duripan" in str(row["reskind"]).lower() and 
-                      str(row["reshard"]).lower() not in {
-                          "noncemented", "extremely weakly cemented", "weakly cemented", "noncoherent",
-                          "extremely weakly coherent", "very weakly coherent", "weakly coherent"
-                      }), PHASE_IDS['duripan']),
-        (lambda row: "placic" in str(row["reskind"]).lower(), PHASE_IDS['placic']),
-        (lambda row: ((row["fragvol"] >= 35) or 
-                      ("boulders" in str(row["fragkind"]).lower() or "cobbles" in str(row["fragkind"]).lower() or "stones" in str(row["fragkind"]).lower())),
-         PHASE_IDS['rudic']),
-        (lambda row: (row["fragvol"] >= 40) and (row["rd"] <= 50), PHASE_IDS['skeletic']),
-        (lambda row: (row["fragvol"] >= 40) and ("concretions" in str(row["fragkind"]).lower()), PHASE_IDS['concretionary']),
-        (lambda row: (pd.to_numeric(row["wtdepannmin"], errors="coerce") <= 50) and (
-                        str(row["drainagecl"]).lower() in {"poorly drained", "very poorly drained"} or 
-                        str(row["hydricrating"]).lower() == "yes"), PHASE_IDS['phreatic']),
-        (lambda row: (((str(row["pondfreqcl"]).lower() in {"frequent", "occasional"} and 
-                         str(row["ponddurcl"]).lower() in {"long (7 to 30 days)", "very long (more than 30 days)"}) or
-                        (str(row["flodfreqcl"]).lower() in {"frequent", "occasional"} and 
-                         str(row["floddurcl"]).lower() in {"long (7 to 30 days)", "very long (more than 30 days)"}))
-                       and 
-                       (str(row["drainagecl"]).lower() in {"poorly drained", "very poorly drained"} or 
-                        str(row["hydricrating"]).lower() == "yes")), PHASE_IDS['anthraquic']),
-        (lambda row: (((str(row["flodfreqcl"]).lower() in {"frequent", "very frequent"} and 
-                         str(row["floddurcl"]).lower() in {"long (7 to 30 days)", "very long (more than 30 days)"}) or
-                        (str(row["flodfreqcl"]).lower() == "occasional" and 
-                         str(row["floddurcl"]).lower() == "very long (more than 30 days)") or
-                        (str(row["pondfreqcl"]).lower() in {"frequent", "common"} and 
-                         str(row["ponddurcl"]).lower() in {"long (7 to 30 days)", "very long (more than 30 days)"}) or
-                        (str(row["pondfreqcl"]).lower() == "occasional" and 
-                         str(row["ponddurcl"]).lower() == "very long (more than 30 days)"))),
-         PHASE_IDS['inundic']),
-        (lambda row: ("salic" in str(row.get("reskind", "")).lower()) or (row.get("ec", row.get("ec_r", 0)) >= 4), PHASE_IDS['saline']),
-        (lambda row: ("salic" in str(row.get("reskind", "")).lower()) or (row.get("ec", row.get("ec_r", 0)) >= 15) or (
-                        (row.get("ec", row.get("ec_r", 0)) >= 4) and (row.get("ph", row.get("ph1to1h2o_r", 0)) >= 8.3)), PHASE_IDS['salic']),
-        (lambda row: ("natric" in str(row.get("reskind", "")).lower()) or (row.get("esp", row.get("esp_r", 0)) >= 6) or (row.get("sar", row.get("sar_r", 0)) >= 13), PHASE_IDS['sodic']),
-        (lambda row: ("excessively drained" in str(row["drainagecl"]).lower() or 
-                      "somewhat excessively drained" in str(row["drainagecl"]).lower()), PHASE_IDS['excessively_drained'])
-    ]
-    
     # Create the 'phase_ids_list' column with a list of matching phase IDs for each row
-    df['phase_ids_list'] = df.apply(
-        lambda row: [phase_id for condition, phase_id in conditions if condition(row)] or [0],
-        axis=1
-    )
+    df['phase_ids_list'] = phase_id_lists(evaluate_phase_rules(df, _PHASE_PLAN), _PHASE_PLAN['ids'])
     
     # Impermeable Layer Classification
     df["il"] = np.select(
@@ -342,180 +506,13 @@ def classify_gaez_v4_phases(df):
     )
 
     # vertic/gelic classes
-    df["vertic"] = df.apply(classify_gaez_vertic, axis=1)
-    df["gelic"] = df.apply(classify_gaez_gelic, axis=1)
+    properties = evaluate_phase_rules(df, _PROPERTY_PLAN)
+    for j, name in enumerate(_PROPERTY_PLAN['ids']):
+        df[name] = properties[:, j].astype(int)
 
     return df
 
 
-# def classify_gaez_v4_phases(df):
-#     """
-#     Classifies soils into GAEZ v4 phases using SSURGO attributes.
-
-#     GAEZ v4 Phases Included:
-#     - Stony, Lithic, Petric, Petrocalcic, Petrogypsic, Petroferric, Fragipan, Duripan
-#     - Placic, Rudic, Skeletic, Gravelly, Concretionary, Erosion
-#     - Phreatic, Anthraquic, Inundic, Flooded, Saline, Salic, Sodic
-#     - Excessively Drained, Impermeable Layer, Water Regime, Rooting Phase
-
-#     Inputs:
-#         - df_component: SSURGO component table.
-#         - df_corestrictions: SSURGO corestrictions table.
-#         - df_chfrags: SSURGO chfrags table.
-#         - df_muaggatt: SSURGO map unit aggregate table.
-
-#     Returns:
-#         DataFrame with 'cokey' and classification columns for each GAEZ v4 phase.
-#     """
-
-#     # Define classification conditions
-#     df["stony_phase"] = (df["fragvol"] >= 35).astype(int)
-#     df["lithic_phase"] = ((df["reskind"].str.contains("lithic bedrock|paralithic bedrock|densic bedrock", na=False)) & (df["rd"] <= 50)).astype(int)
-#     df["petric_phase"] = ((df["fragvol"] >= 40) & (df["rd"] <= 100)).astype(int)
-#     df["gravelly_phase"] = ((df["fragvol"] >= 40) & (df["rd"] <= 100)).astype(int)
-#     df["petrocalcic_phase"] = (df["reskind"].str.contains("petrocalcic", na=False) & (df["rd"] <= 100)).astype(int)
-#     df["petrogypsic_phase"] = (df["reskind"].str.contains("petrogypsic", na=False) & (df["rd"] <= 100)).astype(int)
-#     df["petroferric_phase"] = (df["reskind"].str.contains("petroferric", na=False) & (df["rd"] <= 100)).astype(int)
-
-#     df["fragipan_phase"] = df.apply(
-#         lambda row: 1 if (
-#             any(x in str(row["reskind"]).lower() for x in ["fragipan", "plinthite", "ortstein"]) and
-#             str(row["reshard"]).lower() not in {
-#                 "noncemented", "extremely weakly cemented", "weakly cemented", "noncoherent",
-#                 "extremely weakly coherent", "very weakly coherent", "weakly coherent"
-#             }
-#         ) else 0,
-#         axis=1
-#     )
-
-#     df["duripan_phase"] = df.apply(
-#         lambda row: 1 if (
-#             "duripan" in str(row["reskind"]) and
-#             str(row["reshard"]) not in {
-#                 "noncemented", "extremely weakly cemented", "weakly cemented", "noncoherent",
-#                 "extremely weakly coherent", "very weakly coherent", "weakly coherent"
-#             }
-#         ) else 0,
-#         axis=1
-#     )
-
-#     df["placic_phase"] = df["reskind"].str.contains("placic", na=False).astype(int)
-#     df["rudic_phase"] = ((df["fragvol"] >= 35) | df["fragkind"].str.contains("boulders|cobbles|stones", na=False)).astype(int)
-#     df["skeletic_phase"] = ((df["fragvol"] >= 40) & (df["rd"] <= 50)).astype(int)
-#     df["concretionary_phase"] = ((df["fragvol"] >= 40) & df["fragkind"].str.contains("concretions", na=False)).astype(int)
-
-#     # df["erosion_phase"] = df["erocl"].astype(str).isin(["2", "3", "4"]).astype(int)
-
-#     df["phreatic_phase"] = df.apply(
-#         lambda row: 1 if (
-#             (pd.to_numeric(row["wtdepannmin"], errors="coerce") <= 50) and
-#             (
-#                 str(row["drainagecl"]).lower() in {"poorly drained", "very poorly drained"} or
-#                 str(row["hydricrating"]).lower() == "yes"
-#             )
-#         ) else 0,
-#         axis=1
-#     )
-
-#     df["anthraquic_phase"] = df.apply(
-#         lambda row: 1 if (
-#             (
-#                 (str(row["pondfreqcl"]).lower() in {"frequent", "occasional"} and
-#                  str(row["ponddurcl"]).lower() in {"long (7 to 30 days)", "very long (more than 30 days)"}) or
-#                 (str(row["flodfreqcl"]).lower() in {"frequent", "occasional"} and
-#                  str(row["floddurcl"]).lower() in {"long (7 to 30 days)", "very long (more than 30 days)"})
-#             ) and
-#             (
-#                 str(row["drainagecl"]).lower() in {"poorly drained", "very poorly drained"} or
-#                 str(row["hydricrating"]).lower() == "yes"
-#             )
-#         ) else 0,
-#         axis=1
-#     )
-
-#     df["inundic_phase"] = df.apply(
-#         lambda row: 1 if (
-#             (
-#                 (str(row["flodfreqcl"]).lower() in {"frequent", "very frequent"} and
-#                  str(row["floddurcl"]).lower() in {"long (7 to 30 days)", "very long (more than 30 days)"}) or
-#                 (str(row["flodfreqcl"]).lower() == "occasional" and
-#                  str(row["floddurcl"]).lower() == "very long (more than 30 days)") or
-#                 (str(row["pondfreqcl"]).lower() in {"frequent", "common"} and
-#                  str(row["ponddurcl"]).lower() in {"long (7 to 30 days)", "very long (more than 30 days)"}) or
-#                 (str(row["pondfreqcl"]).lower() == "occasional" and
-#                  str(row["ponddurcl"]).lower() == "very long (more than 30 days)")
-#             )
-#         ) else 0,
-#         axis=1
-#     )
-
-#     df["saline_phase"] = (df["reskind"].str.contains("salic", na=False) | (df["ec"] >= 4)).astype(int)
-#     df["salic_phase"] = ((df["reskind"].str.contains("salic", na=False)) | (df["ec"] >= 15) | ((df["ec"] >= 4) & (df["ph"] >= 8.3))).astype(int)
-
-#     # "sodic_phase" was a bit different because it used a short-circuited .map. We can break it out:
-#     df["sodic_phase"] = (
-#         df["reskind"].str.contains("natric", na=False) |
-#         ( (df["esp"] >= 6) | (df["sar"] >= 13) )
-#     ).astype(int)
-
-#     df["excessively_drained_phase"] = df["drainagecl"].str.contains("excessively drained|somewhat excessively drained", na=False).astype(int)
-
-#     # Impermeable Layer Classification
-#     df["impermeable_layer_phase"] = np.select(
-#         [
-#             (df["rd"].isna()),
-#             (df["rd"] > 150),
-#             (df["rd"] > 80) & (df["rd"] <= 150),
-#             (df["rd"] > 40) & (df["rd"] <= 80),
-#             (df["rd"] <= 40)
-#         ],
-#         [0, 1, 2, 3, 4],
-#         default=0
-#     )
-
-#     # Water Regime Classification
-#     df["water_regime_phase"] = np.select(
-#         [
-#             (df["wtdepannmin"].isna()),
-#             (df["wtdepannmin"] > 80),
-#             (df["wtdepannmin"] > 40) & (df["wtdepannmin"] <= 80),
-#             (df["wtdepannmin"] > 0) & (df["wtdepannmin"] <= 40),
-#             (df["wtdepannmin"] == 0)
-#         ],
-#         [0, 1, 2, 3, 4],
-#         default=0
-#     )
-
-#     # Rooting Phase Classification
-#     df["rooting_phase"] = np.select(
-#         [
-#             (df["rd"].isna()),
-#             (df["rd"] > 80),
-#             (df["rd"] > 60) & (df["rd"] <= 80),
-#             (df["rd"] > 40) & (df["rd"] <= 60),
-#             (df["rd"] > 20) & (df["rd"] <= 40),
-#             (df["rd"] <= 80),
-#             (df["rd"] <= 20)
-#         ],
-#         [0, 1, 2, 3, 4, 5, 6],
-#         default=0
-#     )
-
-#     # Assuming these two classification functions exist.
-#     # If they return "yes"/"no" strings, you may need to cast them to int as well.
-#     df["vertic"] = df.apply(classify_gaez_vertic, axis=1)
-#     df["gelic"] = df.apply(classify_gaez_gelic, axis=1)
-
-#     return df[[
-#         "cokey", "stony_phase", "lithic_phase", "petric_phase", "petrocalcic_phase", "petrogypsic_phase",
-#         "petroferric_phase", "fragipan_phase", "duripan_phase", "placic_phase", "rudic_phase",
-#         "skeletic_phase", "gravelly_phase", "concretionary_phase", "phreatic_phase",
-#         "anthraquic_phase", "inundic_phase", "saline_phase", "salic_phase", "sodic_phase",
-#         "excessively_drained_phase", "impermeable_layer_phase", "water_regime_phase", "rooting_phase",
-#         "vertic", "gelic"
-#     ]]
-
-
 def classify_gaez_vertic(row):
     """
     Determine if a soil exhibits vertic properties (1/0) for a single row,
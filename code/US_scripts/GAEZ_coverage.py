@@ -0,0 +1,256 @@
+"""
+SSURGO coverage pre-check and negative cache for point lookups.
+
+Points outside SSURGO coverage (open ocean, other countries, unsurveyed
+areas) used to cost a full SDA spatial query before failing. Two in-process
+checks now answer them first:
+
+- CoverageMask: a coarse lat/lon bitmap of cells that may hold SSURGO map
+  units. Without a mask file it is rasterized from SSURGO_EXTENTS, generous
+  boxes around the surveyed US states and territories. build_coverage_mask
+  writes a finer mask from the SDA survey-area polygons (sapolygon) to
+  gaez_config.coverage_mask_path. Cells touched by any survey area are set,
+  so the mask only rejects points that are clearly uncovered.
+- NegativeCache: coordinates for which SDA answered "no map unit", kept for
+  gaez_config.coverage_negative_ttl seconds. Only empty answers are stored;
+  failed queries raise and are never cached.
+
+GAEZ_SDA_query.get_dominant_mukey_at_point consults both before querying SDA.
+Counters are reported by coverage_stats().
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+import GAEZ_SDA_client
+import gaez_config
+
+logger = logging.getLogger(__name__)
+
+# Simplified SSURGO survey extents (west, south, east, north) in degrees
+SSURGO_EXTENTS = {
+    'conterminous_us': (-125.0, 24.0, -66.5, 49.5),
+    'alaska': (-180.0, 51.0, -129.5, 71.5),
+    'aleutians_west': (172.0, 51.0, 180.0, 53.5),
+    'hawaii': (-160.5, 18.5, -154.5, 22.5),
+    'puerto_rico_virgin_islands': (-67.5, 17.5, -64.5, 18.75),
+    'guam_northern_marianas': (144.5, 13.0, 146.25, 20.75),
+    'american_samoa': (-171.25, -14.75, -168.0, -11.0),
+    'palau': (131.0, 2.75, 134.75, 8.25),
+    'micronesia': (137.75, 0.75, 163.25, 10.25),
+    'marshall_islands': (160.5, 4.5, 172.25, 14.75),
+}
+
+SAPOLYGON_EXTENT_QUERY = """
+SELECT sapolygongeo.STEnvelope().STPointN(1).STX AS west,
+       sapolygongeo.STEnvelope().STPointN(1).STY AS south,
+       sapolygongeo.STEnvelope().STPointN(3).STX AS east,
+       sapolygongeo.STEnvelope().STPointN(3).STY AS north
+FROM sapolygon
+"""
+
+
+class CoverageMask:
+    """Global lat/lon bitmap; True cells may hold SSURGO map units."""
+
+    def __init__(self, cells: np.ndarray, resolution: float, source: str = 'extents'):
+        # row 0 is the band just below 90N, column 0 the band just east of 180W
+        self.cells = cells
+        self.resolution = resolution
+        self.source = source
+
+    @classmethod
+    def from_extents(cls, extents: Iterable[Tuple[float, float, float, float]],
+                     resolution: float = 0.25, source: str = 'extents') -> 'CoverageMask':
+        """
+        Rasterize (west, south, east, north) boxes; every cell a box touches is set.
+        Boxes wider than 180 degrees are taken to cross the antimeridian.
+        """
+        rows, cols = int(round(180 / resolution)), int(round(360 / resolution))
+        cells = np.zeros((rows, cols), dtype=bool)
+        for west, south, east, north in extents:
+            r0 = max(int(math.floor((90 - north) / resolution)), 0)
+            r1 = min(int(math.floor((90 - south) / resolution)) + 1, rows)
+            if east - west > 180:
+                spans = [(-180.0, west), (east, 180.0)]
+            else:
+                spans = [(west, east)]
+            for lo, hi in spans:
+                c0 = max(int(math.floor((lo + 180) / resolution)), 0)
+                c1 = min(int(math.floor((hi + 180) / resolution)) + 1, cols)
+                cells[r0:r1, c0:c1] = True
+        return cls(cells, resolution, source)
+
+    @classmethod
+    def load(cls, path: str) -> 'CoverageMask':
+        """Mask written by save()."""
+        with np.load(path) as data:
+            shape = tuple(int(n) for n in data['shape'])
+            cells = np.unpackbits(data['bits'])[:shape[0] * shape[1]].reshape(shape).astype(bool)
+            return cls(cells, float(data['resolution']), source=path)
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        np.savez_compressed(path, bits=np.packbits(self.cells), shape=np.array(self.cells.shape),
+                            resolution=np.array(self.resolution))
+
+    def covers(self, latitude: float, longitude: float) -> bool:
+        """False only for points clearly outside SSURGO coverage."""
+        if not (-90 <= latitude <= 90):
+            return False
+        longitude = (longitude + 180) % 360 - 180
+        rows, cols = self.cells.shape
+        row = min(int((90 - latitude) / self.resolution), rows - 1)
+        col = min(int((longitude + 180) / self.resolution), cols - 1)
+        return bool(self.cells[row, col])
+
+
+class NegativeCache:
+    """Thread-safe LRU of coordinates with no map unit, expiring after ttl seconds."""
+
+    def __init__(self, max_entries: int, ttl: float, resolution: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.resolution = resolution
+        self._entries: 'OrderedDict[Tuple[int, int], float]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _key(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        return int(round(latitude / self.resolution)), int(round(longitude / self.resolution))
+
+    def contains(self, latitude: float, longitude: float) -> bool:
+        key = self._key(latitude, longitude)
+        with self._lock:
+            stored_at = self._entries.get(key)
+            if stored_at is None:
+                return False
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return False
+            self._entries.move_to_end(key)
+            return True
+
+    def add(self, latitude: float, longitude: float) -> None:
+        if self.max_entries <= 0 or self.ttl <= 0:
+            return
+        key = self._key(latitude, longitude)
+        with self._lock:
+            self._entries[key] = time.monotonic()
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+_mask = None
+_negative = None
+_state_lock = threading.Lock()
+_counters = {'mask_rejects': 0, 'negative_hits': 0, 'negative_stores': 0}
+
+
+def get_coverage_mask() -> CoverageMask:
+    """Coverage mask from gaez_config.coverage_mask_path, or the bundled extents."""
+    global _mask
+    with _state_lock:
+        if _mask is None:
+            path = gaez_config.coverage_mask_path
+            if path and os.path.isfile(path):
+                try:
+                    _mask = CoverageMask.load(path)
+                except (OSError, KeyError, ValueError) as err:
+                    logger.warning(f"Coverage mask {path} unreadable ({err}); using bundled extents")
+            if _mask is None:
+                _mask = CoverageMask.from_extents(SSURGO_EXTENTS.values())
+        return _mask
+
+
+def _negative_cache() -> NegativeCache:
+    global _negative
+    with _state_lock:
+        if _negative is None:
+            _negative = NegativeCache(gaez_config.coverage_negative_size, gaez_config.coverage_negative_ttl,
+                                      gaez_config.coverage_negative_resolution)
+        return _negative
+
+
+def _count(name: str) -> None:
+    with _state_lock:
+        _counters[name] += 1
+
+
+def known_uncovered(latitude: float, longitude: float) -> bool:
+    """
+    True if the point has no SSURGO map unit without asking SDA: outside the
+    coverage mask, or an earlier SDA answer for it was empty.
+    """
+    if not get_coverage_mask().covers(latitude, longitude):
+        _count('mask_rejects')
+        return True
+    if _negative_cache().contains(latitude, longitude):
+        _count('negative_hits')
+        return True
+    return False
+
+
+def remember_uncovered(latitude: float, longitude: float) -> None:
+    """Record an empty SDA answer for the point."""
+    _negative_cache().add(latitude, longitude)
+    _count('negative_stores')
+
+
+def coverage_stats() -> Dict[str, object]:
+    """Mask rejects, negative cache hits/stores and entries, and the mask source."""
+    mask, negative = get_coverage_mask(), _negative_cache()
+    with _state_lock:
+        stats = dict(_counters)
+    stats['negative_entries'] = len(negative)
+    stats['mask_source'] = mask.source
+    return stats
+
+
+def reset_coverage() -> None:
+    """Reload the mask on next use and forget negative answers and counters."""
+    global _mask, _negative
+    with _state_lock:
+        _mask = None
+        _negative = None
+        for name in _counters:
+            _counters[name] = 0
+
+
+def build_coverage_mask(path: Optional[str] = None, resolution: float = 0.1) -> str:
+    """
+    Build a coverage mask from the envelopes of the SDA survey-area polygons.
+
+    Args:
+        path: Output .npz file (default gaez_config.coverage_mask_path)
+        resolution: Cell size in degrees
+
+    Returns:
+        Path of the written mask
+
+    Raises:
+        requests.RequestException: SDA request failed
+        ValueError: SDA returned no survey-area polygons
+    """
+    path = path or gaez_config.coverage_mask_path
+    payload = GAEZ_SDA_client.get_sda_client().query(SAPOLYGON_EXTENT_QUERY, kind='spatial', allow_stale=False)
+    rows = (payload.get("Table") or [])[1:]
+    extents = [tuple(float(v) for v in row) for row in rows if None not in row]
+    if not extents:
+        raise ValueError("SDA returned no survey-area polygons")
+    mask = CoverageMask.from_extents(extents, resolution, source=path)
+    mask.save(path)
+    logger.info(f"Wrote coverage mask of {len(extents)} survey-area polygons "
+                f"({mask.cells.mean():.1%} of cells set) to {path}")
+    return path
@@ -2,6 +2,7 @@
 #                                Crop requirement functions                                 
 #----------------------------------------------------------------------------------------------------
 
+import numpy as np
 import pandas as pd
 import os
 import sys
@@ -317,3 +318,103 @@ def getGAEZ_requirements_source(CROP_ID, inputLevel, source, requirement_type='a
     else:
         print("Invalid source type. Please specify 'database' or 'csv'.")
         return None
+
+
+#----------------------------------------------------------------------------------------------------
+#                        Compiled (dense array) requirement lookups
+#----------------------------------------------------------------------------------------------------
+
+# Array sizes: SQI codes 1-7, USDA texture classes 1-12, PSCL ids 1-3 (coarse/medium/fine),
+# drainage classes 1-7. Index 0 is the "unknown" slot and always scores 100.
+N_SQI_CODES = 7
+N_TEXTURE_CLASSES = 12
+N_PSCL_CLASSES = 3
+N_DRAINAGE_CLASSES = 7
+DEFAULT_SCORE = 100.0
+
+
+def _codes(values, size):
+    """Coerce ids (int, float or str, possibly NaN) to array indices; unknown or out of range -> 0."""
+    values = np.asarray(values)
+    if values.dtype.kind in 'biuf':
+        codes = values.astype(float)
+    else:
+        codes = pd.to_numeric(pd.Series(values.ravel(), dtype=object), errors='coerce').to_numpy(dtype=float)
+        codes = codes.reshape(values.shape)
+    codes = np.nan_to_num(codes, nan=0).astype(int)
+    return np.where((codes > 0) & (codes <= size), codes, 0)
+
+
+def _fill_first(table, rows, cols, scores):
+    """Write scores into table[rows, cols], keeping the first score listed for each cell."""
+    keep = (rows > 0) & (cols > 0) & ~np.isnan(scores)
+    cells = pd.DataFrame({'row': rows[keep], 'col': cols[keep], 'score': scores[keep]})
+    cells = cells.drop_duplicates(subset=['row', 'col'], keep='first')
+    table[cells['row'].to_numpy(), cells['col'].to_numpy()] = cells['score'].to_numpy()
+
+
+def compile_texture_scores(texture_req):
+    """
+    Dense texture score table: texture_score[SQI_code, text_class_id].
+
+    Texture classes not listed for an SQI (and the unknown class 0) score 100.
+    The first listed score wins if a class appears twice, as with the
+    row-wise query lookups.
+
+    Returns:
+        np.ndarray of shape (8, 13)
+    """
+    table = np.full((N_SQI_CODES + 1, N_TEXTURE_CLASSES + 1), DEFAULT_SCORE)
+    if texture_req is None or len(texture_req) == 0:
+        return table
+    sqi = _codes(texture_req['SQI_code'].to_numpy(), N_SQI_CODES)
+    text_class = _codes(texture_req['text_class_id'].to_numpy(), N_TEXTURE_CLASSES)
+    score = pd.to_numeric(texture_req['score'], errors='coerce').to_numpy(dtype=float)
+    _fill_first(table, sqi, text_class, score)
+    return table
+
+
+def compile_drainage_scores(drainage_req, sqi_code=4):
+    """
+    Dense drainage score table for one SQI: drain_score[pscl_id, drain_num].
+
+    PSCL and drainage ids are compared numerically, so string ids ('2') and
+    integer ids (2) match alike. Unlisted combinations score 100.
+
+    Returns:
+        np.ndarray of shape (4, 8)
+    """
+    table = np.full((N_PSCL_CLASSES + 1, N_DRAINAGE_CLASSES + 1), DEFAULT_SCORE)
+    if drainage_req is None or len(drainage_req) == 0:
+        return table
+    req = drainage_req[pd.to_numeric(drainage_req['SQI_code'], errors='coerce') == sqi_code]
+    pscl = _codes(req['PSCL_ID'].to_numpy(), N_PSCL_CLASSES)
+    drain = _codes(req['DrainNum'].to_numpy(), N_DRAINAGE_CLASSES)
+    score = pd.to_numeric(req['score'], errors='coerce').to_numpy(dtype=float)
+    _fill_first(table, pscl, drain, score)
+    return table
+
+
+def texture_score_table(texture_req):
+    """Compiled texture table from a requirement DataFrame (compiled arrays pass through)."""
+    if isinstance(texture_req, np.ndarray):
+        return texture_req
+    return compile_texture_scores(texture_req)
+
+
+def drainage_score_table(drainage_req):
+    """Compiled SQ4 drainage table from a requirement DataFrame (compiled arrays pass through)."""
+    if isinstance(drainage_req, np.ndarray):
+        return drainage_req
+    return compile_drainage_scores(drainage_req)
+
+
+def texture_scores(texture_req, sqi_code, text_class_ids):
+    """Texture scores for an array of class ids of any shape (fancy indexing into the table)."""
+    return texture_score_table(texture_req)[sqi_code, _codes(text_class_ids, N_TEXTURE_CLASSES)]
+
+
+def drainage_scores(drainage_req, pscl_ids, drain_ids):
+    """SQ4 drainage scores for arrays of PSCL and drainage class ids."""
+    return drainage_score_table(drainage_req)[_codes(pscl_ids, N_PSCL_CLASSES),
+                                              _codes(drain_ids, N_DRAINAGE_CLASSES)]
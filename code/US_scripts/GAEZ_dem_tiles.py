@@ -0,0 +1,298 @@
+"""
+Local memory-mapped DEM tiles with Horn-method slope.
+
+A geographic DEM (e.g. USGS 3DEP 1 arc-second, NAD83 lon/lat, elevation in
+metres) is cut once into square float32 tiles saved as .npy files, plus an
+index.json holding the affine transform, grid size and tile size (the same
+layout as the mukey grid in GAEZ_mukey_raster). Nodata cells are stored as
+NaN and tiles without any data are not written.
+
+Slope is computed with Horn's (1981) 3x3 kernel from the memory-mapped
+cells, so a point slope is a 3x3 array read and a slope grid for an AOI is
+one vectorized pass over a window, with no network calls:
+
+    dz/dx = ((c + 2f + i) - (a + 2d + g)) / (8 dx)
+    dz/dy = ((g + 2h + i) - (a + 2b + c)) / (8 dy)
+    slope % = 100 * sqrt(dz/dx^2 + dz/dy^2)
+
+for the window  a b c / d e f / g h i  around a cell. Cell sizes in metres
+follow the latitude of each row.
+
+Build once (needs rasterio):
+
+    python GAEZ_dem_tiles.py USGS_1_n42w102.tif
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
+
+import gaez_config
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'index.json'
+
+
+def metres_per_degree(lat) -> Tuple[np.ndarray, np.ndarray]:
+    """Length in metres of one degree of longitude and of latitude at lat (GRS80/WGS84 series)."""
+    phi = np.radians(np.asarray(lat, dtype=float))
+    lon_m = 111412.84 * np.cos(phi) - 93.5 * np.cos(3 * phi) + 0.118 * np.cos(5 * phi)
+    lat_m = 111132.92 - 559.82 * np.cos(2 * phi) + 1.175 * np.cos(4 * phi) - 0.0023 * np.cos(6 * phi)
+    return lon_m, lat_m
+
+
+def horn_slope(elevation: np.ndarray, dx, dy) -> np.ndarray:
+    """
+    Slope (%) of every interior cell of an elevation grid with Horn's kernel.
+
+    Args:
+        elevation: 2-D elevation array (metres), rows north to south
+        dx: Cell width in metres (scalar, or one value per row)
+        dy: Cell height in metres (scalar, or one value per row)
+
+    Returns:
+        Array of the same shape; NaN on the outer ring and wherever a cell of
+        the 3x3 window is NaN
+    """
+    z = np.asarray(elevation, dtype=float)
+    out = np.full(z.shape, np.nan)
+    if z.shape[0] < 3 or z.shape[1] < 3:
+        return out
+    dx = np.broadcast_to(np.asarray(dx, dtype=float).reshape(-1, 1), (z.shape[0], 1))[1:-1]
+    dy = np.broadcast_to(np.asarray(dy, dtype=float).reshape(-1, 1), (z.shape[0], 1))[1:-1]
+    a, b, c = z[:-2, :-2], z[:-2, 1:-1], z[:-2, 2:]
+    d, f = z[1:-1, :-2], z[1:-1, 2:]
+    g, h, i = z[2:, :-2], z[2:, 1:-1], z[2:, 2:]
+    dz_dx = ((c + 2 * f + i) - (a + 2 * d + g)) / (8 * dx)
+    dz_dy = ((g + 2 * h + i) - (a + 2 * b + c)) / (8 * dy)
+    # The kernel ignores the centre cell; a nodata centre has no slope either
+    out[1:-1, 1:-1] = np.where(np.isnan(z[1:-1, 1:-1]), np.nan, 100 * np.hypot(dz_dx, dz_dy))
+    return out
+
+
+class DemGrid:
+    """
+    Read-only view of a tiled DEM directory.
+
+    Tiles are opened lazily with np.load(mmap_mode='r') and kept open, so
+    repeated lookups only touch the pages they need.
+    """
+
+    def __init__(self, grid_dir: str):
+        self.grid_dir = grid_dir
+        with open(os.path.join(grid_dir, INDEX_FILE)) as f:
+            index = json.load(f)
+        # affine transform (a, b, c, d, e, f) in degrees: lon = a*col + c, lat = e*row + f
+        self.transform = index['transform']
+        self.width = index['width']
+        self.height = index['height']
+        self.tile_size = index['tile_size']
+        self.tiles = set(index['tiles'])
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def _tile(self, tile_row: int, tile_col: int) -> Optional[np.ndarray]:
+        key = f"{tile_row}_{tile_col}"
+        if key not in self.tiles:
+            return None
+        tile = self._open.get(key)
+        if tile is None:
+            with self._lock:
+                tile = self._open.get(key)
+                if tile is None:
+                    tile = np.load(os.path.join(self.grid_dir, f"tile_{key}.npy"), mmap_mode='r')
+                    self._open[key] = tile
+        return tile
+
+    def _rowcol(self, lon, lat) -> Tuple[np.ndarray, np.ndarray]:
+        a, _, c, _, e, f = self.transform
+        cols = np.floor((np.asarray(lon, dtype=float) - c) / a).astype(np.int64)
+        rows = np.floor((np.asarray(lat, dtype=float) - f) / e).astype(np.int64)
+        return rows, cols
+
+    def row_latitudes(self, rows) -> np.ndarray:
+        """Latitude of the centre of each row."""
+        _, _, _, _, e, f = self.transform
+        return f + e * (np.asarray(rows, dtype=float) + 0.5)
+
+    def cell_size_m(self, rows) -> Tuple[np.ndarray, np.ndarray]:
+        """Cell width and height in metres for each row."""
+        a, _, _, _, e, _ = self.transform
+        lon_m, lat_m = metres_per_degree(self.row_latitudes(rows))
+        return abs(a) * lon_m, abs(e) * lat_m
+
+    def cells(self, rows, cols) -> np.ndarray:
+        """Elevations of (row, col) cells; NaN outside the grid and in missing tiles."""
+        rows, cols = np.broadcast_arrays(np.atleast_1d(rows), np.atleast_1d(cols))
+        out = np.full(rows.shape, np.nan, dtype=np.float32)
+        inside = (rows >= 0) & (rows < self.height) & (cols >= 0) & (cols < self.width)
+        ts = self.tile_size
+        tile_ids = (rows // ts) * (self.width // ts + 1) + cols // ts
+        for tile_id in np.unique(tile_ids[inside]):
+            sel = inside & (tile_ids == tile_id)
+            tile = self._tile(int(rows[sel][0] // ts), int(cols[sel][0] // ts))
+            if tile is not None:
+                out[sel] = tile[rows[sel] % ts, cols[sel] % ts]
+        return out
+
+    def elevations_at(self, lats, lons) -> np.ndarray:
+        """Vectorized point elevation (m); NaN outside the grid or nodata."""
+        rows, cols = self._rowcol(np.atleast_1d(lons), np.atleast_1d(lats))
+        return self.cells(rows, cols)
+
+    def slopes_at(self, lats, lons) -> np.ndarray:
+        """Vectorized Horn slope (%) of the cells holding the points; NaN without a full 3x3 window."""
+        rows, cols = self._rowcol(np.atleast_1d(lons), np.atleast_1d(lats))
+        offsets = np.arange(-1, 2)
+        window = self.cells(rows[:, None, None] + offsets[None, :, None],
+                            cols[:, None, None] + offsets[None, None, :]).astype(float)
+        dx, dy = self.cell_size_m(rows)
+        a, b, c = window[:, 0, 0], window[:, 0, 1], window[:, 0, 2]
+        d, e, f = window[:, 1, 0], window[:, 1, 1], window[:, 1, 2]
+        g, h, i = window[:, 2, 0], window[:, 2, 1], window[:, 2, 2]
+        dz_dx = ((c + 2 * f + i) - (a + 2 * d + g)) / (8 * dx)
+        dz_dy = ((g + 2 * h + i) - (a + 2 * b + c)) / (8 * dy)
+        return np.where(np.isnan(e), np.nan, 100 * np.hypot(dz_dx, dz_dy))
+
+    def slope_at(self, lat: float, lon: float) -> Optional[float]:
+        """Horn slope (%) at a point, or None outside the DEM / next to nodata."""
+        slope = float(self.slopes_at([lat], [lon])[0])
+        return round(slope, 2) if math.isfinite(slope) else None
+
+    def read_window(self, row0: int, row1: int, col0: int, col1: int) -> np.ndarray:
+        """Elevations [row0:row1, col0:col1] assembled from tile slices; NaN outside the grid."""
+        out = np.full((max(row1 - row0, 0), max(col1 - col0, 0)), np.nan, dtype=np.float32)
+        r0, c0 = max(row0, 0), max(col0, 0)
+        r1, c1 = min(row1, self.height), min(col1, self.width)
+        ts = self.tile_size
+        for tile_row in range(r0 // ts, (r1 - 1) // ts + 1 if r1 > r0 else 0):
+            r_start = max(r0, tile_row * ts)
+            r_end = min(r1, (tile_row + 1) * ts)
+            for tile_col in range(c0 // ts, (c1 - 1) // ts + 1 if c1 > c0 else 0):
+                tile = self._tile(tile_row, tile_col)
+                if tile is None:
+                    continue
+                c_start = max(c0, tile_col * ts)
+                c_end = min(c1, (tile_col + 1) * ts)
+                out[r_start - row0:r_end - row0, c_start - col0:c_end - col0] = \
+                    tile[r_start - tile_row * ts:r_end - tile_row * ts, c_start - tile_col * ts:c_end - tile_col * ts]
+        return out
+
+    def window_for_bbox(self, min_lon: float, min_lat: float, max_lon: float,
+                        max_lat: float) -> Tuple[int, int, int, int]:
+        """Row/col window of the cells covering a geographic bbox."""
+        rows, cols = self._rowcol([min_lon, max_lon], [max_lat, min_lat])
+        return int(rows.min()), int(rows.max()) + 1, int(cols.min()), int(cols.max()) + 1
+
+    def slope_window(self, min_lon: float, min_lat: float, max_lon: float,
+                     max_lat: float) -> Tuple[np.ndarray, list]:
+        """
+        Horn slope (%) of every DEM cell covering a bbox, in one vectorized pass.
+
+        Returns:
+            (slope array, affine transform [a, b, c, d, e, f] of the array in degrees)
+        """
+        row0, row1, col0, col1 = self.window_for_bbox(min_lon, min_lat, max_lon, max_lat)
+        # One cell of margin so the cells on the bbox edge have full 3x3 windows
+        elevation = self.read_window(row0 - 1, row1 + 1, col0 - 1, col1 + 1)
+        dx, dy = self.cell_size_m(np.arange(row0 - 1, row1 + 1))
+        slope = horn_slope(elevation, dx, dy)[1:-1, 1:-1]
+        a, b, c, d, e, f = self.transform
+        return slope, [a, b, c + a * col0, d, e, f + e * row0]
+
+
+_grids = {}
+_grids_lock = threading.Lock()
+
+
+def get_dem_grid(grid_dir: Optional[str] = None) -> Optional[DemGrid]:
+    """Cached DemGrid for grid_dir (default gaez_config.dem_tile_dir), or None if not built."""
+    grid_dir = grid_dir or gaez_config.dem_tile_dir
+    with _grids_lock:
+        if grid_dir not in _grids:
+            if not os.path.isfile(os.path.join(grid_dir, INDEX_FILE)):
+                return None
+            _grids[grid_dir] = DemGrid(grid_dir)
+        return _grids[grid_dir]
+
+
+def dem_slope_at(latitude: float, longitude: float) -> Optional[float]:
+    """Horn slope (%) at a point from the local DEM tiles, or None if not covered."""
+    grid = get_dem_grid()
+    if grid is None:
+        return None
+    return grid.slope_at(latitude, longitude)
+
+
+def build_dem_tiles(raster_path: str, grid_dir: Optional[str] = None,
+                    tile_size: int = gaez_config.dem_tile_size) -> str:
+    """
+    Tile a geographic DEM GeoTIFF into the memory-mappable tile format.
+
+    Args:
+        raster_path: DEM in a geographic CRS (lon/lat degrees), elevation in metres
+        grid_dir: Output directory (default: gaez_config.dem_tile_dir)
+        tile_size: Tile edge length in cells
+
+    Returns:
+        Path of the tile directory
+    """
+    import rasterio
+    from rasterio.windows import Window
+
+    grid_dir = grid_dir or gaez_config.dem_tile_dir
+    os.makedirs(grid_dir, exist_ok=True)
+    tiles = []
+
+    with rasterio.open(raster_path) as src:
+        if src.crs is not None and not src.crs.is_geographic:
+            raise ValueError(f"DEM must be in a geographic CRS (found {src.crs})")
+        t = src.transform
+        if t.b != 0 or t.d != 0:
+            raise ValueError("Rotated rasters are not supported")
+
+        for tile_row in range(math.ceil(src.height / tile_size)):
+            for tile_col in range(math.ceil(src.width / tile_size)):
+                window = Window(tile_col * tile_size, tile_row * tile_size,
+                                min(tile_size, src.width - tile_col * tile_size),
+                                min(tile_size, src.height - tile_row * tile_size))
+                block = src.read(1, window=window).astype(np.float32)
+                if src.nodata is not None:
+                    block[block == src.nodata] = np.nan
+                if np.isnan(block).all():
+                    continue
+                tile = np.full((tile_size, tile_size), np.nan, dtype=np.float32)
+                tile[:block.shape[0], :block.shape[1]] = block
+                np.save(os.path.join(grid_dir, f"tile_{tile_row}_{tile_col}.npy"), tile)
+                tiles.append(f"{tile_row}_{tile_col}")
+            logger.info(f"DEM tiles: tile row {tile_row + 1}/{math.ceil(src.height / tile_size)} done")
+
+        index = {
+            'crs': src.crs.to_string() if src.crs else 'EPSG:4269',
+            'transform': [t.a, t.b, t.c, t.d, t.e, t.f],
+            'width': src.width,
+            'height': src.height,
+            'tile_size': tile_size,
+            'source': os.path.basename(raster_path),
+            'tiles': tiles,
+        }
+
+    with open(os.path.join(grid_dir, INDEX_FILE), 'w') as f:
+        json.dump(index, f)
+    with _grids_lock:
+        _grids.pop(grid_dir, None)
+    return grid_dir
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    out = sys.argv[2] if len(sys.argv) > 2 else None
+    print(f"DEM tiles written to {build_dem_tiles(sys.argv[1], out)}")
@@ -0,0 +1,155 @@
+"""
+Depth harmonization of horizon data onto arbitrary depth intervals.
+
+Converts (top, bottom, value) horizons into thickness-weighted means over
+target intervals by integrating the piecewise-constant depth profile with a
+cumulative sum over horizons, instead of expanding horizons into 1 cm slices.
+The mean over [a, b) equals the mean of 1 cm slices over the same depths:
+depths not covered by a horizon, or covered by a horizon with a missing
+value, are left out of both the sum and the thickness.
+
+All functions accept a single profile (arrays of shape (H,)) or a padded batch
+of profiles (shape (P, H), e.g. from GAEZ_SQI_functions.pad_profile_depths,
+with a mask of real horizons).
+"""
+
+import logging
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Standard SQI aggregation layers (cm); the last layer ends at the profile bottom if shallower
+SQI_LAYER_BOUNDARIES = (0, 20, 50, 100)
+
+# Depth below which horizon data are ignored (cm)
+MAX_PROFILE_DEPTH = 200
+
+
+def sqi_layer_intervals(bottom: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Target intervals of the standard SQI layers for a profile ending at bottom:
+    0-20, 20-50 and 50-min(100, bottom) cm.
+    """
+    boundaries = np.array(SQI_LAYER_BOUNDARIES, dtype=float)
+    boundaries[-1] = min(boundaries[-1], bottom)
+    return boundaries[:-1], boundaries[1:]
+
+
+def _prepare(tops, bottoms, values, mask):
+    """Sort horizons by top and zero out padded/missing horizons; returns 2-D arrays."""
+    tops = np.atleast_2d(np.asarray(tops, dtype=float))
+    bottoms = np.atleast_2d(np.asarray(bottoms, dtype=float))
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    valid = ~np.isnan(tops) & ~np.isnan(bottoms) & (bottoms > tops)
+    if mask is not None:
+        valid &= np.atleast_2d(np.asarray(mask, dtype=bool))
+
+    # Padded horizons sort to the end and never start above a target depth
+    tops = np.where(valid, tops, np.inf)
+    order = np.argsort(tops, axis=-1, kind='stable')
+    tops = np.take_along_axis(tops, order, axis=-1)
+    bottoms = np.take_along_axis(np.where(valid, bottoms, np.inf), order, axis=-1)
+    values = np.take_along_axis(values, order, axis=-1)
+    valid = np.take_along_axis(valid, order, axis=-1)
+    return tops, bottoms, values, valid
+
+
+def depth_integrals(tops, bottoms, values, depths, mask=None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Integrals of value and of data coverage from the surface to each depth.
+
+    Args:
+        tops, bottoms, values: (H,) or (P, H) horizon arrays; horizons must not overlap
+        depths: (T,) depths to integrate to
+        mask: Optional (P, H) bool array of real (unpadded) horizons
+
+    Returns:
+        Tuple of (value integral, covered thickness), each (T,) or (P, T)
+    """
+    single = np.ndim(tops) == 1
+    tops, bottoms, values, valid = _prepare(tops, bottoms, values, mask)
+    depths = np.asarray(depths, dtype=float)
+
+    has_value = valid & ~np.isnan(values)
+    with np.errstate(invalid='ignore'):
+        thickness = np.where(has_value, bottoms - tops, 0.0)
+    weighted = np.where(has_value, values, 0.0) * thickness
+
+    # Integrals up to the top of each horizon (exclusive cumulative sums)
+    zeros = np.zeros(tops.shape[:-1] + (1,))
+    value_before = np.concatenate([zeros, np.cumsum(weighted, axis=-1)[..., :-1]], axis=-1)
+    cover_before = np.concatenate([zeros, np.cumsum(thickness, axis=-1)[..., :-1]], axis=-1)
+
+    # Horizon holding each depth: last horizon starting above it (-1 above the first horizon)
+    idx = (tops[..., None, :] <= depths[:, None]).sum(axis=-1) - 1
+    above = idx < 0
+    idx = np.maximum(idx, 0)
+
+    top = np.take_along_axis(tops, idx, axis=-1)
+    partial = np.clip(depths - top, 0, np.take_along_axis(thickness, idx, axis=-1))
+    value_to = np.take_along_axis(value_before, idx, axis=-1) \
+        + partial * np.take_along_axis(np.where(has_value, values, 0.0), idx, axis=-1)
+    cover_to = np.take_along_axis(cover_before, idx, axis=-1) + partial
+    value_to = np.where(above, 0.0, value_to)
+    cover_to = np.where(above, 0.0, cover_to)
+
+    if single:
+        return value_to[0], cover_to[0]
+    return value_to, cover_to
+
+
+def interval_means(tops, bottoms, values, target_tops, target_bottoms, mask=None) -> np.ndarray:
+    """
+    Thickness-weighted means of horizon values over target depth intervals.
+
+    Args:
+        tops, bottoms, values: (H,) or (P, H) horizon arrays; horizons must not overlap
+        target_tops, target_bottoms: (T,) target interval boundaries
+        mask: Optional (P, H) bool array of real (unpadded) horizons
+
+    Returns:
+        (T,) or (P, T) array of means; NaN where an interval has no data
+    """
+    target_tops = np.asarray(target_tops, dtype=float)
+    target_bottoms = np.asarray(target_bottoms, dtype=float)
+    depths = np.concatenate([target_tops, target_bottoms])
+    value_to, cover_to = depth_integrals(tops, bottoms, values, depths, mask=mask)
+
+    n = len(target_tops)
+    total = value_to[..., n:] - value_to[..., :n]
+    cover = cover_to[..., n:] - cover_to[..., :n]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(cover > 0, total / cover, np.nan)
+
+
+def harmonize_horizons(tops, bottoms, values: Dict[str, Iterable[float]], target_tops, target_bottoms,
+                       max_depth: Optional[float] = MAX_PROFILE_DEPTH) -> pd.DataFrame:
+    """
+    Thickness-weighted means of several properties of one profile over target intervals.
+
+    Args:
+        tops, bottoms: (H,) horizon boundaries
+        values: Dict of property name -> (H,) values (None/NaN = missing)
+        target_tops, target_bottoms: (T,) target interval boundaries
+        max_depth: Ignore horizon data below this depth (None = no limit)
+
+    Returns:
+        DataFrame with one row per target interval and one column per property
+    """
+    tops = np.asarray(tops, dtype=float)
+    bottoms = np.asarray(bottoms, dtype=float)
+    if max_depth is not None:
+        bottoms = np.minimum(bottoms, max_depth)
+    means = {name: interval_means(tops, bottoms, pd.to_numeric(pd.Series(list(vals)), errors='coerce'),
+                                  target_tops, target_bottoms)
+             for name, vals in values.items()}
+    return pd.DataFrame(means)
+
+
+def horizon_tops(bottoms: Sequence[float]) -> np.ndarray:
+    """Horizon tops of a contiguous profile given its bottoms (first top is 0)."""
+    bottoms = np.asarray(bottoms, dtype=float)
+    return np.concatenate([[0.0], bottoms[:-1]])
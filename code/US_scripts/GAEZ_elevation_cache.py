@@ -0,0 +1,141 @@
+"""
+Coordinate-quantized cache for elevation and slope lookups.
+
+Elevation and slope at a point are pure functions of the coordinate, so
+GAEZ_elevation_slope keeps every EPQS answer keyed on the coordinate snapped
+to the DEM resolution (gaez_config.elevation_cache_resolution, 1 arc-second
+by default, the 3DEP cell size). Points in the same DEM cell share one entry,
+and slope estimates of neighbouring fields reuse each other's sample points
+whenever those fall in the same cell.
+
+Entries live in an in-memory LRU. With gaez_config.elevation_cache_path set
+(GAEZ_ELEVATION_CACHE) they are also written to a small SQLite file and read
+back on memory misses, so they survive restarts and are shared by worker
+processes. Only successful answers are cached.
+
+Hit/miss counters are reported by elevation_cache_stats().
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+import gaez_config
+
+logger = logging.getLogger(__name__)
+
+
+class CoordinateCache:
+    """
+    Thread-safe LRU of float values keyed by (kind, quantized lat, quantized lon),
+    optionally persisted to SQLite.
+    """
+
+    def __init__(self, max_entries: int, resolution: float, path: Optional[str] = None):
+        self.max_entries = max_entries
+        self.resolution = resolution
+        self.path = path
+        self._entries: 'OrderedDict[Hashable, float]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0}
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with self._connect() as conn:
+                conn.execute("CREATE TABLE IF NOT EXISTS point_values ("
+                             "kind TEXT, lat_q INTEGER, lon_q INTEGER, value REAL, "
+                             "PRIMARY KEY (kind, lat_q, lon_q))")
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=5)
+
+    def cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        """Quantized (row, col) of the DEM cell holding the coordinate."""
+        return int(round(latitude / self.resolution)), int(round(longitude / self.resolution))
+
+    def get(self, kind: str, latitude: float, longitude: float) -> Optional[float]:
+        """Cached value for the point's cell, or None."""
+        key = (kind,) + self.cell(latitude, longitude)
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self._counters['hits'] += 1
+                return value
+        if self.path:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute("SELECT value FROM point_values WHERE kind = ? AND lat_q = ? AND lon_q = ?",
+                                       key).fetchone()
+            except sqlite3.Error as err:
+                logger.warning(f"Elevation cache {self.path}: read failed: {err}")
+                row = None
+            if row is not None:
+                self._remember(key, row[0])
+                with self._lock:
+                    self._counters['disk_hits'] += 1
+                return row[0]
+        with self._lock:
+            self._counters['misses'] += 1
+        return None
+
+    def put(self, kind: str, latitude: float, longitude: float, value: Optional[float]) -> None:
+        """Store a value for the point's cell (None is not stored)."""
+        if value is None:
+            return
+        key = (kind,) + self.cell(latitude, longitude)
+        self._remember(key, float(value))
+        with self._lock:
+            self._counters['stores'] += 1
+        if self.path:
+            try:
+                with self._connect() as conn:
+                    conn.execute("INSERT OR REPLACE INTO point_values VALUES (?, ?, ?, ?)", key + (float(value),))
+            except sqlite3.Error as err:
+                logger.warning(f"Elevation cache {self.path}: write failed: {err}")
+
+    def _remember(self, key: Hashable, value: float) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def stats(self) -> Dict[str, int]:
+        """Hits (memory and disk), misses, stores and current entries."""
+        with self._lock:
+            counters = dict(self._counters)
+            counters['entries'] = len(self._entries)
+        return counters
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_elevation_cache() -> CoordinateCache:
+    """Process-wide elevation/slope cache built from gaez_config settings."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = CoordinateCache(gaez_config.elevation_cache_size, gaez_config.elevation_cache_resolution,
+                                     gaez_config.elevation_cache_path)
+        return _cache
+
+
+def elevation_cache_stats() -> Dict[str, int]:
+    """Counters of the shared elevation/slope cache."""
+    return get_elevation_cache().stats()
+
+
+def reset_elevation_cache() -> None:
+    """Discard the in-memory cache and its counters (the SQLite file is kept)."""
+    global _cache
+    with _cache_lock:
+        _cache = None
@@ -1,14 +1,37 @@
 """
 Lightweight elevation and slope estimation using REST APIs.
 No geospatial packages required - only uses 'requests'.
+
+resolve_slope() picks the slope for a point from the first available source
+in gaez_config.slope_sources (user site data, SSURGO component slope_r, a
+local DEM, and only then the EPQS network call).
+
+EPQS elevations and slope estimates are cached per DEM cell
+(GAEZ_elevation_cache), so repeated and neighbouring lookups reuse earlier
+answers and sample points.
+
+get_slope_grid() gives slope on a caller-specified grid over a bbox from one
+elevation grid read (local DEM window, or one EPQS query per grid node)
+instead of per-point estimates.
 """
 
 import requests
 import logging
 import math
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+import gaez_config
+from GAEZ_dem_tiles import dem_slope_at, get_dem_grid, horn_slope, metres_per_degree
+from GAEZ_elevation_cache import get_elevation_cache
+from GAEZ_singleflight import get_flight_group
 
 logger = logging.getLogger(__name__)
 
+# Known slope sources, in the default precedence order
+SLOPE_SOURCES = ('site', 'component', 'dem', 'epqs')
+
 
 def get_elevation_usgs(latitude, longitude, units='Meters'):
     """
@@ -26,6 +49,13 @@ def get_elevation_usgs(latitude, longitude, units='Meters'):
         >>> elev = get_elevation_usgs(41.2427, -101.6338)
         >>> print(f"Elevation: {elev}m")
     """
+    # Answers are cached per DEM cell (any point of the cell reuses the answer)
+    cache = get_elevation_cache()
+    kind = f"elevation:{units}"
+    cached = cache.get(kind, latitude, longitude)
+    if cached is not None:
+        return cached
+
     url = "https://epqs.nationalmap.gov/v1/json"
     params = {
         'x': longitude,
@@ -43,6 +73,7 @@ def get_elevation_usgs(latitude, longitude, units='Meters'):
             elevation = float(data['value'])
             if elevation != -1000000:  # USGS returns -1000000 for no data
                 logger.info(f"Elevation at ({latitude}, {longitude}): {elevation}{units}")
+                cache.put(kind, latitude, longitude, elevation)
                 return elevation
         
         logger.warning(f"No elevation data available at ({latitude}, {longitude})")
@@ -72,6 +103,15 @@ def estimate_slope_from_elevation(latitude, longitude, distance_m=100):
         >>> slope = estimate_slope_from_elevation(41.2427, -101.6338)
         >>> print(f"Slope: {slope}%")
     """
+    slope = _slope_four_way(latitude, longitude, distance_m)
+    if slope is None:
+        logger.warning("Using default slope of 0% (no elevation data)")
+        return 0.0
+    return slope
+
+
+def _slope_four_way(latitude, longitude, distance_m=100):
+    """4-direction slope estimate (%), or None without a centre elevation."""
     # Convert distance to degrees (approximate)
     # At mid-latitudes: 1 degree lat ≈ 111km, 1 degree lon ≈ 111km * cos(lat)
     lat_offset = distance_m / 111000
@@ -80,8 +120,7 @@ def estimate_slope_from_elevation(latitude, longitude, distance_m=100):
     # Get center elevation
     elev_center = get_elevation_usgs(latitude, longitude)
     if elev_center is None:
-        logger.warning("Using default slope of 0% (no elevation data)")
-        return 0.0
+        return None
     
     # Sample elevations in 4 cardinal directions
     points = [
@@ -117,6 +156,12 @@ def get_slope_simple(latitude, longitude):
     Returns:
         float: Slope percentage, or 0 if calculation fails
     """
+    slope = _slope_north_south(latitude, longitude)
+    return 0.0 if slope is None else slope
+
+
+def _slope_north_south(latitude, longitude):
+    """N-S slope estimate (%), or None if an elevation is missing."""
     distance_m = 100  # Sample 100m apart
     lat_offset = distance_m / 111000
     
@@ -125,7 +170,7 @@ def get_slope_simple(latitude, longitude):
     elev_north = get_elevation_usgs(latitude + lat_offset, longitude)
     
     if elev_center is None or elev_north is None:
-        return 0.0
+        return None
     
     elevation_diff = abs(elev_north - elev_center)
     slope = (elevation_diff / distance_m) * 100
@@ -165,12 +210,19 @@ def get_slope_for_gaez(latitude, longitude, method='simple'):
     Returns:
         float: Slope percentage (0-100)
     """
+    cache = get_elevation_cache()
+    kind = f"slope:{method}"
+    cached = cache.get(kind, latitude, longitude)
+    if cached is not None:
+        return cached
     try:
         if method == 'full':
-            slope = estimate_slope_from_elevation(latitude, longitude)
+            slope = _slope_four_way(latitude, longitude)
         else:
-            slope = get_slope_simple(latitude, longitude)
+            slope = _slope_north_south(latitude, longitude)
         
+        # Failed estimates are not cached
+        cache.put(kind, latitude, longitude, slope)
         return slope if slope is not None else 0.0
         
     except Exception as e:
@@ -178,6 +230,126 @@ def get_slope_for_gaez(latitude, longitude, method='simple'):
         return 0.0
 
 
+def _valid_slope(value):
+    """Slope as float if value is a finite, non-negative number, else None."""
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) and value >= 0 else None
+
+
+def resolve_slope(latitude, longitude, site_slope=None, component_slope=None, sources=None,
+                  fetch_slope=None):
+    """
+    Slope for a point from the first source in the precedence chain that has one.
+
+    Args:
+        latitude: Latitude in decimal degrees
+        longitude: Longitude in decimal degrees
+        site_slope: Slope % recorded by the user (site data), if any
+        component_slope: SSURGO component slope_r (%) of the selected component, if any
+        sources: Source order (default gaez_config.slope_sources); any of SLOPE_SOURCES
+        fetch_slope: Network slope function for the 'epqs' step (default get_slope_for_gaez)
+
+    Returns:
+        tuple: (slope %, source name); (0.0, 'default') if no source gives a slope
+    """
+    fetch_slope = fetch_slope or get_slope_for_gaez
+    for source in (sources or gaez_config.slope_sources):
+        slope = None
+        if source == 'site':
+            slope = _valid_slope(site_slope)
+        elif source == 'component':
+            slope = _valid_slope(component_slope)
+        elif source == 'dem':
+            # None unless local DEM tiles cover the point
+            if latitude is not None and longitude is not None:
+                slope = _valid_slope(dem_slope_at(latitude, longitude))
+        elif source == 'epqs':
+            if latitude is not None and longitude is not None:
+                # Concurrent requests for the same point share one set of EPQS calls
+                slope = _valid_slope(get_flight_group('slope').do(
+                    (float(latitude), float(longitude), 'simple'),
+                    fetch_slope, latitude, longitude, method='simple'
+                ))
+        else:
+            logger.warning(f"Unknown slope source '{source}' ignored")
+        if slope is not None:
+            logger.info(f"Slope at ({latitude}, {longitude}): {slope}% from {source}")
+            return slope, source
+    logger.warning(f"No slope source available at ({latitude}, {longitude}), defaulting to 0")
+    return 0.0, 'default'
+
+
+def slope_grid_coordinates(min_lon, min_lat, max_lon, max_lat, resolution):
+    """
+    Cell centres of the grid covering a bbox with square cells of resolution degrees.
+
+    Returns:
+        tuple: (lats north to south, lons west to east), 1-D arrays
+    """
+    if resolution <= 0 or max_lon <= min_lon or max_lat <= min_lat:
+        raise ValueError("bbox must have max > min and resolution must be positive")
+    n_rows = max(1, math.ceil(round((max_lat - min_lat) / resolution, 9)))
+    n_cols = max(1, math.ceil(round((max_lon - min_lon) / resolution, 9)))
+    lats = max_lat - resolution * (np.arange(n_rows) + 0.5)
+    lons = min_lon + resolution * (np.arange(n_cols) + 0.5)
+    return lats, lons
+
+
+def _dem_slope_grid(grid, lats, lons):
+    """Slope of the DEM cells holding each grid centre, from one vectorized DEM window."""
+    slope, (a, _, c, _, e, f) = grid.slope_window(lons.min(), lats.min(), lons.max(), lats.max())
+    rows = np.floor((lats - f) / e).astype(np.int64)
+    cols = np.floor((lons - c) / a).astype(np.int64)
+    rows, cols = np.clip(rows, 0, slope.shape[0] - 1), np.clip(cols, 0, slope.shape[1] - 1)
+    return slope[rows[:, None], cols[None, :]]
+
+
+def _epqs_slope_grid(lats, lons, resolution):
+    """Horn slope on the grid from EPQS elevations of its nodes plus a one-cell margin."""
+    node_lats = np.concatenate([[lats[0] + resolution], lats, [lats[-1] - resolution]])
+    node_lons = np.concatenate([[lons[0] - resolution], lons, [lons[-1] + resolution]])
+    nodes = [(lat, lon) for lat in node_lats for lon in node_lons]
+    if len(nodes) > gaez_config.slope_grid_max_epqs_points:
+        raise ValueError(f"Slope grid needs {len(nodes)} EPQS elevations (limit "
+                         f"{gaez_config.slope_grid_max_epqs_points}); use a coarser resolution or local DEM tiles")
+    with ThreadPoolExecutor(max_workers=gaez_config.elevation_fetch_workers) as pool:
+        values = list(pool.map(lambda node: get_elevation_usgs(*node), nodes))
+    elevation = np.array([np.nan if v is None else v for v in values], dtype=float).reshape(
+        len(node_lats), len(node_lons))
+    lon_m, lat_m = metres_per_degree(node_lats)
+    return horn_slope(elevation, resolution * lon_m, resolution * lat_m)[1:-1, 1:-1]
+
+
+def get_slope_grid(min_lon, min_lat, max_lon, max_lat, resolution):
+    """
+    Slope for every cell of a caller-specified grid over a bbox.
+
+    The elevation grid is read once: from the local DEM tiles (Horn slope of
+    the DEM cells, one vectorized window) when they cover the bbox, otherwise
+    from EPQS elevations of the grid nodes (one cached call per node instead
+    of five per point), differenced with the Horn kernel at the grid spacing.
+
+    Args:
+        min_lon, min_lat, max_lon, max_lat: Bbox in decimal degrees
+        resolution: Grid cell size in degrees
+
+    Returns:
+        tuple: (slope % array (rows north to south, cols west to east; NaN where
+        unknown), cell-centre latitudes, cell-centre longitudes, source 'dem' or 'epqs')
+    """
+    lats, lons = slope_grid_coordinates(min_lon, min_lat, max_lon, max_lat, resolution)
+    grid = get_dem_grid()
+    if grid is not None:
+        slope = _dem_slope_grid(grid, lats, lons)
+        if not np.isnan(slope).all():
+            return slope, lats, lons, 'dem'
+        logger.info("Local DEM does not cover the bbox, using EPQS elevations")
+    return _epqs_slope_grid(lats, lons, resolution), lats, lons, 'epqs'
+
+
 # Example usage and testing
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
@@ -0,0 +1,265 @@
+"""
+Local memory-mapped mukey grid for offline point and AOI lookups.
+
+The gSSURGO 30 m map unit raster (EPSG:5070, cell value = mukey) is cut once
+into square uint32 tiles saved as .npy files, plus a small index.json holding
+the affine transform, grid size and tile size. At request time a lookup is a
+pure-numpy Albers projection followed by an array index into a memory-mapped
+tile, so no network and no GDAL/rasterio are needed.
+
+Build once (needs rasterio):
+
+    python GAEZ_mukey_raster.py MapunitRaster_30m.tif
+
+Tiles that are entirely nodata (ocean, outside CONUS) are not written.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+from typing import Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+import gaez_config
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = 'index.json'
+NODATA = 0
+
+# NAD83 / Conus Albers (EPSG:5070) on the GRS80 ellipsoid
+_A = 6378137.0
+_F = 1 / 298.257222101
+_E2 = 2 * _F - _F ** 2
+_E = math.sqrt(_E2)
+_LAT0, _LON0, _LAT1, _LAT2 = 23.0, -96.0, 29.5, 45.5
+
+
+def _albers_q(sin_phi):
+    return (1 - _E2) * (sin_phi / (1 - _E2 * sin_phi ** 2)
+                        - (1 / (2 * _E)) * np.log((1 - _E * sin_phi) / (1 + _E * sin_phi)))
+
+
+def _albers_m(phi):
+    return np.cos(phi) / np.sqrt(1 - _E2 * np.sin(phi) ** 2)
+
+
+_M1 = _albers_m(math.radians(_LAT1))
+_M2 = _albers_m(math.radians(_LAT2))
+_Q0 = _albers_q(math.sin(math.radians(_LAT0)))
+_Q1 = _albers_q(math.sin(math.radians(_LAT1)))
+_Q2 = _albers_q(math.sin(math.radians(_LAT2)))
+_N = (_M1 ** 2 - _M2 ** 2) / (_Q2 - _Q1)
+_C = _M1 ** 2 + _N * _Q1
+_RHO0 = _A * math.sqrt(_C - _N * _Q0) / _N
+
+
+def lonlat_to_albers(lon, lat) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Project WGS84/NAD83 longitude/latitude (degrees) to EPSG:5070 metres.
+
+    Ellipsoidal Albers equal-area forward equations (Snyder 1987, eq. 14-1 to 14-12);
+    the NAD83/WGS84 datum difference (~1 m) is ignored at 30 m resolution.
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    q = _albers_q(np.sin(np.radians(lat)))
+    rho = _A * np.sqrt(_C - _N * q) / _N
+    theta = _N * np.radians(lon - _LON0)
+    return rho * np.sin(theta), _RHO0 - rho * np.cos(theta)
+
+
+class MukeyGrid:
+    """
+    Read-only view of a tiled mukey grid directory.
+
+    Tiles are opened lazily with np.load(mmap_mode='r') and kept open, so
+    repeated lookups only touch the pages they need.
+    """
+
+    def __init__(self, grid_dir: str):
+        self.grid_dir = grid_dir
+        with open(os.path.join(grid_dir, INDEX_FILE)) as f:
+            index = json.load(f)
+        # affine transform (a, b, c, d, e, f): x = a*col + c, y = e*row + f
+        self.transform = index['transform']
+        self.width = index['width']
+        self.height = index['height']
+        self.tile_size = index['tile_size']
+        self.tiles = set(index['tiles'])
+        self._open = {}
+        self._lock = threading.Lock()
+
+    def _tile(self, tile_row: int, tile_col: int) -> Optional[np.ndarray]:
+        key = f"{tile_row}_{tile_col}"
+        if key not in self.tiles:
+            return None
+        tile = self._open.get(key)
+        if tile is None:
+            with self._lock:
+                tile = self._open.get(key)
+                if tile is None:
+                    tile = np.load(os.path.join(self.grid_dir, f"tile_{key}.npy"), mmap_mode='r')
+                    self._open[key] = tile
+        return tile
+
+    def _rowcol(self, x, y) -> Tuple[np.ndarray, np.ndarray]:
+        a, _, c, _, e, f = self.transform
+        cols = np.floor((np.asarray(x) - c) / a).astype(np.int64)
+        rows = np.floor((np.asarray(y) - f) / e).astype(np.int64)
+        return rows, cols
+
+    def mukeys_at(self, lats, lons) -> np.ndarray:
+        """Vectorized point lookup; 0 where the point is outside the grid or nodata."""
+        x, y = lonlat_to_albers(lons, lats)
+        rows, cols = self._rowcol(np.atleast_1d(x), np.atleast_1d(y))
+        out = np.zeros(rows.shape, dtype=np.uint32)
+        inside = (rows >= 0) & (rows < self.height) & (cols >= 0) & (cols < self.width)
+        ts = self.tile_size
+        tile_ids = (rows // ts) * (self.width // ts + 1) + cols // ts
+        for tile_id in np.unique(tile_ids[inside]):
+            sel = inside & (tile_ids == tile_id)
+            tile = self._tile(int(rows[sel][0] // ts), int(cols[sel][0] // ts))
+            if tile is not None:
+                out[sel] = tile[rows[sel] % ts, cols[sel] % ts]
+        return out
+
+    def mukey_at(self, lat: float, lon: float) -> Optional[int]:
+        """Map unit key at a point, or None if outside the grid / nodata."""
+        mukey = int(self.mukeys_at([lat], [lon])[0])
+        return mukey if mukey != NODATA else None
+
+    def read_window(self, row0: int, row1: int, col0: int, col1: int) -> np.ndarray:
+        """Grid cells [row0:row1, col0:col1] assembled from tile slices (clipped to the grid)."""
+        row0, col0 = max(row0, 0), max(col0, 0)
+        row1, col1 = min(row1, self.height), min(col1, self.width)
+        out = np.zeros((max(row1 - row0, 0), max(col1 - col0, 0)), dtype=np.uint32)
+        ts = self.tile_size
+        for tile_row in range(row0 // ts, (row1 - 1) // ts + 1 if row1 > row0 else 0):
+            r_start = max(row0, tile_row * ts)
+            r_end = min(row1, (tile_row + 1) * ts)
+            for tile_col in range(col0 // ts, (col1 - 1) // ts + 1 if col1 > col0 else 0):
+                tile = self._tile(tile_row, tile_col)
+                if tile is None:
+                    continue
+                c_start = max(col0, tile_col * ts)
+                c_end = min(col1, (tile_col + 1) * ts)
+                out[r_start - row0:r_end - row0, c_start - col0:c_end - col0] = \
+                    tile[r_start - tile_row * ts:r_end - tile_row * ts, c_start - tile_col * ts:c_end - tile_col * ts]
+        return out
+
+    def window_for_bbox(self, min_lon: float, min_lat: float, max_lon: float,
+                        max_lat: float) -> Tuple[int, int, int, int]:
+        """
+        Row/col window covering a geographic bbox. Parallels are curved in
+        Albers, so the bbox edges are densified before taking the extent.
+        """
+        t = np.linspace(0, 1, 33)
+        lons = np.concatenate([min_lon + (max_lon - min_lon) * t, np.full(33, max_lon),
+                               max_lon - (max_lon - min_lon) * t, np.full(33, min_lon)])
+        lats = np.concatenate([np.full(33, min_lat), min_lat + (max_lat - min_lat) * t,
+                               np.full(33, max_lat), max_lat - (max_lat - min_lat) * t])
+        rows, cols = self._rowcol(*lonlat_to_albers(lons, lats))
+        return int(rows.min()), int(rows.max()) + 1, int(cols.min()), int(cols.max()) + 1
+
+    def mukeys_in_bbox(self, min_lon: float, min_lat: float, max_lon: float, max_lat: float,
+                       return_counts: bool = False) -> Union[List[int], Dict[int, int]]:
+        """
+        Map units within a bbox from one window slice.
+
+        Returns:
+            Sorted list of mukeys, or {mukey: cell count} if return_counts
+        """
+        cells = self.read_window(*self.window_for_bbox(min_lon, min_lat, max_lon, max_lat))
+        values, counts = np.unique(cells[cells != NODATA], return_counts=True)
+        if return_counts:
+            return {int(v): int(n) for v, n in zip(values, counts)}
+        return [int(v) for v in values]
+
+
+_grids = {}
+_grids_lock = threading.Lock()
+
+
+def get_mukey_grid(grid_dir: Optional[str] = None) -> Optional[MukeyGrid]:
+    """Cached MukeyGrid for grid_dir (default gaez_config.mukey_grid_dir), or None if not built."""
+    grid_dir = grid_dir or gaez_config.mukey_grid_dir
+    with _grids_lock:
+        if grid_dir not in _grids:
+            if not os.path.isfile(os.path.join(grid_dir, INDEX_FILE)):
+                return None
+            _grids[grid_dir] = MukeyGrid(grid_dir)
+        return _grids[grid_dir]
+
+
+def build_mukey_grid(raster_path: str, grid_dir: Optional[str] = None,
+                     tile_size: int = gaez_config.mukey_grid_tile_size) -> str:
+    """
+    Tile a gSSURGO mukey GeoTIFF into the memory-mappable grid format.
+
+    Args:
+        raster_path: gSSURGO map unit raster (EPSG:5070, cell value = mukey)
+        grid_dir: Output directory (default: gaez_config.mukey_grid_dir)
+        tile_size: Tile edge length in cells
+
+    Returns:
+        Path of the grid directory
+    """
+    import rasterio
+    from rasterio.windows import Window
+
+    grid_dir = grid_dir or gaez_config.mukey_grid_dir
+    os.makedirs(grid_dir, exist_ok=True)
+    tiles = []
+
+    with rasterio.open(raster_path) as src:
+        epsg = src.crs.to_epsg() if src.crs else None
+        if epsg is not None and epsg != 5070:
+            raise ValueError(f"mukey raster must be in EPSG:5070 (found EPSG:{epsg})")
+        t = src.transform
+        if t.b != 0 or t.d != 0:
+            raise ValueError("Rotated rasters are not supported")
+
+        for tile_row in range(math.ceil(src.height / tile_size)):
+            for tile_col in range(math.ceil(src.width / tile_size)):
+                window = Window(tile_col * tile_size, tile_row * tile_size,
+                                min(tile_size, src.width - tile_col * tile_size),
+                                min(tile_size, src.height - tile_row * tile_size))
+                block = src.read(1, window=window)
+                valid = block > 0
+                if src.nodata is not None:
+                    valid &= block != src.nodata
+                if not valid.any():
+                    continue
+                tile = np.zeros((tile_size, tile_size), dtype=np.uint32)
+                tile[:block.shape[0], :block.shape[1]] = np.where(valid, block, NODATA).astype(np.uint32)
+                np.save(os.path.join(grid_dir, f"tile_{tile_row}_{tile_col}.npy"), tile)
+                tiles.append(f"{tile_row}_{tile_col}")
+            logger.info(f"mukey grid: tile row {tile_row + 1}/{math.ceil(src.height / tile_size)} done")
+
+        index = {
+            'crs': 'EPSG:5070',
+            'transform': [t.a, t.b, t.c, t.d, t.e, t.f],
+            'width': src.width,
+            'height': src.height,
+            'tile_size': tile_size,
+            'source': os.path.basename(raster_path),
+            'tiles': tiles,
+        }
+
+    with open(os.path.join(grid_dir, INDEX_FILE), 'w') as f:
+        json.dump(index, f)
+    with _grids_lock:
+        _grids.pop(grid_dir, None)
+    return grid_dir
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    out = sys.argv[2] if len(sys.argv) > 2 else None
+    print(f"mukey grid written to {build_mukey_grid(sys.argv[1], out)}")
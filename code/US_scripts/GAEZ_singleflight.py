@@ -0,0 +1,135 @@
+"""
+Single-flight coalescing of concurrent identical upstream fetches.
+
+A client that fires many requests for the same field at once (e.g. every
+crop/input combination for one point) makes each request look up the same
+mukey, horizon data and slope. A SingleFlight group lets the first caller
+for a key (the leader) run the fetch while every caller arriving with the
+same key before it finishes waits for, and receives, the leader's result or
+exception. Nothing is cached: once the fetch finishes the next caller starts
+a new one.
+
+    group = get_flight_group('dominant_mukey')
+    mukey = group.do((lat, lon), get_dominant_mukey_at_point, lat, lon)
+    mukey = await group.do_async((lat, lon), get_dominant_mukey_at_point, lat, lon)
+
+Sync and async callers share the in-flight table of a group. Coalescing
+counters of all groups are available from singleflight_stats().
+
+All callers receive the same result object; callers that modify it must
+copy it first.
+"""
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlight:
+    """Group of in-flight calls keyed by a hashable key."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._in_flight: Dict[Hashable, Future] = {}
+        self._counters = {'calls': 0, 'executions': 0, 'coalesced': 0, 'errors': 0}
+
+    def _join(self, key: Hashable) -> Tuple[Future, bool]:
+        """In-flight future for key and whether the caller leads (runs the fetch)."""
+        with self._lock:
+            self._counters['calls'] += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                self._counters['coalesced'] += 1
+                return future, False
+            future = Future()
+            self._in_flight[key] = future
+            self._counters['executions'] += 1
+            return future, True
+
+    def _run(self, key: Hashable, future: Future, fn: Callable, args: tuple, kwargs: dict) -> None:
+        """Run fn as the leader for key and publish its outcome to the waiters."""
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            with self._lock:
+                self._counters['errors'] += 1
+                del self._in_flight[key]
+            future.set_exception(e)
+        else:
+            with self._lock:
+                del self._in_flight[key]
+            future.set_result(result)
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Call fn(*args, **kwargs), or wait for the identical call already in flight.
+
+        Args:
+            key: Identifies identical calls (e.g. the coordinates of a lookup)
+            fn: Function to run if no call for key is in flight
+
+        Returns:
+            The result of the (shared) call; its exception is raised to every caller
+        """
+        future, leader = self._join(key)
+        if leader:
+            self._run(key, future, fn, args, kwargs)
+        else:
+            logger.debug(f"{self.name}: joined in-flight call for {key!r}")
+        return future.result()
+
+    async def do_async(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """
+        Async variant of do(): the leader runs the (blocking) fn in the default
+        executor, waiters await the shared future without blocking the event loop.
+        """
+        future, leader = self._join(key)
+        if leader:
+            loop = asyncio.get_running_loop()
+            loop.run_in_executor(None, self._run, key, future, fn, args, kwargs)
+        else:
+            logger.debug(f"{self.name}: joined in-flight call for {key!r}")
+        return await asyncio.wrap_future(future)
+
+    def in_flight(self) -> int:
+        """Number of keys with a call in flight."""
+        with self._lock:
+            return len(self._in_flight)
+
+    def stats(self) -> Dict[str, int]:
+        """Calls, executed fetches, coalesced callers, failed fetches and current in-flight keys."""
+        with self._lock:
+            counters = dict(self._counters)
+            counters['in_flight'] = len(self._in_flight)
+        return counters
+
+
+_groups: Dict[str, SingleFlight] = {}
+_groups_lock = threading.Lock()
+
+
+def get_flight_group(name: str) -> SingleFlight:
+    """Process-wide SingleFlight group of the given name."""
+    with _groups_lock:
+        group = _groups.get(name)
+        if group is None:
+            group = _groups[name] = SingleFlight(name)
+        return group
+
+
+def singleflight_stats() -> Dict[str, Dict[str, int]]:
+    """Coalescing counters of every group."""
+    with _groups_lock:
+        groups = list(_groups.values())
+    return {group.name: group.stats() for group in groups}
+
+
+def reset_flight_groups() -> None:
+    """Discard all groups and their counters (calls in flight still complete)."""
+    with _groups_lock:
+        _groups.clear()
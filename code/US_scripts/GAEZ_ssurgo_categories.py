@@ -0,0 +1,172 @@
+"""
+Categorical encoding of SSURGO string attributes.
+
+The string columns of the processed horizon data (drainage class, restriction
+kind, flooding/ponding classes, ...) repeat a handful of domain values over
+every horizon. At ingest they are converted to pandas Categoricals whose
+categories come from fixed, versioned vocabularies (the NASIS/SSURGO domain
+values, lowercased), so that
+
+    - a category has the same integer code for every mukey, source (SDA or
+      mirror) and process, and rules can be evaluated once per category and
+      applied to the codes (category_mask);
+    - cached horizon tables store one small integer per value.
+
+Values outside a vocabulary are kept: they are appended after the fixed
+categories (in sorted order), so the codes of the vocabulary values do not
+change. Columns without a closed domain (component names, horizon
+designations, the space-joined fragment kinds) get categories from the data.
+
+Bump CATEGORY_VOCABULARY_VERSION whenever a vocabulary changes; anything that
+persists category codes must be rebuilt.
+"""
+
+import logging
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_VOCABULARY_VERSION = 1
+
+_FREQUENCY_CLASSES = ('none', 'very rare', 'rare', 'occasional', 'common', 'frequent', 'very frequent')
+_DURATION_CLASSES = ('extremely brief (0.1 to 4 hours)', 'very brief (4 to 48 hours)', 'brief (2 to 7 days)',
+                     'long (7 to 30 days)', 'very long (more than 30 days)')
+
+# Fixed vocabularies (lowercase SSURGO domain values); None = categories from the data
+SSURGO_CATEGORY_VOCABULARIES: Dict[str, Optional[Tuple[str, ...]]] = {
+    'drainagecl': ('excessively drained', 'somewhat excessively drained', 'well drained',
+                   'moderately well drained', 'somewhat poorly drained', 'poorly drained',
+                   'very poorly drained', 'subaqueous'),
+    'hydricrating': ('no', 'yes', 'unranked'),
+    'taxtempcl': ('cryic', 'frigid', 'isofrigid', 'mesic', 'isomesic', 'thermic', 'isothermic',
+                  'hyperthermic', 'isohyperthermic', 'gelic', 'hypergelic', 'pergelic', 'subgelic'),
+    'frostact': ('none', 'low', 'moderate', 'high'),
+    'reskind': ('lithic bedrock', 'paralithic bedrock', 'densic bedrock', 'densic material', 'duripan',
+                'fragipan', 'ortstein', 'petrocalcic', 'petroferric', 'petrogypsic', 'placic', 'plinthite',
+                'natric', 'salic', 'sulfuric', 'abrupt textural change', 'strongly contrasting textural stratification',
+                'cemented horizon', 'permafrost', 'human-manufactured materials', 'manufactured layer', 'undefined'),
+    'reshard': ('noncemented', 'extremely weakly cemented', 'very weakly cemented', 'weakly cemented',
+                'moderately cemented', 'strongly cemented', 'very strongly cemented', 'indurated',
+                'noncoherent', 'extremely weakly coherent', 'very weakly coherent', 'weakly coherent',
+                'moderately coherent', 'strongly coherent', 'very strongly coherent'),
+    'taxminalogy': ('amorphic', 'carbonatic', 'coprogenous', 'diatomaceous', 'ferrihydritic', 'ferritic',
+                    'ferruginous', 'gibbsitic', 'glassy', 'glauconitic', 'gypsic', 'halloysitic', 'illitic',
+                    'isotic', 'kaolinitic', 'magnesic', 'marly', 'micaceous', 'mixed', 'oxidic',
+                    'paramicaceous', 'parasesquic', 'sesquic', 'siliceous', 'smectitic', 'vermiculitic'),
+    'pondfreqcl': _FREQUENCY_CLASSES,
+    'ponddurcl': _DURATION_CLASSES,
+    'flodfreqcl': _FREQUENCY_CLASSES,
+    'floddurcl': _DURATION_CLASSES,
+    'plasticity': ('nonplastic', 'slightly plastic', 'moderately plastic', 'very plastic'),
+    'stickiness': ('nonsticky', 'slightly sticky', 'moderately sticky', 'very sticky'),
+    'fragkind': None,
+    'compname': None,
+    'hzname': None,
+}
+
+# Columns whose letter case carries meaning (names shown to users, horizon designations)
+CASE_SENSITIVE_COLUMNS = ('compname', 'hzname')
+
+
+def normalize_category_values(values, lowercase: bool = True) -> pd.Series:
+    """Strip (and lowercase) string values; empty strings and non-strings become NaN."""
+    series = pd.Series(values, dtype=object) if not isinstance(values, pd.Series) else values.astype(object)
+    text = series.where(series.map(lambda v: isinstance(v, str)), None).str.strip()
+    if lowercase:
+        text = text.str.lower()
+    return text.where(text != '', None)
+
+
+def to_category(values, column: str) -> pd.Series:
+    """
+    Encode values of an SSURGO column as a Categorical with the column's vocabulary.
+
+    Args:
+        values: Series or array of strings (any case, NaN/None allowed)
+        column: Column name in SSURGO_CATEGORY_VOCABULARIES
+
+    Returns:
+        Categorical Series (same index as values if it is a Series)
+    """
+    text = normalize_category_values(values, lowercase=column not in CASE_SENSITIVE_COLUMNS)
+    vocabulary = SSURGO_CATEGORY_VOCABULARIES[column]
+    present = text.dropna().unique()
+    if vocabulary is None:
+        categories = sorted(present)
+    else:
+        extra = sorted(set(present) - set(vocabulary))
+        if extra:
+            logger.debug(f"{column}: values outside vocabulary v{CATEGORY_VOCABULARY_VERSION}: {extra}")
+        categories = list(vocabulary) + extra
+    return text.astype(pd.CategoricalDtype(categories))
+
+
+def encode_ssurgo_categoricals(df: pd.DataFrame, columns: Optional[Iterable[str]] = None) -> pd.DataFrame:
+    """
+    Convert the SSURGO string columns of df to Categoricals in place.
+
+    Args:
+        df: Horizon DataFrame
+        columns: Columns to encode (default: all of SSURGO_CATEGORY_VOCABULARIES in df)
+
+    Returns:
+        DataFrame: df, updated in place.
+    """
+    columns = SSURGO_CATEGORY_VOCABULARIES if columns is None else columns
+    for col in columns:
+        if col in df.columns:
+            df[col] = to_category(df[col], col)
+    return df
+
+
+def category_mask(values, predicate: Callable[[str], bool], column: Optional[str] = None) -> np.ndarray:
+    """
+    Evaluate a string predicate once per category and map it onto the rows.
+
+    Args:
+        values: Categorical Series (as produced by encode_ssurgo_categoricals) or
+            plain strings; plain values are encoded first (with column's vocabulary
+            if given), so results do not depend on the input dtype
+        predicate: Function of one normalized category value
+        column: SSURGO column name used to normalize plain values
+
+    Returns:
+        Boolean array; False for missing values
+    """
+    if not isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+        values = to_category(values, column) if column in SSURGO_CATEGORY_VOCABULARIES \
+            else normalize_category_values(values).astype('category')
+    categorical = values.array if isinstance(values, pd.Series) else pd.Categorical(values)
+    hits = np.array([bool(predicate(category)) for category in categorical.categories] + [False], dtype=bool)
+    # Code -1 (missing) picks the trailing False
+    return hits[np.asarray(categorical.codes)]
+
+
+def category_isin(values, targets: Iterable[str], column: Optional[str] = None) -> np.ndarray:
+    """Boolean array of values equal to one of targets (normalized comparison)."""
+    targets = {str(t).strip().lower() for t in targets}
+    return category_mask(values, lambda category: category.lower() in targets, column)
+
+
+def category_contains(values, substrings: Iterable[str], column: Optional[str] = None) -> np.ndarray:
+    """Boolean array of values containing any of substrings (normalized comparison)."""
+    substrings = [str(s).strip().lower() for s in substrings]
+    return category_mask(values, lambda category: any(s in category.lower() for s in substrings), column)
+
+
+def category_code_map(column: str, mapping: Dict[str, float], values) -> np.ndarray:
+    """
+    Map the categories of a column through a dict (e.g. drainage class -> id).
+
+    Returns:
+        Float array; NaN for missing values and categories not in mapping
+    """
+    if not isinstance(getattr(values, 'dtype', None), pd.CategoricalDtype):
+        values = to_category(values, column)
+    categorical = values.array if isinstance(values, pd.Series) else pd.Categorical(values)
+    lookup = np.array([mapping.get(category, np.nan) for category in categorical.categories] + [np.nan],
+                      dtype=float)
+    return lookup[np.asarray(categorical.codes)]
@@ -0,0 +1,177 @@
+"""
+SSURGO survey-area versions for long-lived caches.
+
+NRCS republishes SSURGO per survey area; sacatalog.saverest is the version
+date of each area. SDA horizon rows cached by GAEZ_SSURGO_data are stamped
+with the areasymbol and saverest they came from. refresh_survey_versions()
+fetches the whole sacatalog table in one small SDA query (a few thousand
+rows), keeps it in the process-wide SurveyCatalog, and drops only the cached
+horizon entries whose survey area now has a different version.
+
+The API runs the refresh every gaez_config.survey_refresh_seconds in a
+background thread (start_survey_refresh). Stored results (api/result_store.py)
+record the survey area version behind them and are not served once the
+catalog reports a newer one.
+"""
+
+import hashlib
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Set
+
+import GAEZ_SDA_client
+import GAEZ_SSURGO_data
+import gaez_config
+
+logger = logging.getLogger(__name__)
+
+SACATALOG_QUERY = "SELECT areasymbol, saverest FROM sacatalog"
+
+
+class SurveyCatalog:
+    """Thread-safe map of survey area (areasymbol) to version date (saverest)."""
+
+    def __init__(self):
+        self._versions: Dict[str, str] = {}
+        self._refreshed_at: Optional[str] = None
+        self._lock = threading.Lock()
+        self._counters = {'refreshes': 0, 'failures': 0, 'changed_areas': 0, 'invalidated_entries': 0}
+
+    def version(self, areasymbol: str) -> Optional[str]:
+        """Known version of a survey area, or None."""
+        with self._lock:
+            return self._versions.get(areasymbol)
+
+    def versions(self) -> Dict[str, str]:
+        """Copy of the known versions."""
+        with self._lock:
+            return dict(self._versions)
+
+    def fingerprint(self) -> str:
+        """Short hash of the whole catalog ('' before the first refresh)."""
+        with self._lock:
+            if not self._versions:
+                return ''
+            items = sorted(self._versions.items())
+        return hashlib.sha256(repr(items).encode()).hexdigest()[:16]
+
+    def update(self, versions: Dict[str, str]) -> Set[str]:
+        """
+        Replace the catalog.
+
+        Returns:
+            Survey areas that were known before with a different version
+        """
+        with self._lock:
+            changed = {area for area, version in versions.items()
+                       if area in self._versions and self._versions[area] != version}
+            self._versions = dict(versions)
+            self._refreshed_at = datetime.utcnow().isoformat() + 'Z'
+            self._counters['refreshes'] += 1
+            self._counters['changed_areas'] += len(changed)
+        return changed
+
+    def count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._counters[name] += n
+
+    def stats(self) -> Dict[str, object]:
+        """Known areas, last refresh time and refresh counters."""
+        with self._lock:
+            counters = dict(self._counters)
+            counters['areas'] = len(self._versions)
+            counters['refreshed_at'] = self._refreshed_at
+        return counters
+
+
+_catalog = SurveyCatalog()
+
+
+def get_survey_catalog() -> SurveyCatalog:
+    """Process-wide survey catalog."""
+    return _catalog
+
+
+def reset_survey_catalog() -> None:
+    """Forget the known survey versions and refresh counters."""
+    global _catalog
+    _catalog = SurveyCatalog()
+
+
+def fetch_survey_versions() -> Dict[str, str]:
+    """
+    Version date (saverest) of every SSURGO survey area from SDA sacatalog.
+
+    Raises:
+        requests.RequestException: SDA request failed
+    """
+    payload = GAEZ_SDA_client.get_sda_client().query(SACATALOG_QUERY, allow_stale=False)
+    table = payload.get("Table") or []
+    if not table:
+        return {}
+    header = [str(col).lower() for col in table[0]]
+    area, version = header.index('areasymbol'), header.index('saverest')
+    return {str(row[area]).strip(): str(row[version]) for row in table[1:] if row[area] is not None}
+
+
+def refresh_survey_versions() -> Set[str]:
+    """
+    Refresh the catalog from sacatalog and drop cached horizon rows of survey
+    areas whose version changed.
+
+    Cached entries are compared with the new catalog directly, so entries
+    fetched before the first refresh are checked too.
+
+    Returns:
+        Survey areas republished since the previous refresh
+    """
+    try:
+        versions = fetch_survey_versions()
+    except Exception as err:
+        _catalog.count('failures')
+        logger.warning(f"Survey version refresh failed: {err}")
+        raise
+    changed = _catalog.update(versions)
+    dropped = GAEZ_SSURGO_data.invalidate_survey_areas(versions)
+    _catalog.count('invalidated_entries', dropped)
+    if changed or dropped:
+        logger.info(f"Survey versions: {len(changed)} area(s) republished, {dropped} cached map unit(s) dropped")
+    return changed
+
+
+_refresh_thread = None
+_refresh_stop = threading.Event()
+
+
+def _refresh_loop(interval: float) -> None:
+    while True:
+        try:
+            refresh_survey_versions()
+        except Exception:
+            pass  # logged in refresh_survey_versions; retried at the next interval
+        if _refresh_stop.wait(interval):
+            return
+
+
+def start_survey_refresh(interval: Optional[float] = None) -> bool:
+    """
+    Refresh survey versions now and then every interval seconds (default
+    gaez_config.survey_refresh_seconds) in a daemon thread.
+
+    Returns:
+        False if refreshes are disabled (interval 0) or already running
+    """
+    global _refresh_thread
+    interval = gaez_config.survey_refresh_seconds if interval is None else interval
+    if interval <= 0 or (_refresh_thread is not None and _refresh_thread.is_alive()):
+        return False
+    _refresh_stop.clear()
+    _refresh_thread = threading.Thread(target=_refresh_loop, args=(interval,), name='survey-versions', daemon=True)
+    _refresh_thread.start()
+    return True
+
+
+def stop_survey_refresh() -> None:
+    """Stop the background refresh thread."""
+    _refresh_stop.set()
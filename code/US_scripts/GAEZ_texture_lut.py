@@ -0,0 +1,219 @@
+"""
+Precomputed 1% texture lookup table shared by all texture call sites.
+
+USDA texture class, texture group and GAEZ particle size class (PSCL) depend
+only on sand and clay (silt is the remainder). The table holds all three for
+every 1% cell [sand, sand + 1) x [clay, clay + 1) as a (3, 101, 101) uint8
+array saved as .npy, so texture derivation is an array index per horizon.
+
+A cell is stored only when no class boundary (texture or PSCL rule) touches
+it; every boundary is a straight line in (sand, clay), so this is checked
+exactly at the cell corners. Horizons in boundary cells, on ties, with
+sand + silt + clay != 100 or with missing values fall back to the analytic
+rules (texture_class_ids / pscl_class_ids, defined here and re-exported by
+GAEZ_SSURGO_data), so lookups always equal the analytic classification.
+
+Build once (shipped in data/derived_data):
+
+    python GAEZ_texture_lut.py
+
+The table is memory-mapped at import; without the file it is computed in
+memory.
+"""
+
+import logging
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+import gaez_config
+
+logger = logging.getLogger(__name__)
+
+GRID_SIZE = 101
+# Texture layer value of cells that fall back to the analytic rules
+BOUNDARY = 255
+# Layers of the table
+TEXTURE_ID, TEXTURE_GROUP_ID, PSCL_ID = 0, 1, 2
+# Allowed deviation of sand + silt + clay from 100 for table lookups
+SUM_TOLERANCE = 1e-6
+
+# Texture group (getTextGroup: 1 = C, 2 = M, 3 = F) by texture class id (0 = none)
+TEXTURE_GROUP_BY_ID = np.array([0, 3, 3, 2, 2, 2, 2, 3, 2, 2, 1, 1, 1], dtype=np.uint8)
+TEXTURE_GROUP_LETTERS = {1: 'C', 2: 'M', 3: 'F'}
+
+# Class boundaries as (sand coefficient, clay coefficient, constant, thresholds)
+# of linear forms in sand and clay with silt = 100 - sand - clay
+_BOUNDARIES = [
+    (0.0, 1.0, 0.0, (7, 12, 18, 20, 27, 35, 40)),  # clay
+    (1.0, 0.0, 0.0, (20, 45, 52, 65, 82)),  # sand
+    (-1.0, -1.0, 100.0, (28, 40, 50, 80)),  # silt
+    (-1.0, 0.5, 100.0, (15, 30)),  # silt + 1.5 clay
+    (-1.0, 1.0, 100.0, (30,)),  # silt + 2 clay
+]
+
+
+def texture_class_ids(sand, silt, clay):
+    """
+    Vectorized GAEZ_SSURGO_data.gettt + getTXT_id: USDA texture class id for
+    arrays of sand/silt/clay percentages (same rules, same order as gettt).
+
+    Returns:
+        np.ndarray of int texture class ids (1-12); 0 where no class applies
+        (including NaN inputs), which callers treat like a missing texture.
+    """
+    sand = np.asarray(sand, dtype=float)
+    silt = np.asarray(silt, dtype=float)
+    clay = np.asarray(clay, dtype=float)
+    silt_clay = silt + 1.5 * clay
+    silt_2_clay = silt + 2.0 * clay
+
+    conditions = [
+        silt_clay < 15,
+        silt_clay < 30,
+        ((clay >= 7) & (clay <= 20) & (sand > 52) & (silt_2_clay >= 30)) | ((clay < 7) & (silt < 50) & (silt_2_clay >= 30)),
+        (clay >= 7) & (clay <= 27) & (silt >= 28) & (silt < 50) & (sand <= 52),
+        ((silt >= 50) & (clay >= 12) & (clay < 27)) | ((silt >= 50) & (silt < 80) & (clay < 12)),
+        (silt >= 80) & (clay < 12),
+        (clay >= 20) & (clay < 35) & (silt < 28) & (sand > 45),
+        (clay >= 27) & (clay < 40) & (sand > 20) & (sand <= 45),
+        (clay >= 27) & (clay < 40) & (sand <= 20),
+        (clay >= 35) & (sand >= 45),
+        (clay >= 40) & (silt >= 40),
+        (clay >= 40) & (sand <= 45) & (silt < 40),
+    ]
+    choices = [12, 11, 10, 8, 6, 5, 9, 4, 3, 7, 2, 1]
+    return np.select(conditions, choices, default=0)
+
+
+_FINE_TEXTURE_IDS = [1, 2, 7, 4, 3]
+_MEDIUM_TEXTURE_IDS = [10, 8, 9, 6, 5]
+_COARSE_TEXTURE_IDS = [12, 11]
+
+
+def pscl_class_ids(texture_id, clay, sand):
+    """
+    Vectorized row-based GAEZ_SSURGO_data.classify_pscl for arrays of texture
+    class ids.
+
+    Returns:
+        np.ndarray of int particle size class ids (1 coarse, 2 medium, 3 fine;
+        0 where the texture is unknown). Missing clay/sand count as 0, as in
+        classify_pscl.
+    """
+    texture_id = np.asarray(texture_id, dtype=float)
+    clay = np.nan_to_num(np.asarray(clay, dtype=float), nan=0)
+    sand = np.nan_to_num(np.asarray(sand, dtype=float), nan=0)
+    medium_range = ((clay < 35) & (sand < 65)) | ((sand <= 82) & (clay >= 18))
+
+    conditions = [
+        np.isin(texture_id, _FINE_TEXTURE_IDS),
+        np.isin(texture_id, _MEDIUM_TEXTURE_IDS),
+        np.isin(texture_id, _COARSE_TEXTURE_IDS),
+    ]
+    choices = [
+        np.where((clay <= 35) & medium_range, 2, 3),
+        np.where(~medium_range & (clay > 35), 3, 2),
+        np.where(~((clay < 18) & (sand > 65)) & medium_range, 2, 1),
+    ]
+    return np.select(conditions, choices, default=0)
+
+
+def build_texture_table() -> np.ndarray:
+    """Compute the (3, 101, 101) texture table from the analytic rules."""
+    sand, clay = np.meshgrid(np.arange(GRID_SIZE, dtype=float), np.arange(GRID_SIZE, dtype=float), indexing='ij')
+
+    # Cells [sand, sand + 1) x [clay, clay + 1) crossed by a boundary line. A linear
+    # form reaches its extremes at the corners; only the corner at the lower
+    # sand/clay edges belongs to the cell, so an extreme there counts as touching.
+    boundary = np.zeros(sand.shape, dtype=bool)
+    for coef_sand, coef_clay, const, thresholds in _BOUNDARIES:
+        corners = np.stack([coef_sand * (sand + ds) + coef_clay * (clay + dc) + const
+                            for ds in (0, 1) for dc in (0, 1)])
+        low, high = corners.min(axis=0), corners.max(axis=0)
+        low_in_cell = coef_sand >= 0 and coef_clay >= 0
+        high_in_cell = coef_sand <= 0 and coef_clay <= 0
+        for threshold in thresholds:
+            above_low = (low <= threshold) if low_in_cell else (low < threshold)
+            below_high = (threshold <= high) if high_in_cell else (threshold < high)
+            boundary |= above_low & below_high
+
+    # Any interior point classifies the whole cell
+    mid_sand, mid_clay = sand + 0.5, clay + 0.5
+    ids = texture_class_ids(mid_sand, 100 - mid_sand - mid_clay, mid_clay)
+
+    table = np.zeros((3, GRID_SIZE, GRID_SIZE), dtype=np.uint8)
+    table[TEXTURE_ID] = np.where(boundary, BOUNDARY, ids)
+    table[TEXTURE_GROUP_ID] = np.where(boundary, 0, TEXTURE_GROUP_BY_ID[ids])
+    table[PSCL_ID] = np.where(boundary, 0, pscl_class_ids(ids, mid_clay, mid_sand))
+    return table
+
+
+def build_texture_lut(path: Optional[str] = None) -> str:
+    """Write the texture table to path (default gaez_config.texture_lut_path)."""
+    path = path or gaez_config.texture_lut_path
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    table = build_texture_table()
+    np.save(path, table)
+    logger.info(f"Texture table written to {path} "
+                f"({int((table[TEXTURE_ID] != BOUNDARY).sum())} of {GRID_SIZE ** 2} cells stored)")
+    return path
+
+
+def _load_table(path: str) -> np.ndarray:
+    """Memory-map the shipped table, or compute it if missing or malformed."""
+    try:
+        table = np.load(path, mmap_mode='r')
+        if table.shape == (3, GRID_SIZE, GRID_SIZE) and table.dtype == np.uint8:
+            return table
+        logger.warning(f"Texture table {path} has shape {table.shape}, rebuilding in memory")
+    except (OSError, ValueError):
+        logger.info(f"Texture table {path} not found, building it in memory")
+    return build_texture_table()
+
+
+TEXTURE_TABLE = _load_table(gaez_config.texture_lut_path)
+_FLAT_TABLE = TEXTURE_TABLE.reshape(3, -1)
+
+
+def texture_lookup(sand, silt, clay) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Texture class id, texture group id and PSCL id for arrays of sand/silt/clay %.
+
+    Returns:
+        Tuple of int arrays (texture class id 1-12, texture group id 1-3,
+        PSCL id 1-3), each 0 where no class applies (including NaN inputs)
+    """
+    sand, silt, clay = np.broadcast_arrays(np.asarray(sand, dtype=float), np.asarray(silt, dtype=float),
+                                           np.asarray(clay, dtype=float))
+    shape = sand.shape
+    sand, silt, clay = sand.ravel(), silt.ravel(), clay.ravel()
+    with np.errstate(invalid='ignore'):
+        hit = ((np.abs(sand + silt + clay - 100) <= SUM_TOLERANCE)
+               & (sand >= 0) & (sand < GRID_SIZE) & (clay >= 0) & (clay < GRID_SIZE))
+    # Flat cell index (truncation = floor for the non-negative hits)
+    cell = np.where(hit, sand, 0).astype(np.intp) * GRID_SIZE + np.where(hit, clay, 0).astype(np.intp)
+
+    ids = _FLAT_TABLE[TEXTURE_ID].take(cell)
+    hit &= ids != BOUNDARY
+    ids = np.where(hit, ids, 0).astype(np.int64)
+    groups = TEXTURE_GROUP_BY_ID.take(ids).astype(np.int64)
+    pscl = np.where(hit, _FLAT_TABLE[PSCL_ID].take(cell), 0).astype(np.int64)
+
+    # Boundary cells, ties and inconsistent sums use the analytic rules
+    miss = ~hit
+    if miss.any():
+        miss_ids = texture_class_ids(sand[miss], silt[miss], clay[miss])
+        ids[miss] = miss_ids
+        groups[miss] = TEXTURE_GROUP_BY_ID[miss_ids]
+        pscl[miss] = pscl_class_ids(miss_ids, clay[miss], sand[miss])
+    return ids.reshape(shape), groups.reshape(shape), pscl.reshape(shape)
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    out = sys.argv[1] if len(sys.argv) > 1 else None
+    print(f"Texture table written to {build_texture_lut(out)}")
@@ -0,0 +1,560 @@
+"""
+Multi-point uploads: streaming parsers and chunked scoring.
+
+A CSV or GeoJSON file of points (plain or gzip-compressed, e.g. 5,000-50,000
+field centroids) is posted as the raw request body. PointStream inflates and
+parses the body incrementally as it arrives, so neither the file nor the parsed
+points are held in memory at once. Points are scored in chunks of
+gaez_config.upload_chunk_size:
+
+1. mukeys are looked up for the whole chunk, in the local mukey grid
+   (vectorized) and then through SDA (gaez_config.upload_workers concurrent
+   point queries, sharing the coverage pre-check and flight groups of the
+   point endpoint);
+2. map units not yet scored in this upload are fetched in one
+   ssurgo_gaez_data call and scored in one padded batch
+   (GAEZ_SQI_functions.score_components), dominant component or area-weighted
+   over all components;
+3. one output row per point is returned. Points on a map unit scored earlier
+   in the upload reuse its rating.
+
+The API streams the rows of every chunk as NDJSON or CSV as soon as the chunk
+is done.
+"""
+
+import codecs
+import csv
+import io
+import json
+import logging
+import math
+import re
+import sys
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+from fastapi.concurrency import run_in_threadpool
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import GAEZ_SSURGO_data
+import GAEZ_SQI_functions
+import GAEZ_US_phase_calc
+import gaez_config
+from GAEZ_singleflight import get_flight_group
+
+try:
+    from GAEZ_SDA_query import get_dominant_mukey_at_point
+    SDA_QUERY_AVAILABLE = True
+except ImportError:
+    SDA_QUERY_AVAILABLE = False
+
+try:
+    from GAEZ_mukey_raster import get_mukey_grid, NODATA
+    MUKEY_GRID_AVAILABLE = True
+except ImportError:
+    MUKEY_GRID_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+# Accepted CSV header names (case-insensitive), first match wins
+LATITUDE_COLUMNS = ('latitude', 'lat', 'y')
+LONGITUDE_COLUMNS = ('longitude', 'lon', 'lng', 'long', 'x')
+ID_COLUMNS = ('id', 'point_id', 'field_id', 'name')
+
+SCORE_COLUMNS = ['SQ1', 'SQ2', 'SQ3', 'SQ4', 'SQ5', 'SQ6', 'SQ7', 'SR']
+OUTPUT_COLUMNS = ['id', 'latitude', 'longitude', 'status', 'mukey', 'cokey', 'component_name',
+                  'component_pct', 'components'] + SCORE_COLUMNS + ['error']
+
+FEATURES_START = re.compile(r'"features"\s*:\s*\[')
+
+
+class UploadFormatError(ValueError):
+    """The upload cannot be read as a CSV or GeoJSON point file."""
+    pass
+
+
+@dataclass
+class UploadPoint:
+    """One point of an upload; error is set for rows without valid coordinates."""
+    point_id: str
+    latitude: Optional[float]
+    longitude: Optional[float]
+    error: Optional[str] = None
+
+
+def _coordinates(point_id: str, latitude: Any, longitude: Any) -> UploadPoint:
+    try:
+        lat, lon = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return UploadPoint(point_id, None, None, f"Invalid coordinates ({latitude!r}, {longitude!r})")
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return UploadPoint(point_id, lat, lon, f"Coordinates out of range ({lat}, {lon})")
+    return UploadPoint(point_id, lat, lon)
+
+
+class GzipDecoder:
+    """Incremental gunzip of gzip bodies (detected by their magic bytes); other bodies pass through."""
+
+    def __init__(self):
+        self._head = b''
+        self._plain = False
+        self._inflate = None
+
+    def feed(self, data: bytes) -> bytes:
+        if not self._plain and self._inflate is None:
+            self._head += data
+            if len(self._head) < len(GZIP_MAGIC):
+                return b''
+            data, self._head = self._head, b''
+            if data.startswith(GZIP_MAGIC):
+                self._inflate = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            else:
+                self._plain = True
+        if self._plain:
+            return data
+
+        out = []
+        try:
+            while data:
+                out.append(self._inflate.decompress(data))
+                # concatenated gzip members (e.g. files joined with cat)
+                data = self._inflate.unused_data if self._inflate.eof else b''
+                if data:
+                    self._inflate = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        except zlib.error as err:
+            raise UploadFormatError(f"Invalid gzip data: {err}")
+        return b''.join(out)
+
+    def close(self) -> bytes:
+        if self._inflate is None:
+            return self._head
+        if not self._inflate.eof:
+            raise UploadFormatError("Truncated gzip data")
+        return b''
+
+
+class _TextParser:
+    """Shared UTF-8 decoding of the parsers (a leading byte order mark is dropped)."""
+
+    def __init__(self):
+        self._text = codecs.getincrementaldecoder('utf-8-sig')()
+
+    def _decode(self, data: bytes, final: bool = False) -> str:
+        try:
+            return self._text.decode(data, final)
+        except UnicodeDecodeError as err:
+            raise UploadFormatError(f"Upload is not UTF-8 text: {err}")
+
+
+class CSVPointParser(_TextParser):
+    """
+    Incremental CSV parser. The header needs latitude and longitude columns
+    (LATITUDE_COLUMNS, LONGITUDE_COLUMNS); an ID_COLUMNS column names the
+    points, otherwise they are numbered from 1. Quoted fields must not span lines.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._partial = ''
+        self._columns = None
+        self._rows = 0
+
+    def feed(self, data: bytes) -> List[UploadPoint]:
+        lines = (self._partial + self._decode(data)).split('\n')
+        self._partial = lines.pop()
+        return self._parse(lines)
+
+    def close(self) -> List[UploadPoint]:
+        lines = [self._partial + self._decode(b'', final=True)]
+        self._partial = ''
+        points = self._parse(lines)
+        if self._columns is None:
+            raise UploadFormatError("CSV upload has no header row")
+        return points
+
+    def _parse(self, lines: List[str]) -> List[UploadPoint]:
+        points = []
+        for row in csv.reader(lines):
+            if not any(field.strip() for field in row):
+                continue
+            if self._columns is None:
+                self._columns = self._header(row)
+                continue
+            self._rows += 1
+            lat_col, lon_col, id_col = self._columns
+            point_id = row[id_col].strip() if id_col is not None and id_col < len(row) else str(self._rows)
+            if max(lat_col, lon_col) >= len(row):
+                points.append(UploadPoint(point_id, None, None, "Missing coordinate fields"))
+                continue
+            points.append(_coordinates(point_id, row[lat_col].strip(), row[lon_col].strip()))
+        return points
+
+    @staticmethod
+    def _header(row: List[str]):
+        names = [name.strip().lower() for name in row]
+
+        def find(candidates):
+            return next((names.index(name) for name in candidates if name in names), None)
+
+        lat_col, lon_col = find(LATITUDE_COLUMNS), find(LONGITUDE_COLUMNS)
+        if lat_col is None or lon_col is None:
+            raise UploadFormatError(f"CSV header needs latitude and longitude columns (found: {', '.join(row)})")
+        return lat_col, lon_col, find(ID_COLUMNS)
+
+
+class GeoJSONPointParser(_TextParser):
+    """
+    Incremental parser of a GeoJSON FeatureCollection. Features are decoded one
+    at a time from the features array; only Point geometries are scored. The
+    point id is the feature id, an ID_COLUMNS property or the feature number.
+    """
+
+    def __init__(self, max_feature_chars: int = 1_000_000):
+        super().__init__()
+        self.max_feature_chars = max_feature_chars
+        self._buffer = ''
+        self._in_features = False
+        self._done = False
+        self._features = 0
+        self._json = json.JSONDecoder()
+
+    def feed(self, data: bytes) -> List[UploadPoint]:
+        if self._done:
+            return []
+        self._buffer += self._decode(data)
+        return self._parse(final=False)
+
+    def close(self) -> List[UploadPoint]:
+        if self._done:
+            return []
+        self._buffer += self._decode(b'', final=True)
+        points = self._parse(final=True)
+        if not self._done:
+            raise UploadFormatError("GeoJSON features array is not closed")
+        return points
+
+    def _parse(self, final: bool) -> List[UploadPoint]:
+        if not self._in_features:
+            match = FEATURES_START.search(self._buffer)
+            if match is None:
+                if final or len(self._buffer) > self.max_feature_chars:
+                    raise UploadFormatError("GeoJSON upload must be a FeatureCollection with a features array")
+                return []
+            self._buffer = self._buffer[match.end():]
+            self._in_features = True
+
+        points, buffer, pos = [], self._buffer, 0
+        while True:
+            while pos < len(buffer) and (buffer[pos].isspace() or buffer[pos] == ','):
+                pos += 1
+            if pos == len(buffer):
+                break
+            if buffer[pos] == ']':
+                self._done = True
+                pos = len(buffer)
+                break
+            if buffer[pos] != '{':
+                raise UploadFormatError(f"Unexpected {buffer[pos]!r} in GeoJSON features array")
+            try:
+                feature, pos = self._json.raw_decode(buffer, pos)
+            except json.JSONDecodeError as err:
+                # most likely a feature cut by the end of the chunk
+                if final or len(buffer) - pos > self.max_feature_chars:
+                    raise UploadFormatError(f"Invalid GeoJSON feature: {err}")
+                break
+            self._features += 1
+            points.append(self._point(feature))
+        self._buffer = buffer[pos:]
+        return points
+
+    def _point(self, feature: Dict[str, Any]) -> UploadPoint:
+        properties = feature.get('properties') or {}
+        point_id = feature.get('id')
+        if point_id is None:
+            point_id = next((properties[name] for name in ID_COLUMNS if properties.get(name) is not None),
+                            self._features)
+        point_id = str(point_id)
+        geometry = feature.get('geometry') or {}
+        if geometry.get('type') != 'Point':
+            return UploadPoint(point_id, None, None,
+                               f"Only Point geometries are supported (got {geometry.get('type')})")
+        coordinates = geometry.get('coordinates') or []
+        if len(coordinates) < 2:
+            return UploadPoint(point_id, None, None, "Point has no coordinates")
+        return _coordinates(point_id, coordinates[1], coordinates[0])
+
+
+class PointStream:
+    """
+    Body bytes in, points out: gunzips if needed and parses as file_format
+    ('csv' or 'geojson'), or as GeoJSON if the text starts with '{' and CSV otherwise.
+    """
+
+    def __init__(self, file_format: Optional[str] = None):
+        if file_format not in (None, 'csv', 'geojson'):
+            raise UploadFormatError(f"Unknown upload format: {file_format}")
+        self.file_format = file_format
+        self._gzip = GzipDecoder()
+        self._parser = None
+        self._pending = b''
+
+    def feed(self, data: bytes) -> List[UploadPoint]:
+        return self._parse(self._gzip.feed(data))
+
+    def close(self) -> List[UploadPoint]:
+        points = self._parse(self._gzip.close())
+        if self._parser is None:
+            raise UploadFormatError("Upload is empty")
+        return points + self._parser.close()
+
+    def _parse(self, data: bytes) -> List[UploadPoint]:
+        if self._parser is None:
+            self._pending += data
+            text = self._pending.lstrip(b'\xef\xbb\xbf \t\r\n')
+            if not text:
+                return []
+            self._parser = self._new_parser(self.file_format or ('geojson' if text[:1] == b'{' else 'csv'))
+            data, self._pending = self._pending, b''
+        return self._parser.feed(data)
+
+    @staticmethod
+    def _new_parser(file_format: str):
+        return GeoJSONPointParser() if file_format == 'geojson' else CSVPointParser()
+
+
+class UploadReader:
+    """Reads points from a request body (async iterator of bytes) through a PointStream."""
+
+    def __init__(self, body: AsyncIterator[bytes], file_format: Optional[str] = None):
+        self._body = body
+        self._stream = PointStream(file_format)
+        self._points: List[UploadPoint] = []
+        self.finished = False
+
+    async def read(self, count: int) -> List[UploadPoint]:
+        """Up to count points; fewer only at the end of the upload."""
+        while len(self._points) < count and not self.finished:
+            try:
+                data = await self._body.__anext__()
+            except StopAsyncIteration:
+                self._points.extend(self._stream.close())
+                self.finished = True
+            else:
+                self._points.extend(self._stream.feed(data))
+        points, self._points = self._points[:count], self._points[count:]
+        return points
+
+
+def _mukey_str(mukey) -> str:
+    """'123456' for 123456, '123456.0' or '123456'."""
+    try:
+        return str(int(float(mukey)))
+    except (TypeError, ValueError):
+        return str(mukey).strip()
+
+
+def _number(value, digits: int = 2) -> Optional[float]:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) or math.isinf(value) else round(value, digits)
+
+
+class UploadScorer:
+    """
+    Scores the points of one upload chunk by chunk. Ratings of the map units
+    seen so far (at most gaez_config.upload_map_unit_cache, least recently used
+    dropped first) are reused for later points of the upload.
+    """
+
+    def __init__(self, crop_id: str, input_level: str, depth_weight_type: int,
+                 map_unit_rating: bool = False, requirements: Optional[Dict[str, Any]] = None):
+        self.crop_id = crop_id
+        self.input_level = input_level
+        self.depth_weight_type = depth_weight_type
+        self.map_unit_rating = map_unit_rating
+        self.requirements = requirements or GAEZ_SQI_functions.load_sqi_requirements(crop_id, input_level)
+        self._ratings: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self.stats = {'points': 0, 'map_units_scored': 0, 'map_unit_reuses': 0}
+
+    def score(self, points: List[UploadPoint]) -> List[Dict[str, Any]]:
+        """Output rows (OUTPUT_COLUMNS) for a chunk of points, in input order."""
+        valid = [point for point in points if point.error is None]
+        mukeys = dict(zip((id(point) for point in valid), self._resolve_mukeys(valid)))
+
+        wanted = list(dict.fromkeys(m for m in mukeys.values() if isinstance(m, str)))
+        missing = [m for m in wanted if m not in self._ratings]
+        self.stats['map_unit_reuses'] += len(wanted) - len(missing)
+        failure = None
+        if missing:
+            try:
+                self._store(self._score_map_units(missing))
+                self.stats['map_units_scored'] += len(missing)
+            except Exception as e:
+                logger.warning(f"Scoring {len(missing)} uploaded map units failed: {str(e)}")
+                failure = str(e)
+
+        rows = []
+        for point in points:
+            row = dict.fromkeys(OUTPUT_COLUMNS)
+            row.update(id=point.point_id, latitude=point.latitude, longitude=point.longitude)
+            mukey = mukeys.get(id(point))
+            if point.error is not None:
+                row.update(status='invalid', error=point.error)
+            elif isinstance(mukey, Exception):
+                row.update(status='error', error=f"Map unit lookup failed: {mukey}")
+            elif mukey is None:
+                row.update(status='no_ssurgo', error="No SSURGO map unit at location")
+            elif mukey in self._ratings:
+                self._ratings.move_to_end(mukey)
+                row.update(self._ratings[mukey], mukey=mukey)
+            else:
+                row.update(status='error', mukey=mukey, error=failure or "Map unit was not scored")
+            rows.append(row)
+        self.stats['points'] += len(points)
+        return rows
+
+    def _store(self, ratings: Dict[str, Dict[str, Any]]) -> None:
+        for mukey, rating in ratings.items():
+            self._ratings[mukey] = rating
+            self._ratings.move_to_end(mukey)
+        while len(self._ratings) > gaez_config.upload_map_unit_cache:
+            self._ratings.popitem(last=False)
+
+    def _resolve_mukeys(self, points: List[UploadPoint]) -> List[Any]:
+        """mukey string, None (no map unit) or the lookup exception, per point."""
+        mukeys: List[Any] = [None] * len(points)
+        remaining = list(range(len(points)))
+
+        if MUKEY_GRID_AVAILABLE and points:
+            grid = get_mukey_grid()
+            if grid is not None:
+                found = grid.mukeys_at([p.latitude for p in points], [p.longitude for p in points])
+                for i, mukey in enumerate(found):
+                    if mukey != NODATA:
+                        mukeys[i] = str(int(mukey))
+                remaining = [i for i in remaining if mukeys[i] is None]
+
+        if remaining and SDA_QUERY_AVAILABLE:
+            def lookup(point: UploadPoint):
+                try:
+                    mukey = get_flight_group('dominant_mukey').do(
+                        (point.latitude, point.longitude),
+                        get_dominant_mukey_at_point, point.latitude, point.longitude
+                    )
+                except Exception as e:
+                    return e
+                return None if mukey is None else _mukey_str(mukey)
+
+            with ThreadPoolExecutor(max_workers=gaez_config.upload_workers) as pool:
+                for i, mukey in zip(remaining, pool.map(lookup, [points[i] for i in remaining])):
+                    mukeys[i] = mukey
+        return mukeys
+
+    def _score_map_units(self, mukeys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Ratings of the given map units; map units without component data get status 'no_ssurgo'."""
+        data = get_flight_group('ssurgo_gaez_data').do(
+            (tuple(mukeys), False), GAEZ_SSURGO_data.ssurgo_gaez_data, mukeys
+        )
+        ratings = {mukey: {'status': 'no_ssurgo', 'error': "No component data for map unit"} for mukey in mukeys}
+        if not isinstance(data, pd.DataFrame) or len(data) == 0:
+            return ratings
+
+        # shared with concurrent requests for the same map units: copy before any change
+        data = GAEZ_US_phase_calc.classify_gaez_v4_phases(data.copy())
+        data['mukey'] = data['mukey'].map(_mukey_str)
+        if not self.map_unit_rating:
+            data = data[data['cokey'].isin(self._dominant_cokeys(data))]
+        components = GAEZ_SQI_functions.score_components(
+            GAEZ_SQI_functions.prepare_sqi_data(data), self.requirements, self.input_level, self.depth_weight_type
+        )
+
+        if self.map_unit_rating:
+            for _, row in GAEZ_SQI_functions.map_unit_ratings(components).iterrows():
+                ratings[row['mukey']] = {
+                    'status': 'ok', 'error': None, 'components': int(row['components']),
+                    'component_pct': _number(row.get('comppct_total')),
+                    **{name: _number(row.get(name)) for name in SCORE_COLUMNS}
+                }
+        else:
+            for _, row in components.iterrows():
+                compname = row.get('compname')
+                ratings[row['mukey']] = {
+                    'status': 'ok', 'error': None, 'components': 1, 'cokey': str(row['cokey']),
+                    'component_name': None if pd.isna(compname) else str(compname),
+                    'component_pct': _number(row.get('comppct_r')),
+                    **{name: _number(row.get(name)) for name in SCORE_COLUMNS}
+                }
+        return ratings
+
+    @staticmethod
+    def _dominant_cokeys(data: pd.DataFrame) -> np.ndarray:
+        """Highest comppct_r component per mukey (first listed on ties)."""
+        components = data.drop_duplicates('cokey')
+        if 'comppct_r' in components.columns:
+            pct = pd.to_numeric(components['comppct_r'], errors='coerce').fillna(-1)
+            components = components.assign(_pct=pct).sort_values('_pct', ascending=False, kind='stable')
+        return components.drop_duplicates('mukey')['cokey'].to_numpy()
+
+
+def format_rows(rows: Iterable[Dict[str, Any]], output: str = 'ndjson', header: bool = False) -> str:
+    """Rows as NDJSON lines or CSV records (with the OUTPUT_COLUMNS header row if header)."""
+    if output == 'ndjson':
+        return ''.join(json.dumps(row, separators=(',', ':')) + '\n' for row in rows)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator='\n')
+    if header:
+        writer.writerow(OUTPUT_COLUMNS)
+    for row in rows:
+        writer.writerow(['' if row.get(col) is None else row.get(col) for col in OUTPUT_COLUMNS])
+    return buffer.getvalue()
+
+
+def error_row(message: str) -> Dict[str, Any]:
+    """Row reporting a failure of the upload itself (not of one point)."""
+    row = dict.fromkeys(OUTPUT_COLUMNS)
+    row.update(status='error', error=message)
+    return row
+
+
+async def stream_upload(reader: UploadReader, scorer: UploadScorer, first: List[UploadPoint],
+                        output: str = 'ndjson') -> AsyncIterator[str]:
+    """
+    Score the upload chunk by chunk, yielding the formatted rows of each chunk.
+
+    first is the first chunk, read before the response starts so that an
+    unreadable upload can still be refused. Reading stops after
+    gaez_config.upload_max_points points; an error row then reports the rest as
+    skipped. A format error later in the file ends the stream with an error row.
+    """
+    points, header, total = first, True, 0
+    try:
+        while points:
+            rows = await run_in_threadpool(scorer.score, points)
+            yield format_rows(rows, output, header)
+            header = False
+            total += len(points)
+            remaining = gaez_config.upload_max_points - total
+            if remaining <= 0:
+                if await reader.read(1):
+                    yield format_rows([error_row(f"Upload exceeds {gaez_config.upload_max_points} points; "
+                                                 f"remaining points skipped")], output)
+                break
+            points = await reader.read(min(gaez_config.upload_chunk_size, remaining))
+    except UploadFormatError as e:
+        logger.warning(f"Upload unreadable after {total} points: {str(e)}")
+        yield format_rows([error_row(str(e))], output, header)
+    except Exception as e:
+        logger.error(f"Upload scoring failed after {total} points: {str(e)}", exc_info=True)
+        yield format_rows([error_row(f"Internal server error: {str(e)}")], output, header)
+    logger.info(f"Scored upload: {scorer.stats}")
@@ -7,18 +7,22 @@ This API provides crop-specific soil quality assessments based on:
 """
 
 import logging
-from typing import Dict, Any
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional
 from datetime import datetime
 
-from fastapi import FastAPI, HTTPException, Request, status
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Query, Request, status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.concurrency import run_in_threadpool
 import uvicorn
 
 from .models import (
     CalculationRequest,
     CalculationResponse,
+    WhatIfRequest,
+    InputLevel,
     ErrorResponse,
     CropListResponse,
     HealthResponse
@@ -27,8 +31,17 @@ from .service import (
     GAEZCalculationService,
     GAEZCalculationError,
     SSURGODataError,
-    CalculationServiceError
+    CalculationServiceError,
+    ProfileSessionError
 )
+from .batch_upload import UploadReader, UploadScorer, stream_upload
+from .result_store import ResultStore, is_storable, request_fingerprint
+import GAEZ_SDA_client
+import GAEZ_survey_versions
+import gaez_config
+from GAEZ_coverage import coverage_stats
+from GAEZ_elevation_cache import elevation_cache_stats
+from GAEZ_singleflight import singleflight_stats
 
 # Configure logging
 logging.basicConfig(
@@ -37,6 +50,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run the SSURGO survey version refresh (gaez_config.survey_refresh_seconds) while the app is up."""
+    if GAEZ_survey_versions.start_survey_refresh():
+        logger.info(f"Refreshing SSURGO survey versions every {gaez_config.survey_refresh_seconds}s")
+    try:
+        yield
+    finally:
+        GAEZ_survey_versions.stop_survey_refresh()
+
+
 # Initialize FastAPI app
 app = FastAPI(
     title="GAEZ Soil Quality Index API",
@@ -79,6 +104,7 @@ app = FastAPI(
     license_info={
         "name": "MIT",
     },
+    lifespan=lifespan,
 )
 
 # Add CORS middleware
@@ -96,6 +122,9 @@ app.add_middleware(GZipMiddleware, minimum_size=1000)
 # Initialize service
 calculation_service = GAEZCalculationService()
 
+# Serialized responses of repeated requests, by request fingerprint
+result_store = ResultStore(gaez_config.result_store_size, gaez_config.result_store_dir)
+
 
 @app.exception_handler(GAEZCalculationError)
 async def gaez_calculation_exception_handler(request: Request, exc: GAEZCalculationError):
@@ -108,6 +137,9 @@ async def gaez_calculation_exception_handler(request: Request, exc: GAEZCalculat
     if isinstance(exc, SSURGODataError):
         error_code = "SSURGO_DATA_ERROR"
         status_code = status.HTTP_404_NOT_FOUND
+    elif isinstance(exc, ProfileSessionError):
+        error_code = "PROFILE_NOT_FOUND"
+        status_code = status.HTTP_404_NOT_FOUND
     elif isinstance(exc, CalculationServiceError):
         error_code = "SERVICE_ERROR"
 
@@ -185,6 +217,28 @@ async def health_check():
     )
 
 
+@app.get("/metrics", tags=["System"])
+async def metrics() -> Dict[str, Any]:
+    """
+    Upstream fetch metrics.
+
+    Returns the single-flight coalescing counters per upstream function
+    (calls, executed fetches, coalesced callers), the elevation/slope cache
+    hits and misses, the stored-response hits and misses, the SSURGO survey
+    version refreshes, the coverage pre-check rejects and negative cache
+    hits, and the SDA client counters.
+    """
+    return {
+        "timestamp": datetime.utcnow().isoformat() + 'Z',
+        "singleflight": singleflight_stats(),
+        "elevation_cache": elevation_cache_stats(),
+        "result_store": result_store.stats(),
+        "survey_versions": GAEZ_survey_versions.get_survey_catalog().stats(),
+        "coverage": coverage_stats(),
+        "sda": GAEZ_SDA_client.get_sda_client().stats()
+    }
+
+
 @app.get("/api/v1/crops", response_model=CropListResponse, tags=["Crops"])
 async def list_crops():
     """
@@ -210,12 +264,13 @@ async def list_crops():
     status_code=status.HTTP_200_OK,
     responses={
         200: {"description": "Calculation completed successfully"},
+        304: {"description": "Result unchanged since the ETag sent in If-None-Match"},
         400: {"model": ErrorResponse, "description": "Invalid request parameters"},
         404: {"model": ErrorResponse, "description": "No SSURGO data available for location"},
         500: {"model": ErrorResponse, "description": "Internal server error"}
     }
 )
-async def calculate_soil_quality(request: CalculationRequest):
+async def calculate_soil_quality(request: CalculationRequest, http_request: Request):
     """
     Calculate crop-specific soil quality indices for a location.
 
@@ -278,6 +333,15 @@ async def calculate_soil_quality(request: CalculationRequest):
     2. User site data takes priority for drainage, slope, restrictions
     3. SSURGO data fills in any missing parameters
 
+    ## Repeated Requests
+
+    Responses to requests without user data are stored by a fingerprint of
+    the request and the versions of the requirement tables, SSURGO data, local
+    grids, slope sources and code. Degraded responses are not stored. Repeats are served from the store (`X-Result-Store: hit`) and carry
+    no `profile_id`. The fingerprint is the `ETag`; send it back in
+    `If-None-Match` to get 304 Not Modified while the stored response is
+    current. Send `Cache-Control: no-cache` to force a new calculation.
+
     ## Error Handling
 
     - **404**: No SSURGO data available for the specified location
@@ -288,8 +352,36 @@ async def calculate_soil_quality(request: CalculationRequest):
         logger.info(f"Received calculation request for crop {request.crop_id} "
                    f"at ({request.location.latitude}, {request.location.longitude})")
 
-        result = calculation_service.calculate_soil_quality(request)
-        return result
+        fingerprint = request_fingerprint(request)
+        if fingerprint is not None:
+            etag = f'"{fingerprint}"'
+            if 'no-cache' not in http_request.headers.get('cache-control', ''):
+                # Only a servable entry confirms the ETag: its survey area may have been republished
+                body = result_store.get(fingerprint)
+                if body is not None and etag in http_request.headers.get('if-none-match', ''):
+                    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+                if body is not None:
+                    return Response(content=body, media_type='application/json',
+                                    headers={'ETag': etag, 'X-Result-Store': 'hit'})
+
+        # Run in the threadpool so concurrent requests overlap (and share
+        # in-flight upstream fetches) instead of blocking the event loop
+        result = await run_in_threadpool(calculation_service.calculate_soil_quality, request)
+        if fingerprint is None:
+            return result
+        if not is_storable(request, result):
+            # Degraded (a requested block failed or slope defaulted): serve it but let repeats retry
+            return result
+
+        # The what-if session belongs to this caller; stored copies carry no profile_id
+        sources = result.data_sources
+        survey = None
+        if sources.ssurgo_survey_area and sources.ssurgo_survey_version:
+            survey = (sources.ssurgo_survey_area, sources.ssurgo_survey_version)
+        result_store.put(fingerprint, result.model_copy(update={'profile_id': None}).model_dump_json().encode(),
+                         survey)
+        return Response(content=result.model_dump_json(), media_type='application/json',
+                        headers={'ETag': etag, 'X-Result-Store': 'miss'})
 
     except SSURGODataError as e:
         logger.warning(f"SSURGO data not found: {str(e)}")
@@ -317,17 +409,136 @@ async def calculate_soil_quality(request: CalculationRequest):
         )
 
 
+@app.post(
+    "/api/v1/calculate/what-if",
+    response_model=CalculationResponse,
+    tags=["Calculations"],
+    status_code=status.HTTP_200_OK,
+    responses={
+        200: {"description": "Recalculation completed successfully"},
+        400: {"model": ErrorResponse, "description": "Invalid user data changes"},
+        404: {"model": ErrorResponse, "description": "Unknown or expired profile_id"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    }
+)
+async def calculate_what_if(request: WhatIfRequest):
+    """
+    Recalculate a previous result with changed user data.
+
+    Send the `profile_id` of an earlier `/api/v1/calculate` response and only
+    the changes: plot horizons (matched by `horizon_id`), lab samples (matched
+    by `sample_id`) and site fields. Only the fields sent are replaced, so
+    depths are only needed for new horizons and samples.
+
+    ```json
+    {
+      "profile_id": "3f2b9c0e6d8a4f1b9e7c5a2d1b0f8e6c",
+      "user_data": {
+        "plot_data": [{"horizon_id": "Ap", "ph": 5.8}]
+      }
+    }
+    ```
+
+    The SSURGO profile is not fetched again, and only the indices whose input
+    properties changed are recomputed (listed in `recalculated_indices`).
+    Sessions expire after a period without use (404, run a new calculation).
+    """
+    try:
+        return await run_in_threadpool(calculation_service.recalculate_what_if, request)
+
+    except ProfileSessionError as e:
+        logger.warning(f"What-if profile not found: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=str(e)
+        )
+    except GAEZCalculationError as e:
+        logger.error(f"Calculation error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+    except ValueError as e:
+        logger.warning(f"Validation error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid request: {str(e)}"
+        )
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+
 @app.post(
     "/api/v1/calculate/batch",
     tags=["Calculations"],
-    status_code=status.HTTP_501_NOT_IMPLEMENTED,
-    include_in_schema=False
+    status_code=status.HTTP_200_OK,
+    response_class=StreamingResponse,
+    responses={
+        200: {"description": "One row per uploaded point, streamed as NDJSON or CSV",
+              "content": {"application/x-ndjson": {}, "text/csv": {}}},
+        400: {"model": ErrorResponse, "description": "Unreadable upload or unknown crop"},
+        500: {"model": ErrorResponse, "description": "Internal server error"}
+    }
 )
-async def calculate_batch():
-    """Batch calculation endpoint (not yet implemented)."""
-    raise HTTPException(
-        status_code=status.HTTP_501_NOT_IMPLEMENTED,
-        detail="Batch calculations not yet implemented"
+async def calculate_batch(
+    http_request: Request,
+    crop_id: str = Query(..., description="GAEZ crop identifier (e.g., '4' for maize)"),
+    input_level: InputLevel = Query(..., description="Agricultural input level (L, I, H)"),
+    depth_weight_type: Optional[int] = Query(None, ge=1, le=4, description="Rooting depth type (default: crop's)"),
+    map_unit_rating: bool = Query(False, description="Area-weighted ratings of all components"),
+    file_format: Optional[str] = Query(None, alias="format", pattern="^(csv|geojson)$",
+                                       description="Upload format (default: detected)"),
+    output: str = Query("ndjson", pattern="^(ndjson|csv)$", description="Response format")
+):
+    """
+    Score every point of an uploaded CSV or GeoJSON file (SSURGO data only).
+
+    Post the file as the raw request body, optionally gzip-compressed:
+
+    ```bash
+    curl -X POST "http://localhost:8000/api/v1/calculate/batch?crop_id=4&input_level=L" \
+      -H "Content-Type: text/csv" --data-binary @fields.csv.gz
+    ```
+
+    CSV files need `latitude` and `longitude` columns (`lat`/`lon` also
+    work) and may have an `id` column. GeoJSON files are a FeatureCollection of
+    Point features. Points are scored in chunks, each map unit once per upload,
+    and the rows of every chunk are streamed back as soon as it is done. Points
+    that cannot be scored get a row with a `status` other than `ok` and an `error`.
+    """
+    try:
+        depth_weight_type = calculation_service.get_depth_weight_type(crop_id, depth_weight_type)
+        scorer = await run_in_threadpool(
+            UploadScorer, crop_id, input_level.value, depth_weight_type, map_unit_rating
+        )
+        if scorer.requirements['profile'] is None or len(scorer.requirements['profile']) == 0:
+            raise ValueError(f"Unknown crop_id: {crop_id}")
+
+        reader = UploadReader(http_request.stream(), file_format)
+        first = await reader.read(min(gaez_config.upload_chunk_size, gaez_config.upload_max_points))
+        if not first:
+            raise ValueError("Upload contains no points")
+
+    except ValueError as e:
+        logger.warning(f"Invalid upload: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid request: {str(e)}"
+        )
+    except Exception as e:
+        logger.error(f"Unexpected error: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Internal server error: {str(e)}"
+        )
+
+    return StreamingResponse(
+        stream_upload(reader, scorer, first, output),
+        media_type="application/x-ndjson" if output == "ndjson" else "text/csv"
     )
 
 
@@ -207,6 +207,30 @@ class UserData(BaseModel):
     lab_data: Optional[List[LabData]] = Field(None, description="Laboratory analysis results")
 
 
+class PlotDataHorizonDelta(PlotDataHorizon):
+    """What-if change to a plot horizon, matched by horizon_id (depths only needed for new horizons)."""
+    top_depth: Optional[float] = Field(None, ge=0, description="Top depth of horizon in cm")
+    bottom_depth: Optional[float] = Field(None, gt=0, description="Bottom depth of horizon in cm")
+
+    @model_validator(mode='after')
+    def validate_depth_order(self):
+        if self.top_depth is not None and self.bottom_depth is not None and self.bottom_depth <= self.top_depth:
+            raise ValueError("bottom_depth must be greater than top_depth")
+        return self
+
+
+class LabDataDelta(LabData):
+    """What-if change to a lab sample, matched by sample_id (depth only needed for new samples)."""
+    depth_cm: Optional[float] = Field(None, ge=0, description="Sample depth in cm")
+
+
+class UserDataDelta(BaseModel):
+    """What-if changes to a session's user data; merged records are validated as UserData."""
+    plot_data: Optional[List[PlotDataHorizonDelta]] = Field(None, description="Changed or new plot horizons")
+    site_data: Optional[SiteData] = Field(None, description="Changed site characteristics")
+    lab_data: Optional[List[LabDataDelta]] = Field(None, description="Changed or new lab samples")
+
+
 class CalculationRequest(BaseModel):
     """Main request for soil quality index calculation."""
     location: Location = Field(..., description="Geographic coordinates")
@@ -229,6 +253,17 @@ class CalculationRequest(BaseModel):
         le=1000,
         description="Spatial resolution for SSURGO data in meters"
     )
+    uncertainty_draws: Optional[int] = Field(
+        None,
+        ge=10,
+        le=10000,
+        description="Number of Monte Carlo draws from SSURGO low/high property ranges for SQI uncertainty bands (omit to skip)"
+    )
+    map_unit_rating: bool = Field(
+        False,
+        description="Also score every SSURGO component of the map unit and return comppct_r-weighted "
+                    "map unit SQIs (SSURGO data only; user data applies to the point profile)"
+    )
 
     model_config = {
         "json_schema_extra": {
@@ -275,6 +310,30 @@ class CalculationRequest(BaseModel):
     }
 
 
+class WhatIfRequest(BaseModel):
+    """What-if recalculation of a profile returned by an earlier calculation."""
+    profile_id: str = Field(..., description="profile_id from a previous calculation response")
+    user_data: UserDataDelta = Field(
+        ...,
+        description="Changes to the session's user data: plot horizons (by horizon_id), lab samples "
+                    "(by sample_id) and site fields; only the fields sent are replaced, so depths "
+                    "are only needed for new horizons and samples"
+    )
+
+    model_config = {
+        "json_schema_extra": {
+            "examples": [
+                {
+                    "profile_id": "3f2b9c0e6d8a4f1b9e7c5a2d1b0f8e6c",
+                    "user_data": {
+                        "plot_data": [{"horizon_id": "Ap", "ph": 5.8}]
+                    }
+                }
+            ]
+        }
+    }
+
+
 class SoilQualityIndices(BaseModel):
     """Calculated soil quality index scores."""
     SQ1: float = Field(..., description="Nutrient Availability (low input)")
@@ -287,6 +346,36 @@ class SoilQualityIndices(BaseModel):
     SR: float = Field(..., description="Overall Soil Rating (0-100)")
 
 
+class SQIUncertainty(BaseModel):
+    """Percentile bands of SQI scores from Monte Carlo draws of SSURGO property ranges."""
+    draws: int = Field(..., description="Number of sampled soil profiles")
+    percentiles: List[float] = Field(..., description="Percentiles reported for each index")
+    bands: Dict[str, List[Optional[float]]] = Field(
+        ...,
+        description="Score at each percentile, keyed by SQ1-SQ7 and SR (null where not applicable)"
+    )
+
+
+class ComponentRating(BaseModel):
+    """SQI scores of one SSURGO component of a map unit."""
+    cokey: str = Field(..., description="SSURGO component key")
+    component_name: Optional[str] = Field(None, description="SSURGO component name")
+    component_pct: Optional[float] = Field(None, description="Component percentage of the map unit (comppct_r)")
+    soil_quality_indices: SoilQualityIndices = Field(..., description="SQI scores of the component")
+
+
+class MapUnitRating(BaseModel):
+    """Area-weighted SQI scores over all components of a SSURGO map unit."""
+    mukey: str = Field(..., description="SSURGO map unit key")
+    soil_quality_indices: SoilQualityIndices = Field(
+        ..., description="Component SQIs and SR weighted by comppct_r"
+    )
+    component_pct_total: Optional[float] = Field(
+        None, description="Percentage of the map unit covered by the scored components"
+    )
+    components: List[ComponentRating] = Field(..., description="Scores of each component, by comppct_r")
+
+
 class DataSources(BaseModel):
     """Information about data sources used in calculation."""
     ssurgo_used: bool = Field(..., description="Whether SSURGO data was used")
@@ -295,10 +384,17 @@ class DataSources(BaseModel):
     ssurgo_component_pct: Optional[float] = Field(None, description="SSURGO component percentage (comppct_r)")
     ssurgo_map_unit: Optional[str] = Field(None, description="SSURGO map unit key")
     ssurgo_total_components: Optional[int] = Field(None, description="Total components in map unit")
+    ssurgo_survey_area: Optional[str] = Field(None, description="SSURGO survey area symbol (areasymbol)")
+    ssurgo_survey_version: Optional[str] = Field(
+        None, description="SSURGO survey area version date (sacatalog saverest)"
+    )
     user_plot_data_used: bool = Field(False, description="Whether user plot data was integrated")
     user_site_data_used: bool = Field(False, description="Whether user site data was integrated")
     user_lab_data_used: bool = Field(False, description="Whether user lab data was integrated")
     horizons_count: int = Field(..., description="Number of soil horizons analyzed")
+    slope_source: Optional[str] = Field(
+        None, description="Source of the slope value (site, component, dem, epqs or default)"
+    )
 
 
 class CropInfo(BaseModel):
@@ -419,6 +515,14 @@ class CalculationResponse(BaseModel):
     location: Location = Field(..., description="Location coordinates")
     crop_info: CropInfo = Field(..., description="Crop calculation parameters")
     soil_quality_indices: SoilQualityIndices = Field(..., description="Calculated SQI scores")
+    uncertainty: Optional[SQIUncertainty] = Field(
+        None,
+        description="SQI uncertainty bands (only when uncertainty_draws was requested)"
+    )
+    map_unit: Optional[MapUnitRating] = Field(
+        None,
+        description="Per-component and area-weighted map unit SQIs (only when map_unit_rating was requested)"
+    )
     interpretations: Optional[InterpretationResponse] = Field(
         None,
         description="Detailed interpretations of soil quality indices and suitability ratings"
@@ -426,6 +530,14 @@ class CalculationResponse(BaseModel):
     data_sources: DataSources = Field(..., description="Data sources used")
     metadata: CalculationMetadata = Field(..., description="Calculation metadata")
     message: Optional[str] = Field(None, description="Additional information or warnings")
+    profile_id: Optional[str] = Field(
+        None,
+        description="Handle of the prepared soil profile for what-if recalculations (/api/v1/calculate/what-if)"
+    )
+    recalculated_indices: Optional[List[str]] = Field(
+        None,
+        description="SQIs recomputed by a what-if call (the others were unaffected by the changes)"
+    )
 
 
 class ErrorResponse(BaseModel):
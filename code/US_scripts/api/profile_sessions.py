@@ -0,0 +1,123 @@
+"""
+What-if profile sessions for interactive recalculation.
+
+Every /api/v1/calculate response carries a profile_id bound to the prepared
+SSURGO profile of that request (dominant component, phases, slope). What-if
+calls send the profile_id and only the user-data deltas; the service merges
+them into the session's user data, re-applies it to the stored profile and
+rescores just the SQIs whose input properties changed
+(GAEZ_SQI_functions.PROPERTY_SQI_DEPENDENCIES). No SSURGO query, phase
+classification or requirement-table read is repeated.
+
+Sessions live in memory, are dropped after gaez_config.profile_session_ttl
+seconds without use and, beyond gaez_config.profile_session_max sessions,
+least recently used first.
+"""
+
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from .models import CalculationRequest, UserData, UserDataDelta, PlotDataHorizon, LabData, SiteData
+
+
+@dataclass
+class ProfileSession:
+    """Prepared profile and last calculation state of one what-if session."""
+    request: CalculationRequest          # last request, with the merged user data
+    base_data: pd.DataFrame              # SSURGO profile after phases and slope, before user data
+    working_data: pd.DataFrame           # profile with the user data of the last calculation
+    data_sources: Dict[str, Any]         # data source info of the SSURGO profile
+    depth_weight_type: int
+    scores: Dict[str, Any]               # SQ1-SQ7 of the last calculation
+    requirements: Optional[Dict[str, Any]] = None  # crop requirement tables, loaded on first what-if
+    profile_id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+    last_used: float = field(default_factory=time.monotonic)
+
+
+class ProfileSessionStore:
+    """Thread-safe in-memory sessions with idle expiry and an LRU size bound."""
+
+    def __init__(self, max_sessions: int, ttl_seconds: float):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions: 'OrderedDict[str, ProfileSession]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, session: ProfileSession) -> str:
+        """Store a session and return its profile_id."""
+        with self._lock:
+            self._expire()
+            self._sessions[session.profile_id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session.profile_id
+
+    def get(self, profile_id: str) -> Optional[ProfileSession]:
+        """Live session for profile_id (its idle timer is reset), or None."""
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(profile_id)
+            if session is not None:
+                session.last_used = time.monotonic()
+                self._sessions.move_to_end(profile_id)
+            return session
+
+    def _expire(self) -> None:
+        cutoff = time.monotonic() - self.ttl_seconds
+        while self._sessions:
+            profile_id, session = next(iter(self._sessions.items()))
+            if session.last_used >= cutoff:
+                break
+            del self._sessions[profile_id]
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._sessions)
+
+
+def _merge_records(current: Optional[List], delta: Optional[List], key: str, model) -> Optional[List]:
+    """Fields set in delta records override the current record with the same key; new keys are appended."""
+    if delta is None:
+        return current
+    merged = OrderedDict((getattr(record, key), record.model_dump()) for record in current or [])
+    for record in delta:
+        merged.setdefault(getattr(record, key), {}).update(record.model_dump(exclude_unset=True))
+    return [model(**values) for values in merged.values()]
+
+
+def merge_user_data(current: Optional[UserData], delta: Optional[UserDataDelta]) -> Optional[UserData]:
+    """
+    Apply what-if deltas to a session's user data.
+
+    Plot horizons are matched by horizon_id and lab samples by sample_id; only
+    the fields set in the delta replace the stored values (an explicit null
+    clears one), so a delta to an existing horizon needs no depths. Site data
+    fields are merged the same way.
+
+    Raises:
+        pydantic.ValidationError: If a merged record is invalid (e.g. a new horizon
+            without depths, or texture no longer summing to 100)
+    """
+    if delta is None:
+        return current
+    if current is None:
+        current = UserData()
+
+    site_data = current.site_data
+    if delta.site_data is not None:
+        values = site_data.model_dump() if site_data is not None else {}
+        values.update(delta.site_data.model_dump(exclude_unset=True))
+        site_data = SiteData(**values)
+
+    return UserData(
+        plot_data=_merge_records(current.plot_data, delta.plot_data, 'horizon_id', PlotDataHorizon),
+        site_data=site_data,
+        lab_data=_merge_records(current.lab_data, delta.lab_data, 'sample_id', LabData),
+    )
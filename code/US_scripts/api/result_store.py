@@ -0,0 +1,271 @@
+"""
+Content-addressed store of serialized calculation responses.
+
+Requests without user data are fully determined by their normalized fields
+and by the versions of the inputs behind them (crop requirement tables,
+SSURGO data, the local mukey grid and DEM tiles, the slope source order and
+the pipeline code). request_fingerprint hashes all of these into one
+key. The stored response bytes are returned as-is for repeats of the request,
+skipping the pipeline and response serialization. The key doubles as the
+HTTP ETag, so clients holding it get 304 Not Modified. Degraded responses
+(is_storable) are not stored. For SDA, each entry
+records the survey area and version it was computed from; when the survey
+catalog (GAEZ_survey_versions) reports a newer version of that area, the
+entry is no longer served. Results of other areas are unaffected.
+
+Entries are kept in an in-memory LRU (gaez_config.result_store_size). With
+gaez_config.result_store_dir set (GAEZ_RESULT_STORE) they are also written
+to disk, so they survive restarts and are shared by worker processes. Any
+version change yields new keys; old entries are no longer hit and are
+deleted once older than gaez_config.result_store_max_age or beyond
+gaez_config.result_store_disk_size files.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import GAEZ_dem_tiles
+import GAEZ_mukey_raster
+import gaez_config
+from GAEZ_survey_versions import get_survey_catalog
+
+from .models import CalculationRequest, CalculationResponse
+
+logger = logging.getLogger(__name__)
+
+# Pipeline sources whose content defines the code version of stored results
+_CODE_GLOBS = ['GAEZ_*.py', 'gaez_config.py', 'integrate_user_data.py', 'overlay_user_horizons.py',
+               'lightweight_interpolate.py', 'api/*.py']
+
+
+def _hash_sources() -> str:
+    root = Path(__file__).parent.parent
+    digest = hashlib.sha256()
+    for path in sorted({p for pattern in _CODE_GLOBS for p in root.glob(pattern)}):
+        digest.update(path.relative_to(root).as_posix().encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()[:16]
+
+
+# Hashed at import, so no request handler reads the sources
+_CODE_VERSION = _hash_sources()
+
+
+def code_version() -> str:
+    """Hash of the calculation pipeline sources (computed once per process, at import)."""
+    return _CODE_VERSION
+
+
+def _file_version(path: str) -> str:
+    """Size and modification time of a data file ('missing' if absent)."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return 'missing'
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+
+def data_versions() -> Dict[str, str]:
+    """Versions of the inputs behind a calculation result."""
+    requirements = [gaez_config.profile_req_url, gaez_config.phase_req_url, gaez_config.drainage_req_url,
+                    gaez_config.texture_req_url, gaez_config.terrain_req_url]
+    ssurgo = f"{gaez_config.ssurgo_source}:{gaez_config.ssurgo_data_version}"
+    if gaez_config.ssurgo_source == 'mirror':
+        ssurgo += f":{_file_version(gaez_config.ssurgo_mirror_path)}"
+    return {
+        'code': code_version(),
+        'requirements': ','.join(_file_version(path) for path in requirements),
+        'ssurgo': ssurgo,
+        'mukey_grid': _file_version(os.path.join(gaez_config.mukey_grid_dir, GAEZ_mukey_raster.INDEX_FILE)),
+        'dem': _file_version(os.path.join(gaez_config.dem_tile_dir, GAEZ_dem_tiles.INDEX_FILE)),
+        'slope_sources': ','.join(gaez_config.slope_sources),
+    }
+
+
+def is_storable(request: CalculationRequest, response: CalculationResponse) -> bool:
+    """
+    False for degraded responses, which must not be served to repeats: a requested
+    uncertainty or map unit block that failed (the service returns None for it),
+    or a slope that fell back to the default because no source answered.
+    """
+    if request.uncertainty_draws and response.uncertainty is None:
+        return False
+    if request.map_unit_rating and response.map_unit is None:
+        return False
+    return response.data_sources.slope_source != 'default'
+
+
+def request_fingerprint(request: CalculationRequest) -> Optional[str]:
+    """
+    Content address of a calculation request, or None if it is not cacheable.
+
+    Requests with user data are not cacheable: they are one-off field
+    measurements, and their responses start what-if sessions.
+    """
+    if request.user_data is not None:
+        return None
+    canonical = json.dumps({'request': request.model_dump(mode='json'), 'versions': data_versions()},
+                           sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+Survey = Tuple[str, str]
+
+
+def _survey_is_current(survey: Optional[Survey]) -> bool:
+    """False if the catalog knows a newer version of the survey area behind an entry."""
+    if survey is None or gaez_config.ssurgo_source == 'mirror':
+        return True
+    area, version = survey
+    known = get_survey_catalog().version(area)
+    return known is None or known == version
+
+
+class ResultStore:
+    """
+    Thread-safe LRU of response bytes by fingerprint, optionally backed by a directory.
+
+    Each entry may record the SSURGO survey area and version it was computed
+    from. Entries whose survey area has since been republished (per the survey
+    catalog) are misses, so a refresh only retires results of the changed areas.
+    On disk the survey is a JSON header line in front of the body.
+
+    Disk entries older than max_age seconds are not served, and prune() deletes
+    them along with the oldest files beyond disk_max_entries (0 disables either
+    bound). prune() runs when the store is created and every PRUNE_INTERVAL puts.
+    """
+
+    PRUNE_INTERVAL = 500
+
+    def __init__(self, max_entries: int, directory: Optional[str] = None,
+                 disk_max_entries: int = gaez_config.result_store_disk_size,
+                 max_age: float = gaez_config.result_store_max_age):
+        self.max_entries = max_entries
+        self.directory = directory
+        self.disk_max_entries = disk_max_entries
+        self.max_age = max_age
+        self._entries: 'OrderedDict[str, Tuple[bytes, Optional[Survey]]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0, 'disk_evictions': 0}
+        self._puts_since_prune = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.prune()
+
+    def _path(self, fingerprint: str) -> str:
+        return os.path.join(self.directory, fingerprint[:2], f"{fingerprint}.entry")
+
+    def _expired(self, mtime: float) -> bool:
+        return self.max_age > 0 and time.time() - mtime > self.max_age
+
+    def _read(self, fingerprint: str) -> Optional[Tuple[bytes, Optional[Survey]]]:
+        try:
+            with open(self._path(fingerprint), 'rb') as f:
+                if self._expired(os.fstat(f.fileno()).st_mtime):
+                    return None
+                header = json.loads(f.readline())
+                body = f.read()
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as err:
+            logger.warning(f"Result store {self.directory}: read failed: {err}")
+            return None
+        survey = header.get('survey')
+        return body, tuple(survey) if survey else None
+
+    def get(self, fingerprint: str) -> Optional[bytes]:
+        """Stored response bytes, or None (also for entries of a republished survey area)."""
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            if entry is not None:
+                if _survey_is_current(entry[1]):
+                    self._entries.move_to_end(fingerprint)
+                    self._counters['hits'] += 1
+                    return entry[0]
+                del self._entries[fingerprint]
+                self._counters['misses'] += 1
+                return None
+        entry = self._read(fingerprint) if self.directory else None
+        if entry is not None and _survey_is_current(entry[1]):
+            self._remember(fingerprint, *entry)
+            with self._lock:
+                self._counters['disk_hits'] += 1
+            return entry[0]
+        with self._lock:
+            self._counters['misses'] += 1
+        return None
+
+    def put(self, fingerprint: str, body: bytes, survey: Optional[Survey] = None) -> None:
+        """Store response bytes under their fingerprint, with the (areasymbol, saverest) behind them."""
+        self._remember(fingerprint, body, survey)
+        with self._lock:
+            self._counters['stores'] += 1
+        if self.directory:
+            path = self._path(fingerprint)
+            header = json.dumps({'survey': list(survey)} if survey else {}).encode() + b'\n'
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(header)
+                    f.write(body)
+                os.replace(tmp, path)
+            except OSError as err:
+                logger.warning(f"Result store {self.directory}: write failed: {err}")
+            with self._lock:
+                self._puts_since_prune += 1
+                due = self._puts_since_prune >= self.PRUNE_INTERVAL
+                if due:
+                    self._puts_since_prune = 0
+            if due:
+                self.prune()
+
+    def prune(self) -> int:
+        """Delete expired disk entries and the oldest beyond disk_max_entries; returns the number deleted."""
+        if not self.directory:
+            return 0
+        files = []
+        for path in Path(self.directory).glob('*/*.entry'):
+            try:
+                files.append((path.stat().st_mtime, path))
+            except OSError:
+                continue
+        files.sort(reverse=True)
+        removed = 0
+        for rank, (mtime, path) in enumerate(files):
+            if self._expired(mtime) or 0 < self.disk_max_entries <= rank:
+                try:
+                    path.unlink()
+                    removed += 1
+                except OSError:
+                    continue
+        with self._lock:
+            self._counters['disk_evictions'] += removed
+        if removed:
+            logger.info(f"Result store {self.directory}: pruned {removed} entries")
+        return removed
+
+    def _remember(self, fingerprint: str, body: bytes, survey: Optional[Survey] = None) -> None:
+        with self._lock:
+            self._entries[fingerprint] = (body, survey)
+            self._entries.move_to_end(fingerprint)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, int]:
+        """Hits (memory and disk), misses, stores, disk evictions and current in-memory entries."""
+        with self._lock:
+            counters = dict(self._counters)
+            counters['entries'] = len(self._entries)
+        return counters
@@ -12,26 +12,9 @@ import math
 
 import pandas as pd
 
-# Optional geospatial imports (may not be available in lightweight deployments)
-try:
-    import geopandas as gpd
-    from shapely.geometry import Point, box
-    GEOSPATIAL_AVAILABLE = True
-except ImportError:
-    GEOSPATIAL_AVAILABLE = False
-    # Provide minimal fallback
-    class Point:
-        def __init__(self, x, y):
-            self.x = x
-            self.y = y
-    class box:
-        @staticmethod
-        def __call__(minx, miny, maxx, maxy):
-            return {"bounds": [minx, miny, maxx, maxy]}
-
 # Import lightweight elevation/slope functions (no geospatial packages needed)
 try:
-    from GAEZ_elevation_slope import get_slope_for_gaez
+    from GAEZ_elevation_slope import get_slope_for_gaez, resolve_slope
     SLOPE_API_AVAILABLE = True
 except ImportError:
     SLOPE_API_AVAILABLE = False
@@ -71,6 +54,10 @@ import GAEZ_SQI_functions
 import GAEZ_US_phase_calc
 import GAEZ_crop_req
 import GAEZ_soil_data_processing
+import GAEZ_SQI_uncertainty
+import gaez_config
+from GAEZ_SSURGO_data import first_value
+from GAEZ_singleflight import get_flight_group
 
 # Import lightweight SDA query functions (no geospatial dependencies)
 try:
@@ -80,6 +67,13 @@ except ImportError:
     SDA_QUERY_AVAILABLE = False
     logger.warning("GAEZ_SDA_query not available - falling back to WCS method")
 
+# Import local mukey grid lookup (memory-mapped tiles, numpy only)
+try:
+    from GAEZ_mukey_raster import get_mukey_grid
+    MUKEY_GRID_AVAILABLE = True
+except ImportError:
+    MUKEY_GRID_AVAILABLE = False
+
 # Import user horizon overlay function (new API-specific data integration)
 try:
     from overlay_user_horizons import overlay_user_horizons
@@ -106,9 +100,14 @@ from .models import (
     Location,
     CropListResponse,
     CropListItem,
-    InterpretationResponse
+    InterpretationResponse,
+    SQIUncertainty,
+    MapUnitRating,
+    ComponentRating,
+    WhatIfRequest
 )
 from .interpretation import generate_interpretation
+from .profile_sessions import ProfileSession, ProfileSessionStore, merge_user_data
 
 logger = logging.getLogger(__name__)
 
@@ -192,6 +191,11 @@ class CalculationServiceError(GAEZCalculationError):
     pass
 
 
+class ProfileSessionError(GAEZCalculationError):
+    """Exception for unknown or expired what-if profile sessions."""
+    pass
+
+
 class GAEZCalculationService:
     """
     Service for orchestrating GAEZ soil quality index calculations.
@@ -201,6 +205,8 @@ class GAEZCalculationService:
     def __init__(self):
         """Initialize the GAEZ calculation service."""
         self.api_version = "0.1.0"
+        self.profile_sessions = ProfileSessionStore(gaez_config.profile_session_max,
+                                                    gaez_config.profile_session_ttl)
         logger.info("GAEZCalculationService initialized")
 
     def calculate_soil_quality(self, request: CalculationRequest) -> CalculationResponse:
@@ -226,7 +232,8 @@ class GAEZCalculationService:
             ssurgo_data, mukey_info = self._fetch_ssurgo_data(
                 request.location,
                 request.ssurgo_database,
-                request.ssurgo_resolution
+                request.ssurgo_resolution,
+                include_ranges=request.uncertainty_draws is not None
             )
 
             if ssurgo_data is None or len(ssurgo_data) == 0:
@@ -239,62 +246,31 @@ class GAEZCalculationService:
             logger.info("Classifying soil phases")
             ssurgo_with_phases = GAEZ_US_phase_calc.classify_gaez_v4_phases(ssurgo_data)
 
-            # Step 2.5: Add slope data if missing and API is available
-            if 'slope' not in ssurgo_with_phases.columns or ssurgo_with_phases['slope'].isna().all():
-                if SLOPE_API_AVAILABLE:
-                    try:
-                        logger.info("Fetching slope data from USGS API")
-                        slope = get_slope_for_gaez(
-                            request.location.latitude,
-                            request.location.longitude,
-                            method='simple'
-                        )
-                        ssurgo_with_phases['slope'] = slope
-                        logger.info(f"Added slope data: {slope}%")
-                    except Exception as e:
-                        logger.warning(f"Failed to fetch slope: {str(e)}, defaulting to 0")
-                        ssurgo_with_phases['slope'] = 0.0
-                else:
-                    logger.warning("Slope data not available, defaulting to 0")
-                    ssurgo_with_phases['slope'] = 0.0
+            # Step 2.5: Slope from the first available source: user site data,
+            # SSURGO component slope_r, local DEM, then the EPQS network call
+            slope, slope_source = self._resolve_slope(request, ssurgo_with_phases)
+            ssurgo_with_phases['slope'] = slope
 
             # Step 3: Integrate user data if provided
-            working_data = ssurgo_with_phases.copy()
-            data_sources_info = {
+            base_sources = {
                 'ssurgo_used': True,
                 'ssurgo_component': mukey_info.get('component_name'),
                 'ssurgo_cokey': mukey_info.get('cokey'),
                 'ssurgo_component_pct': mukey_info.get('component_pct'),
                 'ssurgo_map_unit': mukey_info.get('mukey'),
                 'ssurgo_total_components': mukey_info.get('total_components'),
+                'ssurgo_survey_area': mukey_info.get('survey_area'),
+                'ssurgo_survey_version': mukey_info.get('survey_version'),
                 'user_plot_data_used': False,
                 'user_site_data_used': False,
                 'user_lab_data_used': False,
-                'horizons_count': len(ssurgo_with_phases)
+                'horizons_count': len(ssurgo_with_phases),
+                'slope_source': slope_source
             }
-
-            if request.user_data:
-                if USER_INTEGRATION_AVAILABLE:
-                    # New unified integration: Lab > Plot/Site > Map priority
-                    logger.info("Integrating user data with priority: Lab > Plot/Site > Map")
-                    working_data, user_sources = integrate_all_user_data(
-                        request.user_data,
-                        working_data
-                    )
-                    # Update data sources info
-                    data_sources_info.update(user_sources)
-                    data_sources_info['horizons_count'] = len(working_data)
-                else:
-                    # Fallback: use legacy integration (deprecated)
-                    logger.warning("Using legacy data integration - may not work correctly with API")
-                    working_data, data_sources_info = self._integrate_user_data(
-                        working_data,
-                        request.user_data,
-                        data_sources_info
-                    )
+            working_data, data_sources_info = self._apply_user_data(request, ssurgo_with_phases, base_sources)
 
             # Step 4: Determine depth weight type
-            depth_weight_type = self._get_depth_weight_type(
+            depth_weight_type = self.get_depth_weight_type(
                 request.crop_id,
                 request.depth_weight_type
             )
@@ -311,83 +287,275 @@ class GAEZCalculationService:
             if sqi_results is None or len(sqi_results) == 0:
                 raise CalculationServiceError("SQI calculation returned no results")
 
-            # Step 6: Extract results (using first row if multiple components)
-            sqi_row = sqi_results.iloc[0]
-
-            soil_quality_indices = SoilQualityIndices(
-                SQ1=_safe_float(sqi_row.get('SQ1')),
-                SQ2=_safe_float(sqi_row.get('SQ2')),
-                SQ3=_safe_float(sqi_row.get('SQ3')),
-                SQ4=_safe_float(sqi_row.get('SQ4')),
-                SQ5=_safe_float(sqi_row.get('SQ5')),
-                SQ6=_safe_float(sqi_row.get('SQ6')),
-                SQ7=_safe_float(sqi_row.get('SQ7')),
-                SR=_safe_float(sqi_row.get('SR'))
-            )
+            # Step 5.5: Optional uncertainty bands from SSURGO low/high ranges
+            uncertainty = None
+            if request.uncertainty_draws:
+                uncertainty = self._calculate_uncertainty(
+                    working_data, request.crop_id, request.input_level.value,
+                    depth_weight_type, request.uncertainty_draws
+                )
 
-            # Step 7: Generate interpretations
-            logger.info("Generating soil quality interpretations")
-            scores_dict = {
-                'SQ1': soil_quality_indices.SQ1,
-                'SQ2': soil_quality_indices.SQ2,
-                'SQ3': soil_quality_indices.SQ3,
-                'SQ4': soil_quality_indices.SQ4,
-                'SQ5': soil_quality_indices.SQ5,
-                'SQ6': soil_quality_indices.SQ6,
-                'SQ7': soil_quality_indices.SQ7,
-                'SR': soil_quality_indices.SR
-            }
+            # Step 5.6: Optional ratings of every component of the map unit
+            map_unit = None
+            if request.map_unit_rating:
+                map_unit = self._calculate_map_unit_rating(
+                    mukey_info.get('map_unit_data'), request.crop_id,
+                    request.input_level.value, depth_weight_type
+                )
 
-            crop_name = CROP_NAMES.get(request.crop_id, f"Crop {request.crop_id}")
-            interpretations = generate_interpretation(
-                scores=scores_dict,
-                input_level=request.input_level.value,
-                crop_id=request.crop_id,
-                crop_name=crop_name,
-                soil_data=working_data
-            )
+            # Steps 6-8: Scores, interpretations and response
+            response = self._build_response(request, sqi_results, working_data, data_sources_info,
+                                            depth_weight_type, uncertainty, start_time)
+            response.map_unit = map_unit
+
+            # Keep the prepared profile for what-if recalculations
+            response.profile_id = self.profile_sessions.add(ProfileSession(
+                request=request,
+                base_data=ssurgo_with_phases,
+                working_data=working_data,
+                data_sources=base_sources,
+                depth_weight_type=depth_weight_type,
+                scores=self._sqi_scores(sqi_results)
+            ))
 
-            # Step 8: Build response
-            processing_time = time.time() - start_time
+            logger.info(f"Calculation completed successfully in {response.metadata.processing_time_seconds:.2f}s")
+            return response
 
-            crop_info = CropInfo(
-                crop_id=request.crop_id,
-                crop_name=CROP_NAMES.get(request.crop_id, f"Crop {request.crop_id}"),
-                input_level=request.input_level.value,
-                depth_weight_type=depth_weight_type,
-                rooting_depth_description=DEPTH_DESCRIPTIONS[depth_weight_type]
-            )
+        except Exception as e:
+            logger.error(f"Calculation failed: {str(e)}", exc_info=True)
+            raise
+
+    def recalculate_what_if(self, request: WhatIfRequest) -> CalculationResponse:
+        """
+        What-if recalculation of a profile from an earlier calculation.
+
+        The user-data deltas are merged into the session's user data and applied
+        to the stored SSURGO profile; only the SQIs reading a changed property
+        are recomputed (uncertainty bands are not recomputed).
 
-            metadata = CalculationMetadata(
-                calculation_timestamp=datetime.utcnow().isoformat() + 'Z',
-                api_version=self.api_version,
-                gaez_version="4.0",
-                processing_time_seconds=round(processing_time, 3)
+        Args:
+            request: WhatIfRequest with the profile_id and the user-data changes
+
+        Returns:
+            CalculationResponse with the updated scores and the recalculated indices
+
+        Raises:
+            ProfileSessionError: If the profile_id is unknown or expired
+            ValueError: If the merged user data is invalid
+        """
+        start_time = time.time()
+        session = self.profile_sessions.get(request.profile_id)
+        if session is None:
+            raise ProfileSessionError(
+                f"Unknown or expired profile_id {request.profile_id}; run a new calculation"
             )
 
-            response = CalculationResponse(
-                status="success",
-                location=request.location,
-                crop_info=crop_info,
-                soil_quality_indices=soil_quality_indices,
-                interpretations=interpretations,
-                data_sources=DataSources(**data_sources_info),
-                metadata=metadata,
-                message=self._generate_result_message(sqi_results, data_sources_info)
+        with session.lock:
+            user_data = merge_user_data(session.request.user_data, request.user_data)
+            calc_request = session.request.model_copy(update={'user_data': user_data})
+
+            # Slope is only re-resolved when the site slope changed
+            base_data, base_sources = session.base_data, session.data_sources
+            if self._site_slope(calc_request) != self._site_slope(session.request):
+                base_data = base_data.copy()
+                slope, slope_source = self._resolve_slope(calc_request, base_data)
+                base_data['slope'] = slope
+                base_sources = dict(base_sources, slope_source=slope_source)
+
+            working_data, data_sources_info = self._apply_user_data(calc_request, base_data, base_sources)
+
+            before = GAEZ_SQI_functions.prepare_sqi_data(session.working_data)
+            after = GAEZ_SQI_functions.prepare_sqi_data(working_data)
+            sqis = GAEZ_SQI_functions.affected_sqis(GAEZ_SQI_functions.changed_properties(before, after))
+            logger.info(f"What-if on profile {session.profile_id}: recalculating {sqis or 'no indices'}")
+
+            if session.requirements is None:
+                session.requirements = GAEZ_SQI_functions.load_sqi_requirements(
+                    calc_request.crop_id, calc_request.input_level.value
+                )
+            sqi_results = GAEZ_SQI_functions.rescore_sqis(
+                after, session.scores, sqis, session.requirements,
+                calc_request.input_level.value, session.depth_weight_type
             )
 
-            logger.info(f"Calculation completed successfully in {processing_time:.2f}s")
-            return response
+            session.request = calc_request
+            session.base_data, session.data_sources = base_data, base_sources
+            session.working_data = working_data
+            session.scores = self._sqi_scores(sqi_results)
+
+        response = self._build_response(calc_request, sqi_results, working_data, data_sources_info,
+                                        session.depth_weight_type, None, start_time)
+        response.profile_id = session.profile_id
+        response.recalculated_indices = sqis
+        return response
+
+    def _apply_user_data(
+        self,
+        request: CalculationRequest,
+        base_data: pd.DataFrame,
+        base_sources: Dict[str, Any]
+    ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Apply the request's user data to a copy of the prepared SSURGO profile.
+
+        Returns:
+            Tuple of (working DataFrame, data sources info)
+        """
+        working_data = base_data.copy()
+        data_sources_info = dict(base_sources)
+
+        if request.user_data:
+            if USER_INTEGRATION_AVAILABLE:
+                # New unified integration: Lab > Plot/Site > Map priority
+                logger.info("Integrating user data with priority: Lab > Plot/Site > Map")
+                working_data, user_sources = integrate_all_user_data(
+                    request.user_data,
+                    working_data
+                )
+                # Update data sources info
+                data_sources_info.update(user_sources)
+                data_sources_info['horizons_count'] = len(working_data)
+            else:
+                # Fallback: use legacy integration (deprecated)
+                logger.warning("Using legacy data integration - may not work correctly with API")
+                working_data, data_sources_info = self._integrate_user_data(
+                    working_data,
+                    request.user_data,
+                    data_sources_info
+                )
+
+        return working_data, data_sources_info
+
+    @staticmethod
+    def _sqi_scores(sqi_results: pd.DataFrame) -> Dict[str, Any]:
+        """SQ1-SQ7 of the first result row (kept for what-if rescoring)."""
+        sqi_row = sqi_results.iloc[0]
+        return {name: sqi_row.get(name) for name in ('SQ1', 'SQ2', 'SQ3', 'SQ4', 'SQ5', 'SQ6', 'SQ7')}
 
+    @staticmethod
+    def _site_slope(request: CalculationRequest) -> Optional[float]:
+        """Slope recorded in the request's user site data, if any."""
+        if request.user_data is not None and request.user_data.site_data is not None:
+            return request.user_data.site_data.slope_pct
+        return None
+
+    def _build_response(
+        self,
+        request: CalculationRequest,
+        sqi_results: pd.DataFrame,
+        working_data: pd.DataFrame,
+        data_sources_info: Dict[str, Any],
+        depth_weight_type: int,
+        uncertainty: Optional[SQIUncertainty],
+        start_time: float
+    ) -> CalculationResponse:
+        """Scores, interpretations and metadata of a finished calculation."""
+        # Step 6: Extract results (using first row if multiple components)
+        sqi_row = sqi_results.iloc[0]
+
+        soil_quality_indices = SoilQualityIndices(
+            SQ1=_safe_float(sqi_row.get('SQ1')),
+            SQ2=_safe_float(sqi_row.get('SQ2')),
+            SQ3=_safe_float(sqi_row.get('SQ3')),
+            SQ4=_safe_float(sqi_row.get('SQ4')),
+            SQ5=_safe_float(sqi_row.get('SQ5')),
+            SQ6=_safe_float(sqi_row.get('SQ6')),
+            SQ7=_safe_float(sqi_row.get('SQ7')),
+            SR=_safe_float(sqi_row.get('SR'))
+        )
+
+        # Step 7: Generate interpretations
+        logger.info("Generating soil quality interpretations")
+        scores_dict = {
+            'SQ1': soil_quality_indices.SQ1,
+            'SQ2': soil_quality_indices.SQ2,
+            'SQ3': soil_quality_indices.SQ3,
+            'SQ4': soil_quality_indices.SQ4,
+            'SQ5': soil_quality_indices.SQ5,
+            'SQ6': soil_quality_indices.SQ6,
+            'SQ7': soil_quality_indices.SQ7,
+            'SR': soil_quality_indices.SR
+        }
+
+        crop_name = CROP_NAMES.get(request.crop_id, f"Crop {request.crop_id}")
+        interpretations = generate_interpretation(
+            scores=scores_dict,
+            input_level=request.input_level.value,
+            crop_id=request.crop_id,
+            crop_name=crop_name,
+            soil_data=working_data
+        )
+
+        # Step 8: Build response
+        processing_time = time.time() - start_time
+
+        crop_info = CropInfo(
+            crop_id=request.crop_id,
+            crop_name=CROP_NAMES.get(request.crop_id, f"Crop {request.crop_id}"),
+            input_level=request.input_level.value,
+            depth_weight_type=depth_weight_type,
+            rooting_depth_description=DEPTH_DESCRIPTIONS[depth_weight_type]
+        )
+
+        metadata = CalculationMetadata(
+            calculation_timestamp=datetime.utcnow().isoformat() + 'Z',
+            api_version=self.api_version,
+            gaez_version="4.0",
+            processing_time_seconds=round(processing_time, 3)
+        )
+
+        response = CalculationResponse(
+            status="success",
+            location=request.location,
+            crop_info=crop_info,
+            soil_quality_indices=soil_quality_indices,
+            uncertainty=uncertainty,
+            interpretations=interpretations,
+            data_sources=DataSources(**data_sources_info),
+            metadata=metadata,
+            message=self._generate_result_message(sqi_results, data_sources_info)
+        )
+
+        return response
+
+    def _resolve_slope(self, request: CalculationRequest, soil_data: pd.DataFrame) -> Tuple[float, str]:
+        """
+        Slope (%) for the request location and the source it came from.
+
+        Args:
+            request: Calculation request (location and optional user site data)
+            soil_data: Dominant-component SSURGO horizons (slope_r if queried)
+
+        Returns:
+            Tuple of (slope %, source name)
+        """
+        site_slope = self._site_slope(request)
+        component_slope = None
+        if 'slope_r' in soil_data.columns:
+            slopes = pd.to_numeric(soil_data['slope_r'], errors='coerce').dropna()
+            component_slope = slopes.iloc[0] if len(slopes) else None
+
+        if not SLOPE_API_AVAILABLE:
+            logger.warning("Slope sources not available, using site/component slope or 0")
+            for source, value in (('site', site_slope), ('component', component_slope)):
+                if value is not None:
+                    return float(value), source
+            return 0.0, 'default'
+
+        try:
+            return resolve_slope(request.location.latitude, request.location.longitude,
+                                 site_slope=site_slope, component_slope=component_slope,
+                                 fetch_slope=get_slope_for_gaez)
         except Exception as e:
-            logger.error(f"Calculation failed: {str(e)}", exc_info=True)
-            raise
+            logger.warning(f"Failed to resolve slope: {str(e)}, defaulting to 0")
+            return 0.0, 'default'
 
     def _fetch_ssurgo_data(
         self,
         location: Location,
         database: str = 'gssurgo',
-        resolution: int = 30
+        resolution: int = 30,
+        include_ranges: bool = False
     ) -> Tuple[Optional[pd.DataFrame], Dict[str, Any]]:
         """
         Fetch SSURGO data for a point location.
@@ -396,6 +564,7 @@ class GAEZCalculationService:
             location: Geographic coordinates
             database: SSURGO database identifier
             resolution: Spatial resolution in meters
+            include_ranges: Also fetch SSURGO low/high values (for uncertainty bands)
 
         Returns:
             Tuple of (DataFrame with soil data, dict with mukey info)
@@ -403,67 +572,51 @@ class GAEZCalculationService:
         try:
             logger.info(f"Fetching SSURGO data from {database} for ({location.latitude}, {location.longitude})")
 
-            # Try lightweight SDA query first (no heavy geospatial packages needed)
-            if SDA_QUERY_AVAILABLE:
-                try:
-                    logger.info("Using lightweight SDA query (no geospatial packages)")
-                    mukey = get_dominant_mukey_at_point(location.latitude, location.longitude)
-                    
-                    if mukey is None:
-                        logger.warning("No mukey found at location using SDA query")
-                        return None, {'mukey_count': 0, 'mukeys': [], 'method': 'sda_query'}
-                    
-                    mukeys = [mukey]
-                    logger.info(f"Found mukey {mukey} using SDA query")
-                    
-                except Exception as e:
-                    logger.warning(f"SDA query failed: {str(e)}, falling back to WCS method")
-                    mukeys = None
-            else:
-                mukeys = None
-
-            # Fallback to WCS method if SDA query not available or failed
-            if mukeys is None:
-                if not GEOSPATIAL_AVAILABLE:
-                    raise SSURGODataError(
-                        "Neither SDA query nor geospatial libraries (geopandas/rasterio) are available. "
-                        "Cannot fetch SSURGO data. Please provide soil data directly via user_horizons parameter."
-                    )
-                
-                logger.info("Using WCS method (requires geospatial packages)")
-                # Create point geometry and small buffer for AOI
-                point = Point(location.longitude, location.latitude)
-                aoi_gdf = gpd.GeoDataFrame(
-                    {'geometry': [point.buffer(0.001)]},  # Small buffer (~100m)
-                    crs="EPSG:4326"
+            mukeys = None
+
+            # Local memory-mapped mukey grid first (array index, no network)
+            if MUKEY_GRID_AVAILABLE:
+                grid = get_mukey_grid()
+                if grid is not None:
+                    mukey = grid.mukey_at(location.latitude, location.longitude)
+                    if mukey is not None:
+                        mukeys = [mukey]
+                        logger.info(f"Found mukey {mukey} in local mukey grid")
+                    else:
+                        logger.info("Location not covered by local mukey grid, querying SDA")
+
+            # Lightweight SDA spatial query (no heavy geospatial packages needed)
+            if mukeys is None and SDA_QUERY_AVAILABLE:
+                logger.info("Using lightweight SDA query (no geospatial packages)")
+                mukey = get_flight_group('dominant_mukey').do(
+                    (location.latitude, location.longitude),
+                    get_dominant_mukey_at_point, location.latitude, location.longitude
                 )
 
-                # Fetch mukey raster
-                try:
-                    mukey_raster = GAEZ_SSURGO_data.mukey_wcs(
-                        aoi=aoi_gdf,
-                        db=database,
-                        res=resolution
-                    )
-                except Exception as e:
-                    logger.error(f"Failed to fetch mukey raster: {str(e)}")
-                    raise SSURGODataError(f"Cannot retrieve SSURGO data: {str(e)}")
-
-                # Extract unique mukeys from raster
-                import numpy as np
-                raster_data = mukey_raster.read(1)  # Read first band as numpy array
-                mukeys = np.unique(raster_data[raster_data > 0]).tolist()
-
-                # Close the rasterio dataset to free resources
-                mukey_raster.close()
+                if mukey is None:
+                    logger.warning("No mukey found at location using SDA query")
+                    return None, {'mukey_count': 0, 'mukeys': [], 'method': 'sda_query'}
+
+                mukeys = [mukey]
+                logger.info(f"Found mukey {mukey} using SDA query")
+
+            if mukeys is None and not SDA_QUERY_AVAILABLE:
+                raise SSURGODataError(
+                    "Neither a local mukey grid nor the SDA query module is available. "
+                    "Cannot fetch SSURGO data. Please provide soil data directly via user_horizons parameter."
+                )
 
             if not mukeys:
                 raise SSURGODataError("No valid SSURGO map units found at location")
 
             logger.info(f"Found {len(mukeys)} map unit(s): {mukeys}")
 
-            # Fetch component-horizon data for mukeys
-            ssurgo_data = GAEZ_SSURGO_data.ssurgo_gaez_data(mukeys)
+            # Fetch component-horizon data for mukeys (shared with concurrent requests
+            # for the same map units; filtered below into a copy before any change)
+            ssurgo_data = get_flight_group('ssurgo_gaez_data').do(
+                (tuple(str(m) for m in mukeys), include_ranges),
+                GAEZ_SSURGO_data.ssurgo_gaez_data, mukeys, include_ranges=include_ranges
+            )
 
             if ssurgo_data is None or len(ssurgo_data) == 0:
                 raise SSURGODataError("No component data available for map units")
@@ -471,6 +624,9 @@ class GAEZCalculationService:
             # Get total components before filtering
             total_components = len(ssurgo_data['cokey'].unique()) if 'cokey' in ssurgo_data.columns else 0
 
+            # All components, shared with concurrent requests (map unit ratings copy before use)
+            map_unit_data = ssurgo_data
+
             # Filter to dominant component (highest comppct_r)
             # Data is already ordered by comppct_r DESC from SQL query
             if 'cokey' in ssurgo_data.columns and len(ssurgo_data) > 0:
@@ -485,7 +641,10 @@ class GAEZCalculationService:
                 'cokey': str(ssurgo_data.iloc[0].get('cokey', 'Unknown')) if len(ssurgo_data) > 0 else None,
                 'component_name': ssurgo_data.iloc[0].get('compname', 'Unknown') if len(ssurgo_data) > 0 else None,
                 'component_pct': ssurgo_data.iloc[0].get('comppct_r', None) if len(ssurgo_data) > 0 else None,
-                'total_components': total_components
+                'total_components': total_components,
+                'survey_area': first_value(ssurgo_data, 'areasymbol'),
+                'survey_version': first_value(ssurgo_data, 'saverest'),
+                'map_unit_data': map_unit_data,
             }
 
             logger.info(f"Retrieved {len(ssurgo_data)} horizons from dominant component (of {mukey_info['total_components']} total)")
@@ -498,6 +657,82 @@ class GAEZCalculationService:
             logger.error(f"Unexpected error fetching SSURGO data: {str(e)}", exc_info=True)
             raise SSURGODataError(f"Failed to retrieve SSURGO data: {str(e)}")
 
+    def _calculate_uncertainty(
+        self,
+        working_data: pd.DataFrame,
+        crop_id: str,
+        input_level: str,
+        depth_weight_type: int,
+        draws: int
+    ) -> Optional[SQIUncertainty]:
+        """
+        Percentile bands of the SQIs from Monte Carlo draws of SSURGO ranges.
+
+        Uncertainty is supplementary: failures are logged and None is returned
+        so the point calculation is still served.
+        """
+        try:
+            bands = GAEZ_SQI_uncertainty.gaez_sqi_uncertainty(
+                working_data, crop_id, input_level, depth_weight_type, n_draws=draws
+            )
+        except Exception as e:
+            logger.warning(f"Uncertainty calculation failed: {str(e)}")
+            return None
+
+        return SQIUncertainty(
+            draws=draws,
+            percentiles=[float(p) for p in bands.index],
+            bands={
+                name: [None if pd.isna(v) else round(float(v), 2) for v in bands[name]]
+                for name in bands.columns
+            }
+        )
+
+    def _calculate_map_unit_rating(
+        self,
+        map_unit_data: Optional[pd.DataFrame],
+        crop_id: str,
+        input_level: str,
+        depth_weight_type: int
+    ) -> Optional[MapUnitRating]:
+        """
+        SQIs of every SSURGO component of the map unit and their comppct_r-weighted
+        means, scored in one padded batch (GAEZ_SQI_functions.gaez_map_unit_ratings).
+
+        Like uncertainty bands, map unit ratings are supplementary: failures are
+        logged and None is returned so the point calculation is still served.
+        """
+        if map_unit_data is None or len(map_unit_data) == 0:
+            return None
+        try:
+            with_phases = GAEZ_US_phase_calc.classify_gaez_v4_phases(map_unit_data.copy())
+            components, map_units = GAEZ_SQI_functions.gaez_map_unit_ratings(
+                with_phases, crop_id, input_level, depth_weight_type
+            )
+        except Exception as e:
+            logger.warning(f"Map unit rating failed: {str(e)}")
+            return None
+
+        def indices(row) -> SoilQualityIndices:
+            return SoilQualityIndices(**{name: _safe_float(row.get(name))
+                                         for name in ('SQ1', 'SQ2', 'SQ3', 'SQ4', 'SQ5', 'SQ6', 'SQ7', 'SR')})
+
+        map_unit = map_units.iloc[0]
+        return MapUnitRating(
+            mukey=str(map_unit['mukey']),
+            soil_quality_indices=indices(map_unit),
+            component_pct_total=None if pd.isna(map_unit['comppct_total']) else float(map_unit['comppct_total']),
+            components=[
+                ComponentRating(
+                    cokey=str(row['cokey']),
+                    component_name=None if pd.isna(row.get('compname')) else str(row.get('compname')),
+                    component_pct=None if pd.isna(row.get('comppct_r')) else float(row.get('comppct_r')),
+                    soil_quality_indices=indices(row)
+                )
+                for _, row in components.iterrows()
+            ]
+        )
+
     def _integrate_user_data(
         self,
         ssurgo_data: pd.DataFrame,
@@ -697,9 +932,9 @@ class GAEZCalculationService:
 
         return pd.DataFrame(records)
 
-    def _get_depth_weight_type(self, crop_id: str, requested_type: Optional[int]) -> int:
+    def get_depth_weight_type(self, crop_id: str, requested_type: Optional[int]) -> int:
         """
-        Determine depth weight type for crop.
+        Determine depth weight type for crop (also used by the batch upload endpoint).
 
         Args:
             crop_id: GAEZ crop identifier
@@ -326,11 +326,11 @@ def test_service_get_depth_weight_type():
     service = GAEZCalculationService()
 
     # Test with explicit depth type
-    depth = service._get_depth_weight_type("4", 2)
+    depth = service.get_depth_weight_type("4", 2)
     assert depth == 2
 
     # Test with auto-determination (maize should be 3)
-    depth = service._get_depth_weight_type("4", None)
+    depth = service.get_depth_weight_type("4", None)
     assert depth in [1, 2, 3, 4]  # Should return valid depth type
 
 
@@ -572,3 +572,433 @@ def test_multiple_lab_samples():
 
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
+
+
+def test_metrics_endpoint():
+    """Test metrics endpoint reports single-flight, elevation cache and SDA client counters."""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    data = response.json()
+    assert 'singleflight' in data
+    assert 'hits' in data['elevation_cache']
+    assert 'breaker_state' in data['sda']
+
+
+# ============================================================================
+# What-if Recalculation Tests
+# ============================================================================
+
+@pytest.fixture
+def processed_profile():
+    """Three-horizon profile shaped like the prepared SSURGO data of a calculation."""
+    from GAEZ_SSURGO_data import gettt, getTXT_id, BULK_DENSITY_REF
+
+    data = pd.DataFrame({
+        'cokey': ['1001'] * 3, 'hzdept_r': [0, 20, 60], 'hzdepb_r': [20, 60, 150],
+        'sand': [40.0, 30.0, 20.0], 'silt': [40.0, 35.0, 35.0], 'clay': [20.0, 35.0, 45.0],
+        'om': [3.0, 1.0, 0.5], 'db_measured': [1.3, 1.45, 1.5], 'ph': [6.2, 6.5, 8.0],
+        'ec': [0.5, 2.0, 6.0], 'esp': [0.0, 1.7, 10.0], 'caco3': [0.0, 5.0, 20.0], 'gypsum': [0.0, 0.0, 3.0],
+        'teb': [12.0, 16.0, 30.0], 'cecs': [15.0, 20.0, 35.0], 'fragvol': [5.0, 10.0, 30.0],
+        'rd': [80.0] * 3, 'vertic': 0, 'gelic': 0, 'roots': 0, 'il': 0, 'swr': 0, 'drain_id': 5,
+        'pscl_id': '2', 'phase_ids_list': [[0]] * 3,
+    })
+    data['soc'] = data['om'] * 0.58
+    data['bs'] = data['teb'] / data['cecs'] * 100
+    data['cecc'] = data['cecs'] / data['clay'] * 100
+    data['texture'] = data.apply(gettt, axis=1)
+    data['texture_class_id'] = data['texture'].apply(getTXT_id)
+    data['db'] = data['db_measured'] / data['texture'].map(BULK_DENSITY_REF)
+    return data
+
+
+def test_merge_user_data():
+    """What-if deltas replace only the fields sent, matched by horizon_id / sample_id."""
+    from .profile_sessions import merge_user_data
+
+    current = UserData(
+        plot_data=[PlotDataHorizon(horizon_id='Ap', top_depth=0, bottom_depth=25, ph=6.5, sand_pct=45,
+                                   silt_pct=35, clay_pct=20)],
+        site_data=SiteData(drainage_class='well drained', slope_pct=2.5)
+    )
+    delta = UserData(
+        plot_data=[PlotDataHorizon(horizon_id='Ap', top_depth=0, bottom_depth=25, ph=5.8),
+                   PlotDataHorizon(horizon_id='Bt', top_depth=25, bottom_depth=60, clay_pct=30)],
+        site_data=SiteData(slope_pct=4.0)
+    )
+
+    merged = merge_user_data(current, delta)
+
+    assert [(hz.horizon_id, hz.ph, hz.sand_pct) for hz in merged.plot_data] == [('Ap', 5.8, 45), ('Bt', None, None)]
+    assert merged.site_data.drainage_class == 'well drained' and merged.site_data.slope_pct == 4.0
+    assert merge_user_data(current, None) is current
+
+
+def test_what_if_delta_without_depths():
+    """Deltas to existing records need no depths; new records still do."""
+    from pydantic import ValidationError
+    from .models import UserDataDelta
+    from .profile_sessions import merge_user_data
+
+    current = UserData(
+        plot_data=[PlotDataHorizon(horizon_id='Ap', top_depth=0, bottom_depth=25, ph=6.5)],
+        lab_data=[LabData(sample_id='L1', depth_cm=10, ph_h2o=6.4)]
+    )
+
+    merged = merge_user_data(current, UserDataDelta(plot_data=[{'horizon_id': 'Ap', 'ph': 5.8}],
+                                                    lab_data=[{'sample_id': 'L1', 'ph_h2o': 5.9}]))
+
+    assert [(hz.top_depth, hz.bottom_depth, hz.ph) for hz in merged.plot_data] == [(0, 25, 5.8)]
+    assert [(lab.depth_cm, lab.ph_h2o) for lab in merged.lab_data] == [(10, 5.9)]
+    with pytest.raises(ValidationError):
+        merge_user_data(current, UserDataDelta(plot_data=[{'horizon_id': 'Bt', 'clay_pct': 30}]))
+    with pytest.raises(ValidationError):
+        UserDataDelta(plot_data=[{'horizon_id': 'Ap', 'top_depth': 30, 'bottom_depth': 10}])
+    assert merge_user_data(None, UserDataDelta(plot_data=[{'horizon_id': 'Ap', 'top_depth': 0,
+                                                           'bottom_depth': 20}])).plot_data[0].bottom_depth == 20
+
+
+def test_what_if_recalculates_affected_indices(processed_profile):
+    """A topsoil pH change rescores only SQ1/SQ2 and matches a full recalculation."""
+    import GAEZ_SQI_functions
+    from .models import WhatIfRequest
+    from .profile_sessions import ProfileSession
+
+    service = GAEZCalculationService()
+    request = CalculationRequest(location=Location(latitude=41.2, longitude=-101.6), crop_id='4',
+                                 input_level=InputLevel.INTERMEDIATE, depth_weight_type=2)
+    first = GAEZ_SQI_functions.gaez_sqi_ratings(processed_profile, '4', 'I', depthWt_type=2)
+    profile_id = service.profile_sessions.add(ProfileSession(
+        request=request, base_data=processed_profile, working_data=processed_profile,
+        data_sources={'ssurgo_used': True, 'horizons_count': 3, 'slope_source': 'component'},
+        depth_weight_type=2, scores=service._sqi_scores(first)
+    ))
+
+    response = service.recalculate_what_if(WhatIfRequest(profile_id=profile_id, user_data={
+        'plot_data': [{'horizon_id': 'Ap', 'top_depth': 0, 'bottom_depth': 20, 'ph': 4.8}]
+    }))
+
+    assert response.profile_id == profile_id
+    assert response.recalculated_indices == ['SQ1', 'SQ2']
+    assert response.data_sources.user_plot_data_used is True
+    working_data = service.profile_sessions.get(profile_id).working_data
+    expected = GAEZ_SQI_functions.gaez_sqi_ratings(working_data, '4', 'I', depthWt_type=2).iloc[0]
+    assert response.soil_quality_indices.SQ1 == pytest.approx(expected['SQ1'])
+    assert response.soil_quality_indices.SQ1 < first['SQ1'].iloc[0]
+    assert response.soil_quality_indices.SR == pytest.approx(expected['SR'])
+
+
+def test_what_if_unknown_profile():
+    """What-if calls for unknown or expired sessions return 404."""
+    response = client.post("/api/v1/calculate/what-if", json={
+        "profile_id": "missing",
+        "user_data": {"site_data": {"slope_pct": 3.0}}
+    })
+
+    assert response.status_code == 404
+
+
+# ============================================================================
+# Result Store Tests
+# ============================================================================
+
+@pytest.fixture
+def stored_response():
+    """Minimal successful calculation response with a what-if handle."""
+    from .models import CalculationResponse, CropInfo, SoilQualityIndices, DataSources, CalculationMetadata
+
+    return CalculationResponse(
+        status='success',
+        location=Location(latitude=41.2, longitude=-101.6),
+        crop_info=CropInfo(crop_id='4', crop_name='Maize', input_level='L', depth_weight_type=3,
+                           rooting_depth_description='Deep rooting (0-100 cm)'),
+        soil_quality_indices=SoilQualityIndices(SQ1=75.0, SQ2=80.0, SQ3=85.0, SQ4=90.0, SQ5=95.0,
+                                                SQ6=100.0, SQ7=88.0, SR=68.5),
+        data_sources=DataSources(ssurgo_used=True, horizons_count=4),
+        metadata=CalculationMetadata(calculation_timestamp='2025-01-01T00:00:00Z', api_version='0.1.0',
+                                     processing_time_seconds=1.0),
+        profile_id='session-1'
+    )
+
+
+def test_request_fingerprint():
+    """Fingerprints depend on the normalized request and data versions; user data is not cached."""
+    import gaez_config
+    from .result_store import request_fingerprint
+
+    base = {'location': {'latitude': 41.2, 'longitude': -101.6}, 'crop_id': '4', 'input_level': 'L'}
+    fingerprint = request_fingerprint(CalculationRequest(**base))
+
+    assert fingerprint == request_fingerprint(CalculationRequest(**base, ssurgo_database='gssurgo'))
+    assert fingerprint != request_fingerprint(CalculationRequest(**dict(base, crop_id='1')))
+    assert request_fingerprint(CalculationRequest(**base, user_data={'site_data': {'slope_pct': 2}})) is None
+
+    original = gaez_config.ssurgo_data_version
+    try:
+        gaez_config.ssurgo_data_version = '2025-10'
+        assert request_fingerprint(CalculationRequest(**base)) != fingerprint
+    finally:
+        gaez_config.ssurgo_data_version = original
+
+
+def test_request_fingerprint_covers_local_inputs(tmp_path, monkeypatch):
+    """Rebuilding the mukey grid or DEM tiles, or reordering slope sources, changes the fingerprint."""
+    import gaez_config
+    from .result_store import request_fingerprint
+
+    request = CalculationRequest(location={'latitude': 41.2, 'longitude': -101.6}, crop_id='4', input_level='L')
+    monkeypatch.setattr(gaez_config, 'mukey_grid_dir', str(tmp_path / 'mukey_grid'))
+    monkeypatch.setattr(gaez_config, 'dem_tile_dir', str(tmp_path / 'dem_tiles'))
+    fingerprints = {request_fingerprint(request)}
+
+    for name in ('mukey_grid', 'dem_tiles'):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / 'index.json').write_text('{}')
+        fingerprints.add(request_fingerprint(request))
+    monkeypatch.setattr(gaez_config, 'slope_sources', ('site', 'epqs'))
+    fingerprints.add(request_fingerprint(request))
+
+    assert len(fingerprints) == 4
+
+
+def test_degraded_response_not_stored(stored_response):
+    """A requested block that failed, or a default slope, is served but not stored."""
+    from . import main
+    from .result_store import ResultStore
+
+    body = {'location': {'latitude': 41.2, 'longitude': -101.6}, 'crop_id': '4', 'input_level': 'L',
+            'uncertainty_draws': 100}
+    default_slope = stored_response.model_copy(
+        update={'data_sources': stored_response.data_sources.model_copy(update={'slope_source': 'default'})})
+    store = ResultStore(10)
+    with patch.object(main, 'result_store', store), \
+            patch.object(main.calculation_service, 'calculate_soil_quality',
+                         return_value=stored_response) as calculate:
+        first = client.post("/api/v1/calculate", json=body)
+        second = client.post("/api/v1/calculate", json=body)
+        calculate.return_value = default_slope
+        third = client.post("/api/v1/calculate", json=dict(body, uncertainty_draws=None))
+
+    assert calculate.call_count == 3
+    assert first.status_code == second.status_code == third.status_code == 200
+    assert 'X-Result-Store' not in second.headers
+    assert store.stats()['stores'] == 0
+
+
+def test_result_store_tiers(tmp_path):
+    """Entries are served from memory, then from disk by a new store instance."""
+    from .result_store import ResultStore
+
+    store = ResultStore(max_entries=1, directory=str(tmp_path))
+    store.put('ab12', b'{"a": 1}')
+    store.put('cd34', b'{"b": 2}')
+
+    assert store.get('cd34') == b'{"b": 2}'
+    assert store.get('ab12') == b'{"a": 1}'  # evicted from memory, read back from disk
+    assert ResultStore(10, str(tmp_path)).get('cd34') == b'{"b": 2}'
+    assert store.get('ef56') is None
+    assert store.stats() == {'hits': 1, 'disk_hits': 1, 'misses': 1, 'stores': 2, 'disk_evictions': 0,
+                             'entries': 1}
+
+
+def test_result_store_disk_bounds(tmp_path):
+    """Expired disk entries are not served; prune() drops them and the oldest beyond the size bound."""
+    import os
+    import time
+    from .result_store import ResultStore
+
+    store = ResultStore(max_entries=1, directory=str(tmp_path), disk_max_entries=2, max_age=3600)
+    for i, fingerprint in enumerate(['aa01', 'bb02', 'cc03', 'dd04']):
+        store.put(fingerprint, fingerprint.encode())
+        mtime = time.time() - 7200 + 2000 * i
+        os.utime(store._path(fingerprint), (mtime, mtime))
+
+    assert store.get('aa01') is None  # read from disk, where it has expired
+    assert store.prune() == 2  # aa01 and bb02 expired, cc03 and dd04 within both bounds
+    assert sorted(p.name for p in tmp_path.glob('*/*.entry')) == ['cc03.entry', 'dd04.entry']
+
+    store.put('ee05', b'ee05')
+    assert store.prune() == 1
+    assert not os.path.exists(store._path('cc03'))
+    assert store.stats()['disk_evictions'] == 3
+
+
+def test_calculate_served_from_result_store(stored_response):
+    """Repeats skip the pipeline; the ETag answers If-None-Match with 304."""
+    from . import main
+    from .result_store import ResultStore
+
+    body = {'location': {'latitude': 41.2, 'longitude': -101.6}, 'crop_id': '4', 'input_level': 'L'}
+    with patch.object(main, 'result_store', ResultStore(10)), \
+            patch.object(main.calculation_service, 'calculate_soil_quality',
+                         return_value=stored_response) as calculate:
+        first = client.post("/api/v1/calculate", json=body)
+        second = client.post("/api/v1/calculate", json=body)
+        not_modified = client.post("/api/v1/calculate", json=body,
+                                   headers={'If-None-Match': first.headers['ETag']})
+        forced = client.post("/api/v1/calculate", json=body, headers={'Cache-Control': 'no-cache'})
+
+    assert calculate.call_count == 2
+    assert first.headers['X-Result-Store'] == 'miss' and first.json()['profile_id'] == 'session-1'
+    assert second.headers['X-Result-Store'] == 'hit' and second.headers['ETag'] == first.headers['ETag']
+    assert second.json()['profile_id'] is None
+    assert second.json()['soil_quality_indices'] == first.json()['soil_quality_indices']
+    assert not_modified.status_code == 304
+    assert forced.headers['X-Result-Store'] == 'miss'
+
+
+def test_survey_catalog_retires_changed_areas(tmp_path):
+    """A republished survey area retires stored results of that area only, in memory and on disk."""
+    import GAEZ_survey_versions
+    from .result_store import ResultStore, request_fingerprint
+
+    request = CalculationRequest(location={'latitude': 41.2, 'longitude': -101.6}, crop_id='4', input_level='L')
+    catalog = GAEZ_survey_versions.get_survey_catalog()
+    try:
+        catalog.update({'NE001': 'v1', 'NE003': 'v1'})
+        fingerprint = request_fingerprint(request)
+        store = ResultStore(10, str(tmp_path))
+        store.put('ne01', b'{"a": 1}', ('NE001', 'v1'))
+        store.put('ne03', b'{"b": 2}', ('NE003', 'v1'))
+        store.put('none', b'{"c": 3}')
+
+        catalog.update({'NE001': 'v2', 'NE003': 'v1'})
+
+        assert request_fingerprint(request) == fingerprint
+        assert store.get('ne01') is None
+        assert store.get('ne03') == b'{"b": 2}'
+        assert store.get('none') == b'{"c": 3}'
+        assert ResultStore(10, str(tmp_path)).get('ne01') is None
+        assert ResultStore(10, str(tmp_path)).get('ne03') == b'{"b": 2}'
+        store.put('ne01', b'{"a": 4}', ('NE001', 'v2'))
+        assert store.get('ne01') == b'{"a": 4}'
+    finally:
+        GAEZ_survey_versions.reset_survey_catalog()
+
+
+# ============================================================================
+# Map Unit Rating Tests
+# ============================================================================
+
+@patch('api.service.GAEZ_US_phase_calc')
+@patch('api.service.GAEZ_SQI_functions')
+def test_map_unit_rating_response(mock_sqi, mock_phase, mock_ssurgo_data):
+    """Component and area-weighted scores are mapped into MapUnitRating."""
+    scores = {name: [60.0, 40.0] for name in ['SQ1', 'SQ2', 'SQ3', 'SQ4', 'SQ5', 'SQ6', 'SQ7', 'SR']}
+    components = pd.DataFrame({'mukey': ['2494182'] * 2, 'cokey': ['1', '2'], 'compname': ['Holdrege', np.nan],
+                               'comppct_r': [85.0, 15.0], **scores})
+    map_units = pd.DataFrame({'mukey': ['2494182'], 'components': [2], 'comppct_total': [100.0],
+                              **{name: [57.0] for name in scores}})
+    mock_phase.classify_gaez_v4_phases.side_effect = lambda data: data
+    mock_sqi.gaez_map_unit_ratings.return_value = (components, map_units)
+
+    rating = GAEZCalculationService()._calculate_map_unit_rating(mock_ssurgo_data, '4', 'L', 2)
+
+    assert rating.mukey == '2494182' and rating.soil_quality_indices.SR == 57.0
+    assert rating.component_pct_total == 100.0
+    assert [c.cokey for c in rating.components] == ['1', '2']
+    assert rating.components[1].component_name is None
+    assert rating.components[0].soil_quality_indices.SQ1 == 60.0
+    assert GAEZCalculationService()._calculate_map_unit_rating(None, '4', 'L', 2) is None
+
+
+# ============================================================================
+# Batch Upload Tests
+# ============================================================================
+
+def _feed_in_pieces(stream, body, size=7):
+    """Points from a PointStream fed a few bytes at a time."""
+    points = []
+    for start in range(0, len(body), size):
+        points += stream.feed(body[start:start + size])
+    return points + stream.close()
+
+
+def test_upload_parsers_stream_gzip_csv_and_geojson():
+    """Gzip CSV and GeoJSON bodies parse incrementally across arbitrary chunk boundaries."""
+    import gzip
+    import json
+    from .batch_upload import PointStream, UploadFormatError
+
+    csv_body = gzip.compress(b"\xef\xbb\xbfField_ID,Lat,Lon\nA,41.2,-101.6\n\nB,north,-101.6\r\nC,95,-101.6")
+    points = _feed_in_pieces(PointStream(), csv_body)
+    assert [p.point_id for p in points] == ['A', 'B', 'C']
+    assert (points[0].latitude, points[0].longitude, points[0].error) == (41.2, -101.6, None)
+    assert 'Invalid coordinates' in points[1].error and 'out of range' in points[2].error
+
+    collection = {"type": "FeatureCollection", "name": "features, not yet", "features": [
+        {"type": "Feature", "id": 7, "geometry": {"type": "Point", "coordinates": [-101.6, 41.2]}},
+        {"type": "Feature", "properties": {"name": "pivot"},
+         "geometry": {"type": "Polygon", "coordinates": [[[0, 0], [1, 0], [0, 1], [0, 0]]]}},
+        {"type": "Feature", "properties": {}, "geometry": {"type": "Point", "coordinates": [-99.0, 40.0]}}
+    ]}
+    points = _feed_in_pieces(PointStream(), gzip.compress(json.dumps(collection).encode()))
+    assert [p.point_id for p in points] == ['7', 'pivot', '3']
+    assert points[0].latitude == 41.2 and 'Point geometries' in points[1].error
+
+    with pytest.raises(UploadFormatError):
+        _feed_in_pieces(PointStream(), b"name,elevation\nA,100\n")
+    with pytest.raises(UploadFormatError):
+        _feed_in_pieces(PointStream(), gzip.compress(b"lat,lon\n41.2,-101.6\n")[:-6])
+
+
+@patch('api.batch_upload.GAEZ_US_phase_calc.classify_gaez_v4_phases', side_effect=lambda data: data)
+@patch('api.batch_upload.GAEZ_SQI_functions.prepare_sqi_data', side_effect=lambda data: data)
+@patch('api.batch_upload.GAEZ_SQI_functions.score_components')
+@patch('api.batch_upload.GAEZ_SSURGO_data.ssurgo_gaez_data')
+@patch('api.batch_upload.get_dominant_mukey_at_point')
+def test_upload_scorer_scores_each_map_unit_once(mock_point, mock_fetch, mock_score, mock_prepare, mock_phases):
+    """Dominant components of new map units are scored together; repeats reuse the rating."""
+    from .batch_upload import UploadPoint, UploadScorer
+
+    mock_point.side_effect = lambda lat, lon: {41.0: 101, 42.0: 102}.get(lat)
+    mock_fetch.return_value = pd.DataFrame({
+        'mukey': [101, 101, 101, 102], 'cokey': ['a1', 'a2', 'a2', 'b1'],
+        'compname': ['Minor', 'Major', 'Major', 'Only'], 'comppct_r': [20, 75, 75, 90]
+    })
+    mock_score.side_effect = lambda data, *args: data.drop_duplicates('cokey').assign(
+        **{name: 50.0 for name in ['SQ1', 'SQ2', 'SQ3', 'SQ4', 'SQ5', 'SQ6', 'SQ7', 'SR']})
+
+    scorer = UploadScorer('4', 'L', 3, requirements={'profile': None})
+    first = scorer.score([UploadPoint('p1', 41.0, -100.0), UploadPoint('p2', 42.0, -100.0),
+                          UploadPoint('p3', 43.0, -100.0), UploadPoint('p4', None, None, 'bad row')])
+    second = scorer.score([UploadPoint('p5', 41.0, -100.0)])
+
+    assert mock_fetch.call_count == 1 and sorted(mock_fetch.call_args[0][0]) == ['101', '102']
+    assert list(mock_score.call_args[0][0]['cokey']) == ['a2', 'a2', 'b1']
+    assert [row['status'] for row in first] == ['ok', 'ok', 'no_ssurgo', 'invalid']
+    assert first[0]['cokey'] == 'a2' and first[0]['component_name'] == 'Major' and first[0]['SR'] == 50.0
+    assert second[0]['mukey'] == '101' and second[0]['cokey'] == 'a2'
+    assert scorer.stats == {'points': 5, 'map_units_scored': 2, 'map_unit_reuses': 1}
+
+
+def test_batch_upload_streams_rows(monkeypatch):
+    """The batch endpoint streams one NDJSON row per point and stops at the point limit."""
+    import gzip
+    import json
+    import gaez_config
+    from .batch_upload import UploadScorer
+
+    def ratings(self, mukeys):
+        return {mukey: {'status': 'ok', 'error': None, 'components': 1, 'SR': 42.0} for mukey in mukeys}
+
+    body = gzip.compress(b"id,latitude,longitude\n" + b"".join(
+        f"{i},{41.0 + (i % 2)},-100.0\n".encode() for i in range(5)))
+    monkeypatch.setattr(gaez_config, 'upload_chunk_size', 2)
+    with patch('api.batch_upload.get_dominant_mukey_at_point', side_effect=lambda lat, lon: int(lat)), \
+            patch.object(UploadScorer, '_score_map_units', autospec=True, side_effect=ratings) as score:
+        response = client.post("/api/v1/calculate/batch?crop_id=4&input_level=L", content=body)
+        monkeypatch.setattr(gaez_config, 'upload_max_points', 3)
+        limited = client.post("/api/v1/calculate/batch?crop_id=4&input_level=L&output=csv", content=body)
+        refused = client.post("/api/v1/calculate/batch?crop_id=4&input_level=L", content=b"x,y\n")
+
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert response.status_code == 200 and response.headers['content-type'] == 'application/x-ndjson'
+    assert [row['id'] for row in rows] == ['0', '1', '2', '3', '4']
+    assert [row['mukey'] for row in rows] == ['41', '42', '41', '42', '41']
+    assert all(row['SR'] == 42.0 for row in rows)
+    assert score.call_count == 2  # first chunk of each upload; later chunks reuse its ratings
+
+    lines = limited.text.splitlines()
+    assert lines[0].startswith('id,latitude,longitude,status') and len(lines) == 5
+    assert 'exceeds 3 points' in lines[-1]
+    assert refused.status_code == 400
@@ -1,10 +1,15 @@
 """
-Debug script to examine SSURGO data before and after user data integration.
+Debug script to examine SSURGO texture classification for a location.
+
+Compares the texture columns of ssurgo_gaez_data (shared texture lookup table)
+with the row-wise gettt rules and reports horizons that fall back to the
+analytic rules (table boundary cells, ties, sand + silt + clay != 100).
 """
 
 import sys
 import logging
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
 # Add parent directory to path
@@ -12,62 +17,65 @@ sys.path.insert(0, str(Path(__file__).parent))
 
 logging.basicConfig(level=logging.INFO)
 
-from GAEZ_SSURGO_data import get_SSURGO_data, gettt, getTXT_id
-from GAEZ_US_phase_calc import classify_gaez_v4_phases
+from GAEZ_SDA_query import get_dominant_mukey_at_point
+from GAEZ_SSURGO_data import ssurgo_gaez_data, gettt, getTXT_id
+from GAEZ_texture_lut import TEXTURE_TABLE, TEXTURE_ID, BOUNDARY, GRID_SIZE, SUM_TOLERANCE
 
-# Test Nebraska location  
-lat = 41.2
-lon = -101.6
+# Test Nebraska location
+lat = float(sys.argv[1]) if len(sys.argv) > 1 else 41.2
+lon = float(sys.argv[2]) if len(sys.argv) > 2 else -101.6
 
 print("="*80)
 print(f"Fetching SSURGO data for ({lat}, {lon})")
 print("="*80)
 
-# Get SSURGO data
-ssurgo_df = get_SSURGO_data(lat, lon)
+mukey = get_dominant_mukey_at_point(lat, lon)
+ssurgo_df = ssurgo_gaez_data([mukey]) if mukey is not None else None
 
-if ssurgo_df is None or len(ssurgo_df) == 0:
+if not isinstance(ssurgo_df, pd.DataFrame) or len(ssurgo_df) == 0:
     print("No SSURGO data found!")
     sys.exit(1)
 
-print(f"\nRetrieved {len(ssurgo_df)} horizons")
+print(f"\nRetrieved {len(ssurgo_df)} horizons for mukey {mukey}")
 print("\nKey columns:")
-print(ssurgo_df[['hzdept_r', 'hzdepb_r', 'sandtotal_r', 'silt total_r', 'claytotal_r', 
-                 'texcl', 'texture_class_id']].to_string())
+print(ssurgo_df[['cokey', 'hzdept_r', 'hzdepb_r', 'sand', 'silt', 'clay',
+                 'texture', 'texture_class_id', 'pscl']].to_string())
 
 print("\n" + "="*80)
-print("Classifying phases")
+print("Texture class ID validation")
 print("="*80)
 
-ssurgo_with_phases = classify_gaez_v4_phases(ssurgo_df)
-
-print("\nAfter phase classification:")
-print(ssurgo_with_phases[['hzdept_r', 'hzdepb_r', 'sandtotal_r', 'silttotal_r', 'claytotal_r',
-                          'texcl', 'texture_class_id']].to_string())
+sand = ssurgo_df['sand'].to_numpy(dtype=float)
+silt = ssurgo_df['silt'].to_numpy(dtype=float)
+clay = ssurgo_df['clay'].to_numpy(dtype=float)
 
-# Check if texture_class_id is valid
-print("\n" + "="*80)
-print("Texture class ID validation")
-print("="*80)
+# Horizons answered by the table (others use the analytic rules)
+with np.errstate(invalid='ignore'):
+    in_grid = ((np.abs(sand + silt + clay - 100) <= SUM_TOLERANCE)
+               & (sand >= 0) & (sand < GRID_SIZE) & (clay >= 0) & (clay < GRID_SIZE))
+cells = TEXTURE_TABLE[TEXTURE_ID][np.where(in_grid, sand, 0).astype(int), np.where(in_grid, clay, 0).astype(int)]
+from_table = in_grid & (cells != BOUNDARY)
+print(f"\n{int(from_table.sum())} of {len(ssurgo_df)} horizons classified from the lookup table")
 
-for idx, row in ssurgo_with_phases.iterrows():
+mismatches = 0
+for pos, (idx, row) in enumerate(ssurgo_df.iterrows()):
     texture_id = row['texture_class_id']
-    texture_name = row['texcl']
-    sand = row['sandtotal_r']
-    silt = row['silttotal_r']
-    clay = row['claytotal_r']
-    
+    calc_texture = gettt(row['sand'], row['silt'], row['clay'])
+    calc_id = getTXT_id(calc_texture) if calc_texture else np.nan
+    source = "table" if from_table[pos] else "analytic"
+
     print(f"\nHorizon {idx} ({row['hzdept_r']}-{row['hzdepb_r']} cm):")
-    print(f"  Sand={sand:.1f}%, Silt={silt:.1f}%, Clay={clay:.1f}%")
-    print(f"  SSURGO texture: '{texture_name}' (ID={texture_class_id})")
-    
-    # Recalculate texture
-    calc_texture = gettt(sand, silt, clay)
-    calc_id = getTXT_id(calc_texture) if calc_texture else None
-    
-    print(f"  Calculated texture: '{calc_texture}' (ID={calc_id})")
-    
+    print(f"  Sand={row['sand']:.1f}%, Silt={row['silt']:.1f}%, Clay={row['clay']:.1f}% "
+          f"(sum={row['sand'] + row['silt'] + row['clay']:.1f})")
+    print(f"  Derived texture: '{row['texture']}' (ID={texture_id}, {source})")
+    print(f"  gettt texture:   '{calc_texture}' (ID={calc_id})")
+
     if pd.isna(texture_id):
-        print(f"  ⚠️  WARNING: texture_class_id is NaN!")
-    elif texture_id != calc_id:
-        print(f"  ⚠️  WARNING: ID mismatch (SSURGO={texture_id} vs calculated={calc_id})")
+        print(f"  WARNING: texture_class_id is NaN!")
+    if not (pd.isna(texture_id) and pd.isna(calc_id)) and texture_id != calc_id:
+        mismatches += 1
+        print(f"  WARNING: ID mismatch (derived={texture_id} vs gettt={calc_id})")
+
+print("\n" + "="*80)
+print(f"{mismatches} texture mismatches")
+print("="*80)
@@ -17,3 +17,107 @@ terrain_req_url = str(_project_root / "data" / "raw_data" / "GAEZ_terrain_req_rf
 class hz_names:
     top_col_name = 'hzdept_r'
     bottom_col_name = 'hzdepb_r'
+
+# Soil Data Access client settings (GAEZ_SDA_client.py)
+sda_url = "https://sdmdataaccess.sc.egov.usda.gov/tabular/post.rest"
+# timeouts (seconds) used until enough latency samples have been collected
+sda_default_timeouts = {'tabular': 6, 'spatial': 30}
+sda_min_latency_samples = 20
+# adaptive timeout = p99 latency x multiplier, clamped to [min, max]
+sda_timeout_multiplier = 3.0
+sda_min_timeout = 2
+sda_max_timeout = 60
+# send a duplicate request once the first is slower than the recent p95
+sda_hedge_requests = True
+sda_retries = 1
+sda_max_workers = 8
+# consecutive failures before the breaker opens, and cool-down before a probe
+sda_breaker_failure_threshold = 5
+sda_breaker_reset_seconds = 30
+# last good answers kept per query for serving while SDA is down
+sda_stale_cache_size = 256
+# SSURGO requests for at least this many mukeys are streamed and parsed in
+# batches of sda_stream_batch_rows rows (GAEZ_SDA_stream.py)
+sda_stream_min_mukeys = int(os.environ.get('GAEZ_SDA_STREAM_MIN_MUKEYS', 50))
+sda_stream_batch_rows = 5000
+# SSURGO mukey lists are split into batches of about sda_target_rows_per_request
+# query rows (at most sda_max_mukeys_per_request mukeys), fetched concurrently
+sda_target_rows_per_request = 20000
+sda_max_mukeys_per_request = int(os.environ.get('GAEZ_SDA_MAX_MUKEYS_PER_REQUEST', 250))
+sda_fetch_workers = 4
+# mukeys whose raw SDA horizon rows are kept in memory (GAEZ_SSURGO_data.py)
+ssurgo_horizon_cache_size = int(os.environ.get('GAEZ_SSURGO_CACHE_SIZE', 2048))
+# Longest time (seconds) an SDA horizon entry is kept; entries of republished survey
+# areas are dropped earlier by the survey version refresh (GAEZ_survey_versions.py)
+ssurgo_horizon_cache_max_age = float(os.environ.get('GAEZ_SSURGO_CACHE_MAX_AGE', 90 * 86400))
+# Seconds between sacatalog survey version refreshes in the API (0 disables)
+survey_refresh_seconds = float(os.environ.get('GAEZ_SURVEY_REFRESH_SECONDS', 86400))
+
+# SSURGO horizon data source for ssurgo_gaez_data (GAEZ_SSURGO_data.py):
+# 'sda' queries Soil Data Access; 'mirror' reads the local SQLite mirror built by
+# GAEZ_SSURGO_mirror.build_ssurgo_mirror and falls back to SDA for mukeys it lacks
+ssurgo_source = os.environ.get('GAEZ_SSURGO_SOURCE', 'sda')
+ssurgo_mirror_path = os.environ.get('GAEZ_SSURGO_MIRROR',
+                                    str(_project_root / "data" / "derived_data" / "ssurgo_mirror.sqlite"))
+
+# Local tiled mukey grid built from the gSSURGO 30 m raster (GAEZ_mukey_raster.py)
+mukey_grid_dir = os.environ.get('GAEZ_MUKEY_GRID', str(_project_root / "data" / "derived_data" / "mukey_grid"))
+mukey_grid_tile_size = 4096
+
+# SSURGO coverage pre-check for point lookups (GAEZ_coverage.py): coverage bitmap
+# written by build_coverage_mask (bundled survey extents if absent), and empty SDA
+# answers kept for negative_ttl seconds per coordinate rounded to negative_resolution
+coverage_mask_path = os.environ.get('GAEZ_COVERAGE_MASK',
+                                    str(_project_root / "data" / "derived_data" / "ssurgo_coverage.npz"))
+coverage_negative_ttl = float(os.environ.get('GAEZ_COVERAGE_NEGATIVE_TTL', 7 * 86400))
+coverage_negative_size = int(os.environ.get('GAEZ_COVERAGE_NEGATIVE_SIZE', 100000))
+coverage_negative_resolution = 1e-5
+
+# Local DEM tiles (e.g. 3DEP 1 arc-second) for offline slope (GAEZ_dem_tiles.py)
+dem_tile_dir = os.environ.get('GAEZ_DEM_TILES', str(_project_root / "data" / "derived_data" / "dem_tiles"))
+dem_tile_size = 3600
+
+# Elevation/slope answers cached per DEM cell (GAEZ_elevation_cache.py): cell size
+# in degrees (1 arc-second = 3DEP), in-memory entries, optional SQLite file
+elevation_cache_resolution = float(os.environ.get('GAEZ_ELEVATION_CACHE_RESOLUTION', 1 / 3600))
+elevation_cache_size = int(os.environ.get('GAEZ_ELEVATION_CACHE_SIZE', 100000))
+elevation_cache_path = os.environ.get('GAEZ_ELEVATION_CACHE') or None
+# Slope grids without local DEM tiles (GAEZ_elevation_slope.get_slope_grid): concurrent
+# EPQS elevation queries and the largest number of grid nodes fetched per request
+elevation_fetch_workers = 8
+slope_grid_max_epqs_points = int(os.environ.get('GAEZ_SLOPE_GRID_MAX_EPQS_POINTS', 2500))
+
+# 1% sand/clay texture lookup table (GAEZ_texture_lut.py)
+texture_lut_path = os.environ.get('GAEZ_TEXTURE_LUT', str(_project_root / "data" / "derived_data" / "texture_lut.npy"))
+
+# Slope sources tried in order by GAEZ_elevation_slope.resolve_slope: 'site' (user
+# site data), 'component' (SSURGO comp.slope_r), 'dem' (local DEM tiles), 'epqs'
+# (USGS Elevation Point Query Service, two network calls per point)
+slope_sources = tuple(s.strip() for s in os.environ.get('GAEZ_SLOPE_SOURCES', 'site,component,dem,epqs').split(',')
+                      if s.strip())
+
+# Horizon-boundary patterns kept in the depth weight cache (GAEZ_SQI_functions.py)
+depth_weight_cache_size = 4096
+
+# What-if profile sessions kept by the API (api/profile_sessions.py): idle lifetime
+# in seconds and the most sessions held (least recently used are dropped first)
+profile_session_ttl = float(os.environ.get('GAEZ_PROFILE_SESSION_TTL', 1800))
+profile_session_max = int(os.environ.get('GAEZ_PROFILE_SESSION_MAX', 1000))
+
+# Stored calculation responses for repeated requests (api/result_store.py): in-memory
+# entries and optional directory. Bump GAEZ_SSURGO_DATA_VERSION after a SSURGO refresh
+# to stop serving results computed from the previous release.
+result_store_size = int(os.environ.get('GAEZ_RESULT_STORE_SIZE', 1000))
+result_store_dir = os.environ.get('GAEZ_RESULT_STORE') or None
+# On-disk tier bounds: most files kept and their lifetime in seconds (0 = no bound)
+result_store_disk_size = int(os.environ.get('GAEZ_RESULT_STORE_DISK_SIZE', 100000))
+result_store_max_age = float(os.environ.get('GAEZ_RESULT_STORE_MAX_AGE', 30 * 86400))
+ssurgo_data_version = os.environ.get('GAEZ_SSURGO_DATA_VERSION', '')
+
+# Multi-point uploads (api/batch_upload.py): points scored per chunk, concurrent SDA
+# point queries, the most points read from one upload and the map unit ratings
+# kept for reuse within an upload
+upload_chunk_size = int(os.environ.get('GAEZ_UPLOAD_CHUNK_SIZE', 500))
+upload_workers = int(os.environ.get('GAEZ_UPLOAD_WORKERS', 8))
+upload_max_points = int(os.environ.get('GAEZ_UPLOAD_MAX_POINTS', 50000))
+upload_map_unit_cache = int(os.environ.get('GAEZ_UPLOAD_MAP_UNIT_CACHE', 20000))
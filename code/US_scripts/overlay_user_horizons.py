@@ -4,15 +4,163 @@ Overlay user-provided horizon data onto SSURGO map data.
 This module provides a function to properly merge user field measurements
 with SSURGO database horizons, preserving subsurface data when users only
 measure surface horizons.
+
+The overlay engine computes the user-vs-map horizon match for every pair of
+layers in one array operation (interval overlap for horizons, point
+containment for lab samples) and applies all property updates at once: for
+each map horizon and property the last matching user layer with a value wins,
+so passing plot horizons before lab samples gives Lab > Plot > Map.
 """
 
+from typing import Dict, List, Optional, Tuple
+
 import pandas as pd
 import numpy as np
 import logging
 
+# Derived-column recomputation for processed (renamed) SSURGO horizons
+try:
+    from GAEZ_SSURGO_data import DERIVED_COLUMN_SOURCES, SSURGO_RANGE_COLUMNS, derive_horizon_properties
+    DERIVE_FUNCTIONS_AVAILABLE = True
+except ImportError:
+    DERIVE_FUNCTIONS_AVAILABLE = False
+    logging.warning("Derived property functions not available")
+
 logger = logging.getLogger(__name__)
 
 
+def interval_overlap(user_tops, user_bottoms, map_tops, map_bottoms) -> np.ndarray:
+    """
+    (U, M) boolean matrix of user horizons overlapping map horizons
+    (user_top < map_bottom and user_bottom > map_top).
+    """
+    user_tops = np.asarray(user_tops, dtype=float)[:, None]
+    user_bottoms = np.asarray(user_bottoms, dtype=float)[:, None]
+    map_tops = np.asarray(map_tops, dtype=float)[None, :]
+    map_bottoms = np.asarray(map_bottoms, dtype=float)[None, :]
+    return (user_tops < map_bottoms) & (user_bottoms > map_tops)
+
+
+def point_in_horizons(depths, map_tops, map_bottoms) -> np.ndarray:
+    """
+    (U, M) boolean matrix of sample depths lying in map horizons
+    (map_top <= depth < map_bottom).
+    """
+    depths = np.asarray(depths, dtype=float)[:, None]
+    map_tops = np.asarray(map_tops, dtype=float)[None, :]
+    map_bottoms = np.asarray(map_bottoms, dtype=float)[None, :]
+    return (map_tops <= depths) & (map_bottoms > depths)
+
+
+def apply_overlays(data: pd.DataFrame, overlays: List[Tuple[np.ndarray, pd.DataFrame]]
+                   ) -> Tuple[pd.DataFrame, Dict[str, np.ndarray]]:
+    """
+    Apply user layer values to map horizons in one vectorized step.
+
+    Args:
+        data: Map horizons (M rows)
+        overlays: (match, values) pairs in increasing priority, where match is
+            a (U, M) boolean matrix and values a U-row DataFrame whose columns
+            are already named as data columns. NaN values never overwrite.
+
+    Returns:
+        Tuple of (updated copy of data, dict of column -> (M,) bool mask of the
+        rows that received a user value)
+    """
+    result = data.copy()
+    overlays = [(match, values) for match, values in overlays if len(values)]
+    columns = list(dict.fromkeys(col for _, values in overlays for col in values.columns
+                                 if col in result.columns))
+    if not columns:
+        return result, {}
+
+    match = np.concatenate([np.asarray(m, dtype=bool) for m, _ in overlays], axis=0)
+    values = pd.concat([v.reindex(columns=columns) for _, v in overlays], ignore_index=True)
+    values = values.apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+
+    # valid[u, m, c]: user layer u matches horizon m and has a value for column c
+    valid = match[:, :, None] & ~np.isnan(values)[:, None, :]
+    hit = valid.any(axis=0)
+    # Index of the last valid layer = highest priority
+    winner = len(values) - 1 - np.argmax(valid[::-1], axis=0)
+    new = values[winner, np.arange(len(columns))]
+
+    updated = hit.any(axis=0)
+    columns = [col for col, keep in zip(columns, updated) if keep]
+    hit, new = hit[:, updated], new[:, updated]
+    if columns:
+        current = result[columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+        result[columns] = np.where(hit, new, current)
+    return result, {col: hit[:, i] for i, col in enumerate(columns)}
+
+
+def overlay_user_layers(data: pd.DataFrame, horizons: Optional[pd.DataFrame] = None,
+                        samples: Optional[pd.DataFrame] = None,
+                        derive: bool = False,
+                        top_col: str = 'hzdept_r', bottom_col: str = 'hzdepb_r'
+                        ) -> Tuple[pd.DataFrame, Dict[str, np.ndarray]]:
+    """
+    Overlay user horizons and point samples onto map horizons by priority
+    (samples > horizons > map) and recompute derived columns for touched rows.
+
+    Args:
+        data: Map horizons with top_col/bottom_col depth columns
+        horizons: Interval layers with 'hzdept'/'hzdepb' and data column names
+        samples: Point layers with 'depth_cm' and data column names
+        derive: Recompute the GAEZ derived columns of touched rows
+            (GAEZ_SSURGO_data.derive_horizon_properties); derived columns given
+            directly by the user (e.g. lab ESP) keep the user value
+        top_col, bottom_col: Depth columns of data
+
+    Returns:
+        Tuple of (updated copy of data, dict of column -> touched row mask)
+    """
+    tops = data[top_col].to_numpy(dtype=float)
+    bottoms = data[bottom_col].to_numpy(dtype=float)
+    overlays = []
+    if horizons is not None and len(horizons):
+        overlays.append((interval_overlap(horizons['hzdept'], horizons['hzdepb'], tops, bottoms),
+                         horizons.drop(columns=['hzdept', 'hzdepb'])))
+    if samples is not None and len(samples):
+        overlays.append((point_in_horizons(samples['depth_cm'], tops, bottoms),
+                         samples.drop(columns=['depth_cm'])))
+    for match, _ in overlays:
+        unmatched = int((~match.any(axis=1)).sum())
+        if unmatched:
+            logger.warning(f"{unmatched} user layer(s) do not overlap any map horizon")
+
+    result, touched = apply_overlays(data, overlays)
+
+    rows = np.logical_or.reduce(list(touched.values())) if touched else np.zeros(len(result), dtype=bool)
+    if derive and touched and DERIVE_FUNCTIONS_AVAILABLE:
+        direct = {col: result.loc[touched[col], col].copy() for col in touched if col in DERIVED_COLUMN_SOURCES}
+        derive_horizon_properties(result, rows=rows, changed=touched.keys())
+        for col, values in direct.items():
+            result.loc[values.index, col] = values
+
+    if DERIVE_FUNCTIONS_AVAILABLE:
+        clear_measured_ranges(result, touched)
+
+    logger.info(f"Overlaid user values on {len(touched)} properties of {int(rows.sum())} horizons")
+    return result, touched
+
+
+def clear_measured_ranges(data: pd.DataFrame, touched: Dict[str, np.ndarray]) -> None:
+    """
+    Drop the SSURGO low/high values of user-measured properties in place.
+
+    A measured value has no SSURGO spread, so GAEZ_SQI_uncertainty holds it
+    instead of sampling around it. For derived columns given directly (e.g.
+    lab ESP or base saturation) the ranges of their source properties are
+    dropped as well.
+    """
+    for col, rows in touched.items():
+        props = DERIVED_COLUMN_SOURCES.get(col, ()) if col not in SSURGO_RANGE_COLUMNS else (col,)
+        range_cols = [rc for prop in props for rc in SSURGO_RANGE_COLUMNS.get(prop, ()) if rc in data.columns]
+        if range_cols and rows.any():
+            data.loc[rows, range_cols] = np.nan
+
+
 def overlay_user_horizons(user_horizons: pd.DataFrame, ssurgo_data: pd.DataFrame, bedrock_depth: float = None) -> pd.DataFrame:
     """
     Overlay user-provided horizon measurements onto SSURGO data.
@@ -66,29 +214,10 @@ def overlay_user_horizons(user_horizons: pd.DataFrame, ssurgo_data: pd.DataFrame
         if len(result) > 0 and result.iloc[-1][depth_bot_col] > bedrock_depth:
             result.iloc[-1, result.columns.get_loc(depth_bot_col)] = bedrock_depth
     
-    # For each user horizon, find overlapping SSURGO horizons and update properties
-    for idx, user_hz in user_horizons.iterrows():
-        user_top = user_hz['hzdept']
-        user_bot = user_hz['hzdepb']
-        
-        # Find SSURGO horizons that overlap with this user horizon
-        # Overlap: user_top < ssurgo_bot AND user_bot > ssurgo_top
-        overlapping = (
-            (result[depth_top_col] < user_bot) &
-            (result[depth_bot_col] > user_top)
-        )
-        
-        if not overlapping.any():
-            continue
-        
-        # Update properties for overlapping horizons
-        for api_col, ssurgo_col in column_mapping.items():
-            if api_col in user_hz.index and ssurgo_col in result.columns:
-                value = user_hz[api_col]
-                if pd.notna(value):  # Only update if user provided a value
-                    result.loc[overlapping, ssurgo_col] = value
-                    logger.debug(f"Updated {ssurgo_col} for depth {user_top}-{user_bot} cm: {value}")
-    
+    # Update properties for all overlapping horizons in one step
+    result, _ = overlay_user_layers(result, horizons=user_horizons.rename(columns=column_mapping),
+                                    top_col=depth_top_col, bottom_col=depth_bot_col)
+
     logger.info(f"Overlaid {len(user_horizons)} user horizons onto {len(result)} SSURGO horizons")
     
     return result
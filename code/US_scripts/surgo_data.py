@@ -137,13 +137,15 @@ soil_attributes_in_tables = {
 # endregion
 
 # region Load and clean attribute data
-def load_attributes_from_table(table_name, gdb_file=None):
+def load_attributes_from_table(table_name, gdb_file=None, columns=None):
     """
     Load attributes from a specific gSSURGO table.
 
     Args:
         table_name: Name of the table to load
         gdb_file: Path to gSSURGO geodatabase file
+        columns: Optional list of gSSURGO column names to pull instead of
+            soil_attributes_in_tables[table_name]; these keep their gSSURGO names
 
     Returns:
         pd.DataFrame: DataFrame with renamed columns according to soil_attributes_in_tables
@@ -151,8 +153,12 @@ def load_attributes_from_table(table_name, gdb_file=None):
     if gdb_file is None:
         gdb_file = DEFAULT_GDB_FILE
 
-    soil_attributes = soil_attributes_in_tables[table_name]
-    columns_to_pull = ids_cols + list(soil_attributes.keys())
+    if columns is None:
+        soil_attributes = soil_attributes_in_tables[table_name]
+        columns_to_pull = ids_cols + list(soil_attributes.keys())
+    else:
+        soil_attributes = {}
+        columns_to_pull = list(columns)
     data = gpd.read_file(gdb_file, layer=table_name, columns=columns_to_pull)
     data = data.filter(columns_to_pull)
     data.rename(columns=soil_attributes, inplace=True)
@@ -223,6 +223,79 @@ def sample_ssurgo_response():
     }
 
 
+@pytest.fixture(autouse=True)
+def reset_sda_client():
+    """
+    Give every test a fresh shared SDA client, empty SSURGO horizon and
+    elevation caches, an empty survey catalog, no cached coverage answers and
+    fresh single-flight groups so circuit-breaker state, cached answers and
+    coalescing counters from one test cannot leak into another.
+    """
+    try:
+        import GAEZ_SDA_client
+    except ImportError:
+        yield
+        return
+    GAEZ_SDA_client.reset_sda_client()
+    _clear_ssurgo_cache()
+    _reset_flight_groups()
+    _reset_elevation_cache()
+    _reset_survey_catalog()
+    _reset_coverage()
+    yield
+    GAEZ_SDA_client.reset_sda_client()
+    _clear_ssurgo_cache()
+    _reset_flight_groups()
+    _reset_elevation_cache()
+    _reset_survey_catalog()
+    _reset_coverage()
+
+
+def _clear_ssurgo_cache():
+    """Drop SSURGO horizon rows cached by earlier tests."""
+    try:
+        import GAEZ_SSURGO_data
+    except ImportError:
+        return
+    GAEZ_SSURGO_data.clear_ssurgo_cache()
+
+
+def _reset_flight_groups():
+    """Drop single-flight groups and counters of earlier tests."""
+    try:
+        import GAEZ_singleflight
+    except ImportError:
+        return
+    GAEZ_singleflight.reset_flight_groups()
+
+
+def _reset_elevation_cache():
+    """Drop elevation and slope answers cached by earlier tests."""
+    try:
+        import GAEZ_elevation_cache
+    except ImportError:
+        return
+    GAEZ_elevation_cache.reset_elevation_cache()
+
+
+def _reset_survey_catalog():
+    """Drop survey versions refreshed by earlier tests."""
+    try:
+        import GAEZ_survey_versions
+    except ImportError:
+        return
+    GAEZ_survey_versions.reset_survey_catalog()
+
+
+def _reset_coverage():
+    """Drop the coverage mask and empty SDA answers of earlier tests."""
+    try:
+        import GAEZ_coverage
+    except ImportError:
+        return
+    GAEZ_coverage.reset_coverage()
+
+
 @pytest.fixture
 def parametrize_crop_ids():
     """
@@ -0,0 +1,240 @@
+"""
+Unit tests for GAEZ_SDA_client.py
+
+This module tests the shared SDA client: adaptive timeouts, hedged
+requests, the circuit breaker and the stale-answer cache.
+"""
+
+import pytest
+import time
+import threading
+from pathlib import Path
+import sys
+from unittest.mock import patch, MagicMock
+import requests
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from GAEZ_SDA_client import SDAClient, CircuitBreaker, SDAUnavailableError
+
+
+def _response(payload):
+    """Build a mocked successful requests.Response."""
+    response = MagicMock()
+    response.json.return_value = payload
+    response.raise_for_status = MagicMock()
+    return response
+
+
+TABLE = {'Table': [['mukey'], ['123456']]}
+
+
+class TestAdaptiveTimeout:
+    """Tests for latency-percentile based timeouts."""
+
+    @pytest.mark.unit
+    def test_uses_default_until_enough_samples(self):
+        """Cold client falls back to the configured per-kind default."""
+        client = SDAClient(default_timeouts={'tabular': 6, 'spatial': 30}, min_samples=5)
+        assert client.timeout_for('tabular') == 6
+        assert client.timeout_for('spatial') == 30
+
+    @pytest.mark.unit
+    def test_timeout_tracks_p99_and_is_clamped(self):
+        """Timeout is p99 x multiplier, clamped to [min_timeout, max_timeout]."""
+        client = SDAClient(min_samples=5, timeout_multiplier=3.0, min_timeout=2, max_timeout=60)
+        for _ in range(20):
+            client._tracker('tabular').add(1.0)
+        assert client.timeout_for('tabular') == pytest.approx(3.0)
+
+        for _ in range(20):
+            client._tracker('fast').add(0.01)
+        assert client.timeout_for('fast') == 2
+
+        for _ in range(20):
+            client._tracker('slow').add(100.0)
+        assert client.timeout_for('slow') == 60
+
+    @pytest.mark.unit
+    @patch('GAEZ_SDA_client.requests.post')
+    def test_explicit_timeout_caps_adaptive_value(self, mock_post):
+        """A caller-supplied timeout is an upper bound on the request timeout."""
+        mock_post.return_value = _response(TABLE)
+        client = SDAClient(default_timeouts={'spatial': 30}, hedge=False)
+
+        client.query("SELECT 1", kind='spatial', timeout=10)
+
+        assert mock_post.call_args[1]['timeout'] <= 10
+
+
+class TestQuery:
+    """Tests for request formatting and retries."""
+
+    @pytest.mark.unit
+    @patch('GAEZ_SDA_client.requests.post')
+    def test_posts_json_columnname_payload(self, mock_post):
+        """Every query uses the same JSON+COLUMNNAME payload."""
+        mock_post.return_value = _response(TABLE)
+        client = SDAClient(hedge=False)
+
+        result = client.query("SELECT mukey FROM mapunit")
+
+        assert result == TABLE
+        assert mock_post.call_args[1]['json'] == {"format": "JSON+COLUMNNAME", "query": "SELECT mukey FROM mapunit"}
+
+    @pytest.mark.unit
+    @patch('GAEZ_SDA_client.time.sleep')
+    @patch('GAEZ_SDA_client.requests.post')
+    def test_connection_error_retried_without_sleeping(self, mock_post, mock_sleep):
+        """A failed attempt is retried immediately."""
+        mock_post.side_effect = [requests.ConnectionError("reset"), _response(TABLE)]
+        client = SDAClient(hedge=False, retries=1)
+
+        assert client.query("SELECT 1") == TABLE
+        assert mock_post.call_count == 2
+        mock_sleep.assert_not_called()
+
+    @pytest.mark.unit
+    @patch('GAEZ_SDA_client.requests.post')
+    def test_client_error_not_retried(self, mock_post):
+        """4xx responses are raised without retrying or tripping the breaker."""
+        response = MagicMock()
+        error_response = MagicMock(status_code=400)
+        response.raise_for_status.side_effect = requests.HTTPError("400", response=error_response)
+        mock_post.return_value = response
+        client = SDAClient(hedge=False, retries=2, failure_threshold=1)
+
+        with pytest.raises(requests.HTTPError):
+            client.query("SELECT bad")
+
+        assert mock_post.call_count == 1
+        assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+class TestHedging:
+    """Tests for hedged duplicate requests."""
+
+    @pytest.mark.unit
+    def test_slow_primary_is_hedged(self):
+        """When the first request is slower than p95 a duplicate wins."""
+        calls = []
+        release = threading.Event()
+
+        def fake_post(url, json=None, timeout=None):
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                release.wait(2)
+            return _response(TABLE)
+
+        client = SDAClient(min_samples=5, min_timeout=1, max_timeout=5, retries=0)
+        for _ in range(20):
+            client._tracker('tabular').add(0.05)
+
+        with patch('GAEZ_SDA_client.requests.post', side_effect=fake_post):
+            assert client.query("SELECT 1") == TABLE
+        release.set()
+
+        stats = client.stats()
+        assert stats['hedged'] == 1
+        assert stats['hedge_wins'] == 1
+        assert len(calls) == 2
+
+
+class TestCircuitBreaker:
+    """Tests for the circuit breaker and stale cache."""
+
+    @pytest.mark.unit
+    def test_breaker_opens_and_half_opens(self):
+        """Breaker opens after threshold failures and allows one probe after reset."""
+        breaker = CircuitBreaker(failure_threshold=2, reset_seconds=0.05)
+        breaker.record_failure()
+        assert breaker.allow_request()
+        breaker.record_failure()
+        assert not breaker.allow_request()
+
+        time.sleep(0.06)
+        assert breaker.allow_request()
+        assert not breaker.allow_request()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    @pytest.mark.unit
+    @patch('GAEZ_SDA_client.requests.post')
+    def test_open_breaker_fails_fast(self, mock_post):
+        """With the breaker open SDA is not called at all."""
+        mock_post.side_effect = requests.ConnectionError("down")
+        client = SDAClient(hedge=False, retries=0, failure_threshold=1, reset_seconds=60)
+
+        with pytest.raises(requests.ConnectionError):
+            client.query("SELECT 1")
+        with pytest.raises(SDAUnavailableError):
+            client.query("SELECT 1")
+
+        assert mock_post.call_count == 1
+
+    @pytest.mark.unit
+    @patch('GAEZ_SDA_client.requests.post')
+    def test_client_error_releases_half_open_probe(self, mock_post):
+        """A 400 answer to the half-open probe does not hold the breaker half-open."""
+        client = SDAClient(hedge=False, retries=0, failure_threshold=1, reset_seconds=0.05)
+        mock_post.side_effect = requests.ConnectionError("down")
+        with pytest.raises(requests.ConnectionError):
+            client.query("SELECT 1")
+
+        time.sleep(0.06)
+        bad_request = MagicMock()
+        bad_request.raise_for_status.side_effect = requests.HTTPError("400", response=MagicMock(status_code=400))
+        mock_post.side_effect = None
+        mock_post.return_value = bad_request
+        with pytest.raises(requests.HTTPError):
+            client.query("SELECT bad")
+        assert client.breaker.state == CircuitBreaker.HALF_OPEN
+
+        mock_post.return_value = _response(TABLE)
+        assert client.query("SELECT 1") == TABLE
+        assert client.breaker.state == CircuitBreaker.CLOSED
+
+    @pytest.mark.unit
+    @patch('GAEZ_SDA_client.requests.post')
+    def test_serves_stale_answer_when_down(self, mock_post):
+        """Last good answer is served while SDA is failing."""
+        client = SDAClient(hedge=False, retries=0, failure_threshold=1, reset_seconds=60)
+        mock_post.return_value = _response(TABLE)
+        client.query("SELECT 1")
+
+        mock_post.side_effect = requests.Timeout("slow")
+        assert client.query("SELECT 1") == TABLE
+        assert client.query("SELECT 1") == TABLE
+        assert client.stats()['stale_served'] == 2
+
+
+class TestQuerySDA:
+    """Tests for GAEZ_SDA_query.query_sda on top of the shared client."""
+
+    @pytest.mark.unit
+    @patch('GAEZ_SDA_client.requests.post')
+    def test_query_sda_strips_header_row(self, mock_post):
+        """query_sda keeps returning data rows only."""
+        from GAEZ_SDA_query import get_mukeys_by_bbox
+
+        mock_post.return_value = _response({'Table': [['mukey'], ['101'], ['202']]})
+
+        assert get_mukeys_by_bbox(-101.8, 41.1, -101.7, 41.2) == [101, 202]
+
+    @pytest.mark.unit
+    @patch('GAEZ_SDA_client.requests.post')
+    def test_query_sda_retries_override(self, mock_post):
+        """query_sda(retries=0) fails fast; the default uses the client's retry count."""
+        from GAEZ_SDA_query import query_sda
+
+        mock_post.side_effect = requests.ConnectionError("reset")
+        client = SDAClient(hedge=False, retries=2, failure_threshold=10)
+        with patch('GAEZ_SDA_client.get_sda_client', return_value=client):
+            with pytest.raises(requests.ConnectionError):
+                query_sda("SELECT 1", retries=0)
+            assert mock_post.call_count == 1
+
+            with pytest.raises(requests.ConnectionError):
+                query_sda("SELECT 2")
+            assert mock_post.call_count == 4
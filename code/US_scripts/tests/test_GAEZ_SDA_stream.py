@@ -0,0 +1,176 @@
+"""
+Unit tests for GAEZ_SDA_stream.py
+
+This module tests incremental parsing of SDA JSON+COLUMNNAME answers:
+rows split across chunk boundaries, typed column conversion, malformed
+bodies, the streaming SDA client call and the streamed ssurgo_gaez_data path.
+"""
+
+import json
+import time
+import pytest
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import sys
+from unittest.mock import patch, MagicMock
+import requests
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import gaez_config
+from GAEZ_SDA_stream import iter_table_rows, iter_table_frames, rows_to_frame, SDAStreamError
+from GAEZ_SDA_client import SDAClient
+
+
+HEADER = ['mukey', 'hzname', 'om_r']
+ROWS = [['1', 'A"p]', '1.5'], ['2', None, None], ['3', 'Bt[1]\\', 'n/a'], ['4', 'C', '']]
+BODY = json.dumps({'Table': [HEADER] + ROWS}).encode()
+
+# Raw ssurgo_gaez_data query answer as SDA sends it (all values strings or null)
+QUERY_HEADER = ['mukey', 'cokey', 'compname', 'comppct_r', 'chkey', 'hzname', 'hzdept_r', 'hzdepb_r',
+                'sandtotal_r', 'silttotal_r', 'claytotal_r', 'pi_r', 'lep_r', 'ec_r', 'caco3_r', 'om_r',
+                'dbovendry_r', 'gypsum_r', 'sar_r', 'cec7_r', 'ecec_r', 'sumbases_r', 'ph1to1h2o_r',
+                'total_fragvol_r', 'fragkind', 'plasticity', 'stickiness', 'drainagecl', 'hydricrating',
+                'taxtempcl', 'frostact', 'reskind', 'resdept_r', 'reshard', 'taxminalogy', 'pondfreqcl',
+                'ponddurcl', 'flodfreqcl', 'floddurcl', 'wtdepannmin']
+QUERY_ROWS = [
+    ['100', '1', 'Holdrege', '85', '11', 'Ap', '0', '20', '40.0', '40.0', '20.0', '5.0', '2.0', '0.5', '0',
+     '2.0', '1.4', '0', '1.0', '15.0', '12.0', '10.0', '6.5', '5', 'Gravel', None, None, 'Well drained',
+     'No', 'Mesic', 'Low', None, None, None, 'Mixed', None, None, None, None, '150'],
+    ['100', '1', 'Holdrege', '85', '12', 'Bt', '20', '60', '30.0', '40.0', '30.0', '12.0', '4.0', '0.6', '1',
+     '1.0', '1.5', '0', '2.0', '20.0', None, '15.0', '7.2', None, None, None, None, 'Well drained',
+     'No', 'Mesic', 'Low', None, None, None, 'Mixed', None, None, None, None, '150'],
+]
+
+
+class TestIterTableRows:
+    """Tests for iter_table_rows."""
+
+    @pytest.mark.unit
+    def test_every_split_point(self):
+        """Rows are identical wherever the body is split into chunks."""
+        for split in range(1, len(BODY)):
+            batches = list(iter_table_rows([BODY[:split], BODY[split:]]))
+            assert batches == [(HEADER, ROWS)], split
+
+    @pytest.mark.unit
+    def test_batches_and_multibyte_characters(self):
+        """Rows are yielded in batches; UTF-8 characters split across chunks decode correctly."""
+        rows = [[str(i), 'Ä horizon', str(i)] for i in range(7)]
+        body = json.dumps({'Table': [HEADER] + rows}, ensure_ascii=False).encode()
+        chunks = [body[i:i + 3] for i in range(0, len(body), 3)]
+
+        batches = list(iter_table_rows(chunks, batch_rows=3))
+
+        assert [len(batch) for _, batch in batches] == [3, 3, 1]
+        assert [row for _, batch in batches for row in batch] == rows
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("body", [b'{}', b'', b'{"Table": [["mukey"]]}', b'{"Table": []}'])
+    def test_empty_answers(self, body):
+        """Empty answers yield nothing."""
+        assert list(iter_table_rows([body])) == []
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("body", [BODY[:-10], b'{"error": "bad query"}', b'{"Table": [["a"], "b"]}'])
+    def test_malformed_bodies_raise(self, body):
+        """Truncated bodies and non-table answers raise SDAStreamError."""
+        with pytest.raises(SDAStreamError):
+            list(iter_table_rows([body]))
+
+
+class TestTypedFrames:
+    """Tests for rows_to_frame / iter_table_frames."""
+
+    @pytest.mark.unit
+    def test_numeric_columns_are_float(self):
+        """Schema columns become float64 (unparseable -> NaN); others keep the strings."""
+        frame = rows_to_frame(HEADER, ROWS, ['om_r'])
+
+        assert frame['om_r'].dtype == np.float64
+        np.testing.assert_array_equal(frame['om_r'], [1.5, np.nan, np.nan, np.nan])
+        assert frame['mukey'].tolist() == ['1', '2', '3', '4']
+
+    @pytest.mark.unit
+    def test_frames_match_full_parse(self):
+        """Concatenated batches equal a DataFrame of the fully parsed body."""
+        frames = list(iter_table_frames([BODY[:20], BODY[20:]], ['om_r'], batch_rows=2))
+        expected = pd.DataFrame(ROWS, columns=HEADER)
+        expected['om_r'] = pd.to_numeric(expected['om_r'], errors='coerce')
+
+        pd.testing.assert_frame_equal(pd.concat(frames, ignore_index=True), expected)
+
+
+class TestStreamingClient:
+    """Tests for SDAClient.stream and the streamed ssurgo_gaez_data path."""
+
+    @pytest.mark.unit
+    @patch('GAEZ_SDA_client.requests.post')
+    def test_stream_yields_body_chunks(self, mock_post):
+        """The body is requested with stream=True and yielded chunk by chunk."""
+        response = MagicMock()
+        response.iter_content.return_value = iter([BODY[:10], BODY[10:]])
+        mock_post.return_value = response
+        client = SDAClient(hedge=False)
+
+        assert b''.join(client.stream('SELECT 1')) == BODY
+        assert mock_post.call_args.kwargs['stream'] is True
+        assert mock_post.call_args.kwargs['json']['format'] == 'JSON+COLUMNNAME'
+        assert len(client._tracker('stream')) == 1
+
+    @pytest.mark.unit
+    @patch('GAEZ_SDA_client.requests.post')
+    def test_stream_failure_counts_against_breaker(self, mock_post):
+        """Connection failures are retried, then raised and recorded by the breaker."""
+        mock_post.side_effect = requests.ConnectionError("down")
+        client = SDAClient(hedge=False, retries=1, failure_threshold=1)
+
+        with pytest.raises(requests.ConnectionError):
+            list(client.stream('SELECT 1'))
+        assert mock_post.call_count == 2
+        assert client.breaker.state == 'open'
+
+    @pytest.mark.unit
+    @patch('GAEZ_SDA_client.requests.post')
+    def test_half_open_probe_released(self, mock_post):
+        """A 400 probe and an abandoned probe body both leave the breaker usable."""
+        client = SDAClient(hedge=False, retries=0, failure_threshold=1, reset_seconds=0.05)
+        mock_post.side_effect = requests.ConnectionError("down")
+        with pytest.raises(requests.ConnectionError):
+            list(client.stream('SELECT 1'))
+
+        time.sleep(0.06)
+        bad_request = MagicMock()
+        bad_request.raise_for_status.side_effect = requests.HTTPError("400", response=MagicMock(status_code=400))
+        mock_post.side_effect = None
+        mock_post.return_value = bad_request
+        with pytest.raises(requests.HTTPError):
+            list(client.stream('SELECT bad'))
+        assert client.breaker.state == 'half_open'
+
+        response = MagicMock()
+        response.iter_content.return_value = iter([BODY[:10], BODY[10:]])
+        mock_post.return_value = response
+        chunks = client.stream('SELECT 1')
+        assert next(chunks) == BODY[:10]
+        chunks.close()
+        assert client.breaker.state == 'closed'
+
+    @pytest.mark.unit
+    def test_ssurgo_gaez_data_streams_large_requests(self, monkeypatch):
+        """Requests with many mukeys go through the stream and give the same frame."""
+        import GAEZ_SSURGO_data
+
+        body = json.dumps({'Table': [QUERY_HEADER] + QUERY_ROWS}).encode()
+        client = MagicMock()
+        client.stream.return_value = iter([body[:100], body[100:]])
+        monkeypatch.setattr(gaez_config, 'sda_stream_min_mukeys', 1)
+        monkeypatch.setattr(GAEZ_SSURGO_data.GAEZ_SDA_client, 'get_sda_client', lambda: client)
+
+        result = GAEZ_SSURGO_data.ssurgo_gaez_data(['100'], source='sda')
+        expected = GAEZ_SSURGO_data._ssurgo_rows_to_frame(QUERY_HEADER, QUERY_ROWS)
+
+        client.stream.assert_called_once()
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
@@ -194,6 +194,43 @@ class TestCalculateDepthWeights:
         weights = sqi.calculate_depth_weights(data)
         assert weights.iloc[1] == 0, "Zero-thickness horizon should have zero weight"
 
+    def test_vectorized_matches_scalar_cumulative_weight(self):
+        """Array weights equal the per-horizon scalar cumulative_weight formula."""
+        tops = np.array([0, 18, 43, 90, 150])
+        bottoms = np.array([18, 43, 90, 150, 230])
+        for depth_type in [1, 2, 3, 4]:
+            raw = np.array([sqi.cumulative_weight(b, depth_type) - sqi.cumulative_weight(t, depth_type)
+                            for t, b in zip(tops, bottoms)])
+            np.testing.assert_allclose(sqi.depth_weights(tops, bottoms, depth_type), raw / raw.sum())
+
+    def test_depth_weights_are_cached_copies(self):
+        """Repeated boundary patterns hit the cache and callers get writable copies."""
+        sqi._cached_depth_weights.cache_clear()
+        first = sqi.depth_weights([0, 20], [20, 60], 2)
+        first[0] = -1
+        second = sqi.depth_weights([0, 20], [20, 60], 2)
+
+        assert second[0] > 0
+        assert sqi._cached_depth_weights.cache_info().hits == 1
+
+    def test_batch_weights_match_single_profiles(self):
+        """Padded batch weights equal per-profile weights and ignore padding."""
+        data = pd.DataFrame({
+            'cokey': ['a', 'a', 'a', 'b', 'b'],
+            'hzdept_r': [0, 20, 50, 0, 30],
+            'hzdepb_r': [20, 50, 100, 30, 150],
+        })
+        keys, tops, bottoms, mask = sqi.pad_profile_depths(data)
+        weights = sqi.depth_weights_batch(tops, bottoms, 3, mask)
+
+        assert list(keys) == ['a', 'b']
+        assert tops.shape == (2, 3) and not mask[1, 2]
+        assert weights[1, 2] == 0
+        for i, key in enumerate(keys):
+            profile = data[data['cokey'] == key]
+            expected = sqi.calculate_depth_weights(profile, depthWt_type=3).to_numpy()
+            np.testing.assert_allclose(weights[i, :len(profile)], expected)
+
 
 class TestCalculateSQ1:
     """Tests for calculate_SQ1 (nutrient availability)."""
@@ -579,6 +616,101 @@ class TestGaezSqiRatings:
         pass
 
 
+
+class TestIncrementalRescore:
+    """Tests for what-if rescoring of only the SQIs whose inputs changed."""
+
+    @pytest.mark.unit
+    def test_changed_properties_and_affected_sqis(self, sample_soil_horizon_data):
+        """A topsoil pH change only touches SQ1 and SQ2; a lost horizon touches every SQI."""
+        after = sample_soil_horizon_data.copy()
+        after.loc[0, 'ph'] = 5.0
+
+        assert sqi.changed_properties(sample_soil_horizon_data, after) == {'ph'}
+        assert sqi.affected_sqis({'ph'}) == ['SQ1', 'SQ2']
+        assert sqi.affected_sqis({'sandtotal_r', 'compname'}) == []
+        assert sqi.affected_sqis(sqi.changed_properties(sample_soil_horizon_data, after.iloc[:2])) == sqi.SQI_NAMES
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("column, values", [
+        ('ph', [4.5, 6.8, 7.0]),
+        ('ec', [12.0, 0.4, 0.3]),
+        ('caco3', [30.0, 1.0, 2.0]),
+        ('db', [1.8, 1.35, 1.45]),
+        ('drain_id', [6, 6, 6]),
+        ('hzdepb_r', [15, 50, 150]),
+    ])
+    def test_rescore_matches_full_rating(self, sample_soil_horizon_data, column, values):
+        """Rescoring the affected SQIs gives the same ratings as a full recalculation."""
+        requirements = sqi.load_sqi_requirements('4', 'I')
+        before = sqi.prepare_sqi_data(sample_soil_horizon_data)
+        previous = sqi.score_sqis(before, requirements, 'I', 2)
+        after = before.copy()
+        after[column] = values
+
+        sqis = sqi.affected_sqis(sqi.changed_properties(before, after))
+        result = sqi.rescore_sqis(after, previous, sqis, requirements, 'I', 2)
+
+        assert len(sqis) < len(sqi.SQI_NAMES)
+        pd.testing.assert_frame_equal(result, sqi.gaez_sqi_ratings(after, '4', 'I', depthWt_type=2))
+
+
+class TestMapUnitRatings:
+    """Tests for batch scoring of all components and area-weighted map unit ratings."""
+
+    @pytest.fixture
+    def map_unit_data(self, sample_soil_horizon_data):
+        """Two map units: mukey 1 with a 3- and a 2-horizon component, mukey 2 with one component."""
+        first = sample_soil_horizon_data.assign(mukey='1', cokey='11', compname='Alpha', comppct_r=70)
+        second = sample_soil_horizon_data.iloc[:2].assign(
+            mukey='1', cokey='12', compname='Beta', comppct_r=30, hzdepb_r=[10, 40], ph=[5.0, 5.2],
+            ec=[6.0, 9.0], db=[1.6, 1.7], fragvol=[35.0, 50.0], rd=60.0, vertic=1, drain_id=6, il=2)
+        third = sample_soil_horizon_data.assign(mukey='2', cokey='21', compname='Gamma', comppct_r=90,
+                                                caco3=[10.0, 25.0, 40.0], texture_class_id='3')
+        return pd.concat([first, second, third], ignore_index=True)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("input_level", ['L', 'I', 'H'])
+    def test_components_match_scalar_ratings(self, map_unit_data, input_level):
+        """Each component of the padded batch equals its own gaez_sqi_ratings result."""
+        requirements = sqi.load_sqi_requirements('4', input_level)
+        components = sqi.score_components(sqi.prepare_sqi_data(map_unit_data), requirements, input_level, 2)
+
+        assert list(components['cokey']) == ['11', '12', '21']
+        for _, component in components.iterrows():
+            profile = map_unit_data[map_unit_data['cokey'] == component['cokey']].reset_index(drop=True)
+            scalar = sqi.gaez_sqi_ratings(profile, '4', input_level, depthWt_type=2).iloc[0]
+            for name in sqi.SQI_NAMES + ['SR']:
+                if name == 'SQ1' and input_level == 'H':
+                    assert np.isnan(component[name])
+                else:
+                    np.testing.assert_allclose(component[name], float(scalar[name]), rtol=1e-9)
+
+    @pytest.mark.unit
+    def test_area_weighted_ratings(self, map_unit_data):
+        """Map unit scores are the comppct_r-weighted means of their components."""
+        components, map_units = sqi.gaez_map_unit_ratings(map_unit_data, '4', 'I', depthWt_type=2)
+
+        assert list(map_units['mukey']) == ['1', '2']
+        first = map_units.iloc[0]
+        for name in sqi.SQI_NAMES + ['SR']:
+            expected = 0.7 * components.loc[0, name] + 0.3 * components.loc[1, name]
+            np.testing.assert_allclose(first[name], expected, rtol=1e-9)
+        assert first['components'] == 2 and first['comppct_total'] == 100
+        np.testing.assert_allclose(map_units.iloc[1]['SR'], components.loc[2, 'SR'], rtol=1e-9)
+
+    @pytest.mark.unit
+    def test_missing_comppct_weighs_equally(self):
+        """Without comppct_r the components of a map unit weigh the same."""
+        components = pd.DataFrame({'mukey': ['1', '1'], 'cokey': ['a', 'b'], 'comppct_r': [np.nan, np.nan],
+                                   **{name: [40.0, 60.0] for name in sqi.SQI_NAMES + ['SR']}})
+
+        result = sqi.map_unit_ratings(components).iloc[0]
+
+        assert result['SR'] == 50.0
+        assert np.isnan(result['comppct_total'])
+
+
 @pytest.mark.parametrize("depth_type", [1, 2, 3, 4])
 def test_depth_weight_types(depth_type, sample_soil_horizon_data):
     """Parametrized test for all depth weight types."""
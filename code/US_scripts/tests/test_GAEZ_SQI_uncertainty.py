@@ -0,0 +1,160 @@
+"""
+Unit tests for GAEZ_SQI_uncertainty.py
+
+This module tests triangular sampling of SSURGO low/high ranges, the
+vectorized texture classification and batch SQI scoring, and the
+percentile bands returned by gaez_sqi_uncertainty.
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import GAEZ_SQI_functions as sqi
+from GAEZ_SQI_uncertainty import triangular_draws, sample_profiles, gaez_sqi_uncertainty
+from GAEZ_SSURGO_data import gettt, getTXT_id, texture_class_ids, BULK_DENSITY_REF
+
+
+SQI_COLUMNS = ['SQ1', 'SQ2', 'SQ3', 'SQ4', 'SQ5', 'SQ6', 'SQ7', 'SR']
+
+
+@pytest.fixture
+def processed_profile():
+    """Three-horizon profile shaped like ssurgo_gaez_data output after phase classification."""
+    data = pd.DataFrame({
+        'cokey': ['1001'] * 3, 'hzdept_r': [0, 20, 60], 'hzdepb_r': [20, 60, 150],
+        'sand': [40.0, 30.0, 20.0], 'silt': [40.0, 35.0, 35.0], 'clay': [20.0, 35.0, 45.0],
+        'om': [3.0, 1.0, 0.5], 'db_measured': [1.3, 1.45, 1.5], 'sar': [0.0, 2.0, 8.0],
+        'ph': [6.2, 6.5, 8.0], 'ec': [0.5, 2.0, 6.0], 'caco3': [0.0, 5.0, 20.0], 'gypsum': [0.0, 0.0, 3.0],
+        'teb': [12.0, 16.0, 30.0], 'cecs': [15.0, 20.0, 35.0], 'fragvol': [5.0, 10.0, 30.0],
+        'rd': [80.0] * 3, 'vertic': 0, 'gelic': 0, 'roots': 0, 'il': 0, 'swr': 0, 'drain_id': 5,
+        'pscl_id': '2', 'phase_ids_list': [[0]] * 3,
+    })
+    data['esp'] = (100 * (-0.0126 + 0.01475 * data['sar'])) / (1 + (-0.0126 + 0.01475 * data['sar']))
+    data['soc'] = data['om'] * 0.58
+    data['bs'] = data['teb'] / data['cecs'] * 100
+    data['cecc'] = data['cecs'] / data['clay'] * 100
+    data['texture'] = data.apply(gettt, axis=1)
+    data['texture_class_id'] = data['texture'].apply(getTXT_id)
+    data['db'] = data['db_measured'] / data['texture'].map(BULK_DENSITY_REF)
+    return data
+
+
+@pytest.fixture
+def ranged_profile(processed_profile):
+    """Processed profile with SSURGO low/high columns."""
+    data = processed_profile.copy()
+    for col, source, spread in [('sandtotal', 'sand', 10), ('claytotal', 'clay', 8), ('om', 'om', 0.5),
+                                ('ph1to1h2o', 'ph', 0.5), ('cec7', 'cecs', 3), ('sumbases', 'teb', 3),
+                                ('ec', 'ec', 1.0), ('dbovendry', 'db_measured', 0.1)]:
+        data[f'{col}_l'] = (data[source] - spread).clip(lower=0)
+        data[f'{col}_h'] = data[source] + spread
+    data['resdept_l'] = 50
+    data['resdept_h'] = 120
+    return data
+
+
+class TestTriangularDraws:
+    """Tests for triangular inverse-CDF sampling."""
+
+    @pytest.mark.unit
+    def test_draws_stay_within_range(self):
+        """Draws lie in [low, high] and centre on the mode."""
+        rng = np.random.default_rng(0)
+        draws = triangular_draws([10.0, 5.0], [20.0, 5.0], [40.0, 5.0], 5000, rng, correlated=False)
+
+        assert draws.shape == (5000, 2)
+        assert draws[:, 0].min() >= 10 and draws[:, 0].max() <= 40
+        assert draws[:, 0].mean() == pytest.approx((10 + 20 + 40) / 3, abs=0.5)
+        np.testing.assert_array_equal(draws[:, 1], 5.0)
+
+    @pytest.mark.unit
+    def test_missing_range_keeps_mode(self):
+        """Missing low/high give no spread and NaN modes stay NaN."""
+        rng = np.random.default_rng(0)
+        draws = triangular_draws([np.nan, 1.0], [3.0, np.nan], [np.nan, 2.0], 10, rng)
+
+        np.testing.assert_array_equal(draws[:, 0], 3.0)
+        assert np.isnan(draws[:, 1]).all()
+
+
+class TestVectorizedTexture:
+    """Tests for texture_class_ids against the row-wise gettt."""
+
+    @pytest.mark.unit
+    def test_matches_gettt(self):
+        """Every texture on a 2% grid gets the same class id as gettt/getTXT_id."""
+        sand, clay = np.meshgrid(np.arange(0, 101, 2.0), np.arange(0, 101, 2.0))
+        keep = sand + clay <= 100
+        sand, clay = sand[keep], clay[keep]
+        silt = 100 - sand - clay
+
+        expected = [getTXT_id(gettt(s, si, c)) for s, si, c in zip(sand, silt, clay)]
+        expected = np.nan_to_num(np.array(expected, dtype=float), nan=0)
+
+        np.testing.assert_array_equal(texture_class_ids(sand, silt, clay), expected)
+
+
+class TestBatchScoring:
+    """Tests for calculate_sqi_batch and the uncertainty bands."""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("input_level", ['L', 'I', 'H'])
+    def test_zero_width_draws_match_scalar(self, processed_profile, input_level):
+        """Without ranges every draw equals the scalar gaez_sqi_ratings result."""
+        scalar = sqi.gaez_sqi_ratings(processed_profile, '1', input_level, depthWt_type=2).iloc[0]
+        bands = gaez_sqi_uncertainty(processed_profile, '1', input_level, depthWt_type=2, n_draws=20, seed=1)
+
+        for name in SQI_COLUMNS:
+            if name == 'SQ1' and input_level == 'H':
+                assert bands[name].isna().all()
+            else:
+                np.testing.assert_allclose(bands[name], float(scalar[name]), rtol=1e-9)
+
+    @pytest.mark.unit
+    def test_bands_are_ordered_and_bounded(self, ranged_profile):
+        """Percentiles are non-decreasing, within 0-100 and bracket a real spread."""
+        bands = gaez_sqi_uncertainty(ranged_profile, '1', 'I', depthWt_type=2, n_draws=500,
+                                     percentiles=(5, 50, 95), seed=3)
+
+        assert list(bands.index) == [5, 50, 95]
+        assert (bands.diff().dropna() >= -1e-9).all().all()
+        assert ((bands >= 0) & (bands <= 100)).all().all()
+        assert bands.loc[95, 'SR'] > bands.loc[5, 'SR']
+
+    @pytest.mark.unit
+    def test_sampled_texture_is_valid(self, ranged_profile):
+        """Sand/clay draws leave a non-negative silt remainder and a texture class."""
+        layers = sample_profiles(ranged_profile, n_draws=200, seed=5)
+
+        assert layers['texture_class_id'].shape == (200, 3)
+        assert (layers['texture_class_id'] > 0).all()
+        assert layers['rd'].min() >= 50 and layers['rd'].max() <= 120
+
+    @pytest.mark.unit
+    def test_seed_is_reproducible(self, ranged_profile):
+        """The same seed gives the same bands."""
+        first = gaez_sqi_uncertainty(ranged_profile, '1', 'L', n_draws=100, seed=11)
+        second = gaez_sqi_uncertainty(ranged_profile, '1', 'L', n_draws=100, seed=11)
+        pd.testing.assert_frame_equal(first, second)
+
+    @pytest.mark.unit
+    def test_user_measured_values_are_held(self, ranged_profile):
+        """Overlaid plot and lab values are not sampled over the SSURGO ranges they replace."""
+        from integrate_user_data import integrate_lab_data, integrate_plot_data
+
+        plot = pd.DataFrame({'hzdept': [0], 'hzdepb': [20], 'ph': [8.0]})
+        lab = pd.DataFrame({'depth_cm': [40], 'base_sat_pct': [55.0]})
+        data = integrate_lab_data(lab, integrate_plot_data(plot, ranged_profile))
+
+        layers = sample_profiles(data, n_draws=200, seed=7)
+
+        np.testing.assert_array_equal(layers['ph'][:, 0], 8.0)
+        np.testing.assert_array_equal(layers['bs'][:, 1], 55.0)
+        assert layers['ph'][:, 1].std() > 0
+        assert layers['bs'][:, 2].std() > 0
@@ -560,6 +560,114 @@ class TestSDAReturnMocked:
         assert request_data['query'] == query
 
 
+_QUERY_HEADER = ['mukey', 'cokey', 'compname', 'comppct_r', 'chkey', 'hzname', 'hzdept_r', 'hzdepb_r',
+                 'sandtotal_r', 'silttotal_r', 'claytotal_r', 'pi_r', 'lep_r', 'ec_r', 'caco3_r', 'om_r',
+                 'dbovendry_r', 'gypsum_r', 'sar_r', 'cec7_r', 'ecec_r', 'sumbases_r', 'ph1to1h2o_r',
+                 'total_fragvol_r', 'fragkind', 'plasticity', 'stickiness', 'drainagecl', 'hydricrating',
+                 'taxtempcl', 'frostact', 'reskind', 'resdept_r', 'reshard', 'taxminalogy', 'pondfreqcl',
+                 'ponddurcl', 'flodfreqcl', 'floddurcl', 'wtdepannmin']
+
+
+def _mukey_rows(mukey):
+    """Two horizons of one component per mukey, as SDA returns them."""
+    cokey = str(int(mukey) * 10)
+    return [[mukey, cokey, 'Comp', '90', cokey + str(i), 'A', str(top), str(top + 20), '40', '40', '20',
+             '5', '2', '0.5', '0', '2', '1.4', '0', '1', '15', '12', '10', '6.5', '5', None, None, None,
+             'Well drained', 'No', 'Mesic', 'Low', None, None, None, 'Mixed', None, None, None, None, '150']
+            for i, top in enumerate((0, 20))]
+
+
+def _fake_sda(queries):
+    """sda_return stand-in answering from the mukeys in the query's IN clause."""
+    def answer(query, **kwargs):
+        queries.append(query)
+        mukeys = query.split('comp.mukey IN (')[1].split(')')[0].split(',')
+        rows = [row for mukey in mukeys for row in _mukey_rows(mukey)]
+        return pd.DataFrame({'Table': [[_QUERY_HEADER] + rows]})
+    return answer
+
+
+class TestChunkedSSURGOFetch:
+    """Tests for batched, concurrent SDA fetching and the horizon cache."""
+
+    @pytest.mark.unit
+    def test_large_lists_are_batched_and_merged(self, monkeypatch):
+        """Mukeys are split into batches and merged back in query order."""
+        import gaez_config
+        import GAEZ_SSURGO_data
+
+        queries = []
+        monkeypatch.setattr(gaez_config, 'sda_max_mukeys_per_request', 3)
+        monkeypatch.setattr(GAEZ_SSURGO_data, 'sda_return', _fake_sda(queries))
+        mukeys = [105, 101, 104, 102, 103, 106, 107]
+
+        result = GAEZ_SSURGO_data.ssurgo_gaez_data(mukeys, source='sda')
+
+        assert len(queries) == 3
+        assert result['mukey'].tolist() == [str(m) for m in sorted(mukeys) for _ in range(2)]
+        assert result['hzdept_r'].tolist() == [0, 20] * len(mukeys)
+
+    @pytest.mark.unit
+    def test_cached_mukeys_skip_upstream(self, monkeypatch):
+        """Mukeys fetched before are served from the cache and left out of the query."""
+        import GAEZ_SSURGO_data
+
+        queries = []
+        monkeypatch.setattr(GAEZ_SSURGO_data, 'sda_return', _fake_sda(queries))
+
+        first = GAEZ_SSURGO_data.ssurgo_gaez_data(['201', '202'], source='sda')
+        second = GAEZ_SSURGO_data.ssurgo_gaez_data(['202', '203', '201'], source='sda')
+
+        assert len(queries) == 2
+        assert 'comp.mukey IN (203)' in queries[1]
+        assert second['mukey'].tolist() == ['201', '201', '202', '202', '203', '203']
+        pd.testing.assert_frame_equal(second[second['mukey'] != '203'].reset_index(drop=True), first,
+                                      check_dtype=False, check_categorical=False)
+
+    @pytest.mark.unit
+    def test_failed_batch_is_raised(self, monkeypatch):
+        """A failed batch raises after the others finish; their rows are cached."""
+        import requests
+        import gaez_config
+        import GAEZ_SSURGO_data
+
+        queries = []
+        answer = _fake_sda(queries)
+
+        def flaky(query, **kwargs):
+            if 'comp.mukey IN (303' in query:
+                queries.append(query)
+                raise requests.ConnectionError("down")
+            return answer(query)
+
+        monkeypatch.setattr(gaez_config, 'sda_max_mukeys_per_request', 2)
+        monkeypatch.setattr(GAEZ_SSURGO_data, 'sda_return', flaky)
+
+        with pytest.raises(GAEZ_SSURGO_data.SDAFetchError) as err:
+            GAEZ_SSURGO_data.ssurgo_gaez_data(['301', '302', '303', '304', '305'], source='sda')
+        assert err.value.mukeys == ['303', '304']
+        assert len(queries) == 3
+
+        monkeypatch.setattr(GAEZ_SSURGO_data, 'sda_return', answer)
+        result = GAEZ_SSURGO_data.ssurgo_gaez_data(['301', '302', '303', '304', '305'], source='sda')
+        assert len(queries) == 4 and 'comp.mukey IN (303,304)' in queries[-1]
+        assert result['mukey'].unique().tolist() == ['301', '302', '303', '304', '305']
+
+    @pytest.mark.unit
+    def test_batch_size_follows_rows_per_mukey(self, monkeypatch):
+        """Batch size is the target rows per request over the observed rows per mukey."""
+        import gaez_config
+        import GAEZ_SSURGO_data
+
+        monkeypatch.setattr(gaez_config, 'sda_target_rows_per_request', 100)
+        monkeypatch.setattr(gaez_config, 'sda_max_mukeys_per_request', 250)
+        monkeypatch.setattr(GAEZ_SSURGO_data, '_rows_per_mukey', {'rows': 0, 'mukeys': 0})
+
+        assert GAEZ_SSURGO_data.sda_batch_size() == 250
+        GAEZ_SSURGO_data._record_batch_size(10, 40)
+        assert GAEZ_SSURGO_data.sda_batch_size() == 25
+
+
 # Integration tests
 @pytest.mark.integration
 @pytest.mark.requires_network
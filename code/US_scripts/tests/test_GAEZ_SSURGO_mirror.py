@@ -0,0 +1,152 @@
+"""
+Unit tests for GAEZ_SSURGO_mirror.py
+
+This module tests building the local SQLite SSURGO mirror and serving
+ssurgo_gaez_data from it, with SDA fallback for missing map units.
+"""
+
+import pytest
+import pandas as pd
+from pathlib import Path
+import sys
+from unittest.mock import patch
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import GAEZ_SSURGO_mirror
+from GAEZ_SSURGO_data import ssurgo_gaez_data, build_ssurgo_gaez_query
+
+
+def _fake_gssurgo_tables():
+    """Two map units, one component each, two horizons per component (gSSURGO column names)."""
+    return {
+        'muaggatt': pd.DataFrame({'mukey': ['100', '200'], 'wtdepannmin': [50, None]}),
+        'component': pd.DataFrame({
+            'mukey': ['100', '200'], 'cokey': ['1001', '2001'], 'compname': ['Alpha', 'Beta'],
+            'comppct_r': [85, 90], 'drainagecl': ['Well drained', 'Poorly drained'],
+            'hydricrating': ['No', 'Yes'], 'taxtempcl': ['mesic', 'mesic'], 'frostact': ['Low', 'Low'],
+        }),
+        'corestrictions': pd.DataFrame({'cokey': ['1001'], 'reskind': ['Lithic bedrock'],
+                                        'resdept_r': [80], 'reshard': ['Strongly cemented']}),
+        'cotaxfmmin': pd.DataFrame({'cokey': ['1001', '2001'], 'taxminalogy': ['mixed', 'smectitic']}),
+        'comonth': pd.DataFrame({'cokey': ['2001', '2001'], 'monthseq': [1, 2],
+                                 'pondfreqcl': ['None', 'Frequent'], 'ponddurcl': [None, 'Long'],
+                                 'flodfreqcl': ['None', 'None'], 'floddurcl': [None, None]}),
+        'chorizon': pd.DataFrame({
+            'cokey': ['1001', '1001', '2001', '2001'], 'chkey': ['11', '12', '21', '22'],
+            'hzname': ['A', 'Bt', 'A', 'Bg'], 'hzdept_r': [0, 20, 0, 30], 'hzdepb_r': [20, 80, 30, 150],
+            'sandtotal_r': [40.0, 30.0, 10.0, 8.0], 'silttotal_r': [40.0, 35.0, 45.0, 42.0],
+            'claytotal_r': [20.0, 35.0, 45.0, 50.0], 'pi_r': [10, 20, 30, 35], 'lep_r': [1, 3, 6, 7],
+            'ec_r': [0.5, 0.4, 1.0, 2.0], 'caco3_r': [0, 0, 0, 5], 'om_r': [3.0, 1.0, 4.0, 1.0],
+            'dbovendry_r': [1.3, 1.45, 1.2, 1.3], 'gypsum_r': [0, 0, 0, 0], 'sar_r': [0, 0, 1, 2],
+            'cec7_r': [15, 20, 35, 38], 'ecec_r': [14, 18, 33, 35], 'sumbases_r': [12, 16, 30, 36],
+            'ph1to1h2o_r': [6.2, 6.5, 7.0, 7.8],
+        }),
+        'chfrags': pd.DataFrame({'chkey': ['11', '12', '12'], 'fragvol_r': [5, 10, 5],
+                                 'fragkind': ['Granite', 'Granite', 'Basalt']}),
+        'chconsistence': pd.DataFrame({'chkey': ['11', '21'], 'plasticity': ['Slightly plastic', 'Plastic'],
+                                       'stickiness': ['Slightly sticky', 'Sticky']}),
+    }
+
+
+@pytest.fixture
+def mirror_path(tmp_path):
+    """Build a mirror from the fake gSSURGO tables."""
+    tables = _fake_gssurgo_tables()
+
+    def fake_load(table_name, gdb_file=None, columns=None):
+        return tables[table_name].reindex(columns=columns)
+
+    path = str(tmp_path / "ssurgo_mirror.sqlite")
+    with patch('surgo_data.load_attributes_from_table', side_effect=fake_load):
+        GAEZ_SSURGO_mirror.build_ssurgo_mirror('fake.gdb', path)
+    return path
+
+
+class TestBuildMirror:
+    """Tests for building and querying the mirror."""
+
+    @pytest.mark.unit
+    def test_build_creates_indexed_tables(self, mirror_path):
+        """All joined tables and their key indexes are created."""
+        import sqlite3
+        conn = sqlite3.connect(mirror_path)
+        names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'index')")}
+        conn.close()
+
+        assert set(GAEZ_SSURGO_mirror.MIRROR_TABLES) <= names
+        assert 'idx_chorizon_cokey' in names
+
+    @pytest.mark.unit
+    def test_build_mukey_subset(self, tmp_path):
+        """Only the requested map units (and their children) are mirrored."""
+        tables = _fake_gssurgo_tables()
+        path = str(tmp_path / "subset.sqlite")
+        with patch('surgo_data.load_attributes_from_table',
+                   side_effect=lambda name, gdb_file=None, columns=None: tables[name].reindex(columns=columns)):
+            GAEZ_SSURGO_mirror.build_ssurgo_mirror('fake.gdb', path, mukeys=[200])
+
+        assert GAEZ_SSURGO_mirror.mirror_mukeys([100, 200], path) == {'200'}
+        header, rows = GAEZ_SSURGO_mirror.query_mirror("SELECT chkey FROM chorizon", path)
+        assert sorted(r[0] for r in rows) == ['21', '22']
+
+    @pytest.mark.unit
+    def test_same_query_runs_locally(self, mirror_path):
+        """The SDA query runs unchanged on the mirror and returns text values."""
+        header, rows = GAEZ_SSURGO_mirror.query_mirror(build_ssurgo_gaez_query([100]), mirror_path)
+
+        assert header[:2] == ['mukey', 'cokey']
+        assert {row[0] for row in rows} == {'100'}
+        assert all(v is None or isinstance(v, str) for row in rows for v in row)
+
+
+class TestMirrorSource:
+    """Tests for ssurgo_gaez_data with source='mirror'."""
+
+    @pytest.mark.unit
+    @patch('GAEZ_SSURGO_data.sda_return')
+    def test_mirror_answers_without_sda(self, mock_sda_return, mirror_path):
+        """Mirrored mukeys never reach SDA."""
+        with patch('gaez_config.ssurgo_mirror_path', mirror_path):
+            df = ssurgo_gaez_data([100, 200], source='mirror')
+
+        mock_sda_return.assert_not_called()
+        assert isinstance(df, pd.DataFrame)
+        assert list(df['chkey']) == ['11', '12', '21', '22']
+        assert df.loc[df['chkey'] == '12', 'fragvol'].iloc[0] in (10, 5)
+        assert df.loc[df['chkey'] == '11', 'rd'].iloc[0] == 80
+        assert df['drain_id'].tolist() == [5, 5, 2, 2]
+
+    @pytest.mark.unit
+    @patch('GAEZ_SSURGO_data.sda_return')
+    def test_missing_mukey_falls_back_to_sda(self, mock_sda_return, mirror_path):
+        """Only mukeys absent from the mirror are sent to SDA."""
+        header = ['mukey', 'cokey', 'compname', 'comppct_r', 'chkey', 'hzname', 'hzdept_r', 'hzdepb_r',
+                  'sandtotal_r', 'silttotal_r', 'claytotal_r', 'pi_r', 'lep_r', 'ec_r', 'caco3_r', 'om_r',
+                  'dbovendry_r', 'gypsum_r', 'sar_r', 'cec7_r', 'ecec_r', 'sumbases_r', 'ph1to1h2o_r',
+                  'total_fragvol_r', 'fragkind', 'plasticity', 'stickiness', 'drainagecl', 'hydricrating',
+                  'taxtempcl', 'frostact', 'reskind', 'resdept_r', 'reshard', 'taxminalogy', 'pondfreqcl',
+                  'ponddurcl', 'flodfreqcl', 'floddurcl', 'wtdepannmin']
+        row = ['50', '501', 'Gamma', '100', '51', 'A', '0', '200', '60', '30', '10'] + [None] * 12 \
+            + [None, None, None, None, 'Well drained'] + [None] * 12
+        mock_sda_return.return_value = pd.DataFrame({'Table': [[header, row]]})
+
+        with patch('gaez_config.ssurgo_mirror_path', mirror_path):
+            df = ssurgo_gaez_data([300, 100, 50], source='mirror')
+
+        query = mock_sda_return.call_args[0][0]
+        assert 'IN (300,50)' in query
+        assert list(df['mukey']) == ['50', '100', '100']
+
+    @pytest.mark.unit
+    @patch('GAEZ_SSURGO_data.sda_return')
+    def test_no_mirror_file_uses_sda(self, mock_sda_return, tmp_path):
+        """Without a mirror file all mukeys go to SDA."""
+        mock_sda_return.return_value = None
+
+        with patch('gaez_config.ssurgo_mirror_path', str(tmp_path / "missing.sqlite")):
+            result = ssurgo_gaez_data([100], source='mirror')
+
+        assert result == "SSURGO not available in this area"
+        mock_sda_return.assert_called_once()
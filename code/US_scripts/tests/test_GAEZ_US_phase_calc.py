@@ -359,6 +359,99 @@ class TestPhaseClassificationIntegration:
             pytest.skip("Function not directly importable")
 
 
+class TestPhaseRuleTable:
+    """Tests for the declarative phase rule table and its compiled plan."""
+
+    @pytest.mark.unit
+    def test_table_covers_all_phase_ids(self):
+        """Every HWSD phase id has exactly one rule."""
+        from GAEZ_US_phase_calc import PHASE_RULE_TABLE, PHASE_IDS
+
+        assert [name for name, _ in PHASE_RULE_TABLE] == list(PHASE_IDS)
+
+    @pytest.mark.unit
+    def test_unknown_operator_rejected(self):
+        """Compiling a rule with an unknown operator raises ValueError."""
+        from GAEZ_US_phase_calc import compile_phase_rules
+
+        with pytest.raises(ValueError):
+            compile_phase_rules([('stony', [[('fragvol', '~', 35)]])])
+
+    @pytest.mark.unit
+    def test_custom_table_and_aliases(self):
+        """A plan runs on any table; aliased and missing fields are handled."""
+        from GAEZ_US_phase_calc import compile_phase_rules, evaluate_phase_rules
+
+        plan = compile_phase_rules(
+            [('saline', [[('ec', '>=', 4)], [('reskind', 'contains', ('salic',))]]),
+             ('hard', [[('reshard', 'notin', ('noncemented',))]])],
+            phase_ids={'saline': 10, 'hard': 99},
+            aliases={'ec': ('ec', 'elec_cond')})
+        table = pd.DataFrame({'elec_cond': [5.0, 1.0, np.nan]})
+
+        matches = evaluate_phase_rules(table, plan)
+
+        assert plan['ids'] == [10, 99]
+        np.testing.assert_array_equal(matches, [[True, True], [False, True], [False, True]])
+
+    @pytest.mark.unit
+    def test_string_rules_normalize_case(self):
+        """String clauses match regardless of case and surrounding blanks."""
+        from GAEZ_US_phase_calc import classify_gaez_v4_phases, PHASE_IDS
+
+        data = pd.DataFrame({
+            'fragvol': [5.0, 5.0], 'rd': [30, 30], 'ec': [0.5, 0.5], 'esp': [1.0, 1.0], 'sar': [1.0, 1.0],
+            'reskind': [' Lithic Bedrock', None], 'reshard': [None, None], 'fragkind': [None, None],
+            'wtdepannmin': [None, None], 'drainagecl': ['Well drained', 'WELL DRAINED'],
+            'hydricrating': ['No', 'No'], 'pondfreqcl': [None, None], 'flodfreqcl': [None, None],
+            'taxminalogy': ['Smectitic', 'mixed'],
+        })
+
+        result = classify_gaez_v4_phases(data)
+
+        assert result['phase_ids_list'].tolist() == [[PHASE_IDS['lithic']], [0]]
+        assert result['vertic'].tolist() == [1, 0]
+
+
+class TestComponentLevelPhases:
+    """Tests for evaluating component attributes once per component."""
+
+    @pytest.mark.unit
+    def test_component_clauses_broadcast_to_horizons(self):
+        """Component attributes come from the first horizon of each cokey; horizon fields stay per row."""
+        from GAEZ_US_phase_calc import evaluate_phase_rules, compile_phase_rules
+
+        plan = compile_phase_rules([('lithic', [[('reskind', 'contains', ('lithic bedrock',)), ('rd', '<=', 50)]]),
+                                    ('stony', [[('fragvol', '>=', 35)]])],
+                                   phase_ids={'lithic': 2, 'stony': 1})
+        data = pd.DataFrame({
+            'cokey': ['1', '1', '2', '2', '1'],
+            'reskind': ['Lithic bedrock', None, None, 'Lithic bedrock', 'Lithic bedrock'],
+            'rd': [30, 30, 30, 30, 30],
+            'fragvol': [10.0, 50.0, 10.0, 50.0, 10.0],
+        })
+
+        matches = evaluate_phase_rules(data, plan)
+        per_row = evaluate_phase_rules(data, plan, component_key=None)
+
+        np.testing.assert_array_equal(matches[:, 0], [True, True, False, False, True])
+        np.testing.assert_array_equal(matches[:, 1], [False, True, False, True, False])
+        np.testing.assert_array_equal(per_row[:, 0], [True, False, False, True, True])
+
+    @pytest.mark.unit
+    def test_matches_per_row_evaluation(self, sample_soil_component_data):
+        """With component attributes constant per cokey, both passes give the same phases."""
+        from GAEZ_US_phase_calc import evaluate_phase_rules
+
+        data = sample_soil_component_data.copy()
+        data['fragvol'] = [5.0, 40.0, 60.0]
+        data['rd'] = 45
+        data['reskind'] = 'Duripan'
+
+        np.testing.assert_array_equal(evaluate_phase_rules(data),
+                                      evaluate_phase_rules(data, component_key=None))
+
+
 @pytest.mark.parametrize("fragment_volume,expected_phase", [
     (35.0, "stony or skeletic"),
     (10.0, "normal"),
@@ -0,0 +1,134 @@
+"""
+Unit tests for GAEZ_coverage.py
+
+This module tests the SSURGO coverage mask (bundled extents, rasterization,
+save/load), the TTL negative cache, and the pre-checks in
+GAEZ_SDA_query.get_dominant_mukey_at_point that skip SDA for uncovered points.
+"""
+
+import pytest
+from pathlib import Path
+import sys
+from unittest.mock import patch
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import GAEZ_coverage
+from GAEZ_coverage import CoverageMask, NegativeCache, SSURGO_EXTENTS
+from GAEZ_SDA_query import get_dominant_mukey_at_point
+
+
+class TestCoverageMask:
+    """Tests for CoverageMask."""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("lat, lon", [(41.2, -101.6), (61.2, -149.9), (19.7, -155.1),
+                                          (18.2, -66.5), (13.4, 144.8), (52.9, 173.2)])
+    def test_bundled_extents_cover_us(self, lat, lon):
+        """Surveyed US states and territories pass the bundled mask."""
+        assert CoverageMask.from_extents(SSURGO_EXTENTS.values()).covers(lat, lon)
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("lat, lon", [(0.0, 0.0), (48.85, 2.35), (35.0, -40.0), (-33.9, 151.2), (95.0, 0.0)])
+    def test_bundled_extents_reject_elsewhere(self, lat, lon):
+        """Points far from any survey area (and invalid latitudes) are rejected."""
+        assert not CoverageMask.from_extents(SSURGO_EXTENTS.values()).covers(lat, lon)
+
+    @pytest.mark.unit
+    def test_antimeridian_and_round_trip(self, tmp_path):
+        """Boxes wider than 180 degrees wrap; save/load keeps every cell."""
+        mask = CoverageMask.from_extents([(-179.5, 50.0, 179.5, 52.0)], resolution=0.5)
+
+        assert mask.covers(51.0, 179.8) and mask.covers(51.0, -179.8)
+        assert not mask.covers(51.0, 0.0)
+        path = str(tmp_path / "coverage.npz")
+        mask.save(path)
+        loaded = CoverageMask.load(path)
+        assert loaded.resolution == 0.5 and (loaded.cells == mask.cells).all()
+
+    @pytest.mark.unit
+    def test_build_from_survey_polygons(self, tmp_path, monkeypatch):
+        """build_coverage_mask rasterizes SDA sapolygon envelopes and is picked up from config."""
+        import gaez_config
+
+        payload = {"Table": [["west", "south", "east", "north"], [-102.0, 41.0, -101.0, 42.0]]}
+        path = str(tmp_path / "coverage.npz")
+        monkeypatch.setattr(gaez_config, 'coverage_mask_path', path)
+        with patch('GAEZ_coverage.GAEZ_SDA_client.get_sda_client') as get_client:
+            get_client.return_value.query.return_value = payload
+            GAEZ_coverage.build_coverage_mask(resolution=0.1)
+
+        mask = GAEZ_coverage.get_coverage_mask()
+        assert mask.source == path
+        assert mask.covers(41.5, -101.5)
+        assert not mask.covers(38.0, -95.0)  # inside the bundled extents, not in this survey
+
+
+class TestNegativeCache:
+    """Tests for NegativeCache."""
+
+    @pytest.mark.unit
+    def test_entries_expire(self):
+        """Empty answers are served until the TTL passes."""
+        cache = NegativeCache(10, ttl=60, resolution=1e-5)
+        with patch('GAEZ_coverage.time.monotonic', return_value=100.0):
+            cache.add(41.2, -101.6)
+        with patch('GAEZ_coverage.time.monotonic', return_value=150.0):
+            assert cache.contains(41.2, -101.6)
+            assert not cache.contains(41.21, -101.6)
+        with patch('GAEZ_coverage.time.monotonic', return_value=161.0):
+            assert not cache.contains(41.2, -101.6)
+        assert len(cache) == 0
+
+    @pytest.mark.unit
+    def test_size_bound(self):
+        """The least recently used coordinates are dropped first."""
+        cache = NegativeCache(2, ttl=60, resolution=1e-5)
+        cache.add(1.0, 1.0)
+        cache.add(2.0, 2.0)
+        cache.contains(1.0, 1.0)
+        cache.add(3.0, 3.0)
+
+        assert cache.contains(1.0, 1.0) and cache.contains(3.0, 3.0)
+        assert not cache.contains(2.0, 2.0)
+
+
+class TestDominantMukeyPrecheck:
+    """Tests for the coverage pre-checks of get_dominant_mukey_at_point."""
+
+    @pytest.mark.unit
+    @patch('GAEZ_SDA_query.get_mukeys_by_bbox')
+    def test_uncovered_point_skips_sda(self, mock_bbox):
+        """Points outside the mask are answered without a query."""
+        assert get_dominant_mukey_at_point(48.85, 2.35) is None
+        mock_bbox.assert_not_called()
+        assert GAEZ_coverage.coverage_stats()['mask_rejects'] == 1
+
+    @pytest.mark.unit
+    @patch('GAEZ_SDA_query.get_mukeys_by_bbox')
+    def test_empty_answer_is_cached(self, mock_bbox):
+        """An empty SDA answer is stored; the repeat does not query SDA."""
+        mock_bbox.return_value = []
+
+        assert get_dominant_mukey_at_point(41.5, -82.5) is None
+        assert get_dominant_mukey_at_point(41.5, -82.5) is None
+
+        assert mock_bbox.call_count == 1
+        stats = GAEZ_coverage.coverage_stats()
+        assert stats['negative_stores'] == 1 and stats['negative_hits'] == 1
+
+    @pytest.mark.unit
+    @patch('GAEZ_SDA_query.get_mukeys_by_bbox')
+    def test_failures_and_hits_not_cached(self, mock_bbox):
+        """SDA errors propagate and found map units are always re-queried."""
+        mock_bbox.side_effect = GAEZ_coverage.GAEZ_SDA_client.SDAUnavailableError('down')
+        with pytest.raises(GAEZ_coverage.GAEZ_SDA_client.SDAUnavailableError):
+            get_dominant_mukey_at_point(41.2, -101.6)
+
+        mock_bbox.side_effect = None
+        mock_bbox.return_value = [123]
+        assert get_dominant_mukey_at_point(41.2, -101.6) == 123
+        assert get_dominant_mukey_at_point(41.2, -101.6) == 123
+        assert mock_bbox.call_count == 3
+        assert GAEZ_coverage.coverage_stats()['negative_entries'] == 0
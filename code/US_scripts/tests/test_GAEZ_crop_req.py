@@ -925,3 +925,37 @@ class TestGetGAEZRequirementsSourceDatabase:
         )
 
         assert result is None
+
+
+class TestCompiledLookups:
+    """Tests for the dense texture and drainage score tables."""
+
+    @pytest.mark.unit
+    def test_texture_table_defaults_and_string_ids(self, sample_crop_requirements):
+        """Listed classes are scored, everything else (and unknown ids) is 100."""
+        table = GAEZ_crop_req.compile_texture_scores(sample_crop_requirements['texture'])
+
+        assert table.shape == (8, 13)
+        assert table[1, 7] == 95 and table[3, 12] == 82
+        assert table[1, 1] == 100 and table[7, 7] == 100
+
+        scores = GAEZ_crop_req.texture_scores(table, 1, ['7', 7.0, None, 'x', 99])
+        assert list(scores) == [95, 95, 100, 100, 100]
+
+    @pytest.mark.unit
+    def test_texture_first_listed_score_wins(self):
+        """Duplicated classes keep the first score, like the row-wise lookup."""
+        req = pd.DataFrame({'SQI_code': [1, 1], 'text_class_id': [4, 4], 'score': [60, 90]})
+        assert GAEZ_crop_req.compile_texture_scores(req)[1, 4] == 60
+
+    @pytest.mark.unit
+    def test_drainage_ids_match_numerically(self):
+        """String and integer PSCL ids index the same drainage scores."""
+        req = pd.DataFrame({'SQI_code': [4, 4, 4], 'PSCL_ID': [2, 2, 3], 'DrainNum': [1, 2, 1],
+                            'score': [10, 50, 20]})
+        table = GAEZ_crop_req.compile_drainage_scores(req)
+
+        assert table.shape == (4, 8)
+        assert GAEZ_crop_req.drainage_scores(table, '2', 1) == 10
+        assert GAEZ_crop_req.drainage_scores(req, 3, '1') == 20
+        assert list(GAEZ_crop_req.drainage_scores(table, [2, 2, 0], [2, 5, 1])) == [50, 100, 100]
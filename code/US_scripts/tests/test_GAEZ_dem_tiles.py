@@ -0,0 +1,182 @@
+"""
+Unit tests for GAEZ_dem_tiles.py
+
+This module tests the Horn slope kernel, point and window slopes on a tiled
+DEM (including windows that cross tile edges and nodata), and the DEM step
+of the slope-source chain.
+"""
+
+import pytest
+import json
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import gaez_config
+from GAEZ_dem_tiles import DemGrid, horn_slope, metres_per_degree, dem_slope_at, build_dem_tiles, INDEX_FILE
+
+# 1 arc-second cells, grid origin (north-west corner) near (41.2 N, -101.6 E)
+CELL = 1 / 3600
+ORIGIN_LON, ORIGIN_LAT = -101.6, 41.2
+
+
+def _write_dem(grid_dir, cells, tile_size=4):
+    """Write cells as a tiled DEM directory without rasterio (all-NaN tiles dropped)."""
+    height, width = cells.shape
+    tiles = []
+    for tr in range(0, height, tile_size):
+        for tc in range(0, width, tile_size):
+            tile = np.full((tile_size, tile_size), np.nan, dtype=np.float32)
+            block = cells[tr:tr + tile_size, tc:tc + tile_size]
+            tile[:block.shape[0], :block.shape[1]] = block
+            if np.isnan(tile).all():
+                continue
+            key = f"{tr // tile_size}_{tc // tile_size}"
+            np.save(grid_dir / f"tile_{key}.npy", tile)
+            tiles.append(key)
+    index = {'crs': 'EPSG:4269', 'transform': [CELL, 0.0, ORIGIN_LON, 0.0, -CELL, ORIGIN_LAT],
+             'width': width, 'height': height, 'tile_size': tile_size, 'tiles': tiles}
+    (grid_dir / INDEX_FILE).write_text(json.dumps(index))
+    return DemGrid(str(grid_dir))
+
+
+def _plane(rise_east, rise_south, shape=(12, 12)):
+    """Elevations rising rise_east metres per cell eastward and rise_south per cell southward."""
+    rows, cols = np.indices(shape)
+    return (500 + rise_east * cols + rise_south * rows).astype(np.float32)
+
+
+def _cell_center(row, col):
+    return ORIGIN_LAT - CELL * (row + 0.5), ORIGIN_LON + CELL * (col + 0.5)
+
+
+def _expected_slope(rise_east, rise_south, row):
+    lon_m, lat_m = metres_per_degree(_cell_center(row, 0)[0])
+    return 100 * np.hypot(rise_east / (CELL * lon_m), rise_south / (CELL * lat_m))
+
+
+class TestHornSlope:
+    """Tests for the Horn kernel."""
+
+    @pytest.mark.unit
+    def test_plane_slope(self):
+        """A plane gives its exact gradient in every interior cell; the outer ring is NaN."""
+        slope = horn_slope(_plane(3.0, 4.0, (5, 6)), dx=10.0, dy=10.0)
+
+        np.testing.assert_allclose(slope[1:-1, 1:-1], 50.0)
+        assert np.isnan(slope[0]).all() and np.isnan(slope[:, -1]).all()
+
+    @pytest.mark.unit
+    def test_nodata_propagates(self):
+        """Cells next to NaN have no slope."""
+        z = _plane(1.0, 0.0, (5, 5))
+        z[2, 2] = np.nan
+
+        slope = horn_slope(z, 30.0, 30.0)
+
+        assert np.isnan(slope[1:4, 1:4]).all()
+
+
+class TestDemGrid:
+    """Tests for point and window slopes on tiled DEMs."""
+
+    @pytest.mark.unit
+    def test_point_slope_across_tiles(self, tmp_path):
+        """Point slopes match the plane gradient, including 3x3 windows crossing tile edges."""
+        grid = _write_dem(tmp_path, _plane(0.5, 0.2))
+
+        for row, col in [(1, 1), (3, 4), (4, 3), (7, 8), (10, 10)]:
+            lat, lon = _cell_center(row, col)
+            assert grid.slope_at(lat, lon) == pytest.approx(_expected_slope(0.5, 0.2, row), abs=0.01)
+            assert grid.elevations_at([lat], [lon])[0] == pytest.approx(500 + 0.5 * col + 0.2 * row)
+
+    @pytest.mark.unit
+    def test_edges_and_missing_tiles(self, tmp_path):
+        """Points on the DEM edge, outside it or next to a missing tile have no slope."""
+        cells = _plane(0.5, 0.2)
+        cells[8:, 8:] = np.nan  # one all-nodata tile that is not written
+        grid = _write_dem(tmp_path, cells)
+
+        assert '2_2' not in grid.tiles
+        assert grid.slope_at(*_cell_center(0, 5)) is None
+        assert grid.slope_at(*_cell_center(7, 7)) is None
+        assert grid.slope_at(ORIGIN_LAT + 1, ORIGIN_LON) is None
+
+    @pytest.mark.unit
+    def test_slope_window_matches_points(self, tmp_path):
+        """The vectorized window slopes equal the point slopes of the same cells."""
+        grid = _write_dem(tmp_path, _plane(1.0, -0.5))
+        lat_max, lon_min = _cell_center(2, 3)
+        lat_min, lon_max = _cell_center(9, 7)
+
+        slope, transform = grid.slope_window(lon_min, lat_min, lon_max, lat_max)
+
+        assert slope.shape == (8, 5)
+        assert transform[2] == pytest.approx(ORIGIN_LON + 3 * CELL)
+        assert transform[5] == pytest.approx(ORIGIN_LAT - 2 * CELL)
+        rows, cols = np.indices(slope.shape)
+        lats, lons = _cell_center(rows + 2, cols + 3)
+        np.testing.assert_allclose(slope, grid.slopes_at(lats.ravel(), lons.ravel()).reshape(slope.shape))
+
+
+class TestBuildDemTiles:
+    """Tests for tiling a DEM GeoTIFF."""
+
+    @pytest.mark.unit
+    def test_build_from_geotiff(self, tmp_path):
+        """A GeoTIFF round-trips through build_dem_tiles; nodata becomes NaN."""
+        rasterio = pytest.importorskip("rasterio")
+        from rasterio.transform import from_origin
+
+        cells = _plane(0.5, 0.2, (10, 10))
+        cells[:, 8:] = -9999
+        path = tmp_path / "dem.tif"
+        with rasterio.open(path, 'w', driver='GTiff', height=10, width=10, count=1, dtype='float32',
+                           crs='EPSG:4269', transform=from_origin(ORIGIN_LON, ORIGIN_LAT, CELL, CELL),
+                           nodata=-9999) as dst:
+            dst.write(cells, 1)
+
+        grid = DemGrid(build_dem_tiles(str(path), str(tmp_path / "dem"), tile_size=4))
+
+        assert grid.width == 10 and grid.height == 10
+        assert "0_2" not in grid.tiles
+        expected = np.where(cells == -9999, np.nan, cells)
+        np.testing.assert_array_equal(grid.read_window(0, 10, 0, 10), expected)
+
+
+class TestDemSlopeSource:
+    """Tests for the 'dem' step of the slope-source chain."""
+
+    @pytest.mark.unit
+    def test_resolve_slope_uses_local_dem(self, tmp_path, monkeypatch):
+        """With DEM tiles configured, resolve_slope answers from them without network calls."""
+        from GAEZ_elevation_slope import resolve_slope
+
+        _write_dem(tmp_path, _plane(0.5, 0.2))
+        monkeypatch.setattr(gaez_config, 'dem_tile_dir', str(tmp_path))
+        lat, lon = _cell_center(5, 5)
+
+        def no_network(*args, **kwargs):
+            raise AssertionError("EPQS called")
+
+        slope, source = resolve_slope(lat, lon, fetch_slope=no_network)
+
+        assert source == 'dem'
+        assert slope == pytest.approx(_expected_slope(0.5, 0.2, 5), abs=0.01)
+        assert dem_slope_at(ORIGIN_LAT + 1, ORIGIN_LON) is None
+
+    @pytest.mark.unit
+    def test_uncovered_point_falls_through_to_network(self, tmp_path, monkeypatch):
+        """Outside the DEM tiles (or without any) the chain continues to EPQS."""
+        from GAEZ_elevation_slope import resolve_slope
+
+        _write_dem(tmp_path, _plane(0.5, 0.2))
+        monkeypatch.setattr(gaez_config, 'dem_tile_dir', str(tmp_path))
+        assert resolve_slope(ORIGIN_LAT + 1, ORIGIN_LON, fetch_slope=lambda *a, **k: 4.5) == (4.5, 'epqs')
+
+        monkeypatch.setattr(gaez_config, 'dem_tile_dir', str(tmp_path / "missing"))
+        lat, lon = _cell_center(5, 5)
+        assert resolve_slope(lat, lon, fetch_slope=lambda *a, **k: 4.5) == (4.5, 'epqs')
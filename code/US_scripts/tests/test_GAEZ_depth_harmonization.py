@@ -0,0 +1,107 @@
+"""
+Unit tests for GAEZ_depth_harmonization.py
+
+This module tests cumulative-sum interval means against 1 cm slicing,
+padded batches, and the standard SQI layer aggregation used by the legacy
+plot/lab processors.
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from GAEZ_depth_harmonization import (interval_means, harmonize_horizons, sqi_layer_intervals, horizon_tops)
+from GAEZ_soil_data_processing import agg_data_layer_SQI
+
+
+def _sliced_means(tops, bottoms, values, target_tops, target_bottoms):
+    """Reference: expand to 1 cm slices and average each target interval."""
+    slices = np.full(int(max(bottoms.max(), target_bottoms.max())), np.nan)
+    for top, bottom, value in zip(tops, bottoms, values):
+        slices[int(top):int(bottom)] = value
+    return np.array([np.nanmean(slices[int(t):int(b)]) if np.any(~np.isnan(slices[int(t):int(b)])) else np.nan
+                     for t, b in zip(target_tops, target_bottoms)])
+
+
+class TestIntervalMeans:
+    """Tests for interval_means."""
+
+    @pytest.mark.unit
+    def test_matches_1cm_slicing(self):
+        """Means equal 1 cm slice means, including gaps and missing values."""
+        tops = np.array([0.0, 12.0, 30.0, 75.0])
+        bottoms = np.array([12.0, 25.0, 75.0, 140.0])
+        values = np.array([10.0, 20.0, np.nan, 40.0])
+        target_tops = np.array([0.0, 5.0, 20.0, 50.0, 100.0, 26.0])
+        target_bottoms = np.array([20.0, 13.0, 50.0, 100.0, 200.0, 30.0])
+
+        result = interval_means(tops, bottoms, values, target_tops, target_bottoms)
+
+        np.testing.assert_allclose(result, _sliced_means(tops, bottoms, values, target_tops, target_bottoms))
+        assert np.isnan(result[-1])
+
+    @pytest.mark.unit
+    def test_fractional_boundaries(self):
+        """Non-integer depths are weighted by their exact overlap."""
+        result = interval_means([0.0, 7.5], [7.5, 30.0], [2.0, 6.0], [0.0], [10.0])
+
+        assert result[0] == pytest.approx((7.5 * 2.0 + 2.5 * 6.0) / 10.0)
+
+    @pytest.mark.unit
+    def test_padded_batch_matches_single_profiles(self):
+        """A padded (P, H) batch gives the same means as each profile alone."""
+        tops = np.array([[0.0, 20.0, 50.0], [0.0, 35.0, 0.0]])
+        bottoms = np.array([[20.0, 50.0, 120.0], [35.0, 90.0, 0.0]])
+        values = np.array([[1.0, 2.0, 3.0], [4.0, 5.0, np.nan]])
+        mask = np.array([[True, True, True], [True, True, False]])
+        target_tops, target_bottoms = sqi_layer_intervals(100)
+
+        batch = interval_means(tops, bottoms, values, target_tops, target_bottoms, mask=mask)
+
+        assert batch.shape == (2, 3)
+        for p in range(2):
+            single = interval_means(tops[p][mask[p]], bottoms[p][mask[p]], values[p][mask[p]],
+                                    target_tops, target_bottoms)
+            np.testing.assert_allclose(batch[p], single)
+
+    @pytest.mark.unit
+    def test_unsorted_horizons(self):
+        """Horizon order does not matter."""
+        result = interval_means([20.0, 0.0], [50.0, 20.0], [2.0, 1.0], [0.0], [50.0])
+
+        assert result[0] == pytest.approx((20 * 1.0 + 30 * 2.0) / 50)
+
+
+class TestSQILayers:
+    """Tests for the standard SQI layer aggregation."""
+
+    @pytest.mark.unit
+    def test_layer_intervals_follow_profile_bottom(self):
+        """The last layer ends at min(100, bottom)."""
+        tops, bottoms = sqi_layer_intervals(80)
+
+        np.testing.assert_array_equal(tops, [0, 20, 50])
+        np.testing.assert_array_equal(bottoms, [20, 50, 80])
+
+    @pytest.mark.unit
+    def test_agg_data_layer_SQI_matches_slice_means(self):
+        """agg_data_layer_SQI equals the mean of the 1 cm values in each layer."""
+        data = pd.Series(np.r_[np.full(25, 10.0), np.full(35, 30.0)])
+
+        means, bounds = agg_data_layer_SQI(data, bottom=60, depth=True)
+
+        np.testing.assert_allclose(means, [10.0, (5 * 10.0 + 25 * 30.0) / 30, 30.0])
+        assert bounds.tolist() == [20, 50, 60]
+
+    @pytest.mark.unit
+    def test_harmonize_horizons_caps_at_max_depth(self):
+        """Horizon data below 200 cm are ignored."""
+        tops = horizon_tops([150, 300])
+        layers = harmonize_horizons(tops, [150, 300], {'ph': [6.0, 8.0]}, [100.0], [250.0])
+
+        assert layers['ph'].iloc[0] == pytest.approx((50 * 6.0 + 50 * 8.0) / 100)
@@ -0,0 +1,111 @@
+"""
+Unit tests for GAEZ_elevation_cache.py
+
+This module tests the coordinate-quantized elevation/slope cache: sharing
+entries within a DEM cell, LRU eviction, SQLite persistence, and its use by
+the EPQS elevation and slope functions (repeat and neighbouring lookups).
+"""
+
+import pytest
+from pathlib import Path
+import sys
+from unittest.mock import patch, MagicMock
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from GAEZ_elevation_cache import CoordinateCache, get_elevation_cache, elevation_cache_stats
+import GAEZ_elevation_slope
+
+CELL = 1 / 3600
+
+
+def _epqs_response(value):
+    response = MagicMock()
+    response.json.return_value = {'value': value}
+    return response
+
+
+class TestCoordinateCache:
+    """Tests for CoordinateCache."""
+
+    @pytest.mark.unit
+    def test_points_in_one_cell_share_an_entry(self):
+        """Coordinates quantized to the same cell hit the same entry; other kinds do not."""
+        cache = CoordinateCache(10, CELL)
+        cache.put('elevation:Meters', 41.0, -101.0, 950.5)
+
+        assert cache.get('elevation:Meters', 41.0 + 0.4 * CELL, -101.0 - 0.4 * CELL) == 950.5
+        assert cache.get('elevation:Meters', 41.0 + CELL, -101.0) is None
+        assert cache.get('slope:simple', 41.0, -101.0) is None
+        assert cache.stats() == {'hits': 1, 'disk_hits': 0, 'misses': 2, 'stores': 1, 'entries': 1}
+
+    @pytest.mark.unit
+    def test_lru_eviction_and_none(self):
+        """The least recently used entry is evicted; None is never stored."""
+        cache = CoordinateCache(2, CELL)
+        cache.put('e', 1.0, 1.0, 1.0)
+        cache.put('e', 2.0, 2.0, 2.0)
+        cache.get('e', 1.0, 1.0)
+        cache.put('e', 3.0, 3.0, 3.0)
+        cache.put('e', 4.0, 4.0, None)
+
+        assert len(cache) == 2
+        assert cache.get('e', 2.0, 2.0) is None
+        assert cache.get('e', 1.0, 1.0) == 1.0
+
+    @pytest.mark.unit
+    def test_sqlite_persistence(self, tmp_path):
+        """Entries written to the SQLite file are read back by a new cache."""
+        path = str(tmp_path / "elevation.sqlite")
+        CoordinateCache(10, CELL, path).put('elevation:Meters', 41.0, -101.0, 950.5)
+
+        cache = CoordinateCache(10, CELL, path)
+
+        assert cache.get('elevation:Meters', 41.0, -101.0) == 950.5
+        assert cache.stats()['disk_hits'] == 1
+        assert cache.get('elevation:Meters', 41.0, -101.0) == 950.5
+        assert cache.stats()['hits'] == 1
+
+
+class TestCachedElevationSlope:
+    """Tests for the cache in GAEZ_elevation_slope."""
+
+    @pytest.mark.unit
+    @patch('GAEZ_elevation_slope.requests.get')
+    def test_repeat_elevation_lookups_skip_epqs(self, mock_get):
+        """A second lookup in the same cell is answered from the cache; failures are not cached."""
+        mock_get.return_value = _epqs_response(950.5)
+
+        assert GAEZ_elevation_slope.get_elevation_usgs(41.0, -101.0) == 950.5
+        assert GAEZ_elevation_slope.get_elevation_usgs(41.0 + 0.2 * CELL, -101.0) == 950.5
+        assert mock_get.call_count == 1
+
+        mock_get.return_value = _epqs_response(-1000000)
+        assert GAEZ_elevation_slope.get_elevation_usgs(42.0, -101.0) is None
+        assert GAEZ_elevation_slope.get_elevation_usgs(42.0, -101.0) is None
+        assert mock_get.call_count == 3
+
+    @pytest.mark.unit
+    @patch('GAEZ_elevation_slope.requests.get')
+    def test_slope_cache_and_neighbour_reuse(self, mock_get):
+        """Slopes are cached; a field 100 m north reuses the first field's north sample."""
+        mock_get.side_effect = lambda url, params, timeout: _epqs_response(900 + params['y'] * 1000)
+
+        first = GAEZ_elevation_slope.get_slope_for_gaez(41.0, -101.0)
+        assert mock_get.call_count == 2
+        assert GAEZ_elevation_slope.get_slope_for_gaez(41.0, -101.0) == first
+        assert mock_get.call_count == 2
+
+        GAEZ_elevation_slope.get_slope_for_gaez(41.0 + 100 / 111000, -101.0)
+        assert mock_get.call_count == 3
+        assert elevation_cache_stats()['hits'] >= 2
+
+    @pytest.mark.unit
+    @patch('GAEZ_elevation_slope.requests.get')
+    def test_failed_slope_is_not_cached(self, mock_get):
+        """A slope that could not be estimated returns 0 and is retried next time."""
+        mock_get.side_effect = ConnectionError("EPQS down")
+
+        assert GAEZ_elevation_slope.get_slope_for_gaez(41.0, -101.0) == 0.0
+        assert get_elevation_cache().get('slope:simple', 41.0, -101.0) is None
@@ -0,0 +1,147 @@
+"""
+Unit tests for GAEZ_elevation_slope.py
+
+This module tests the slope-source precedence chain (resolve_slope): user
+site slope, SSURGO component slope_r, local DEM and the EPQS fallback, the
+component slope carried through the SSURGO horizon data, and slope grids for
+a bbox (get_slope_grid).
+"""
+
+import pytest
+import json
+import numpy as np
+from pathlib import Path
+import sys
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import GAEZ_elevation_slope
+from GAEZ_elevation_slope import resolve_slope, get_slope_grid
+from GAEZ_dem_tiles import metres_per_degree
+
+
+class TestResolveSlope:
+    """Tests for resolve_slope."""
+
+    @pytest.mark.unit
+    def test_site_slope_first(self):
+        """A recorded site slope wins; no network call is made."""
+        fetch = MagicMock(return_value=9.0)
+
+        assert resolve_slope(41.0, -101.0, site_slope=2.5, component_slope=6.0,
+                             fetch_slope=fetch) == (2.5, 'site')
+        fetch.assert_not_called()
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("site_slope", [None, np.nan, -1, 'n/a'])
+    def test_component_slope_without_site_slope(self, site_slope):
+        """Missing or invalid site slopes fall through to the component slope_r."""
+        fetch = MagicMock(return_value=9.0)
+
+        assert resolve_slope(41.0, -101.0, site_slope=site_slope, component_slope=6.0,
+                             fetch_slope=fetch) == (6.0, 'component')
+        fetch.assert_not_called()
+
+    @pytest.mark.unit
+    def test_dem_before_network(self, monkeypatch):
+        """A local DEM slope is used before EPQS."""
+        fetch = MagicMock(return_value=9.0)
+        monkeypatch.setattr(GAEZ_elevation_slope, 'dem_slope_at', lambda lat, lon: 3.25)
+
+        assert resolve_slope(41.0, -101.0, fetch_slope=fetch) == (3.25, 'dem')
+        fetch.assert_not_called()
+
+    @pytest.mark.unit
+    def test_network_last_and_default(self, monkeypatch):
+        """EPQS is the last resort; without any source the slope defaults to 0."""
+        monkeypatch.setattr(GAEZ_elevation_slope, 'dem_slope_at', lambda lat, lon: None)
+        fetch = MagicMock(return_value=4.5)
+
+        assert resolve_slope(41.0, -101.0, fetch_slope=fetch) == (4.5, 'epqs')
+        fetch.assert_called_once_with(41.0, -101.0, method='simple')
+        assert resolve_slope(41.0, -101.0, sources=('site', 'component'), fetch_slope=fetch) == (0.0, 'default')
+
+    @pytest.mark.unit
+    def test_configured_order(self, monkeypatch):
+        """The order comes from gaez_config.slope_sources."""
+        import gaez_config
+
+        monkeypatch.setattr(gaez_config, 'slope_sources', ('component', 'site'))
+
+        assert resolve_slope(41.0, -101.0, site_slope=2.5, component_slope=6.0) == (6.0, 'component')
+
+
+class TestComponentSlope:
+    """Tests for comp.slope_r in the SSURGO horizon data."""
+
+    @pytest.mark.unit
+    def test_query_selects_component_slope(self):
+        """The component-horizon query selects slope_r (no extra round trip)."""
+        from GAEZ_SSURGO_data import build_ssurgo_gaez_query, SSURGO_NUMERIC_QUERY_COLUMNS
+
+        assert 'comp.slope_r' in build_ssurgo_gaez_query([100])
+        assert 'slope_r' in SSURGO_NUMERIC_QUERY_COLUMNS
+
+
+class TestSlopeGrid:
+    """Tests for get_slope_grid."""
+
+    @pytest.mark.unit
+    def test_grid_from_local_dem(self, tmp_path, monkeypatch):
+        """With DEM tiles, every grid cell gets the Horn slope without network calls."""
+        import gaez_config
+
+        cell = 1 / 3600
+        rows, cols = np.indices((40, 40))
+        np.save(tmp_path / "tile_0_0.npy", (500 + 0.6 * cols).astype(np.float32))
+        (tmp_path / "index.json").write_text(json.dumps({
+            'transform': [cell, 0.0, -101.0, 0.0, -cell, 41.0], 'width': 40, 'height': 40,
+            'tile_size': 40, 'tiles': ['0_0']}))
+        monkeypatch.setattr(gaez_config, 'dem_tile_dir', str(tmp_path))
+
+        with patch('GAEZ_elevation_slope.requests.get') as mock_get:
+            slope, lats, lons, source = get_slope_grid(-101.0 + 5 * cell, 41.0 - 35 * cell,
+                                                       -101.0 + 35 * cell, 41.0 - 5 * cell, 3 * cell)
+
+        mock_get.assert_not_called()
+        assert source == 'dem'
+        assert slope.shape == (10, 10) == (len(lats), len(lons))
+        expected = 100 * 0.6 / (cell * metres_per_degree(lats)[0])
+        np.testing.assert_allclose(slope, np.repeat(expected[:, None], 10, axis=1), rtol=1e-4)
+
+    @pytest.mark.unit
+    @patch('GAEZ_elevation_slope.requests.get')
+    def test_grid_from_epqs_nodes(self, mock_get, monkeypatch):
+        """Without a DEM, each grid node (plus margin) is queried once and differenced."""
+        monkeypatch.setattr('GAEZ_elevation_slope.get_dem_grid', lambda: None)
+        resolution = 0.001
+
+        def epqs(url, params, timeout):
+            response = MagicMock()
+            response.json.return_value = {'value': 1000 + 5000 * params['y']}  # 5 m per 0.001 deg north
+            return response
+        mock_get.side_effect = epqs
+
+        slope, lats, lons, source = get_slope_grid(-101.004, 41.0, -101.0, 41.003, resolution)
+
+        assert source == 'epqs'
+        assert slope.shape == (3, 4)
+        assert mock_get.call_count == 5 * 6
+        _, lat_m = metres_per_degree(lats)
+        np.testing.assert_allclose(slope, np.repeat((100 * 5 / (resolution * lat_m))[:, None], 4, axis=1),
+                                   rtol=1e-3)
+
+    @pytest.mark.unit
+    def test_grid_limits(self, monkeypatch):
+        """Invalid bboxes and grids needing too many EPQS calls are rejected."""
+        import gaez_config
+
+        monkeypatch.setattr('GAEZ_elevation_slope.get_dem_grid', lambda: None)
+        monkeypatch.setattr(gaez_config, 'slope_grid_max_epqs_points', 10)
+
+        with pytest.raises(ValueError):
+            get_slope_grid(-101.0, 41.0, -101.1, 41.1, 0.01)
+        with pytest.raises(ValueError):
+            get_slope_grid(-101.1, 41.0, -101.0, 41.1, 0.01)
@@ -0,0 +1,139 @@
+"""
+Unit tests for GAEZ_mukey_raster.py
+
+This module tests the Albers projection, point/AOI lookups on a tiled
+mukey grid, and building the grid from a GeoTIFF.
+"""
+
+import pytest
+import json
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from GAEZ_mukey_raster import MukeyGrid, lonlat_to_albers, build_mukey_grid, INDEX_FILE
+
+
+# Grid origin in EPSG:5070 near (41.2 N, -101.6 E), 30 m cells, 8x8 cells in 4x4 tiles
+ORIGIN_X, ORIGIN_Y = -491000.0, 2055000.0
+
+
+def _write_grid(grid_dir, cells, tile_size=4, drop_empty=True):
+    """Write cells as a tiled grid directory without rasterio."""
+    height, width = cells.shape
+    tiles = []
+    for tr in range(0, height, tile_size):
+        for tc in range(0, width, tile_size):
+            tile = np.zeros((tile_size, tile_size), dtype=np.uint32)
+            block = cells[tr:tr + tile_size, tc:tc + tile_size]
+            tile[:block.shape[0], :block.shape[1]] = block
+            if drop_empty and not tile.any():
+                continue
+            key = f"{tr // tile_size}_{tc // tile_size}"
+            np.save(grid_dir / f"tile_{key}.npy", tile)
+            tiles.append(key)
+    index = {'crs': 'EPSG:5070', 'transform': [30.0, 0.0, ORIGIN_X, 0.0, -30.0, ORIGIN_Y],
+             'width': width, 'height': height, 'tile_size': tile_size, 'tiles': tiles}
+    (grid_dir / INDEX_FILE).write_text(json.dumps(index))
+    return MukeyGrid(str(grid_dir))
+
+
+def _cell_center_lonlat(row, col):
+    """Invert the projection for a cell centre using pyproj (test helper only)."""
+    pyproj = pytest.importorskip("pyproj")
+    transformer = pyproj.Transformer.from_crs("EPSG:5070", "EPSG:4326", always_xy=True)
+    return transformer.transform(ORIGIN_X + 30 * col + 15, ORIGIN_Y - 30 * row - 15)
+
+
+@pytest.fixture
+def grid(tmp_path):
+    cells = np.arange(1, 65, dtype=np.uint32).reshape(8, 8)
+    cells[4:, 4:] = 0  # one all-nodata tile that is not written
+    return _write_grid(tmp_path, cells)
+
+
+class TestProjection:
+    """Tests for the numpy Albers projection."""
+
+    @pytest.mark.unit
+    def test_matches_pyproj(self):
+        """Forward projection agrees with PROJ to well under a cell."""
+        pyproj = pytest.importorskip("pyproj")
+        transformer = pyproj.Transformer.from_crs("EPSG:4269", "EPSG:5070", always_xy=True)
+        lons = np.array([-101.6353, -124.0, -70.0, -96.0])
+        lats = np.array([41.2042, 48.5, 44.0, 25.0])
+
+        x, y = lonlat_to_albers(lons, lats)
+        ex, ey = transformer.transform(lons, lats)
+
+        np.testing.assert_allclose(x, ex, atol=0.01)
+        np.testing.assert_allclose(y, ey, atol=0.01)
+
+
+class TestMukeyGrid:
+    """Tests for point and bbox lookups."""
+
+    @pytest.mark.unit
+    def test_point_lookup(self, grid):
+        """A cell centre returns that cell's mukey."""
+        lon, lat = _cell_center_lonlat(2, 5)
+        assert grid.mukey_at(lat, lon) == 2 * 8 + 5 + 1
+
+    @pytest.mark.unit
+    def test_point_outside_or_nodata(self, grid):
+        """Nodata tiles and points off the grid return None."""
+        lon, lat = _cell_center_lonlat(6, 6)
+        assert grid.mukey_at(lat, lon) is None
+        assert grid.mukey_at(30.0, -90.0) is None
+
+    @pytest.mark.unit
+    def test_vectorized_points(self, grid):
+        """Many points across tiles in one call."""
+        coords = [_cell_center_lonlat(r, c) for r, c in [(0, 0), (7, 0), (0, 7), (7, 7)]]
+        lons, lats = zip(*coords)
+        np.testing.assert_array_equal(grid.mukeys_at(lats, lons), [1, 57, 8, 0])
+
+    @pytest.mark.unit
+    def test_read_window_spans_tiles(self, grid):
+        """Window reads stitch slices from several tiles."""
+        window = grid.read_window(2, 6, 3, 6)
+        expected = np.arange(1, 65, dtype=np.uint32).reshape(8, 8)
+        expected[4:, 4:] = 0
+        np.testing.assert_array_equal(window, expected[2:6, 3:6])
+
+    @pytest.mark.unit
+    def test_bbox_lookup(self, grid):
+        """Bbox lookup returns the map units (and cell counts) it covers."""
+        lon0, lat0 = _cell_center_lonlat(1, 1)
+        lon1, lat1 = _cell_center_lonlat(2, 2)
+        counts = grid.mukeys_in_bbox(min(lon0, lon1), min(lat0, lat1), max(lon0, lon1), max(lat0, lat1),
+                                     return_counts=True)
+        assert {10, 11, 18, 19} <= set(counts)
+        assert all(n >= 1 for n in counts.values())
+
+
+class TestBuildGrid:
+    """Tests for tiling a GeoTIFF."""
+
+    @pytest.mark.unit
+    def test_build_from_geotiff(self, tmp_path):
+        """A GeoTIFF round-trips through build_mukey_grid."""
+        rasterio = pytest.importorskip("rasterio")
+        from rasterio.transform import from_origin
+
+        cells = np.arange(1, 101, dtype=np.uint32).reshape(10, 10)
+        cells[:, 8:] = 0
+        path = tmp_path / "mukey.tif"
+        with rasterio.open(path, 'w', driver='GTiff', height=10, width=10, count=1, dtype='uint32',
+                           crs='EPSG:5070', transform=from_origin(ORIGIN_X, ORIGIN_Y, 30, 30), nodata=0) as dst:
+            dst.write(cells, 1)
+
+        grid_dir = build_mukey_grid(str(path), str(tmp_path / "grid"), tile_size=4)
+        grid = MukeyGrid(grid_dir)
+
+        assert grid.width == 10 and grid.height == 10
+        assert "0_2" not in grid.tiles
+        np.testing.assert_array_equal(grid.read_window(0, 10, 0, 10), cells)
@@ -0,0 +1,159 @@
+"""
+Unit tests for GAEZ_singleflight.py
+
+This module tests coalescing of concurrent identical calls: one execution per
+key while callers overlap, shared exceptions, the async path sharing the
+in-flight table with sync callers, and the coalescing counters.
+"""
+
+import asyncio
+import threading
+import time
+import pytest
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from GAEZ_singleflight import SingleFlight, get_flight_group, singleflight_stats, reset_flight_groups
+
+
+def _blocking_fetch(release, calls, result='mukey'):
+    """Fetch that records its call and blocks until released."""
+    def fetch(*args):
+        calls.append(args)
+        assert release.wait(5)
+        return result
+    return fetch
+
+
+def _wait_for(predicate, timeout=5):
+    """Wait until predicate() holds."""
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+class TestSingleFlight:
+    """Tests for SingleFlight.do / do_async."""
+
+    @pytest.mark.unit
+    def test_concurrent_callers_share_one_call(self):
+        """Overlapping callers with the same key get the result of a single call."""
+        group = SingleFlight('test')
+        release, calls, results = threading.Event(), [], []
+        fetch = _blocking_fetch(release, calls)
+
+        threads = [threading.Thread(target=lambda: results.append(group.do((40.0, -100.0), fetch, 40.0, -100.0)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        assert _wait_for(lambda: group.stats()['calls'] == 8)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert calls == [(40.0, -100.0)]
+        assert results == ['mukey'] * 8
+        assert group.stats() == {'calls': 8, 'executions': 1, 'coalesced': 7, 'errors': 0, 'in_flight': 0}
+
+    @pytest.mark.unit
+    def test_different_keys_and_sequential_calls_are_not_coalesced(self):
+        """Only callers overlapping on the same key share a call; nothing is cached."""
+        group = SingleFlight('test')
+        calls = []
+
+        for key in [1, 2, 1]:
+            group.do(key, lambda k: calls.append(k) or k, key)
+
+        assert calls == [1, 2, 1]
+        assert group.stats()['coalesced'] == 0
+
+    @pytest.mark.unit
+    def test_exception_is_shared(self):
+        """Every waiting caller receives the leader's exception; the key is then free again."""
+        group = SingleFlight('test')
+        release, errors = threading.Event(), []
+
+        def failing_fetch():
+            assert release.wait(5)
+            raise ConnectionError("SDA down")
+
+        def call():
+            try:
+                group.do('key', failing_fetch)
+            except ConnectionError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=call) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        assert _wait_for(lambda: group.stats()['calls'] == 3)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+
+        assert len(errors) == 3 and len({id(e) for e in errors}) == 1
+        assert group.stats()['errors'] == 1
+        assert group.do('key', lambda: 'recovered') == 'recovered'
+
+    @pytest.mark.unit
+    def test_async_callers_join_sync_call(self):
+        """Async callers await a call started by a sync caller (and each other)."""
+        group = SingleFlight('test')
+        release, calls, sync_result = threading.Event(), [], []
+        fetch = _blocking_fetch(release, calls, result=42)
+
+        leader = threading.Thread(target=lambda: sync_result.append(group.do('k', fetch)))
+        leader.start()
+        assert _wait_for(lambda: group.in_flight() == 1)
+
+        async def main():
+            waiters = [asyncio.ensure_future(group.do_async('k', fetch)) for _ in range(3)]
+            await asyncio.sleep(0)
+            release.set()
+            return await asyncio.gather(*waiters)
+
+        assert asyncio.run(main()) == [42, 42, 42]
+        leader.join(5)
+        assert sync_result == [42] and len(calls) == 1
+        assert group.stats()['coalesced'] == 3
+
+    @pytest.mark.unit
+    def test_async_leader(self):
+        """An async leader runs the call off the event loop and shares it."""
+        group = SingleFlight('test')
+        release, calls = threading.Event(), []
+        fetch = _blocking_fetch(release, calls, result='slope')
+
+        async def main():
+            callers = [asyncio.ensure_future(group.do_async('k', fetch)) for _ in range(4)]
+            await asyncio.sleep(0)
+            release.set()
+            return await asyncio.gather(*callers)
+
+        assert asyncio.run(main()) == ['slope'] * 4
+        assert len(calls) == 1
+        assert group.stats()['coalesced'] == 3
+
+
+class TestFlightGroups:
+    """Tests for the process-wide groups and their metrics."""
+
+    @pytest.mark.unit
+    def test_groups_are_shared_and_reported(self):
+        """get_flight_group returns one group per name; stats are reported by name."""
+        reset_flight_groups()
+        group = get_flight_group('dominant_mukey')
+        assert get_flight_group('dominant_mukey') is group
+
+        group.do('k', lambda: None)
+
+        assert singleflight_stats() == {'dominant_mukey': {'calls': 1, 'executions': 1, 'coalesced': 0,
+                                                           'errors': 0, 'in_flight': 0}}
+        reset_flight_groups()
+        assert singleflight_stats() == {}
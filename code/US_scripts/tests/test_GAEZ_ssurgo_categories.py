@@ -0,0 +1,132 @@
+"""
+Unit tests for GAEZ_ssurgo_categories.py
+
+This module tests the categorical encoding of SSURGO string attributes:
+normalization, stable codes across inputs, values outside the vocabularies,
+per-category rule evaluation and the encoding done at ingest.
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from GAEZ_ssurgo_categories import (SSURGO_CATEGORY_VOCABULARIES, to_category, encode_ssurgo_categoricals,
+                                    category_isin, category_contains, category_code_map)
+from GAEZ_SSURGO_data import _ssurgo_rows_to_frame
+from GAEZ_US_phase_calc import classify_gaez_v4_phases
+
+
+HEADER = ['mukey', 'cokey', 'compname', 'comppct_r', 'chkey', 'hzname', 'hzdept_r', 'hzdepb_r',
+          'sandtotal_r', 'silttotal_r', 'claytotal_r', 'pi_r', 'lep_r', 'ec_r', 'caco3_r', 'om_r',
+          'dbovendry_r', 'gypsum_r', 'sar_r', 'cec7_r', 'ecec_r', 'sumbases_r', 'ph1to1h2o_r',
+          'total_fragvol_r', 'fragkind', 'plasticity', 'stickiness', 'drainagecl', 'hydricrating',
+          'taxtempcl', 'frostact', 'reskind', 'resdept_r', 'reshard', 'taxminalogy', 'pondfreqcl',
+          'ponddurcl', 'flodfreqcl', 'floddurcl', 'wtdepannmin']
+
+
+def _row(cokey, chkey, top, bottom, drainage, reskind, fragkind, flood=(None, None)):
+    return ['100', cokey, 'Holdrege', 85, chkey, 'Ap', top, bottom, 40.0, 40.0, 20.0, 5.0, 2.0, 0.5, 0.0,
+            2.0, 1.4, 0.0, 1.0, 15.0, 12.0, 10.0, 6.5, 45.0, fragkind, 'Slightly plastic', 'Slightly sticky',
+            drainage, 'No', 'Mesic', 'Low', reskind, 40, 'Strongly cemented', 'Mixed', None, None,
+            flood[0], flood[1], 30]
+
+
+ROWS = [
+    _row('1', '11', 0, 20, ' Poorly drained', 'Lithic bedrock', 'Cobbles', ('Frequent', 'Long (7 to 30 days)')),
+    _row('1', '12', 20, 40, ' Poorly drained', 'Lithic bedrock', None, ('Frequent', 'Long (7 to 30 days)')),
+    _row('2', '21', 0, 30, 'Well drained', 'Duripan', 'Concretions', ('Rare', 'Brief (2 to 7 days)')),
+    _row('2', '22', 30, 60, 'WELL DRAINED', 'Petrocalcic', 'Gravel', (None, None)),
+]
+
+
+class TestCategoryEncoding:
+    """Tests for to_category and encode_ssurgo_categoricals."""
+
+    @pytest.mark.unit
+    def test_codes_are_fixed_by_vocabulary(self):
+        """The same value has the same code whatever else is in the column."""
+        a = to_category(pd.Series(['Well drained', 'Poorly drained']), 'drainagecl')
+        b = to_category(pd.Series([' poorly drained ', None, '']), 'drainagecl')
+
+        assert a.cat.codes.iloc[1] == b.cat.codes.iloc[0]
+        assert list(a.cat.categories) == list(SSURGO_CATEGORY_VOCABULARIES['drainagecl'])
+        assert b.isna().tolist() == [False, True, True]
+
+    @pytest.mark.unit
+    def test_values_outside_vocabulary_are_kept(self):
+        """Unknown values are appended after the vocabulary without shifting its codes."""
+        result = to_category(pd.Series(['Well drained', 'Marshy']), 'drainagecl')
+        vocabulary = SSURGO_CATEGORY_VOCABULARIES['drainagecl']
+
+        assert result.tolist() == ['well drained', 'marshy']
+        assert list(result.cat.categories[:len(vocabulary)]) == list(vocabulary)
+        assert result.cat.codes.iloc[1] == len(vocabulary)
+
+    @pytest.mark.unit
+    def test_case_sensitive_columns_are_only_stripped(self):
+        """Component names and horizon designations keep their case."""
+        df = pd.DataFrame({'compname': [' Holdrege', 'Holdrege'], 'hzname': ['Ap', 'Bt1 ']})
+        encode_ssurgo_categoricals(df)
+
+        assert df['compname'].tolist() == ['Holdrege', 'Holdrege']
+        assert df['hzname'].tolist() == ['Ap', 'Bt1']
+        assert isinstance(df['compname'].dtype, pd.CategoricalDtype)
+
+
+class TestCategoryRules:
+    """Tests for evaluating rules once per category."""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("encode", [True, False])
+    def test_masks_match_string_rules(self, encode):
+        """Masks on Categoricals and on plain strings equal the row-wise string tests."""
+        values = pd.Series(['Lithic bedrock', None, 'Paralithic bedrock ', 'Duripan', 'weird'])
+        column = to_category(values, 'reskind') if encode else values
+
+        expected_contains = [any(s in str(v).lower() for s in ['lithic bedrock', 'densic']) for v in values]
+        expected_isin = [str(v).strip().lower() == 'duripan' for v in values]
+
+        np.testing.assert_array_equal(category_contains(column, ['Lithic bedrock', 'densic'], 'reskind'),
+                                      expected_contains)
+        np.testing.assert_array_equal(category_isin(column, ['Duripan'], 'reskind'), expected_isin)
+
+    @pytest.mark.unit
+    def test_code_map(self):
+        """category_code_map maps categories through a dict; missing -> NaN."""
+        result = category_code_map('drainagecl', {'well drained': 5, 'poorly drained': 2},
+                                   pd.Series(['Well drained', None, 'Poorly drained', 'subaqueous']))
+
+        np.testing.assert_array_equal(result, [5, np.nan, 2, np.nan])
+
+
+class TestIngestEncoding:
+    """Tests for the encoding in _ssurgo_rows_to_frame."""
+
+    @pytest.mark.unit
+    def test_frame_columns_are_categorical(self):
+        """Vocabulary columns are Categoricals; drain_id follows the drainage class."""
+        df = _ssurgo_rows_to_frame(HEADER, ROWS)
+
+        for col in SSURGO_CATEGORY_VOCABULARIES:
+            assert isinstance(df[col].dtype, pd.CategoricalDtype), col
+        assert df['drainagecl'].tolist() == ['poorly drained', 'poorly drained', 'well drained', 'well drained']
+        assert df['drain_id'].tolist() == [2, 2, 5, 5]
+
+    @pytest.mark.unit
+    def test_phases_match_plain_strings(self):
+        """Phase classification gives the same result on Categoricals and on plain strings."""
+        encoded = _ssurgo_rows_to_frame(HEADER, ROWS)
+        plain = encoded.copy()
+        for col in SSURGO_CATEGORY_VOCABULARIES:
+            plain[col] = plain[col].astype(object)
+
+        encoded = classify_gaez_v4_phases(encoded)
+        plain = classify_gaez_v4_phases(plain)
+
+        assert encoded['phase_ids_list'].tolist() == plain['phase_ids_list'].tolist()
+        assert encoded['phase_ids_list'].iloc[0] != [0]
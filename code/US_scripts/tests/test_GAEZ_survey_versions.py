@@ -0,0 +1,119 @@
+"""
+Unit tests for GAEZ_survey_versions.py
+
+This module tests the survey-area columns of the SDA horizon query, the
+version stamps and max-age expiry of the raw horizon cache, and the sacatalog
+refresh that drops only the cached map units of republished survey areas.
+"""
+
+import pytest
+import pandas as pd
+from pathlib import Path
+import sys
+from unittest.mock import MagicMock, patch
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import GAEZ_SSURGO_data
+import GAEZ_survey_versions
+from GAEZ_SSURGO_data import RawHorizonCache, build_ssurgo_gaez_query
+from GAEZ_survey_versions import SurveyCatalog, refresh_survey_versions
+
+
+def _raw_rows(mukey, areasymbol, saverest):
+    return pd.DataFrame({'mukey': [mukey, mukey], 'cokey': [f'{mukey}1', f'{mukey}1'],
+                         'hzdept_r': [0, 20], 'areasymbol': [areasymbol] * 2, 'saverest': [saverest] * 2})
+
+
+def _sacatalog_payload(versions):
+    return {"Table": [["areasymbol", "saverest"]] + [[area, version] for area, version in versions.items()]}
+
+
+class TestSurveyQuery:
+    """Tests for the survey-area columns of build_ssurgo_gaez_query."""
+
+    @pytest.mark.unit
+    def test_survey_columns_only_on_request(self):
+        """areasymbol and saverest are joined in only with survey_version=True (SDA)."""
+        plain = build_ssurgo_gaez_query([100])
+        versioned = build_ssurgo_gaez_query([100], survey_version=True)
+
+        assert 'saverest' not in plain and 'SACATALOG' not in plain
+        assert 'lg.areasymbol, sac.saverest' in versioned
+        assert 'SACATALOG sac ON lg.areasymbol = sac.areasymbol' in versioned
+
+
+class TestVersionedHorizonCache:
+    """Tests for the survey stamps of RawHorizonCache."""
+
+    @pytest.mark.unit
+    def test_invalidates_only_changed_areas(self):
+        """Only map units of survey areas with a new saverest are dropped."""
+        cache = RawHorizonCache(10)
+        cache.put(pd.concat([_raw_rows('1', 'NE001', '2024-09-01'), _raw_rows('2', 'NE003', '2024-09-01'),
+                             _raw_rows('3', 'IA001', '2024-09-01')]))
+
+        assert cache.survey_versions() == {'NE001': '2024-09-01', 'NE003': '2024-09-01', 'IA001': '2024-09-01'}
+        dropped = cache.invalidate_changed_areas({'NE001': '2025-09-01', 'NE003': '2024-09-01'})
+
+        assert dropped == 1
+        assert set(cache.get_many(['1', '2', '3'])) == {'2', '3'}
+
+    @pytest.mark.unit
+    def test_entries_expire_after_max_age(self):
+        """Entries older than max_age are not served."""
+        cache = RawHorizonCache(10, max_age=100)
+        with patch('GAEZ_SSURGO_data.time.monotonic', return_value=1000.0):
+            cache.put(_raw_rows('1', 'NE001', '2024-09-01'))
+        with patch('GAEZ_SSURGO_data.time.monotonic', return_value=1050.0):
+            assert set(cache.get_many(['1'])) == {'1'}
+        with patch('GAEZ_SSURGO_data.time.monotonic', return_value=1101.0):
+            assert cache.get_many(['1']) == {}
+        assert len(cache) == 0
+
+
+class TestSurveyRefresh:
+    """Tests for SurveyCatalog and refresh_survey_versions."""
+
+    @pytest.mark.unit
+    def test_catalog_reports_changed_areas(self):
+        """update returns previously known areas whose version changed; the fingerprint follows."""
+        catalog = SurveyCatalog()
+        assert catalog.fingerprint() == ''
+
+        assert catalog.update({'NE001': 'a', 'NE003': 'a'}) == set()
+        first = catalog.fingerprint()
+        assert catalog.update({'NE001': 'b', 'NE003': 'a', 'IA001': 'a'}) == {'NE001'}
+        assert catalog.version('NE001') == 'b'
+        assert catalog.fingerprint() not in ('', first)
+        assert catalog.stats()['areas'] == 3
+
+    @pytest.mark.unit
+    def test_refresh_drops_republished_map_units(self):
+        """A sacatalog refresh drops cached rows of republished areas only."""
+        GAEZ_SSURGO_data._horizon_cache.put(pd.concat([_raw_rows('1', 'NE001', 'v1'), _raw_rows('2', 'NE003', 'v1')]))
+        client = MagicMock()
+        client.query.return_value = _sacatalog_payload({'NE001': 'v2', 'NE003': 'v1'})
+
+        with patch('GAEZ_survey_versions.GAEZ_SDA_client.get_sda_client', return_value=client):
+            refresh_survey_versions()
+
+        client.query.assert_called_once_with(GAEZ_survey_versions.SACATALOG_QUERY, allow_stale=False)
+        assert set(GAEZ_SSURGO_data._horizon_cache.get_many(['1', '2'])) == {'2'}
+        stats = GAEZ_survey_versions.get_survey_catalog().stats()
+        assert stats['refreshes'] == 1 and stats['invalidated_entries'] == 1
+
+    @pytest.mark.unit
+    def test_failed_refresh_keeps_cache(self):
+        """An SDA failure is counted and leaves cached rows in place."""
+        GAEZ_SSURGO_data._horizon_cache.put(_raw_rows('1', 'NE001', 'v1'))
+        client = MagicMock()
+        client.query.side_effect = GAEZ_survey_versions.GAEZ_SDA_client.SDAUnavailableError('down')
+
+        with patch('GAEZ_survey_versions.GAEZ_SDA_client.get_sda_client', return_value=client):
+            with pytest.raises(GAEZ_survey_versions.GAEZ_SDA_client.SDAUnavailableError):
+                refresh_survey_versions()
+
+        assert set(GAEZ_SSURGO_data._horizon_cache.get_many(['1'])) == {'1'}
+        assert GAEZ_survey_versions.get_survey_catalog().stats()['failures'] == 1
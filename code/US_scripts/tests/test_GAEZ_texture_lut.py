@@ -0,0 +1,79 @@
+"""
+Unit tests for GAEZ_texture_lut.py
+
+This module tests that the 1% texture lookup table gives exactly the
+analytic texture class, texture group and particle size class, including
+ties on class boundaries, and that the shipped table matches a rebuild.
+"""
+
+import pytest
+import numpy as np
+from pathlib import Path
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import gaez_config
+import GAEZ_texture_lut
+from GAEZ_texture_lut import texture_lookup, build_texture_table, build_texture_lut, TEXTURE_GROUP_BY_ID
+from GAEZ_SSURGO_data import texture_class_ids, pscl_class_ids, getTextGroup, gettt
+
+
+def _analytic(sand, silt, clay):
+    ids = texture_class_ids(sand, silt, clay)
+    return ids, TEXTURE_GROUP_BY_ID[ids], pscl_class_ids(ids, clay, sand)
+
+
+class TestTextureLookup:
+    """Tests for texture_lookup against the analytic rules."""
+
+    @pytest.mark.unit
+    @pytest.mark.parametrize("step", [1.0, 0.5, 0.1])
+    def test_grid_matches_analytic(self, step):
+        """Grid points (many exactly on class boundaries) match the analytic rules."""
+        sand, clay = np.meshgrid(np.arange(0, 100 + step / 2, step), np.arange(0, 100 + step / 2, step))
+        keep = sand + clay <= 100
+        sand, clay = sand[keep], clay[keep]
+        silt = 100 - sand - clay
+
+        for looked_up, expected in zip(texture_lookup(sand, silt, clay), _analytic(sand, silt, clay)):
+            np.testing.assert_array_equal(looked_up, expected)
+
+    @pytest.mark.unit
+    def test_random_points_match_analytic(self):
+        """Random textures, including sums off 100 and missing values, match the analytic rules."""
+        rng = np.random.default_rng(7)
+        sand = rng.uniform(0, 100, 200000)
+        clay = rng.uniform(0, 100 - sand)
+        silt = 100 - sand - clay + rng.choice([0.0, 0.0, 0.3, -0.4], size=sand.size)
+        sand[:50] = np.nan
+
+        for looked_up, expected in zip(texture_lookup(sand, silt, clay), _analytic(sand, silt, clay)):
+            np.testing.assert_array_equal(looked_up, expected)
+
+    @pytest.mark.unit
+    def test_group_ids_match_getTextGroup(self):
+        """Texture group ids follow getTextGroup (C/M/F)."""
+        letters = {'C': 1, 'M': 2, 'F': 3}
+        for sand, silt, clay in [(92, 5, 3), (40, 40, 20), (20, 20, 60), (30, 35, 35)]:
+            group = texture_lookup(sand, silt, clay)[1]
+            assert group == letters[getTextGroup(gettt(sand, silt, clay))]
+
+
+class TestTextureTable:
+    """Tests for building and loading the table."""
+
+    @pytest.mark.unit
+    def test_shipped_table_matches_rebuild(self):
+        """The loaded table equals a fresh build."""
+        np.testing.assert_array_equal(np.asarray(GAEZ_texture_lut.TEXTURE_TABLE), build_texture_table())
+
+    @pytest.mark.unit
+    def test_build_writes_loadable_table(self, tmp_path):
+        """build_texture_lut writes a (3, 101, 101) uint8 .npy file."""
+        path = build_texture_lut(str(tmp_path / "texture_lut.npy"))
+        table = np.load(path, mmap_mode='r')
+
+        assert table.shape == (3, 101, 101)
+        assert table.dtype == np.uint8
@@ -0,0 +1,160 @@
+"""
+Unit tests for overlay_user_horizons.py and integrate_user_data.py
+
+This module tests the vectorized user/map horizon overlay: the overlap
+matrices, Lab > Plot > Map priority, and recomputation of derived columns
+for the touched horizons only.
+"""
+
+import pytest
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from types import SimpleNamespace
+import sys
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from overlay_user_horizons import interval_overlap, point_in_horizons, apply_overlays, overlay_user_horizons
+from integrate_user_data import integrate_plot_data, integrate_lab_data, integrate_all_user_data
+from GAEZ_SSURGO_data import (derive_horizon_properties, pscl_class_ids, texture_class_ids, classify_pscl,
+                              gettt, PSCL_IDS)
+
+
+@pytest.fixture
+def map_horizons():
+    """Processed SSURGO horizons for one component."""
+    data = pd.DataFrame({
+        'cokey': ['1001'] * 3, 'hzdept_r': [0, 20, 60], 'hzdepb_r': [20, 60, 150],
+        'sand': [40.0, 30.0, 20.0], 'silt': [40.0, 35.0, 35.0], 'clay': [20.0, 35.0, 45.0],
+        'om': [3.0, 1.0, 0.5], 'db_measured': [1.3, 1.45, 1.5], 'sar': [0.0, 2.0, 8.0],
+        'ph': [6.2, 6.5, 8.0], 'ec': [0.5, 2.0, 6.0], 'caco3': [0.0, 5.0, 20.0], 'gypsum': [0.0, 0.0, 3.0],
+        'teb': [12.0, 16.0, 30.0], 'cecs': [15.0, 20.0, 35.0], 'fragvol': [5.0, 10.0, 30.0],
+    })
+    return derive_horizon_properties(data)
+
+
+class TestOverlapMatrices:
+    """Tests for the user-vs-map match matrices."""
+
+    @pytest.mark.unit
+    def test_interval_overlap(self):
+        """Horizons overlap when they share any depth; touching boundaries do not."""
+        match = interval_overlap([0, 15, 60], [10, 30, 70], [0, 20, 60], [20, 60, 150])
+
+        np.testing.assert_array_equal(match, [[True, False, False],
+                                              [True, True, False],
+                                              [False, False, True]])
+
+    @pytest.mark.unit
+    def test_point_in_horizons(self):
+        """A sample belongs to the horizon with top <= depth < bottom."""
+        match = point_in_horizons([0, 20, 200], [0, 20, 60], [20, 60, 150])
+
+        np.testing.assert_array_equal(match, [[True, False, False],
+                                              [False, True, False],
+                                              [False, False, False]])
+
+    @pytest.mark.unit
+    def test_last_layer_with_value_wins(self):
+        """Later overlays win; NaN values never overwrite."""
+        data = pd.DataFrame({'ph': [6.0, 6.0]})
+        first = (np.array([[True, True]]), pd.DataFrame({'ph': [7.0]}))
+        second = (np.array([[True, False]]), pd.DataFrame({'ph': [np.nan]}))
+        third = (np.array([[False, True]]), pd.DataFrame({'ph': [8.0]}))
+
+        result, touched = apply_overlays(data, [first, second, third])
+
+        assert result['ph'].tolist() == [7.0, 8.0]
+        np.testing.assert_array_equal(touched['ph'], [True, True])
+
+
+class TestDerivedColumns:
+    """Tests for derive_horizon_properties."""
+
+    @pytest.mark.unit
+    def test_pscl_matches_classify_pscl(self):
+        """Vectorized particle size classes equal the row-wise classify_pscl."""
+        sand, clay = np.meshgrid(np.arange(0, 101, 2.0), np.arange(0, 101, 2.0))
+        keep = sand + clay <= 100
+        sand, clay = sand[keep], clay[keep]
+        silt = 100 - sand - clay
+
+        expected = [PSCL_IDS[classify_pscl(pd.Series({'texture': gettt(s, si, c), 'clay': c, 'sand': s}))]
+                    for s, si, c in zip(sand, silt, clay)]
+
+        np.testing.assert_array_equal(pscl_class_ids(texture_class_ids(sand, silt, clay), clay, sand), expected)
+
+    @pytest.mark.unit
+    def test_processed_frame_has_pscl_ids(self, map_horizons):
+        """pscl_id is numeric and matches the pscl class."""
+        assert map_horizons['pscl'].tolist() == ['2', '2', '3']
+        assert map_horizons['pscl_id'].tolist() == [2, 2, 3]
+        assert map_horizons['texture'].tolist() == ['Loam', 'Clay loam', 'Clay']
+
+
+class TestUserOverlay:
+    """Tests for plot/lab integration through the overlay engine."""
+
+    @pytest.mark.unit
+    def test_plot_texture_updates_derived_columns(self, map_horizons):
+        """Plot texture replaces overlapping horizons and recomputes their texture columns only."""
+        plot = pd.DataFrame({'hzdept': [0], 'hzdepb': [25], 'sandtotal': [70.0], 'silttotal': [20.0],
+                             'claytotal': [10.0], 'DB': [1.4]})
+
+        result = integrate_plot_data(plot, map_horizons)
+
+        assert result['sand'].tolist() == [70.0, 70.0, 20.0]
+        assert result['texture'].tolist()[:2] == ['Sandy loam', 'Sandy loam']
+        assert result['texture_class_id'].tolist() == [10, 10, 1]
+        assert result['db_measured'].tolist()[:2] == [1.4, 1.4]
+        assert result.loc[0, 'db'] == pytest.approx(1.4 / 1.56)
+        pd.testing.assert_series_equal(result.loc[2], map_horizons.loc[2])
+
+    @pytest.mark.unit
+    def test_lab_updates_processed_columns(self, map_horizons):
+        """Lab OC updates om and soc; lab ESP and BS are kept as measured."""
+        lab = pd.DataFrame({'depth_cm': [30.0], 'organic_carbon_pct': [1.0], 'esp_pct': [12.0],
+                            'base_sat_pct': [55.0], 'cec_cmol_kg': [25.0]})
+
+        result = integrate_lab_data(lab, map_horizons)
+
+        assert result.loc[1, 'om'] == pytest.approx(1.724)
+        assert result.loc[1, 'soc'] == pytest.approx(1.724 * 0.58)
+        assert result.loc[1, 'esp'] == 12.0
+        assert result.loc[1, 'bs'] == 55.0
+        assert result.loc[1, 'cecc'] == pytest.approx(25.0 / 35.0 * 100)
+        pd.testing.assert_frame_equal(result.drop(index=1), map_horizons.drop(index=1))
+
+    @pytest.mark.unit
+    def test_lab_supersedes_plot(self, map_horizons):
+        """For the same property lab beats plot beats map, in one pass."""
+        user_data = SimpleNamespace(
+            plot_data=[SimpleNamespace(top_depth=0, bottom_depth=60, sand_pct=None, silt_pct=None, clay_pct=None,
+                                       ph=5.5, organic_matter_pct=None, bulk_density=None,
+                                       coarse_fragments_pct=None, cec_soil=None, ec=None, caco3_pct=None,
+                                       gypsum_pct=None)],
+            site_data=None,
+            lab_data=[SimpleNamespace(depth_cm=10, ph_h2o=7.1, organic_carbon_pct=None, cec_cmol_kg=None,
+                                      ec_ds_m=None, esp_pct=None, base_saturation_pct=None, caco3_pct=None,
+                                      gypsum_pct=None)],
+        )
+
+        result, sources = integrate_all_user_data(user_data, map_horizons)
+
+        assert result['ph'].tolist() == [7.1, 5.5, 8.0]
+        assert sources['user_plot_data_used'] and sources['user_lab_data_used']
+
+    @pytest.mark.unit
+    def test_raw_overlay_truncates_to_bedrock(self):
+        """overlay_user_horizons updates _r columns and truncates at bedrock."""
+        ssurgo = pd.DataFrame({'hzdept_r': [0, 20, 60], 'hzdepb_r': [20, 60, 150],
+                               'sandtotal_r': [40.0, 30.0, 20.0], 'ph1to1h2o_r': [6.0, 6.5, 7.0]})
+        user = pd.DataFrame({'hzdept': [0], 'hzdepb': [30], 'sandtotal': [55.0], 'ph': [np.nan]})
+
+        result = overlay_user_horizons(user, ssurgo, bedrock_depth=80)
+
+        assert result['hzdepb_r'].tolist() == [20, 60, 80]
+        assert result['sandtotal_r'].tolist() == [55.0, 55.0, 20.0]
+        assert result['ph1to1h2o_r'].tolist() == [6.0, 6.5, 7.0]